@@ -6,7 +6,7 @@ import threading
 import time
 import urllib.request
 from datetime import datetime
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 
 from config import FLASK_HOST, FLASK_PORT, FLASK_DEBUG
@@ -17,13 +17,27 @@ from routes.categories import categories_bp
 from routes.analytics import analytics_bp
 from routes.upload import upload_bp
 from routes.admin import admin_bp
+from routes.recommendations import recommendations_bp
+from routes.listing import PaginationError
+from sparql.terms import BindError
 from sparql.fuseki_client import fuseki_client
-from services.recommendation import recommendation_service
+from services.catalog_snapshot import catalog_snapshot
+from services.also_liked import also_liked_model
+from services.analytics_views import analytics_views
+from services.dataset_counters import dataset_counters
+from services.ingredient_index import ingredient_index
+from services.product_similarity import product_similarity
+from services.query_planner import query_planner
+from services.search_index import search_index
+from utils.metrics import metrics, PROMETHEUS_CONTENT_TYPE
+from utils.tracing import tracer, TracingJSONProvider, REQUEST_ID_HEADER
 
 app = Flask(__name__)
+app.json = TracingJSONProvider(app)
 CORS(app,
      origins=os.getenv('CORS_ORIGINS', '*').split(','),
-     allow_headers=['Content-Type', 'Authorization'],
+     allow_headers=['Content-Type', 'Authorization', 'If-None-Match', REQUEST_ID_HEADER],
+     expose_headers=['ETag', 'Server-Timing', REQUEST_ID_HEADER],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 
 
@@ -35,6 +49,42 @@ app.register_blueprint(categories_bp)
 app.register_blueprint(analytics_bp)
 app.register_blueprint(upload_bp)
 app.register_blueprint(admin_bp)
+app.register_blueprint(recommendations_bp)
+
+
+# === Metrics และ tracing ต่อ endpoint ===
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.trace = tracer.start_trace(tracer.request_id(request.headers.get(REQUEST_ID_HEADER)),
+                                 f'{request.method} {endpoint}', path=request.path)
+
+
+@app.after_request
+def record_request_metrics(response):
+    """บันทึกเวลาและขนาด response ต่อ URL rule (response แบบ streaming นับถึงตอนเริ่มส่ง)
+    และใส่ X-Request-ID กับ Server-Timing (สรุป span ของ trace)
+    """
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(endpoint, request.method, response.status_code,
+                                time.perf_counter() - started,
+                                response.calculate_content_length() or 0)
+    trace = g.get('trace')
+    if trace is not None:
+        trace.root.attributes['status'] = response.status_code
+        response.headers[REQUEST_ID_HEADER] = trace.request_id
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+
+@app.teardown_request
+def finish_trace(exc):
+    """ปิด trace และ export (หลังส่ง response แล้ว — ไม่เพิ่มเวลาให้ client)"""
+    tracer.finish_trace(g.pop('trace', None))
 
 
 # === Routes หลัก ===
@@ -51,7 +101,9 @@ def index():
                 'GET /api/products': 'ดึงรายการผลิตภัณฑ์ทั้งหมด',
                 'GET /api/products?category=<id>': 'กรองตามหมวดหมู่',
                 'GET /api/products?min_price=<n>&max_price=<n>': 'กรองตามช่วงราคา',
+                'GET /api/products?limit=<n>&cursor=<next_cursor>': 'แบ่งหน้า (ใช้ได้กับทุก endpoint แบบรายการ)',
                 'GET /api/products/<id>': 'รายละเอียดผลิตภัณฑ์',
+                'POST /api/products/batch': 'รายละเอียดผลิตภัณฑ์หลายรายการ (body {"ids": [...]})',
             },
             'วิสาหกิจชุมชน': {
                 'GET /api/enterprises': 'ดึงรายการวิสาหกิจทั้งหมด',
@@ -78,9 +130,13 @@ def index():
             },
             'แนะนำ': {
                 'GET /api/recommendations/<product_id>/similar': 'ผลิตภัณฑ์คล้ายกัน',
+                'POST /api/recommendations/similar/batch': 'ผลิตภัณฑ์คล้ายกันของหลายรายการ (body {"ids": [...]})',
+                'GET /api/recommendations/<product_id>/also-liked': 'ผู้รีวิวที่ชอบผลิตภัณฑ์นี้ชอบอะไรอีก (ตอบ 503 จนกว่าจะรัน python train_also_liked.py)',
             },
             'ระบบ': {
                 'GET /api/health': 'ตรวจสอบสถานะระบบ',
+                'GET /api/cache/stats': 'สถิติแคชผลลัพธ์ SPARQL',
+                'GET /api/metrics': 'metrics รูปแบบ Prometheus (latency ต่อ endpoint/query template, p95/p99)',
             }
         }
     })
@@ -88,21 +144,42 @@ def index():
 
 @app.route('/api/health')
 def health_check():
-    """ตรวจสอบสถานะระบบและการเชื่อมต่อ Fuseki"""
+    """ตรวจสอบสถานะระบบและการเชื่อมต่อ Fuseki (ping) — จำนวน triples มาจากตัวนับ ไม่ได้นับใหม่"""
     fuseki_status = fuseki_client.check_connection()
+    if fuseki_status['connected']:
+        counts = dataset_counters.counts()
+        if counts is not None:
+            fuseki_status['triple_count'] = counts['triples']
     return jsonify({
         'status': 'ok' if fuseki_status['connected'] else 'error',
         'fuseki': fuseki_status
     })
 
 
-@app.route('/api/recommendations/<product_id>/similar')
-def get_similar(product_id):
-    """แนะนำผลิตภัณฑ์คล้ายกัน"""
-    result = recommendation_service.get_similar_products(product_id)
-    if 'error' in result:
-        return jsonify({'error': result['error']}), 500
-    return jsonify(result)
+@app.route('/api/cache/stats')
+def cache_stats():
+    """สถิติแคชผลลัพธ์ SPARQL: hit ratio, หน่วยความจำ, จำนวนที่ถูกไล่ออก"""
+    return jsonify({
+        'message': 'สถิติแคชผลลัพธ์ SPARQL',
+        'cache': fuseki_client.cache.stats(),
+        'snapshot': catalog_snapshot.stats(),
+        'analytics': analytics_views.stats(),
+        'counters': dataset_counters.stats(),
+        'ingredients': ingredient_index.stats(),
+        'search': search_index.stats(),
+        'text_index': fuseki_client.text_index_stats(),
+        'similarity': product_similarity.stats(),
+        'also_liked': also_liked_model.stats(),
+        'query_plans': query_planner.stats()
+    })
+
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """metrics รูปแบบ Prometheus: histogram เวลาตอบกลับต่อ endpoint และต่อ query template
+    พร้อม p50/p95/p99, จำนวนแถว, จำนวนข้อผิดพลาด และขนาดข้อมูล
+    """
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 
 # === Survey ===
@@ -159,6 +236,16 @@ def not_found(e):
     return jsonify({'error': 'ไม่พบหน้าที่ต้องการ'}), 404
 
 
+@app.errorhandler(PaginationError)
+def bad_pagination(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@app.errorhandler(BindError)
+def bad_parameter(e):
+    return jsonify({'error': str(e)}), 400
+
+
 @app.errorhandler(500)
 def internal_error(e):
     return jsonify({'error': 'เกิดข้อผิดพลาดภายในระบบ'}), 500
@@ -182,6 +269,15 @@ def keep_alive():
 ping_thread = threading.Thread(target=keep_alive, daemon=True)
 ping_thread.start()
 
+# โหลด catalog snapshot, analytics views และความคล้ายของผลิตภัณฑ์ล่วงหน้า (ถ้า Fuseki ยังไม่พร้อม request แรก ๆ จะใช้ SPARQL สดและลองใหม่เป็นระยะ)
+catalog_snapshot.rebuild_async()
+analytics_views.rebuild_async(delay=0)
+product_similarity.rebuild_async()
+# เปิดไฟล์โมเดล also-liked (mmap) ถ้าฝึกไว้แล้ว
+also_liked_model.load()
+# ตั้งต้นตัวนับของ overview/health แล้วตรวจทานเป็นระยะ
+dataset_counters.start()
+
 
 if __name__ == '__main__':
     print("=" * 50)
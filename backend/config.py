@@ -7,9 +7,131 @@ FUSEKI_DATASET = os.getenv('FUSEKI_DATASET', 'sakon_ce')
 FUSEKI_QUERY_ENDPOINT = f"{FUSEKI_URL}/{FUSEKI_DATASET}/sparql"
 FUSEKI_UPDATE_ENDPOINT = f"{FUSEKI_URL}/{FUSEKI_DATASET}/update"
 FUSEKI_DATA_ENDPOINT = f"{FUSEKI_URL}/{FUSEKI_DATASET}/data"
+FUSEKI_VALIDATE_ENDPOINT = f"{FUSEKI_URL}/$/validate/query"
+FUSEKI_PING_ENDPOINT = f"{FUSEKI_URL}/$/ping"
 FUSEKI_ADMIN_USER = os.getenv('FUSEKI_ADMIN_USER', 'admin')
 FUSEKI_ADMIN_PASSWORD = os.getenv('FUSEKI_ADMIN_PASSWORD', 'sakon_ce_admin')
 
+# backend ของ SPARQL: 'fuseki' (HTTP ไปยัง FUSEKI_URL) หรือ 'embedded' (triple store ในโปรเซส
+# โหลดจาก EMBEDDED_DATA_FILES ตอนเริ่ม — ไม่ต้องมี Fuseki, ข้อมูลที่เขียนอยู่ในหน่วยความจำเท่านั้น)
+SPARQL_BACKEND = os.getenv('SPARQL_BACKEND', 'fuseki')
+ONTOLOGY_DIR = os.getenv(
+    'ONTOLOGY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ontology'))
+# รายชื่อไฟล์คั่นด้วยจุลภาค (.ttl = Turtle, .owl/.rdf = RDF/XML) path สัมพัทธ์อิงกับ ONTOLOGY_DIR
+EMBEDDED_DATA_FILES = [
+    os.path.join(ONTOLOGY_DIR, name.strip())
+    for name in os.getenv('EMBEDDED_DATA_FILES', 'sakon_ce_ontology.owl,sample_data.ttl').split(',')
+    if name.strip()
+]
+# โครงสร้างของ embedded store: 'dict' (dict ซ้อนกัน) หรือ 'encoded' (id + array เรียงลำดับ ประหยัดหน่วยความจำ)
+EMBEDDED_STORE = os.getenv('EMBEDDED_STORE', 'dict')
+# ไฟล์ index ของ store แบบ 'encoded' ที่เปิดด้วย mmap (ว่าง = สร้างในหน่วยความจำทุกครั้งที่เริ่ม)
+EMBEDDED_INDEX_FILE = os.getenv('EMBEDDED_INDEX_FILE', '')
+
+# HTTP connection pool สำหรับเชื่อมต่อ Fuseki (keep-alive)
+FUSEKI_POOL_SIZE = int(os.getenv('FUSEKI_POOL_SIZE', 10))
+FUSEKI_CONNECT_TIMEOUT = float(os.getenv('FUSEKI_CONNECT_TIMEOUT', 5))
+FUSEKI_READ_TIMEOUT = float(os.getenv('FUSEKI_READ_TIMEOUT', 30))
+FUSEKI_ACCEPT_GZIP = os.getenv('FUSEKI_ACCEPT_GZIP', 'true').lower() == 'true'
+
+# text index ของ Fuseki (jena-text / Lucene ดู docker/fuseki/sakon_ce_text.ttl) สำหรับค้นหาข้อความ
+# 'auto' = ตรวจเองเป็นระยะว่า text:query ใช้ได้, 'true' = ใช้เสมอ, 'false' = ใช้ FILTER CONTAINS เสมอ
+FUSEKI_TEXT_INDEX = os.getenv('FUSEKI_TEXT_INDEX', 'auto').lower()
+FUSEKI_TEXT_INDEX_PROBE_SECONDS = float(os.getenv('FUSEKI_TEXT_INDEX_PROBE_SECONDS', 300))
+
+# จำนวน thread สูงสุดสำหรับยิงหลาย query พร้อมกัน (query_many)
+FUSEKI_FANOUT_WORKERS = int(os.getenv('FUSEKI_FANOUT_WORKERS', FUSEKI_POOL_SIZE))
+
+# แคชผลลัพธ์ SPARQL (LRU + TTL) — ล้างทั้งหมดทุกครั้งที่ update สำเร็จ
+QUERY_CACHE_ENABLED = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 256))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv('QUERY_CACHE_TTL_SECONDS', 300))
+
+# อายุของ dataset version ที่จำไว้ใน worker ก่อนอ่านซ้ำจาก Fuseki (วินาที)
+DATASET_VERSION_TTL_SECONDS = float(os.getenv('DATASET_VERSION_TTL_SECONDS', 2))
+
+# โหมดดึงรายละเอียดผลิตภัณฑ์/วิสาหกิจ: 'multi' (หลาย SELECT พร้อมกัน) หรือ 'construct' (CONSTRUCT รอบเดียว)
+# override รายคำขอได้ด้วย ?mode=multi|construct
+DETAIL_QUERY_MODES = ('multi', 'construct')
+DETAIL_QUERY_MODE = os.getenv('DETAIL_QUERY_MODE', 'multi')
+
+# การแบ่งหน้าของ endpoint แบบรายการ (?limit=<n>&cursor=<next_cursor>)
+# LIST_DEFAULT_LIMIT = 0 คือไม่จำกัดเมื่อไม่ส่ง limit (เข้ากันได้กับ frontend เดิม)
+LIST_DEFAULT_LIMIT = int(os.getenv('LIST_DEFAULT_LIMIT', '0'))
+LIST_MAX_LIMIT = int(os.getenv('LIST_MAX_LIMIT', '500'))
+
+# จำนวนค่าล่าสุดต่อ query template/endpoint ที่ใช้คำนวณ p50/p95/p99 ใน /api/metrics
+METRICS_QUANTILE_WINDOW = int(os.getenv('METRICS_QUANTILE_WINDOW', '1024'))
+
+# Slow-query log: query ที่ช้ากว่า SLOW_QUERY_THRESHOLD_MS (ค่าติดลบ = ปิด) จะถูกบันทึก
+# พร้อมแผนการทำงานจาก Fuseki ลง ring buffer (ดูที่ /api/admin/slow-queries) และไฟล์ JSONL
+# SLOW_QUERY_LOG_FILE ว่าง = ไม่เขียนไฟล์
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500'))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', '200'))
+SLOW_QUERY_LOG_FILE = os.getenv(
+    'SLOW_QUERY_LOG_FILE', os.path.join(os.path.dirname(__file__), 'logs', 'slow_queries.jsonl'))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', '3'))
+
+# Tracing ต่อ request: span ของ route/service/Fuseki สรุปใน header Server-Timing
+# TRACE_EXPORT_FILE: ไฟล์ JSONL ที่เขียน trace ทุก request (ว่าง = ไม่ export)
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+TRACE_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE', '')
+TRACE_EXPORT_MAX_BYTES = int(os.getenv('TRACE_EXPORT_MAX_BYTES', str(10 * 1024 * 1024)))
+TRACE_EXPORT_BACKUPS = int(os.getenv('TRACE_EXPORT_BACKUPS', '3'))
+
+# Catalog snapshot: ตอบ endpoint ผลิตภัณฑ์/วิสาหกิจ/หมวดหมู่จากสำเนาในหน่วยความจำ
+# (สร้างใหม่หลัง admin เขียนข้อมูล) ถ้าปิดหรือยังไม่พร้อมจะ query Fuseki ตามเดิม
+CATALOG_SNAPSHOT_ENABLED = os.getenv('CATALOG_SNAPSHOT_ENABLED', 'true').lower() == 'true'
+# ถ้าโหลดไม่สำเร็จ (เช่น Fuseki ยังไม่พร้อม) จะลองใหม่หลังผ่านไปกี่วินาที
+CATALOG_SNAPSHOT_RETRY_SECONDS = float(os.getenv('CATALOG_SNAPSHOT_RETRY_SECONDS', '30'))
+
+# Analytics views: ผลลัพธ์ของ /api/analytics/* (ยกเว้น overview/shared-ingredients) ที่คำนวณล่วงหน้าใน query เดียว
+# คำนวณใหม่หลัง admin เขียนข้อมูล โดยรอให้ไม่มีการเขียนใหม่ ANALYTICS_VIEWS_DEBOUNCE_SECONDS วินาทีก่อน
+ANALYTICS_VIEWS_ENABLED = os.getenv('ANALYTICS_VIEWS_ENABLED', 'true').lower() == 'true'
+ANALYTICS_VIEWS_DEBOUNCE_SECONDS = float(os.getenv('ANALYTICS_VIEWS_DEBOUNCE_SECONDS', '2'))
+ANALYTICS_VIEWS_RETRY_SECONDS = float(os.getenv('ANALYTICS_VIEWS_RETRY_SECONDS', '30'))
+
+# ตัวนับ triples/ผลิตภัณฑ์/วิสาหกิจ/หมวดหมู่ของ overview และ health: นับจริงตอนเริ่ม ปรับตามการเขียนของ admin
+# แล้วตรวจทานกับค่าจริงทุก DATASET_COUNTERS_RECONCILE_SECONDS วินาที (0 = ไม่ตรวจทานเป็นระยะ)
+DATASET_COUNTERS_RECONCILE_SECONDS = float(os.getenv('DATASET_COUNTERS_RECONCILE_SECONDS', '600'))
+
+# คู่ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน: คำนวณจาก inverted index วัตถุดิบ → ผลิตภัณฑ์ในหน่วยความจำ
+# (ปรับทีละผลิตภัณฑ์หลัง admin เขียนข้อมูล) ถ้าปิดจะ query Fuseki ตามเดิม
+INGREDIENT_INDEX_ENABLED = os.getenv('INGREDIENT_INDEX_ENABLED', 'true').lower() == 'true'
+
+# ค้นหาข้อความ (/api/search และ fallback ของ semantic search): inverted index ของ character n-gram + BM25
+# ในหน่วยความจำ (ปรับเฉพาะผลิตภัณฑ์ที่เกี่ยวข้องหลัง admin เขียนข้อมูล) ถ้าปิดจะ query CONTAINS ใน Fuseki ตามเดิม
+SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+
+# semantic search ที่มีหลาย intent: แผนของ query planner (services/query_planner.py) เก็บแบบ LRU ตาม signature
+# ทุกแผนส่งผ่าน template เดียว (semantic_plan) — จำนวนชุด intent ที่เป็นไปได้ไม่เพิ่ม template/metrics
+QUERY_PLAN_CACHE_SIZE = int(os.getenv('QUERY_PLAN_CACHE_SIZE', '256'))
+
+# ผลิตภัณฑ์คล้ายกัน: weighted cosine บนเมทริกซ์คุณลักษณะ (NumPy) คำนวณ top-k ของทุกผลิตภัณฑ์ไว้ล่วงหน้า
+# SIMILARITY_WEIGHTS: น้ำหนักของกลุ่มคุณลักษณะ "กลุ่ม=น้ำหนัก" คั่นด้วยจุลภาค (0 = ไม่ใช้กลุ่มนั้น)
+SIMILARITY_ENABLED = os.getenv('SIMILARITY_ENABLED', 'true').lower() == 'true'
+SIMILARITY_TOP_K = int(os.getenv('SIMILARITY_TOP_K', '10'))
+SIMILARITY_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, weight in (
+        item.split('=', 1) for item in os.getenv(
+            'SIMILARITY_WEIGHTS',
+            'category=3,ingredient=2,certification=1,channel=0.5,customer=1,price=1,district=1',
+        ).split(',') if item.strip()
+    )
+}
+SIMILARITY_RETRY_SECONDS = float(os.getenv('SIMILARITY_RETRY_SECONDS', '30'))
+
+# "ลูกค้าที่ชอบสินค้านี้ก็ชอบ": factor ของผลิตภัณฑ์จาก matrix factorisation ของคะแนนรีวิว
+# ฝึกแบบ offline ด้วย python train_also_liked.py แล้วบันทึกเป็น .npy (+ .json ข้อมูลผลิตภัณฑ์) ที่ API เปิดด้วย mmap
+ALSO_LIKED_MODEL_FILE = os.getenv(
+    'ALSO_LIKED_MODEL_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'also_liked.npy'))
+ALSO_LIKED_TOP_K = int(os.getenv('ALSO_LIKED_TOP_K', '10'))
+
+# จำนวนรหัสสูงสุดต่อคำขอของ POST /api/products/batch และ /api/recommendations/similar/batch
+BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', '50'))
+
 # Namespace ของ Ontology
 SCE_NAMESPACE = "http://sakon-ce.example.org/ontology#"
 SCE_PREFIX = "sce"
@@ -31,4 +153,5 @@ PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
 PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
 PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
 PREFIX owl: <http://www.w3.org/2002/07/owl#>
+PREFIX text: <http://jena.apache.org/text#>
 """
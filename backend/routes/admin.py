@@ -4,18 +4,39 @@ import logging
 from flask import Blueprint, request, jsonify
 from config import ADMIN_USERNAME, ADMIN_PASSWORD, SCE_NAMESPACE
 from sparql.fuseki_client import fuseki_client
-from sparql.queries import (
-    GET_ALL_PRODUCTS, GET_ALL_ENTERPRISES,
-    build_insert_product, DELETE_PRODUCT, DELETE_PRODUCT_REVERSE,
-    build_insert_enterprise, DELETE_ENTERPRISE,
-)
+from sparql.dataset_version import dataset_version
+from services.catalog_snapshot import catalog_snapshot
+from services.analytics_views import analytics_views
+from services.dataset_counters import dataset_counters
+from services.ingredient_index import ingredient_index
+from services.search_index import search_index
+from services.product_similarity import product_similarity
+from sparql.queries import build_insert_product, build_insert_enterprise
+from sparql.registry import registry
 from routes.auth import create_token, require_admin
+from routes.ndjson import wants_ndjson
+from routes.listing import query_list, stream_list
 
 logger = logging.getLogger(__name__)
 
 admin_bp = Blueprint('admin', __name__)
 
 
+def _after_write(resource_id, before):
+    """หลังเขียนข้อมูลสำเร็จ: เลื่อน dataset version ปรับตัวนับ ingredient index และ search index
+    แล้วสั่งสร้าง catalog snapshot, analytics views และความคล้ายของผลิตภัณฑ์ใหม่
+
+    before: dataset_counters.footprint(resource_id) ที่วัดไว้ก่อนเขียน
+    """
+    version = dataset_version.bump()
+    dataset_counters.record_write(resource_id, before, version)
+    ingredient_index.record_write(resource_id, version)
+    search_index.record_write(resource_id, version)
+    catalog_snapshot.rebuild_async()
+    analytics_views.rebuild_async()
+    product_similarity.rebuild_async()
+
+
 # === Authentication ===
 
 @admin_bp.route('/api/admin/login', methods=['POST'])
@@ -48,10 +69,14 @@ def admin_logout():
 @require_admin
 def list_products():
     """ดึงรายการผลิตภัณฑ์ทั้งหมด"""
-    result = fuseki_client.query(GET_ALL_PRODUCTS)
+    if wants_ndjson():
+        return stream_list('all_products')
+
+    result = query_list('all_products')
     if not result['success']:
         return jsonify({'error': result.get('error', 'Query failed')}), 500
-    return jsonify({'products': result['results'], 'count': result['count']})
+    return jsonify({'products': result['results'], 'count': result['count'],
+                    'next_cursor': result['next_cursor']})
 
 
 @admin_bp.route('/api/admin/products', methods=['POST'])
@@ -80,9 +105,11 @@ def create_product():
         enterprise_id=data.get('enterpriseId', ''),
         image_url=data.get('imageUrl', ''),
     )
-    result = fuseki_client.update(query)
+    before = dataset_counters.footprint(product_id)
+    result = fuseki_client.update(query, query_name='insert_product')
     if not result['success']:
         return jsonify({'error': result.get('error', 'Insert failed')}), 500
+    _after_write(product_id, before)
 
     return jsonify({'message': 'เพิ่มผลิตภัณฑ์สำเร็จ', 'productId': product_id}), 201
 
@@ -95,13 +122,7 @@ def update_product(product_id):
     if not data:
         return jsonify({'error': 'ไม่มีข้อมูล'}), 400
 
-    # ลบ triples เดิม
-    del_query = DELETE_PRODUCT.format(product_id=product_id)
-    del_rev = DELETE_PRODUCT_REVERSE.format(product_id=product_id)
-    fuseki_client.update(del_query)
-    fuseki_client.update(del_rev)
-
-    # Insert ใหม่
+    # สร้าง INSERT ก่อน — ถ้าข้อมูลไม่ถูกต้อง (BindError) จะยังไม่ได้ลบของเดิม
     query = build_insert_product(
         product_id=product_id,
         name=data.get('name', ''),
@@ -113,7 +134,14 @@ def update_product(product_id):
         enterprise_id=data.get('enterpriseId', ''),
         image_url=data.get('imageUrl', ''),
     )
-    result = fuseki_client.update(query)
+
+    # ลบ triples เดิม แล้ว insert ใหม่
+    before = dataset_counters.footprint(product_id)
+    registry.run('delete_product', product_id=product_id)
+    registry.run('delete_product_reverse', product_id=product_id)
+    result = fuseki_client.update(query, query_name='insert_product')
+    # triples เดิมถูกลบไปแล้ว ข้อมูลเปลี่ยนแม้ insert จะล้มเหลว
+    _after_write(product_id, before)
     if not result['success']:
         return jsonify({'error': result.get('error', 'Update failed')}), 500
 
@@ -124,10 +152,11 @@ def update_product(product_id):
 @require_admin
 def delete_product(product_id):
     """ลบผลิตภัณฑ์"""
-    del_query = DELETE_PRODUCT.format(product_id=product_id)
-    del_rev = DELETE_PRODUCT_REVERSE.format(product_id=product_id)
-    r1 = fuseki_client.update(del_query)
-    r2 = fuseki_client.update(del_rev)
+    before = dataset_counters.footprint(product_id)
+    r1 = registry.run('delete_product', product_id=product_id)
+    r2 = registry.run('delete_product_reverse', product_id=product_id)
+    if r1['success'] or r2['success']:
+        _after_write(product_id, before)
     if not r1['success'] or not r2['success']:
         return jsonify({'error': 'ลบไม่สำเร็จ'}), 500
     return jsonify({'message': 'ลบผลิตภัณฑ์สำเร็จ'})
@@ -139,10 +168,11 @@ def delete_product(product_id):
 @require_admin
 def list_enterprises():
     """ดึงรายการวิสาหกิจทั้งหมด"""
-    result = fuseki_client.query(GET_ALL_ENTERPRISES)
+    result = query_list('all_enterprises')
     if not result['success']:
         return jsonify({'error': result.get('error', 'Query failed')}), 500
-    return jsonify({'enterprises': result['results'], 'count': result['count']})
+    return jsonify({'enterprises': result['results'], 'count': result['count'],
+                    'next_cursor': result['next_cursor']})
 
 
 @admin_bp.route('/api/admin/enterprises', methods=['POST'])
@@ -164,9 +194,11 @@ def create_enterprise():
         name=name,
         description=data.get('description', ''),
     )
-    result = fuseki_client.update(query)
+    before = dataset_counters.footprint(enterprise_id)
+    result = fuseki_client.update(query, query_name='insert_enterprise')
     if not result['success']:
         return jsonify({'error': result.get('error', 'Insert failed')}), 500
+    _after_write(enterprise_id, before)
 
     return jsonify({'message': 'เพิ่มวิสาหกิจสำเร็จ', 'enterpriseId': enterprise_id}), 201
 
@@ -179,17 +211,19 @@ def update_enterprise(enterprise_id):
     if not data:
         return jsonify({'error': 'ไม่มีข้อมูล'}), 400
 
-    # ลบเก่า
-    del_query = DELETE_ENTERPRISE.format(enterprise_id=enterprise_id)
-    fuseki_client.update(del_query)
-
-    # Insert ใหม่
+    # สร้าง INSERT ก่อน — ถ้าข้อมูลไม่ถูกต้อง (BindError) จะยังไม่ได้ลบของเดิม
     query = build_insert_enterprise(
         enterprise_id=enterprise_id,
         name=data.get('name', ''),
         description=data.get('description', ''),
     )
-    result = fuseki_client.update(query)
+
+    # ลบเก่า แล้ว insert ใหม่
+    before = dataset_counters.footprint(enterprise_id)
+    registry.run('delete_enterprise', enterprise_id=enterprise_id)
+    result = fuseki_client.update(query, query_name='insert_enterprise')
+    # triples เดิมถูกลบไปแล้ว ข้อมูลเปลี่ยนแม้ insert จะล้มเหลว
+    _after_write(enterprise_id, before)
     if not result['success']:
         return jsonify({'error': result.get('error', 'Update failed')}), 500
 
@@ -200,8 +234,54 @@ def update_enterprise(enterprise_id):
 @require_admin
 def delete_enterprise(enterprise_id):
     """ลบวิสาหกิจ"""
-    del_query = DELETE_ENTERPRISE.format(enterprise_id=enterprise_id)
-    result = fuseki_client.update(del_query)
+    before = dataset_counters.footprint(enterprise_id)
+    result = registry.run('delete_enterprise', enterprise_id=enterprise_id)
     if not result['success']:
         return jsonify({'error': 'ลบไม่สำเร็จ'}), 500
+    _after_write(enterprise_id, before)
     return jsonify({'message': 'ลบวิสาหกิจสำเร็จ'})
+
+
+# === Slow-query log ===
+
+@admin_bp.route('/api/admin/slow-queries', methods=['GET'])
+@require_admin
+def list_slow_queries():
+    """query ที่ช้ากว่าเกณฑ์ล่าสุด พร้อม SPARQL, พารามิเตอร์, route และแผนการทำงาน
+
+    ?limit=<n> จำกัดจำนวน, ?query=<ชื่อ template> กรองตาม template
+    """
+    slow_queries = fuseki_client.slow_queries
+    limit = request.args.get('limit', type=int)
+    records = slow_queries.recent(limit=limit, query_name=request.args.get('query'))
+    return jsonify({
+        'threshold_ms': slow_queries.threshold_ms,
+        'enabled': slow_queries.enabled,
+        'log_file': slow_queries.path,
+        'count': len(records),
+        'slow_queries': records,
+    })
+
+
+@admin_bp.route('/api/admin/slow-queries', methods=['DELETE'])
+@require_admin
+def clear_slow_queries():
+    """ล้าง slow-query log ในหน่วยความจำ (ไฟล์ JSONL ไม่ถูกลบ)"""
+    fuseki_client.slow_queries.clear()
+    return jsonify({'message': 'ล้าง slow-query log สำเร็จ'})
+
+
+# === Analytics views ===
+
+@admin_bp.route('/api/admin/analytics/refresh', methods=['POST'])
+@require_admin
+def refresh_analytics():
+    """คำนวณ analytics views ใหม่ทันที (ไม่รอ debounce) แล้วคืนสถานะ"""
+    if not analytics_views.enabled:
+        return jsonify({'error': 'analytics views ถูกปิดอยู่ (ANALYTICS_VIEWS_ENABLED=false)'}), 400
+    if not analytics_views.rebuild():
+        return jsonify({'error': analytics_views.last_error, 'analytics': analytics_views.stats()}), 500
+    return jsonify({
+        'message': 'คำนวณ analytics views ใหม่สำเร็จ',
+        'analytics': analytics_views.stats(),
+    })
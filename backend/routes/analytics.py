@@ -1,38 +1,26 @@
 # API Routes สำหรับวิเคราะห์ข้อมูล
-from flask import Blueprint, jsonify
-from sparql.fuseki_client import fuseki_client
-from sparql.queries import (
-    ANALYTICS_PRICE_BY_CATEGORY, ANALYTICS_CHANNELS,
-    ANALYTICS_CERTIFICATIONS, ANALYTICS_ENTERPRISE_PRODUCTS,
-    ANALYTICS_CUSTOMER_SEGMENTS, ANALYTICS_TOP_RATED,
-    SEMANTIC_SHARED_INGREDIENTS
-)
+from flask import Blueprint, jsonify, request
+from services.analytics_views import analytics_views
+from services.dataset_counters import dataset_counters
+from services.recommendation import recommendation_service
+from routes.conditional import register_etag
 
 analytics_bp = Blueprint('analytics', __name__)
+register_etag(analytics_bp)
 
 
 @analytics_bp.route('/api/analytics/overview', methods=['GET'])
 def get_overview():
-    """ภาพรวมระบบ: จำนวน triples, ผลิตภัณฑ์, วิสาหกิจ"""
-    triple_count = fuseki_client.count_triples()
-
-    product_count = fuseki_client.query(
-        "SELECT (COUNT(?p) AS ?count) WHERE { ?p a sce:FoodProduct }"
-    )
-    enterprise_count = fuseki_client.query(
-        "SELECT (COUNT(?e) AS ?count) WHERE { ?e a sce:CommunityEnterprise }"
-    )
-    category_count = fuseki_client.query(
-        "SELECT (COUNT(?c) AS ?count) WHERE { ?c a sce:ProductCategory }"
-    )
+    """ภาพรวมระบบ: จำนวน triples, ผลิตภัณฑ์, วิสาหกิจ (จากตัวนับ — ดู services/dataset_counters.py)"""
+    counts = dataset_counters.counts() or {}
 
     return jsonify({
         'message': 'ภาพรวมระบบฐานข้อมูลออนโทโลยี',
         'overview': {
-            'triple_count': triple_count,
-            'product_count': int(product_count['results'][0]['count']) if product_count['success'] else 0,
-            'enterprise_count': int(enterprise_count['results'][0]['count']) if enterprise_count['success'] else 0,
-            'category_count': int(category_count['results'][0]['count']) if category_count['success'] else 0,
+            'triple_count': counts.get('triples', 0),
+            'product_count': counts.get('products', 0),
+            'enterprise_count': counts.get('enterprises', 0),
+            'category_count': counts.get('categories', 0),
         }
     })
 
@@ -40,7 +28,7 @@ def get_overview():
 @analytics_bp.route('/api/analytics/price-by-category', methods=['GET'])
 def price_by_category():
     """วิเคราะห์ราคาตามหมวดหมู่"""
-    result = fuseki_client.query(ANALYTICS_PRICE_BY_CATEGORY)
+    result = analytics_views.run('analytics_price_by_category')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -48,14 +36,15 @@ def price_by_category():
     return jsonify({
         'message': 'วิเคราะห์ราคาตามหมวดหมู่',
         'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @analytics_bp.route('/api/analytics/channels', methods=['GET'])
 def channel_analysis():
     """วิเคราะห์ช่องทางจำหน่าย"""
-    result = fuseki_client.query(ANALYTICS_CHANNELS)
+    result = analytics_views.run('analytics_channels')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -63,14 +52,15 @@ def channel_analysis():
     return jsonify({
         'message': 'วิเคราะห์ช่องทางจำหน่าย',
         'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @analytics_bp.route('/api/analytics/certifications', methods=['GET'])
 def certification_analysis():
     """วิเคราะห์การรับรองมาตรฐาน"""
-    result = fuseki_client.query(ANALYTICS_CERTIFICATIONS)
+    result = analytics_views.run('analytics_certifications')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -78,14 +68,15 @@ def certification_analysis():
     return jsonify({
         'message': 'วิเคราะห์การรับรองมาตรฐาน',
         'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @analytics_bp.route('/api/analytics/enterprise-products', methods=['GET'])
 def enterprise_product_analysis():
     """วิเคราะห์จำนวนผลิตภัณฑ์ต่อวิสาหกิจ"""
-    result = fuseki_client.query(ANALYTICS_ENTERPRISE_PRODUCTS)
+    result = analytics_views.run('analytics_enterprise_products')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -93,14 +84,15 @@ def enterprise_product_analysis():
     return jsonify({
         'message': 'วิเคราะห์จำนวนผลิตภัณฑ์ต่อวิสาหกิจ',
         'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @analytics_bp.route('/api/analytics/customers', methods=['GET'])
 def customer_analysis():
     """วิเคราะห์กลุ่มลูกค้าเป้าหมาย"""
-    result = fuseki_client.query(ANALYTICS_CUSTOMER_SEGMENTS)
+    result = analytics_views.run('analytics_customer_segments')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -108,14 +100,15 @@ def customer_analysis():
     return jsonify({
         'message': 'วิเคราะห์กลุ่มลูกค้าเป้าหมาย',
         'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @analytics_bp.route('/api/analytics/top-rated', methods=['GET'])
 def top_rated_products():
     """ผลิตภัณฑ์ที่ได้คะแนนรีวิวสูงสุด"""
-    result = fuseki_client.query(ANALYTICS_TOP_RATED)
+    result = analytics_views.run('analytics_top_rated')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -123,20 +116,24 @@ def top_rated_products():
     return jsonify({
         'message': 'ผลิตภัณฑ์ที่ได้คะแนนรีวิวสูงสุด',
         'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @analytics_bp.route('/api/analytics/shared-ingredients', methods=['GET'])
 def shared_ingredients():
-    """ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน"""
-    result = fuseki_client.query(SEMANTIC_SHARED_INGREDIENTS)
+    """ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน (?min_shared=<n> ค่าเริ่มต้น 2, ?limit=<k> ค่าเริ่มต้น 20, 0 = ทั้งหมด)"""
+    min_shared = max(1, request.args.get('min_shared', 2, type=int))
+    limit = max(0, request.args.get('limit', 20, type=int))
+    result = recommendation_service.get_shared_ingredient_products(min_shared=min_shared, limit=limit)
 
-    if not result['success']:
+    if 'error' in result:
         return jsonify({'error': result['error']}), 500
 
     return jsonify({
-        'message': 'ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน (>= 2 ชนิด)',
-        'data': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'message': f'ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน (>= {min_shared} ชนิด)',
+        'data': result['pairs'],
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
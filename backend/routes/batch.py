@@ -0,0 +1,21 @@
+# Shared batch utilities — อ่านรายการรหัสจาก body ของคำขอ POST .../batch
+from flask import request
+from config import BATCH_MAX_IDS
+from sparql.terms import Iri, BindError
+
+
+def read_batch_ids():
+    """รหัสจาก body {"ids": [...]} (ตัดรหัสซ้ำ คงลำดับเดิม)
+
+    ไม่มีรายการ / เกิน BATCH_MAX_IDS / รหัสไม่ถูกต้อง → BindError (ตอบ 400)
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        raise BindError('ต้องส่ง {"ids": [...]} อย่างน้อยหนึ่งรหัส')
+    ids = list(dict.fromkeys(str(value) for value in ids))
+    if len(ids) > BATCH_MAX_IDS:
+        raise BindError(f'ส่งได้ไม่เกิน {BATCH_MAX_IDS} รหัสต่อคำขอ (ได้รับ {len(ids)})')
+    for value in ids:
+        Iri.bind(value)
+    return ids
@@ -1,15 +1,16 @@
 # API Routes สำหรับหมวดหมู่ผลิตภัณฑ์
 from flask import Blueprint, jsonify
-from sparql.fuseki_client import fuseki_client
-from sparql.queries import GET_ALL_CATEGORIES, GET_PRODUCTS_BY_CATEGORY
+from routes.conditional import register_etag
+from routes.listing import query_list
 
 categories_bp = Blueprint('categories', __name__)
+register_etag(categories_bp)
 
 
 @categories_bp.route('/api/categories', methods=['GET'])
 def get_categories():
     """ดึงรายการหมวดหมู่ทั้งหมดพร้อมจำนวนผลิตภัณฑ์"""
-    result = fuseki_client.query(GET_ALL_CATEGORIES)
+    result = query_list('all_categories')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -17,17 +18,17 @@ def get_categories():
     return jsonify({
         'message': f"พบหมวดหมู่ {result['count']} หมวด",
         'count': result['count'],
+        'next_cursor': result['next_cursor'],
         'categories': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
 @categories_bp.route('/api/categories/<category_id>/products', methods=['GET'])
 def get_category_products(category_id):
     """ดึงผลิตภัณฑ์ในหมวดหมู่ที่ระบุ"""
-    result = fuseki_client.query(
-        GET_PRODUCTS_BY_CATEGORY.format(category_id=category_id)
-    )
+    result = query_list('products_by_category', category_id=category_id)
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -36,6 +37,8 @@ def get_category_products(category_id):
         'message': f"ผลิตภัณฑ์ในหมวดหมู่ {category_id}: {result['count']} รายการ",
         'category_id': category_id,
         'count': result['count'],
+        'next_cursor': result['next_cursor'],
         'products': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
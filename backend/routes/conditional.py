@@ -0,0 +1,63 @@
+# Shared conditional GET utilities — ETag จาก dataset version + พารามิเตอร์ของคำขอ
+import hashlib
+from flask import g, request, make_response
+from sparql.dataset_version import dataset_version
+from routes.ndjson import wants_ndjson
+
+
+def compute_etag(version):
+    """สร้าง ETag จาก dataset version, path, query string และรูปแบบผลลัพธ์ (JSON/NDJSON)"""
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    variant = 'ndjson' if wants_ndjson() else 'json'
+    digest = hashlib.sha1(f'{request.path}?{args}#{variant}'.encode('utf-8')).hexdigest()[:16]
+    return f'v{version}-{digest}'
+
+
+def _check_not_modified():
+    """ถ้า If-None-Match ตรงกับ ETag ปัจจุบัน ตอบ 304 ทันทีโดยไม่ query ข้อมูล
+
+    อ่าน version ก่อนเรียก route และใช้ค่าเดียวกันตอนแนบ ETag
+    ถ้ามีการเขียนระหว่างนั้น ETag จะเป็นของ version เก่า → client จะได้ข้อมูลใหม่ในรอบถัดไป
+    """
+    if request.method != 'GET':
+        return None
+    version = dataset_version.current()
+    g.dataset_version = version
+    if version is None or not request.if_none_match:
+        return None
+    etag = compute_etag(version)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept')
+        return response
+    return None
+
+
+def _add_etag(response):
+    """แนบ ETag ให้คำตอบ 200 ของคำขอ GET"""
+    if request.method != 'GET' or response.status_code != 200:
+        return response
+    version = g.get('dataset_version')
+    if version is None:
+        return response
+    response.set_etag(compute_etag(version))
+    # ให้ browser ถามซ้ำด้วย If-None-Match ทุกครั้ง (ได้ 304 ถ้าข้อมูลไม่เปลี่ยน)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    return response
+
+
+def skip_etag():
+    """ไม่แนบ ETag กับคำตอบของคำขอนี้ (ข้อมูลไม่ได้เปลี่ยนตาม dataset version เช่นโมเดลที่ฝึกแบบ offline)
+
+    client จึงไม่มี ETag ส่งกลับมาใน If-None-Match และไม่ได้ 304 ที่ค้างจากโมเดลเดิม
+    """
+    g.dataset_version = None
+
+
+def register_etag(blueprint):
+    """เปิดใช้ ETag / 304 กับทุก route ใน blueprint"""
+    blueprint.before_request(_check_not_modified)
+    blueprint.after_request(_add_etag)
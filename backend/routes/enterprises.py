@@ -1,17 +1,22 @@
 # API Routes สำหรับวิสาหกิจชุมชน
-from flask import Blueprint, jsonify
-from sparql.fuseki_client import fuseki_client
-from sparql.queries import (
-    GET_ALL_ENTERPRISES, GET_ENTERPRISE_BY_ID, GET_ENTERPRISE_PRODUCTS
-)
+import time
+from flask import Blueprint, request, jsonify
+from config import DETAIL_QUERY_MODE, DETAIL_QUERY_MODES
+from services.catalog_snapshot import catalog_snapshot
+from sparql.framing import frame_enterprise
+from sparql.registry import registry
+from sparql.terms import Iri
+from routes.conditional import register_etag
+from routes.listing import query_list
 
 enterprises_bp = Blueprint('enterprises', __name__)
+register_etag(enterprises_bp)
 
 
 @enterprises_bp.route('/api/enterprises', methods=['GET'])
 def get_enterprises():
     """ดึงรายการวิสาหกิจชุมชนทั้งหมด"""
-    result = fuseki_client.query(GET_ALL_ENTERPRISES)
+    result = query_list('all_enterprises')
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -19,31 +24,68 @@ def get_enterprises():
     return jsonify({
         'message': f"พบวิสาหกิจชุมชน {result['count']} แห่ง",
         'count': result['count'],
+        'next_cursor': result['next_cursor'],
         'enterprises': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
-@enterprises_bp.route('/api/enterprises/<enterprise_id>', methods=['GET'])
-def get_enterprise(enterprise_id):
-    """ดึงรายละเอียดวิสาหกิจชุมชนตาม ID"""
-    # ข้อมูลพื้นฐาน
-    basic = fuseki_client.query(
-        GET_ENTERPRISE_BY_ID.format(enterprise_id=enterprise_id)
-    )
+def _load_enterprise_multi(enterprise_id):
+    """ดึงวิสาหกิจด้วย SELECT 2 query พร้อมกัน → (enterprise หรือ None, เวลา ms, มาจากแคชหรือไม่)"""
+    # ข้อมูลพื้นฐาน + รายการผลิตภัณฑ์ ยิงพร้อมกัน
+    params = {'enterprise_id': enterprise_id}
+    batch = registry.run_many({
+        'basic': ('enterprise_by_id', params),
+        'products': ('enterprise_products', params),
+    })
+    basic = batch['results']['basic']
     if not basic['success'] or basic['count'] == 0:
-        return jsonify({'error': f'ไม่พบวิสาหกิจชุมชน: {enterprise_id}'}), 404
+        return None, batch['response_time_ms'], batch['cached']
 
     enterprise = basic['results'][0]
+    enterprise['products'] = batch['results']['products'].get('results', [])
+    return enterprise, batch['response_time_ms'], batch['cached']
+
+
+def _load_enterprise_construct(enterprise_id):
+    """ดึงวิสาหกิจด้วย CONSTRUCT รอบเดียวแล้วจัดรูปฝั่ง Python → (enterprise หรือ None, เวลา ms, มาจากแคชหรือไม่)"""
+    result = registry.run('enterprise_document', enterprise_id=enterprise_id)
+    if not result['success']:
+        return None, result['response_time_ms'], False
+    return frame_enterprise(result['graph'], enterprise_id), result['response_time_ms'], result['cached']
 
-    # ดึงรายการผลิตภัณฑ์
-    products = fuseki_client.query(
-        GET_ENTERPRISE_PRODUCTS.format(enterprise_id=enterprise_id)
-    )
-    enterprise['products'] = products.get('results', [])
+
+def _load_enterprise_snapshot(snapshot, enterprise_id):
+    """อ่านจาก catalog snapshot → (enterprise หรือ None, เวลา ms, True) (dict ใช้ร่วมกัน ห้ามแก้ไข)"""
+    start_time = time.time()
+    enterprise = snapshot.enterprise(enterprise_id)
+    return enterprise, round((time.time() - start_time) * 1000, 2), True
+
+
+@enterprises_bp.route('/api/enterprises/<enterprise_id>', methods=['GET'])
+def get_enterprise(enterprise_id):
+    """ดึงรายละเอียดวิสาหกิจชุมชนตาม ID"""
+    # ตรวจรหัสก่อนทุกทาง: รหัสผิดรูปแบบตอบ 400 เหมือนกันไม่ว่าจะอ่านจาก snapshot หรือ Fuseki
+    Iri.bind(enterprise_id)
+    # ระบุ ?mode ที่รู้จักมาเอง = ขอ query Fuseki สด ไม่ใช้ snapshot (ค่าอื่นถือว่าไม่ได้ระบุ)
+    mode = request.args.get('mode')
+    if mode not in DETAIL_QUERY_MODES:
+        mode = None
+    snapshot = catalog_snapshot.current() if mode is None else None
+    if snapshot is not None:
+        enterprise, response_time, cached = _load_enterprise_snapshot(snapshot, enterprise_id)
+    elif (mode or DETAIL_QUERY_MODE) == 'construct':
+        enterprise, response_time, cached = _load_enterprise_construct(enterprise_id)
+    else:
+        enterprise, response_time, cached = _load_enterprise_multi(enterprise_id)
+
+    if enterprise is None:
+        return jsonify({'error': f'ไม่พบวิสาหกิจชุมชน: {enterprise_id}'}), 404
 
     return jsonify({
         'message': f"ข้อมูลวิสาหกิจ: {enterprise.get('name', enterprise_id)}",
         'enterprise': enterprise,
-        'response_time_ms': basic['response_time_ms']
+        'response_time_ms': response_time,
+        'cached': cached
     })
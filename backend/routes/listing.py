@@ -0,0 +1,296 @@
+# Shared list-query utilities — รูปแบบผลลัพธ์ (แถว/คอลัมน์) และการแบ่งหน้าแบบ cursor ของ endpoint แบบรายการ
+import base64
+import binascii
+import json
+import time
+from flask import request, jsonify
+from config import LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT
+from services.catalog_snapshot import catalog_snapshot
+from services.search_index import search_index
+from sparql.columnar import ColumnarResult
+from sparql.fuseki_client import fuseki_client
+from sparql.queries import NUMERIC_ORDER_VARS, page_key, paginate_query, select_vars
+from sparql.registry import registry
+from routes.ndjson import ndjson_response
+
+
+class PaginationError(ValueError):
+    """limit/cursor ไม่ถูกต้อง (ตอบ 400)"""
+
+
+def wants_columns():
+    """client ขอผลลัพธ์แบบคอลัมน์ (?format=columns) หรือไม่"""
+    return request.args.get('format') == 'columns'
+
+
+def encode_cursor(order_var, row, key_var):
+    """สร้าง cursor (opaque) จากแถวสุดท้ายของหน้า"""
+    key = row.get(f'{key_var}_uri', row.get(key_var))
+    payload = json.dumps([order_var, row.get(order_var), key], ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, order_var):
+    """แปลง cursor กลับเป็น (ค่าคอลัมน์ที่เรียง, ค่าตัวแปรตัดสินเสมอ)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_var, value, key = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise PaginationError('cursor ไม่ถูกต้อง')
+    if cursor_var != order_var or value is None or key is None:
+        raise PaginationError('cursor ไม่ตรงกับรายการนี้')
+    return value, key
+
+
+def page_params():
+    """อ่าน ?limit และ ?cursor → (limit หรือ None, cursor หรือ None)"""
+    raw_limit = request.args.get('limit')
+    if raw_limit is None:
+        limit = LIST_DEFAULT_LIMIT or None
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise PaginationError('limit ต้องเป็นจำนวนเต็ม')
+        if limit < 1:
+            raise PaginationError('limit ต้องมากกว่า 0')
+    if limit is not None:
+        limit = min(limit, LIST_MAX_LIMIT)
+    return limit, request.args.get('cursor') or None
+
+
+def paginated_query(sparql_query, fetch=None):
+    """ใส่ keyset pagination ตาม ?limit/?cursor → (query, limit, order_var, key_var)
+
+    fetch: จำนวนแถวที่ขอจาก Fuseki — ค่าเริ่มต้นขอเกิน limit มา 1 แถวเพื่อรู้ว่ามีหน้าถัดไปหรือไม่
+    """
+    limit, cursor = page_params()
+    if limit is None and cursor is None:
+        return sparql_query, None, None, None
+    order_var, _, key_var = page_key(sparql_query)
+    after = decode_cursor(cursor, order_var) if cursor else None
+    try:
+        sparql_query = paginate_query(sparql_query, after=after,
+                                      limit=fetch or (limit + 1 if limit else None))
+    except ValueError as e:
+        raise PaginationError(str(e))
+    return sparql_query, limit, order_var, key_var
+
+
+class PageOverflow(Exception):
+    """แถวที่ขอมาหมดก่อนกลุ่มแถวแรกของหน้าจบ — ต้องขอแถวเพิ่มแล้วตัดหน้าใหม่"""
+
+
+def _position(row, order_var, key_var):
+    return row.get(order_var), row.get(f'{key_var}_uri', row.get(key_var))
+
+
+def _page_iter(rows, limit, order_var, key_var, fetch=None):
+    """ส่งแถวของหน้าทีละแถว ถ้ามีหน้าถัดไปปิดท้ายด้วย {"next_cursor": ...}
+
+    แถวที่ตำแหน่งเดียวกัน (ค่าที่เรียงและ key เท่ากัน เช่น product ที่มีหลายรูป) อยู่หน้าเดียวกันเสมอ
+    เพราะหน้าถัดไปเริ่มจากตำแหน่งที่มากกว่า cursor: ถ้ากลุ่มสุดท้ายล้น limit จะยกไปหน้าถัดไปทั้งกลุ่ม
+    และถ้าทั้งหน้าเป็นกลุ่มเดียว หน้านั้นจะยาวเกิน limit
+    fetch: จำนวนแถวที่ขอมา (None = rows คือแถวที่เหลือทั้งหมด) — ถ้าแถวหมดก่อนกลุ่มแรกจบ raise PageOverflow
+    ก่อนส่งแถวใดออกไป
+    """
+    group, group_position, last, read = [], None, None, 0
+    for row in rows:
+        read += 1
+        position = _position(row, order_var, key_var)
+        if group and position != group_position:
+            yield from group
+            last, group = group[-1], []
+        if read > limit and last is not None:
+            yield {'next_cursor': encode_cursor(order_var, last, key_var)}
+            return
+        if not group:
+            group_position = position
+        group.append(row)
+    if fetch is not None and read >= fetch:
+        raise PageOverflow()
+    yield from group
+
+
+def _cut_page(rows, limit, order_var, key_var, fetch=None):
+    """(list ของแถวในหน้า, next_cursor หรือ None) — ดู _page_iter"""
+    page = list(_page_iter(rows, limit, order_var, key_var, fetch))
+    if page and 'next_cursor' in page[-1]:
+        return page[:-1], page[-1]['next_cursor']
+    return page, None
+
+
+def _sort_value(order_var, value):
+    return float(value) if order_var in NUMERIC_ORDER_VARS else value
+
+
+def paginated_rows(sparql_query, rows):
+    """keyset pagination แบบเดียวกับ paginated_query แต่กรองแถวที่เรียงไว้แล้วในหน่วยความจำ
+
+    rows ต้องเรียงตาม ORDER BY ของ query แล้วตัดสินเสมอด้วย STR(ตัวแปรแรก) (เช่นแถวจาก catalog snapshot)
+    คืน (แถวของหน้า, next_cursor หรือ None)
+    """
+    limit, cursor = page_params()
+    if limit is None and cursor is None:
+        return rows, None
+    try:
+        order_var, descending, key_var = page_key(sparql_query)
+    except ValueError as e:
+        raise PaginationError(str(e))
+    return _page_rows(rows, limit, cursor, order_var, descending, key_var)
+
+
+def ranked_rows(rows):
+    """keyset pagination ของแถวที่เรียงตาม score มากไปน้อยแล้วตาม URI ของ product (ผลจาก search index)"""
+    limit, cursor = page_params()
+    if limit is None and cursor is None:
+        return rows, None
+    return _page_rows(rows, limit, cursor, 'score', True, 'product')
+
+
+def _page_rows(rows, limit, cursor, order_var, descending, key_var):
+    if cursor:
+        value, key = decode_cursor(cursor, order_var)
+        try:
+            value = _sort_value(order_var, value)
+        except (TypeError, ValueError):
+            raise PaginationError('cursor ไม่ถูกต้อง')
+
+        def after_cursor(row):
+            current = row.get(order_var)
+            if current is None:
+                return False
+            current = _sort_value(order_var, current)
+            if current == value:
+                return row.get(f'{key_var}_uri', row.get(key_var)) > key
+            return current < value if descending else current > value
+
+        rows = (row for row in rows if after_cursor(row))
+    if limit:
+        return _cut_page(rows, limit, order_var, key_var)
+    return list(rows), None
+
+
+def _snapshot_list(sparql_query, rows, columns):
+    """ผลลัพธ์จาก catalog snapshot ในรูปแบบเดียวกับ query_list()"""
+    start_time = time.time()
+    rows, next_cursor = paginated_rows(sparql_query, rows)
+    results = ColumnarResult.from_rows(select_vars(sparql_query), rows) if columns else rows
+    return {
+        'success': True,
+        'results': results.to_dict() if columns else results,
+        'count': len(rows),
+        'response_time_ms': round((time.time() - start_time) * 1000, 2),
+        'cached': True,
+        'next_cursor': next_cursor,
+    }
+
+
+def _ranked_list(sparql_query, ranked, columns):
+    """หน้าผลลัพธ์จาก search index: แบ่งหน้าตามคะแนนก่อน แล้วดึงแถวเฉพาะรหัสในหน้านั้น"""
+    page, next_cursor = ranked_rows(ranked)
+    result = search_index.hydrate(page)
+    if not result['success']:
+        return result
+    if columns:
+        result['results'] = ColumnarResult.from_rows(select_vars(sparql_query) + ['score'],
+                                                     result['results']).to_dict()
+    return {**result, 'next_cursor': next_cursor}
+
+
+def query_list(name, **params):
+    """query template ตามชื่อสำหรับ endpoint แบบรายการ — รูปแบบผลลัพธ์เหมือน registry.run() และเพิ่ม next_cursor
+
+    ถ้า ?format=columns: 'results' เป็น dict แบบคอลัมน์ (ColumnarResult.to_dict)
+    ไม่เช่นนั้นเป็น list ของ dict ตามเดิม
+    next_cursor เป็น None เมื่อไม่มีหน้าถัดไป (หรือไม่ได้แบ่งหน้า)
+    query ที่ catalog snapshot ครอบคลุมจะตอบจากหน่วยความจำ (cached = True)
+    ค้นหาข้อความที่ search index ครอบคลุมจะเรียงตามคะแนน BM25 (แถวมี score เพิ่ม)
+    """
+    template = registry.resolve(name)
+    sparql_query = registry.render(template, **params)
+    columns = wants_columns()
+    ranked = search_index.select(name, **params)
+    if ranked is not None:
+        return _ranked_list(sparql_query, ranked, columns)
+    rows = catalog_snapshot.select(name, **params)
+    if rows is not None:
+        return _snapshot_list(sparql_query, rows, columns)
+
+    fetch = None
+    while True:
+        paged_query, limit, order_var, key_var = paginated_query(sparql_query, fetch)
+        if columns:
+            result = fuseki_client.query_columns(paged_query, include_prefixes=False,
+                                                 query_name=template, params=params)
+        else:
+            result = fuseki_client.query(paged_query, include_prefixes=False, query_name=template,
+                                         params=params)
+        if not result['success']:
+            return result
+        fetch = fetch or (limit + 1 if limit else None)
+        try:
+            return _with_page(result, columns, limit, order_var, key_var, fetch)
+        except PageOverflow:
+            # ทั้งหน้าเป็นกลุ่มแถวเดียวที่ยาวกว่าที่ขอมา → ขอเพิ่มเป็นสองเท่าจนกลุ่มจบ
+            fetch *= 2
+
+
+def _with_page(result, columns, limit, order_var, key_var, fetch):
+    """ตัดแถวที่ขอเกินมาออก (ไม่ตัดกลางกลุ่มแถวตำแหน่งเดียวกัน) แล้วใส่ next_cursor"""
+    results = result['results']
+    next_cursor = None
+    if limit:
+        page, next_cursor = _cut_page(results, limit, order_var, key_var, fetch)
+        if len(page) < len(results):
+            results = results.head(len(page)) if columns else page
+
+    return {
+        **result,
+        'results': results.to_dict() if columns else results,
+        'count': len(results),
+        'next_cursor': next_cursor,
+    }
+
+
+def _fuseki_stream(sparql_query, template, params):
+    """แถวของหน้าจาก Fuseki แบบ stream — ขอเพิ่มแบบเดียวกับ query_list เมื่อเกิด PageOverflow"""
+    fetch = None
+    while True:
+        paged_query, limit, order_var, key_var = paginated_query(sparql_query, fetch)
+        rows = fuseki_client.iter_query(paged_query, include_prefixes=False, query_name=template,
+                                        params=params)
+        try:
+            if not limit:
+                yield from rows
+                return
+            fetch = fetch or limit + 1
+            try:
+                # PageOverflow เกิดก่อนส่งแถวใดออกไป จึงเริ่มใหม่ได้
+                yield from _page_iter(rows, limit, order_var, key_var, fetch)
+                return
+            except PageOverflow:
+                fetch *= 2
+        finally:
+            rows.close()
+
+
+def stream_list(name, **params):
+    """เหมือน query_list แต่ตอบเป็น NDJSON แบบ stream (ดู routes/ndjson.py)"""
+    template = registry.resolve(name)
+    sparql_query = registry.render(template, **params)
+    ranked = search_index.select(name, **params)
+    snapshot_rows = catalog_snapshot.select(name, **params) if ranked is None else None
+    if ranked is not None:
+        page, next_cursor = ranked_rows(ranked)
+        result = search_index.hydrate(page)
+        if not result['success']:
+            return jsonify({'error': result['error']}), 500
+        rows = result['results']
+    elif snapshot_rows is not None:
+        rows, next_cursor = paginated_rows(sparql_query, snapshot_rows)
+    else:
+        return ndjson_response(_fuseki_stream(sparql_query, template, params))
+    if next_cursor:
+        rows = [*rows, {'next_cursor': next_cursor}]
+    return ndjson_response(rows)
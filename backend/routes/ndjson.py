@@ -0,0 +1,47 @@
+# Shared NDJSON utilities — ส่งผลลัพธ์รายการยาวแบบ stream ทีละบรรทัด (opt-in ผ่าน Accept header)
+import json
+import logging
+from flask import Response, request, jsonify
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """client ขอ application/x-ndjson มากกว่า application/json หรือไม่
+
+    Accept: */* หรือไม่ระบุ → ได้ JSON ตามเดิม
+    """
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def _encode(row):
+    return json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def ndjson_response(rows):
+    """สร้าง response แบบ stream จาก iterator ของแถว (หนึ่ง JSON object ต่อบรรทัด)
+
+    ดึงแถวแรกก่อนส่ง header เพื่อให้ข้อผิดพลาดตอนเชื่อมต่อ Fuseki ยังตอบเป็น 500 ได้
+    ถ้าผิดพลาดระหว่าง stream จะปิดท้ายด้วยบรรทัด {"error": ...}
+    """
+    rows = iter(rows)
+    try:
+        first = next(rows, None)
+    except Exception as e:
+        return jsonify({'error': f'เกิดข้อผิดพลาดในการ query: {str(e)}'}), 500
+
+    def generate():
+        if first is None:
+            return
+        yield _encode(first)
+        try:
+            for row in rows:
+                yield _encode(row)
+        except Exception as e:
+            logger.error("[NDJSON] stream interrupted: %s", str(e))
+            yield _encode({'error': f'เกิดข้อผิดพลาดในการ query: {str(e)}'})
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
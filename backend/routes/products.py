@@ -1,14 +1,18 @@
 # API Routes สำหรับผลิตภัณฑ์อาหาร
+import time
 from flask import Blueprint, request, jsonify
-from sparql.fuseki_client import fuseki_client
-from sparql.queries import (
-    GET_ALL_PRODUCTS, GET_PRODUCT_BY_ID, GET_PRODUCT_INGREDIENTS,
-    GET_PRODUCT_CERTIFICATIONS, GET_PRODUCT_CHANNELS, GET_PRODUCT_CUSTOMERS,
-    GET_PRODUCT_REVIEWS, GET_PRODUCT_PROCESS, GET_PRODUCTS_BY_CATEGORY,
-    GET_PRODUCTS_BY_PRICE_RANGE
-)
+from config import DETAIL_QUERY_MODE, DETAIL_QUERY_MODES
+from services.catalog_snapshot import catalog_snapshot
+from sparql.framing import frame_product
+from sparql.registry import registry
+from sparql.terms import Iri
+from routes.batch import read_batch_ids
+from routes.conditional import register_etag
+from routes.listing import query_list, stream_list
+from routes.ndjson import wants_ndjson
 
 products_bp = Blueprint('products', __name__)
+register_etag(products_bp)
 
 
 @products_bp.route('/api/products', methods=['GET'])
@@ -20,17 +24,17 @@ def get_products():
     max_price = request.args.get('max_price')
 
     if category:
-        result = fuseki_client.query(
-            GET_PRODUCTS_BY_CATEGORY.format(category_id=category)
-        )
+        name, params = 'products_by_category', {'category_id': category}
     elif min_price and max_price:
-        result = fuseki_client.query(
-            GET_PRODUCTS_BY_PRICE_RANGE.format(
-                min_price=min_price, max_price=max_price
-            )
-        )
+        name, params = 'products_by_price_range', {'min_price': min_price, 'max_price': max_price}
     else:
-        result = fuseki_client.query(GET_ALL_PRODUCTS)
+        name, params = 'all_products', {}
+
+    # Accept: application/x-ndjson → stream ทีละแถว ไม่สร้าง list ทั้งชุดในหน่วยความจำ
+    if wants_ndjson():
+        return stream_list(name, **params)
+
+    result = query_list(name, **params)
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -38,52 +42,121 @@ def get_products():
     return jsonify({
         'message': f"พบผลิตภัณฑ์ {result['count']} รายการ",
         'count': result['count'],
+        'next_cursor': result['next_cursor'],
         'products': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
-@products_bp.route('/api/products/<product_id>', methods=['GET'])
-def get_product(product_id):
-    """ดึงรายละเอียดผลิตภัณฑ์ตาม ID"""
-    # ข้อมูลพื้นฐาน
-    basic = fuseki_client.query(
-        GET_PRODUCT_BY_ID.format(product_id=product_id)
-    )
+def _load_product_multi(product_id):
+    """ดึงผลิตภัณฑ์ด้วยหลาย SELECT query พร้อมกัน → (product หรือ None, เวลา ms, มาจากแคชหรือไม่)"""
+    # ยิงทุก query พร้อมกันในรอบเดียว (ไม่ขึ้นต่อกัน)
+    params = {'product_id': product_id}
+    batch = registry.run_many({
+        'basic': ('product_by_id', params),
+        'ingredients': ('product_ingredients', params),
+        'certifications': ('product_certifications', params),
+        'channels': ('product_channels', params),
+        'customers': ('product_customers', params),
+        'reviews': ('product_reviews', params),
+        'process': ('product_process', params),
+    })
+    results = batch['results']
+
+    basic = results['basic']
     if not basic['success'] or basic['count'] == 0:
-        return jsonify({'error': f'ไม่พบผลิตภัณฑ์: {product_id}'}), 404
+        return None, batch['response_time_ms'], batch['cached']
 
     product = basic['results'][0]
 
-    # ดึงข้อมูลเพิ่มเติม
-    ingredients = fuseki_client.query(
-        GET_PRODUCT_INGREDIENTS.format(product_id=product_id)
-    )
-    certifications = fuseki_client.query(
-        GET_PRODUCT_CERTIFICATIONS.format(product_id=product_id)
-    )
-    channels = fuseki_client.query(
-        GET_PRODUCT_CHANNELS.format(product_id=product_id)
-    )
-    customers = fuseki_client.query(
-        GET_PRODUCT_CUSTOMERS.format(product_id=product_id)
-    )
-    reviews = fuseki_client.query(
-        GET_PRODUCT_REVIEWS.format(product_id=product_id)
-    )
-    process = fuseki_client.query(
-        GET_PRODUCT_PROCESS.format(product_id=product_id)
-    )
-
-    product['ingredients'] = ingredients.get('results', [])
-    product['certifications'] = certifications.get('results', [])
-    product['channels'] = channels.get('results', [])
-    product['target_customers'] = customers.get('results', [])
-    product['reviews'] = reviews.get('results', [])
-    product['production_process'] = process.get('results', [])
+    # ข้อมูลเพิ่มเติม
+    product['ingredients'] = results['ingredients'].get('results', [])
+    product['certifications'] = results['certifications'].get('results', [])
+    product['channels'] = results['channels'].get('results', [])
+    product['target_customers'] = results['customers'].get('results', [])
+    product['reviews'] = results['reviews'].get('results', [])
+    product['production_process'] = results['process'].get('results', [])
+
+    return product, batch['response_time_ms'], batch['cached']
+
+
+def _load_product_construct(product_id):
+    """ดึงผลิตภัณฑ์ด้วย CONSTRUCT รอบเดียวแล้วจัดรูปฝั่ง Python → (product หรือ None, เวลา ms, มาจากแคชหรือไม่)"""
+    result = registry.run('product_document', product_id=product_id)
+    if not result['success']:
+        return None, result['response_time_ms'], False
+    return frame_product(result['graph'], product_id), result['response_time_ms'], result['cached']
+
+
+def _load_product_snapshot(snapshot, product_id):
+    """อ่านจาก catalog snapshot → (product หรือ None, เวลา ms, True) (dict ใช้ร่วมกัน ห้ามแก้ไข)"""
+    start_time = time.time()
+    product = snapshot.product(product_id)
+    return product, round((time.time() - start_time) * 1000, 2), True
+
+
+def _load_products_batch(product_ids):
+    """ดึงหลายผลิตภัณฑ์ด้วย CONSTRUCT รอบเดียว (VALUES ?product) แล้วแยกรายรหัสฝั่ง Python
+
+    คืน ({รหัส: product หรือ None}, เวลา ms, มาจากแคชหรือไม่) — products เป็น None ถ้า query ไม่สำเร็จ
+    """
+    result = registry.run('products_batch', product_ids=product_ids)
+    if not result['success']:
+        return None, result['response_time_ms'], False
+    graph = result['graph']
+    products = {product_id: frame_product(graph, product_id) for product_id in product_ids}
+    return products, result['response_time_ms'], result['cached']
+
+
+@products_bp.route('/api/products/batch', methods=['POST'])
+def get_products_batch():
+    """ดึงรายละเอียดหลายผลิตภัณฑ์ในคำขอเดียว body: {"ids": [...]} (แทนการเรียก /api/products/<id> ทีละการ์ด)"""
+    product_ids = read_batch_ids()
+    snapshot = catalog_snapshot.current()
+    if snapshot is not None:
+        start_time = time.time()
+        products = {product_id: snapshot.product(product_id) for product_id in product_ids}
+        response_time, cached = round((time.time() - start_time) * 1000, 2), True
+    else:
+        products, response_time, cached = _load_products_batch(product_ids)
+        if products is None:
+            return jsonify({'error': 'ไม่สามารถดึงข้อมูลผลิตภัณฑ์ได้'}), 500
+
+    found = {product_id: product for product_id, product in products.items() if product is not None}
+    return jsonify({
+        'message': f"พบผลิตภัณฑ์ {len(found)} จาก {len(product_ids)} รหัส",
+        'count': len(found),
+        'products': found,
+        'not_found': [product_id for product_id in product_ids if product_id not in found],
+        'response_time_ms': response_time,
+        'cached': cached
+    })
+
+
+@products_bp.route('/api/products/<product_id>', methods=['GET'])
+def get_product(product_id):
+    """ดึงรายละเอียดผลิตภัณฑ์ตาม ID"""
+    # ตรวจรหัสก่อนทุกทาง: รหัสผิดรูปแบบตอบ 400 เหมือนกันไม่ว่าจะอ่านจาก snapshot หรือ Fuseki
+    Iri.bind(product_id)
+    # ระบุ ?mode ที่รู้จักมาเอง = ขอ query Fuseki สด ไม่ใช้ snapshot (ค่าอื่นถือว่าไม่ได้ระบุ)
+    mode = request.args.get('mode')
+    if mode not in DETAIL_QUERY_MODES:
+        mode = None
+    snapshot = catalog_snapshot.current() if mode is None else None
+    if snapshot is not None:
+        product, response_time, cached = _load_product_snapshot(snapshot, product_id)
+    elif (mode or DETAIL_QUERY_MODE) == 'construct':
+        product, response_time, cached = _load_product_construct(product_id)
+    else:
+        product, response_time, cached = _load_product_multi(product_id)
+
+    if product is None:
+        return jsonify({'error': f'ไม่พบผลิตภัณฑ์: {product_id}'}), 404
 
     return jsonify({
         'message': f"ข้อมูลผลิตภัณฑ์: {product.get('name', product_id)}",
         'product': product,
-        'response_time_ms': basic['response_time_ms']
+        'response_time_ms': response_time,
+        'cached': cached
     })
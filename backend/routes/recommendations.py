@@ -0,0 +1,37 @@
+# API Routes สำหรับแนะนำผลิตภัณฑ์
+from flask import Blueprint, jsonify
+from services.recommendation import recommendation_service
+from routes.batch import read_batch_ids
+from routes.conditional import register_etag, skip_etag
+
+recommendations_bp = Blueprint('recommendations', __name__)
+register_etag(recommendations_bp)
+
+
+@recommendations_bp.route('/api/recommendations/similar/batch', methods=['POST'])
+def get_similar_batch():
+    """แนะนำผลิตภัณฑ์คล้ายกันของหลายผลิตภัณฑ์ในคำขอเดียว body: {"ids": [...]}"""
+    result = recommendation_service.get_similar_products_batch(read_batch_ids())
+    if 'error' in result:
+        return jsonify({'error': result['error']}), 500
+    return jsonify(result)
+
+
+@recommendations_bp.route('/api/recommendations/<product_id>/similar', methods=['GET'])
+def get_similar(product_id):
+    """แนะนำผลิตภัณฑ์คล้ายกัน"""
+    result = recommendation_service.get_similar_products(product_id)
+    if 'error' in result:
+        return jsonify({'error': result['error']}), 500
+    return jsonify(result)
+
+
+@recommendations_bp.route('/api/recommendations/<product_id>/also-liked', methods=['GET'])
+def get_also_liked(product_id):
+    """แนะนำผลิตภัณฑ์ที่ผู้รีวิวกลุ่มเดียวกันชอบ (โมเดลจากคะแนนรีวิว)"""
+    # โมเดลถูกฝึกใหม่ได้โดย dataset version ไม่เปลี่ยน
+    skip_etag()
+    result = recommendation_service.get_also_liked_products(product_id)
+    if result is None:
+        return jsonify({'error': 'ยังไม่มีโมเดล also-liked (รัน python train_also_liked.py)'}), 503
+    return jsonify(result)
@@ -1,10 +1,12 @@
 # API Routes สำหรับค้นหา (พื้นฐานและ Semantic)
 from flask import Blueprint, request, jsonify
-from sparql.fuseki_client import fuseki_client
-from sparql.queries import SEARCH_PRODUCTS_BY_TEXT, SEARCH_BY_CERTIFICATION
 from services.semantic_search import SemanticSearch
+from routes.conditional import register_etag
+from routes.listing import query_list, stream_list
+from routes.ndjson import wants_ndjson
 
 search_bp = Blueprint('search', __name__)
+register_etag(search_bp)
 semantic_search = SemanticSearch()
 
 
@@ -15,9 +17,10 @@ def search_products():
     if not query:
         return jsonify({'error': 'กรุณาระบุคำค้นหา (parameter: q)'}), 400
 
-    result = fuseki_client.query(
-        SEARCH_PRODUCTS_BY_TEXT.format(search_term=query)
-    )
+    if wants_ndjson():
+        return stream_list('search_products_by_text', search_term=query)
+
+    result = query_list('search_products_by_text', search_term=query)
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -27,8 +30,10 @@ def search_products():
         'query': query,
         'search_type': 'basic',
         'count': result['count'],
+        'next_cursor': result['next_cursor'],
         'products': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
@@ -39,9 +44,10 @@ def search_by_certification():
     if not query:
         return jsonify({'error': 'กรุณาระบุคำค้นหา (parameter: q)'}), 400
 
-    result = fuseki_client.query(
-        SEARCH_BY_CERTIFICATION.format(search_term=query)
-    )
+    if wants_ndjson():
+        return stream_list('search_by_certification', search_term=query)
+
+    result = query_list('search_by_certification', search_term=query)
 
     if not result['success']:
         return jsonify({'error': result['error']}), 500
@@ -51,8 +57,10 @@ def search_by_certification():
         'query': query,
         'search_type': 'certification',
         'count': result['count'],
+        'next_cursor': result['next_cursor'],
         'products': result['results'],
-        'response_time_ms': result['response_time_ms']
+        'response_time_ms': result['response_time_ms'],
+        'cached': result['cached']
     })
 
 
@@ -64,6 +72,6 @@ def semantic_search_products():
         return jsonify({'error': 'กรุณาระบุคำค้นหา (parameter: q)'}), 400
 
     # แปลงคำค้นเป็น SPARQL query ด้วย semantic search
-    search_result = semantic_search.search(query)
+    search_result = semantic_search.search(query, run_query=query_list)
 
     return jsonify(search_result)
@@ -0,0 +1,280 @@
+# "ลูกค้าที่ชอบสินค้านี้ก็ชอบ" จาก matrix factorisation ของคะแนนรีวิว (ผู้รีวิว × ผลิตภัณฑ์)
+#
+# ฝึกแบบ offline (train_also_liked.py) ด้วย alternating least squares: R ≈ U·Vᵀ
+#   explicit: เฉพาะช่องที่มีรีวิว ค่าเป้าหมาย = คะแนน − ค่าเฉลี่ยรวม
+#   implicit: ทุกช่อง ค่าเป้าหมาย = [มีรีวิว] น้ำหนัก confidence = 1 + alpha·คะแนน (Hu, Koren & Volinsky 2008)
+# บันทึกเฉพาะ factor ของผลิตภัณฑ์ V (ปรับแถวให้ยาวหนึ่งหน่วย) เป็น .npy และข้อมูลผลิตภัณฑ์เป็น .json คู่กัน
+# API เปิด .npy ด้วย mmap แล้วให้คะแนนทุกผลิตภัณฑ์เทียบกับผลิตภัณฑ์ i ด้วย dot product เดียว V·V[i]
+# factor เทียบกันได้เฉพาะผลิตภัณฑ์ที่เชื่อมกันผ่านผู้รีวิว (component เดียวกันของกราฟผู้รีวิว–ผลิตภัณฑ์)
+# ผลิตภัณฑ์ต่าง component จึงไม่ถูกแนะนำ
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import ALSO_LIKED_MODEL_FILE, ALSO_LIKED_TOP_K
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+MODES = ('explicit', 'implicit')
+
+
+def metadata_path(model_file):
+    """ไฟล์ .json ที่คู่กับ factor (.npy)"""
+    return os.path.splitext(model_file)[0] + '.json'
+
+
+# === ฝึกโมเดล ===
+
+def rating_matrix(rating_rows):
+    """R (ผู้รีวิว × ผลิตภัณฑ์, 0 = ไม่มีรีวิว) และ mask จากแถวของ REVIEW_RATINGS
+
+    คืน (product_uris, reviewers, R, mask) — ผู้รีวิวรีวิวผลิตภัณฑ์เดียวซ้ำ ใช้คะแนนเฉลี่ย
+    """
+    products, reviewers, ratings = {}, {}, {}
+    for row in rating_rows:
+        product = products.setdefault(row['product_uri'], len(products))
+        reviewer = reviewers.setdefault(row.get('reviewerName') or row['review_uri'], len(reviewers))
+        ratings.setdefault((reviewer, product), []).append(float(row['rating']))
+    matrix = np.zeros((len(reviewers), len(products)))
+    mask = np.zeros(matrix.shape, dtype=bool)
+    for (reviewer, product), values in ratings.items():
+        matrix[reviewer, product] = sum(values) / len(values)
+        mask[reviewer, product] = True
+    return list(products), list(reviewers), matrix, mask
+
+
+def connected_components(mask):
+    """หมายเลข component ของแต่ละผลิตภัณฑ์ในกราฟสองฝั่งผู้รีวิว–ผลิตภัณฑ์ (union-find)"""
+    parent = list(range(mask.shape[1]))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for row in mask:
+        products = np.flatnonzero(row)
+        for other in products[1:]:
+            parent[find(other)] = find(products[0])
+    roots = [find(i) for i in range(len(parent))]
+    labels = {}
+    return np.array([labels.setdefault(root, len(labels)) for root in roots], dtype=np.int32)
+
+
+def _solve_rows(fixed, targets, weights, reg):
+    """แก้ least squares ถ่วงน้ำหนักทีละแถว: argmin_x Σ_j w_j (t_j − x·f_j)² + reg·|x|²"""
+    k = fixed.shape[1]
+    regulariser = reg * np.eye(k)
+    solved = np.zeros((targets.shape[0], k))
+    for row in range(targets.shape[0]):
+        weighted = fixed.T * weights[row]
+        solved[row] = np.linalg.solve(weighted @ fixed + regulariser, weighted @ targets[row])
+    return solved
+
+
+def factorise(matrix, mask, factors=16, reg=0.1, iterations=15, mode='explicit', alpha=1.0, seed=0):
+    """ALS → (U, V, rmse ของช่องที่มีรีวิว)"""
+    if mode not in MODES:
+        raise ValueError(f"mode ต้องเป็น {' หรือ '.join(MODES)}: {mode!r}")
+    rng = np.random.default_rng(seed)
+    users = rng.normal(scale=0.1, size=(matrix.shape[0], factors))
+    items = rng.normal(scale=0.1, size=(matrix.shape[1], factors))
+
+    if mode == 'explicit':
+        mean = matrix[mask].mean()
+        targets = np.where(mask, matrix - mean, 0.0)
+        weights = mask.astype(float)
+    else:
+        mean = 0.0
+        targets = mask.astype(float)
+        weights = 1.0 + alpha * matrix
+
+    for _ in range(iterations):
+        users = _solve_rows(items, targets, weights, reg)
+        items = _solve_rows(users, targets.T, weights.T, reg)
+
+    residual = (users @ items.T + mean - matrix)[mask] if mode == 'explicit' else \
+        (users @ items.T - targets)[mask]
+    rmse = float(np.sqrt(np.mean(residual ** 2))) if residual.size else 0.0
+    return users, items, rmse
+
+
+def train(rating_rows, product_rows, factors=16, reg=0.1, iterations=15, mode='explicit', alpha=1.0, seed=0):
+    """ฝึกจากแถวของ REVIEW_RATINGS และ GET_ALL_PRODUCTS → (factor ของผลิตภัณฑ์ float32, metadata)"""
+    product_uris, reviewers, matrix, mask = rating_matrix(rating_rows)
+    if not product_uris:
+        raise ValueError('ไม่มีรีวิวที่มีคะแนนสำหรับฝึกโมเดล')
+    _, items, rmse = factorise(matrix, mask, factors, reg, iterations, mode, alpha, seed)
+    norms = np.linalg.norm(items, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    info = {}
+    for row in product_rows:
+        info.setdefault(row['product_uri'], row)
+    counts = mask.sum(axis=0)
+    products = []
+    for column, uri in enumerate(product_uris):
+        row = info.get(uri, {})
+        product = {
+            'product': uri.split('#')[-1],
+            'product_uri': uri,
+            'name': row.get('name', uri.split('#')[-1]),
+            'price': row.get('price'),
+            'reviews': int(counts[column]),
+            'avgRating': round(float(matrix[mask[:, column], column].mean()), 2),
+        }
+        for key in ('categoryName', 'imageUrl'):
+            if row.get(key) is not None:
+                product[key] = row[key]
+        products.append(product)
+
+    metadata = {
+        'trained_at': time.time(),
+        'mode': mode,
+        'factors': factors,
+        'reg': reg,
+        'iterations': iterations,
+        'alpha': alpha,
+        'seed': seed,
+        'reviewers': len(reviewers),
+        'ratings': int(mask.sum()),
+        'rmse': round(rmse, 4),
+        'products': products,
+        'component': connected_components(mask).tolist(),
+    }
+    return (items / norms).astype(np.float32), metadata
+
+
+def save(model_file, item_factors, metadata):
+    """เขียน .npy แล้วจึง .json (ไฟล์ชั่วคราวแล้ว rename — API ที่กำลังอ่านไม่เห็นไฟล์ครึ่งๆ)"""
+    os.makedirs(os.path.dirname(os.path.abspath(model_file)), exist_ok=True)
+    for path, write in ((model_file, lambda f: np.save(f, item_factors)),
+                        (metadata_path(model_file),
+                         lambda f: f.write(json.dumps(metadata, ensure_ascii=False).encode('utf-8')))):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+
+# === ใช้งานใน API ===
+
+class AlsoLikedState:
+    """factor (mmap) + ข้อมูลผลิตภัณฑ์ของโมเดลหนึ่งไฟล์ (ไม่ถูกแก้ไขหลังโหลด)"""
+
+    def __init__(self, item_factors, metadata, mtime):
+        self.factors = item_factors
+        self.metadata = metadata
+        self.mtime = mtime
+        self.products = metadata['products']
+        self.component = np.array(metadata['component'], dtype=np.int32)
+        self.rows = {product['product']: row for row, product in enumerate(self.products)}
+        names = np.array([product['name'] for product in self.products], dtype=object)
+        self.tie_rank = np.argsort(np.argsort(names, kind='stable'), kind='stable')
+
+    def neighbours(self, product_id, k):
+        """ผลิตภัณฑ์ใน component เดียวกันที่คะแนน V·V[i] > 0 สูงสุด k รายการ (ค่าเท่ากันเรียงตามชื่อ)"""
+        row = self.rows.get(product_id)
+        if row is None:
+            return []
+        scores = np.round(self.factors @ self.factors[row], 6)
+        candidates = np.flatnonzero((self.component == self.component[row]) & (scores > 0))
+        candidates = candidates[candidates != row]
+        order = np.lexsort((self.tie_rank[candidates], -scores[candidates]))[:k]
+        return [_neighbour_row(self.products[i], scores[i]) for i in candidates[order]]
+
+    def stats(self):
+        return {key: value for key, value in self.metadata.items() if key not in ('products', 'component')}
+
+
+def _neighbour_row(product, score):
+    """แถวรูปแบบเดียวกับ /api/recommendations/<id>/similar + คะแนนของโมเดล"""
+    neighbour = {
+        'relatedProduct': product['product'],
+        'relatedProduct_uri': product['product_uri'],
+        'relatedName': product['name'],
+        'relatedPrice': product['price'],
+        'score': round(float(score), 4),
+        'avgRating': product['avgRating'],
+        'reviews': product['reviews'],
+    }
+    for key in ('categoryName', 'imageUrl'):
+        if product.get(key) is not None:
+            neighbour[key] = product[key]
+    return neighbour
+
+
+class AlsoLikedModel:
+    """เปิดไฟล์โมเดลด้วย mmap และเปิดใหม่เมื่อ train_also_liked.py เขียนไฟล์ใหม่ (ตรวจ mtime ของ .json)"""
+
+    def __init__(self, model_file=ALSO_LIKED_MODEL_FILE, top_k=ALSO_LIKED_TOP_K):
+        self.model_file = model_file
+        self.top_k = top_k
+        self._state = None
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.last_error = None
+
+    def _metadata_mtime(self):
+        try:
+            return os.stat(metadata_path(self.model_file)).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self):
+        """เปิดไฟล์โมเดลถ้ายังไม่ได้เปิดหรือถูกเขียนใหม่ คืน state หรือ None ถ้าไม่มีไฟล์/ไฟล์ไม่ถูกต้อง"""
+        mtime = self._metadata_mtime()
+        state = self._state
+        if state is not None and state.mtime == mtime:
+            return state
+        if mtime is None:
+            return state
+        with self._lock:
+            if self._state is not None and self._state.mtime == mtime:
+                return self._state
+            try:
+                with open(metadata_path(self.model_file), encoding='utf-8') as f:
+                    metadata = json.load(f)
+                item_factors = np.load(self.model_file, mmap_mode='r')
+                if item_factors.ndim != 2 or item_factors.shape[0] != len(metadata['products']):
+                    raise ValueError(f'จำนวนแถวของ factor ไม่ตรงกับ metadata: {item_factors.shape}')
+                self._state = AlsoLikedState(item_factors, metadata, mtime)
+            except (OSError, ValueError, KeyError) as e:
+                # เช่นอ่านระหว่างที่ train เขียน .npy ใหม่แต่ยังไม่เขียน .json — ลองใหม่ในคำขอถัดไป
+                self.last_error = f'เปิดโมเดลไม่สำเร็จ: {e}'
+                logger.warning("[ALSO-LIKED] %s", self.last_error)
+                return self._state
+            self.loads += 1
+            self.last_error = None
+            logger.info("[ALSO-LIKED] โหลดโมเดล %s: %d products × %d factors",
+                        self.model_file, *self._state.factors.shape)
+            return self._state
+
+    def also_liked(self, product_id):
+        """ผลิตภัณฑ์ที่ผู้รีวิวกลุ่มเดียวกันชอบ หรือ None ถ้ายังไม่มีโมเดล"""
+        state = self.load()
+        if state is None:
+            return None
+        with tracer.span('also_liked', product=product_id):
+            return state.neighbours(product_id, self.top_k)
+
+    def stats(self):
+        state = self._state
+        return {
+            'model_file': self.model_file,
+            'ready': state is not None,
+            'top_k': self.top_k,
+            'loads': self.loads,
+            'last_error': self.last_error,
+            **(state.stats() if state is not None else {}),
+        }
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+also_liked_model = AlsoLikedModel()
@@ -0,0 +1,100 @@
+# Analytics views — ผลลัพธ์ของ query วิเคราะห์ข้อมูล (ANALYTICS_*) ที่คำนวณล่วงหน้าเก็บไว้ในหน่วยความจำ
+#
+# หน้า dashboard เรียกทุก endpoint พร้อมกัน และแต่ละ endpoint คือ GROUP BY ที่สแกนทั้ง dataset
+# จึงคำนวณทุก view ใน query เดียว (UNION ของ subquery — queries.union_views) แล้วแยกแถวตาม ?view
+# สร้างใหม่ใน thread แยกหลัง admin เขียนข้อมูล โดยรอให้การเขียนที่ตามมาติด ๆ กันหยุดก่อน (debounce)
+# ระหว่างนั้นและเมื่อ dataset version ไม่ตรง จะ query Fuseki สดตามเดิม (ผลลัพธ์ไม่เก่ากว่าข้อมูล)
+import time
+
+from config import (
+    ANALYTICS_VIEWS_ENABLED, ANALYTICS_VIEWS_DEBOUNCE_SECONDS, ANALYTICS_VIEWS_RETRY_SECONDS,
+)
+from services.background_state import BackgroundState, LoadError
+from sparql import queries as q
+from sparql.registry import registry
+from utils.tracing import tracer
+
+
+def _order_value(row, order_var):
+    value = row.get(order_var)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('-inf')
+
+
+class AnalyticsState:
+    """ผลลัพธ์ทุก view ของ dataset version หนึ่ง (ไม่ถูกแก้ไขหลังสร้าง — อ่านพร้อมกันได้โดยไม่ต้อง lock)"""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.built_at = time.time()
+        views = {name: [] for name in q.ANALYTICS_VIEWS}
+        for row in rows:
+            row = dict(row)
+            name = row.pop('view', None)
+            if name in views:
+                views[name].append(row)
+        # เรียงตาม ORDER BY เดิมของแต่ละ view (sort แบบ stable: ค่าเท่ากันคงลำดับจาก Fuseki)
+        for name, view_rows in views.items():
+            order_var, descending, _ = q.page_key(q.ANALYTICS_VIEWS[name])
+            view_rows.sort(key=lambda row: _order_value(row, order_var), reverse=descending)
+        self.views = views
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'built_at': self.built_at,
+            'rows': {name: len(rows) for name, rows in self.views.items()},
+        }
+
+
+class AnalyticsViews(BackgroundState):
+    """ถือ AnalyticsState ปัจจุบันและสร้างใหม่ใน background (services/background_state.py)
+
+    rebuild_async() เลื่อนการสร้างออกไป debounce_seconds นับจากครั้งล่าสุดที่ถูกเรียก
+    การเขียนหลายครั้งติดกันจึงคำนวณใหม่ครั้งเดียวหลังเขียนเสร็จ
+    """
+
+    thread_name = 'analytics-views'
+    log_tag = 'ANALYTICS'
+    load_error = 'คำนวณ analytics views ไม่สำเร็จ'
+    build_error = 'คำนวณ analytics views ไม่สำเร็จ'
+
+    def __init__(self, enabled=ANALYTICS_VIEWS_ENABLED, debounce_seconds=ANALYTICS_VIEWS_DEBOUNCE_SECONDS,
+                 retry_seconds=ANALYTICS_VIEWS_RETRY_SECONDS):
+        super().__init__(enabled, retry_seconds, debounce_seconds)
+
+    def build(self, version):
+        """คำนวณทุก view จาก Fuseki ใน query เดียวเป็น AnalyticsState"""
+        result = registry.run('analytics_views', use_cache=False)
+        if not result['success']:
+            raise LoadError(result.get('error') or 'analytics_views')
+        return AnalyticsState(version, result['results'])
+
+    def describe(self, state):
+        rows = sum(len(view_rows) for view_rows in state.views.values())
+        return f'{len(state.views)} views, {rows} rows'
+
+    def settings(self):
+        return {'debounce_seconds': self.debounce_seconds}
+
+    def run(self, name):
+        """ผลลัพธ์ของ view ในรูปแบบเดียวกับ registry.run() — ถ้ายังไม่พร้อมจะ query Fuseki สด"""
+        state = self.current()
+        if state is None or name not in state.views:
+            return registry.run(name)
+        start_time = time.time()
+        with tracer.span('analytics_view', query=name):
+            rows = state.views[name]
+        return {
+            'success': True,
+            'results': rows,
+            'count': len(rows),
+            'response_time_ms': round((time.time() - start_time) * 1000, 2),
+            'cached': True,
+        }
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+analytics_views = AnalyticsViews()
@@ -0,0 +1,161 @@
+# state ในหน่วยความจำที่คำนวณจาก Fuseki ตาม dataset version และสร้างใหม่ใน background
+#
+# ใช้ร่วมกันโดย CatalogSnapshot, AnalyticsViews และ ProductSimilarity: subclass กำหนดแค่ build(version)
+# ส่วนการสร้างใน thread แยก การสร้างซ้ำเมื่อถูกสั่งระหว่างสร้าง การรอ debounce และการเว้นช่วงหลังล้มเหลวอยู่ที่นี่
+# state ใหม่ถูกสลับ reference ครั้งเดียว (copy-on-write) — ระหว่างสร้างและเมื่อ version ไม่ตรง current() คืน None
+import logging
+import threading
+import time
+
+from sparql.dataset_version import dataset_version
+from sparql.registry import registry
+
+
+class LoadError(Exception):
+    """โหลดข้อมูลสำหรับสร้าง state ไม่สำเร็จ (ข้อความบอกว่าส่วนใดล้มเหลว)"""
+
+
+def run_queries(*names):
+    """ผลลัพธ์ของหลาย query (ไม่ผ่านแคช) ตามชื่อ — ถ้า query ใดล้มเหลวจะ raise LoadError พร้อมชื่อ query"""
+    results = {name: registry.run(name, use_cache=False) for name in names}
+    failed = [name for name, result in results.items() if not result['success']]
+    if failed:
+        raise LoadError(', '.join(failed))
+    return results
+
+
+class BackgroundState:
+    """ถือ state ปัจจุบัน (ต้องมี .version และ .stats()) และสร้างใหม่ใน background
+
+    current() คืน state เฉพาะเมื่อ version ตรงกับ dataset version ล่าสุด
+    ถ้าไม่ตรง (worker นี้หรือ worker อื่นเขียนข้อมูล) จะสั่งสร้างใหม่แล้วคืน None ให้ใช้ SPARQL สด
+    rebuild_async() เลื่อนการสร้างออกไป debounce_seconds นับจากครั้งล่าสุดที่ถูกเรียก
+    """
+
+    thread_name = 'background-state'
+    log_tag = 'STATE'
+    load_error = 'โหลดข้อมูลไม่สำเร็จ'
+    build_error = 'สร้าง state ไม่สำเร็จ'
+
+    def __init__(self, enabled, retry_seconds, debounce_seconds=0.0):
+        self.enabled = enabled
+        self.retry_seconds = retry_seconds
+        self.debounce_seconds = debounce_seconds
+        self.logger = logging.getLogger(type(self).__module__)
+        self._state = None
+        self._lock = threading.Lock()
+        self._building = False
+        self._pending = False
+        self._due = 0.0
+        self._failed_at = None
+        self.builds = 0
+        self.last_build_ms = None
+        self.last_error = None
+
+    def build(self, version):
+        """สร้าง state ของ version จาก Fuseki (subclass กำหนด) — โหลดไม่สำเร็จให้ raise LoadError"""
+        raise NotImplementedError
+
+    def describe(self, state):
+        """ข้อความสรุป state สำหรับ log หลังสร้างเสร็จ"""
+        return ''
+
+    def settings(self):
+        """ค่าตั้งเฉพาะของ subclass ที่แสดงใน stats()"""
+        return {}
+
+    def current(self):
+        """state ที่ใช้ตอบได้ หรือ None (ปิดอยู่ / ยังไม่พร้อม / เก่ากว่า dataset version)"""
+        if not self.enabled:
+            return None
+        state = self._state
+        if state is not None and state.version == dataset_version.current():
+            return state
+        retry_due = self._failed_at is None or \
+            time.monotonic() - self._failed_at >= self.retry_seconds
+        if retry_due and not self._building:
+            self.rebuild_async()
+        return None
+
+    def rebuild_async(self, delay=None):
+        """สั่งสร้างใหม่ใน thread แยกหลังผ่านไป delay วินาที (ค่าเริ่มต้น debounce_seconds)
+
+        ถ้ากำลังสร้างอยู่ จะสร้างซ้ำอีกรอบหลังเสร็จ (คำสั่งที่ค้างหลายครั้งรวมเป็นรอบเดียว)
+        """
+        if not self.enabled:
+            return
+        delay = self.debounce_seconds if delay is None else delay
+        with self._lock:
+            self._due = time.monotonic() + delay
+            if self._building:
+                self._pending = True
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild_loop, name=self.thread_name, daemon=True).start()
+
+    def _wait_until_due(self):
+        while True:
+            with self._lock:
+                remaining = self._due - time.monotonic()
+                if remaining <= 0:
+                    # คำสั่งก่อนหน้านี้ทั้งหมดจะเห็นข้อมูลในรอบที่กำลังจะสร้าง
+                    self._pending = False
+                    return
+            time.sleep(remaining)
+
+    def _rebuild_loop(self):
+        while True:
+            self._wait_until_due()
+            try:
+                self.rebuild()
+            finally:
+                with self._lock:
+                    if not self._pending:
+                        self._building = False
+                        return
+
+    def rebuild(self):
+        """สร้าง state ใหม่ทันทีแล้วสลับเข้าแทน คืน True ถ้าสำเร็จ"""
+        start = time.perf_counter()
+        # อ่าน version ก่อนโหลด: ถ้ามีการเขียนระหว่างโหลด version จะไม่ตรงและถูกสร้างใหม่อีกรอบ
+        version = dataset_version.refresh()
+        try:
+            if version is None:
+                raise LoadError('dataset_version')
+            state = self.build(version)
+        except LoadError as e:
+            self._fail(f'{self.load_error}: {e}')
+            return False
+        except (KeyError, ValueError) as e:
+            self._fail(f'{self.build_error}: {e}', exc_info=True)
+            return False
+
+        self._state = state
+        self._failed_at = None
+        self.last_error = None
+        self.builds += 1
+        self.last_build_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.logger.info("[%s] version %s: %s (%.0f ms)", self.log_tag, version,
+                         self.describe(state), self.last_build_ms)
+        return True
+
+    def _fail(self, message, exc_info=False):
+        self._failed_at = time.monotonic()
+        self.last_error = message
+        if exc_info:
+            self.logger.exception("[%s] %s", self.log_tag, message)
+        else:
+            self.logger.warning("[%s] %s", self.log_tag, message)
+
+    def stats(self):
+        state = self._state
+        return {
+            'enabled': self.enabled,
+            'ready': state is not None,
+            'building': self._building,
+            **self.settings(),
+            'builds': self.builds,
+            'last_build_ms': self.last_build_ms,
+            'last_error': self.last_error,
+            **(state.stats() if state is not None else {}),
+        }
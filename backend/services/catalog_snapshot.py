@@ -0,0 +1,277 @@
+# Catalog snapshot — สำเนาข้อมูลผลิตภัณฑ์ วิสาหกิจ และหมวดหมู่ในหน่วยความจำ สำหรับตอบ endpoint อ่านอย่างเดียว
+#
+# โหลดจาก Fuseki ครั้งเดียว (5 query) เป็น object แบบ __slots__ พร้อม index ตาม ID
+# แล้วสร้างแถวผลลัพธ์ของ list query ที่ใช้บ่อยเตรียมไว้ (รูปแบบเดียวกับ FusekiClient._parse_results)
+# สร้างใหม่ทั้งชุดใน thread แยกหลัง admin เขียนข้อมูล แล้วสลับ reference ครั้งเดียว (copy-on-write)
+# ระหว่างนั้นและเมื่อ dataset version ไม่ตรง จะคืน None ให้ route ถาม Fuseki ตามเดิม
+import bisect
+import time
+
+from config import CATALOG_SNAPSHOT_ENABLED, CATALOG_SNAPSHOT_RETRY_SECONDS
+from services.background_state import BackgroundState, run_queries
+from sparql.framing import frame_product, frame_enterprise
+from sparql.terms import Number
+from utils.tracing import tracer
+
+
+def _local_name(uri):
+    return uri.split('#')[-1] if '#' in uri else uri
+
+
+def _set_if(target, key, value):
+    if value is not None:
+        target[key] = value
+
+
+def _set_resource(target, var, uri):
+    """ใส่ค่า URI แบบเดียวกับ _parse_results: var = ชื่อย่อ, var_uri = URI เต็ม"""
+    if uri is not None:
+        target[var] = _local_name(uri)
+        target[f'{var}_uri'] = uri
+
+
+class ProductRecord:
+    """ผลิตภัณฑ์หนึ่งรายการ (ค่าตาม GET_ALL_PRODUCTS) + เอกสารรายละเอียดที่จัดรูปแล้ว"""
+
+    __slots__ = ('id', 'uri', 'name', 'price', 'price_value', 'description', 'weight',
+                 'shelf_life', 'image_url', 'category_uri', 'category_name',
+                 'enterprise_uri', 'enterprise_name', 'detail')
+
+    def __init__(self, row):
+        self.id = row['product']
+        self.uri = row['product_uri']
+        self.name = row['name']
+        self.price = row['price']
+        self.price_value = float(row['price'])
+        self.description = row.get('description')
+        self.weight = row.get('weight')
+        self.shelf_life = row.get('shelfLife')
+        self.image_url = row.get('imageUrl')
+        self.category_uri = row.get('category_uri')
+        self.category_name = row.get('categoryName')
+        self.enterprise_uri = row.get('enterprise_uri')
+        self.enterprise_name = row.get('enterpriseName')
+        self.detail = None
+
+    def list_row(self):
+        """แถวของ all_products"""
+        row = {}
+        _set_resource(row, 'product', self.uri)
+        row['name'] = self.name
+        row['price'] = self.price
+        _set_if(row, 'description', self.description)
+        _set_if(row, 'weight', self.weight)
+        if self.category_name is not None:
+            _set_resource(row, 'category', self.category_uri)
+            row['categoryName'] = self.category_name
+        if self.enterprise_name is not None:
+            _set_resource(row, 'enterprise', self.enterprise_uri)
+            row['enterpriseName'] = self.enterprise_name
+        _set_if(row, 'shelfLife', self.shelf_life)
+        _set_if(row, 'imageUrl', self.image_url)
+        return row
+
+    def category_row(self):
+        """แถวของ products_by_category"""
+        row = {}
+        _set_resource(row, 'product', self.uri)
+        row['name'] = self.name
+        row['price'] = self.price
+        _set_if(row, 'description', self.description)
+        _set_if(row, 'enterpriseName', self.enterprise_name)
+        _set_if(row, 'imageUrl', self.image_url)
+        return row
+
+    def price_row(self):
+        """แถวของ products_by_price_range"""
+        row = {}
+        _set_resource(row, 'product', self.uri)
+        row['name'] = self.name
+        row['price'] = self.price
+        _set_if(row, 'categoryName', self.category_name)
+        _set_if(row, 'enterpriseName', self.enterprise_name)
+        _set_if(row, 'imageUrl', self.image_url)
+        return row
+
+    def search_row(self):
+        """แถวของ search_result_rows (รูปแบบเดียวกับ SEARCH_PRODUCTS_BY_TEXT)"""
+        row = {}
+        _set_resource(row, 'product', self.uri)
+        row['name'] = self.name
+        row['price'] = self.price
+        _set_if(row, 'categoryName', self.category_name)
+        _set_if(row, 'enterpriseName', self.enterprise_name)
+        _set_if(row, 'description', self.description)
+        _set_if(row, 'imageUrl', self.image_url)
+        return row
+
+
+class EnterpriseRecord:
+    """วิสาหกิจหนึ่งแห่ง (ค่าตาม GET_ALL_ENTERPRISES) + เอกสารรายละเอียด"""
+
+    __slots__ = ('id', 'uri', 'name', 'description', 'location_name', 'detail')
+
+    def __init__(self, row):
+        self.id = row['enterprise']
+        self.uri = row['enterprise_uri']
+        self.name = row['name']
+        self.description = row.get('description')
+        self.location_name = row.get('locationName')
+        self.detail = None
+
+    def list_row(self):
+        row = {}
+        _set_resource(row, 'enterprise', self.uri)
+        row['name'] = self.name
+        _set_if(row, 'description', self.description)
+        _set_if(row, 'locationName', self.location_name)
+        return row
+
+
+class CategoryRecord:
+    """หมวดหมู่หนึ่งหมวด (ค่าตาม GET_ALL_CATEGORIES)"""
+
+    __slots__ = ('id', 'uri', 'name', 'description', 'product_count')
+
+    def __init__(self, row):
+        self.id = row['category']
+        self.uri = row['category_uri']
+        self.name = row['name']
+        self.description = row.get('description')
+        self.product_count = row['productCount']
+
+    def list_row(self):
+        row = {}
+        _set_resource(row, 'category', self.uri)
+        row['name'] = self.name
+        _set_if(row, 'description', self.description)
+        row['productCount'] = self.product_count
+        return row
+
+
+def _by_name(record):
+    """ลำดับเดียวกับ ORDER BY ?name แล้วตัดสินเสมอด้วย STR(URI) (เหมือน keyset pagination)"""
+    return record.name, record.uri
+
+
+class CatalogState:
+    """snapshot หนึ่งชุด (ไม่ถูกแก้ไขหลังสร้าง — อ่านพร้อมกันหลาย thread ได้โดยไม่ต้อง lock)
+
+    แถวที่คืนจาก select() ใช้ร่วมกันทุก request ผู้เรียกต้องอ่านอย่างเดียว
+    """
+
+    def __init__(self, version, product_rows, enterprise_rows, category_rows,
+                 product_graph, enterprise_graph):
+        self.version = version
+        self.built_at = time.time()
+
+        self.products = {}
+        for row in product_rows:
+            # OPTIONAL หลายค่า (เช่นหลายหมวดหมู่) → เก็บแถวแรก
+            if row['product'] not in self.products:
+                self.products[row['product']] = ProductRecord(row)
+        self.enterprises = {row['enterprise']: EnterpriseRecord(row) for row in enterprise_rows}
+        self.categories = {row['category']: CategoryRecord(row) for row in category_rows}
+
+        for product in self.products.values():
+            product.detail = frame_product(product_graph, product.id)
+        for enterprise in self.enterprises.values():
+            enterprise.detail = frame_enterprise(enterprise_graph, enterprise.id)
+
+        products = sorted(self.products.values(), key=_by_name)
+        self._all_products = [p.list_row() for p in products]
+        self._by_category = {}
+        for product in products:
+            if product.category_uri is not None:
+                self._by_category.setdefault(_local_name(product.category_uri), []).append(
+                    product.category_row())
+
+        by_price = sorted(self.products.values(), key=lambda p: (p.price_value, p.uri))
+        self._prices = [p.price_value for p in by_price]
+        self._by_price = [p.price_row() for p in by_price]
+
+        self._all_enterprises = [e.list_row() for e in sorted(self.enterprises.values(), key=_by_name)]
+        self._all_categories = [c.list_row() for c in sorted(self.categories.values(), key=_by_name)]
+
+    def select(self, name, **params):
+        """แถวผลลัพธ์ของ list query ตามชื่อ template หรือ None ถ้า snapshot ไม่ครอบคลุม query นี้"""
+        if name == 'all_products':
+            return self._all_products
+        if name == 'products_by_category':
+            return self._by_category.get(params['category_id'], [])
+        if name == 'products_by_price_range':
+            low = float(Number.bind(params['min_price']))
+            high = float(Number.bind(params['max_price']))
+            if low > high:
+                return []
+            start = bisect.bisect_left(self._prices, low)
+            end = bisect.bisect_right(self._prices, high)
+            return self._by_price[start:end]
+        if name == 'search_result_rows':
+            # แถวของรหัสที่ search index จับคู่ได้ (สร้างตอนเรียก — ไม่ได้เตรียมไว้ล่วงหน้า)
+            return [self.products[product_id].search_row() for product_id in params['product_ids']
+                    if product_id in self.products]
+        if name == 'all_enterprises':
+            return self._all_enterprises
+        if name == 'all_categories':
+            return self._all_categories
+        return None
+
+    def product(self, product_id):
+        """เอกสารรายละเอียดผลิตภัณฑ์ (รูปแบบเดียวกับ GET /api/products/<id>) หรือ None"""
+        record = self.products.get(product_id)
+        return record.detail if record is not None else None
+
+    def enterprise(self, enterprise_id):
+        record = self.enterprises.get(enterprise_id)
+        return record.detail if record is not None else None
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'built_at': self.built_at,
+            'products': len(self.products),
+            'enterprises': len(self.enterprises),
+            'categories': len(self.categories),
+        }
+
+
+class CatalogSnapshot(BackgroundState):
+    """ถือ CatalogState ปัจจุบันและสร้างใหม่ใน background (services/background_state.py)"""
+
+    thread_name = 'catalog-snapshot'
+    log_tag = 'SNAPSHOT'
+    load_error = 'โหลด snapshot ไม่สำเร็จ'
+    build_error = 'สร้าง snapshot ไม่สำเร็จ'
+
+    def __init__(self, enabled=CATALOG_SNAPSHOT_ENABLED, retry_seconds=CATALOG_SNAPSHOT_RETRY_SECONDS):
+        super().__init__(enabled, retry_seconds)
+
+    def build(self, version):
+        """โหลดข้อมูลทั้งชุดจาก Fuseki (5 query) เป็น CatalogState"""
+        results = run_queries('all_products', 'all_enterprises', 'all_categories',
+                              'catalog_products', 'catalog_enterprises')
+        return CatalogState(
+            version,
+            results['all_products']['results'],
+            results['all_enterprises']['results'],
+            results['all_categories']['results'],
+            results['catalog_products']['graph'],
+            results['catalog_enterprises']['graph'],
+        )
+
+    def describe(self, state):
+        return (f'{len(state.products)} products, {len(state.enterprises)} enterprises, '
+                f'{len(state.categories)} categories')
+
+    def select(self, name, **params):
+        """แถวของ list query จาก snapshot หรือ None ถ้าต้องถาม Fuseki"""
+        state = self.current()
+        if state is None:
+            return None
+        with tracer.span('snapshot', query=name):
+            return state.select(name, **params)
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,165 @@
+# ตัวนับของ dataset (triples, ผลิตภัณฑ์, วิสาหกิจ, หมวดหมู่) สำหรับ /api/analytics/overview และ /api/health
+#
+# COUNT(*) บน ?s ?p ?o ต้องสแกนทั้ง store จึงนับจริงครั้งเดียวตอนเริ่ม (COUNT_DATASET) แล้วเก็บไว้ในหน่วยความจำ
+# admin เขียนข้อมูล: วัด footprint ของ resource ที่ถูกแก้ (RESOURCE_FOOTPRINT) ก่อนและหลังเขียน แล้วบวกผลต่าง
+# ตรวจทานกับค่าจริงเป็นระยะใน background และทันทีเมื่อ dataset version ไม่ต่อเนื่อง
+# (worker อื่นเขียนข้อมูล หรือวัด footprint ไม่สำเร็จ)
+import logging
+import threading
+import time
+
+from config import DATASET_COUNTERS_RECONCILE_SECONDS
+from sparql.dataset_version import dataset_version
+from sparql.registry import registry
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('triples', 'products', 'enterprises', 'categories')
+
+
+def _parse_counts(result):
+    if not result['success'] or not result['results']:
+        return None
+    row = result['results'][0]
+    return {field: int(float(row.get(field, 0))) for field in FIELDS}
+
+
+class DatasetCounters:
+    """ตัวนับที่ปรับตามการเขียนของ admin แทนการ COUNT ทั้ง dataset ทุกคำขอ
+
+    counts() คืน dict ใหม่ทุกครั้ง (ผู้เรียกแก้ไขได้) หรือ None ถ้ายังนับจาก Fuseki ไม่ได้
+    """
+
+    def __init__(self, reconcile_seconds=DATASET_COUNTERS_RECONCILE_SECONDS):
+        self.reconcile_seconds = reconcile_seconds
+        self._counts = None
+        self.version = None
+        self._lock = threading.Lock()
+        self._seed_lock = threading.Lock()
+        self._reconciling = False
+        self._started = False
+        self.reconciles = 0
+        self.adjustments = 0
+        self.last_reconcile_ms = None
+        self.last_reconciled_at = None
+        self.last_drift = None
+        self.last_error = None
+
+    def counts(self):
+        """ค่าตัวนับปัจจุบัน — ครั้งแรกนับจาก Fuseki ทันที (ถ้ายังไม่ได้ตั้งต้นใน background)"""
+        counts = self._counts
+        if counts is None:
+            with self._seed_lock:
+                if self._counts is None:
+                    self.reconcile()
+            counts = self._counts
+            if counts is None:
+                return None
+        elif self.version != dataset_version.current():
+            # worker อื่นเขียนข้อมูล: ตอบค่าเดิมไปก่อนแล้วนับใหม่ใน background
+            self.reconcile_async()
+        return dict(counts)
+
+    def footprint(self, resource_id):
+        """จำนวน triple และชนิดของ resource (dict ตาม FIELDS) หรือ None ถ้า query ไม่สำเร็จ
+
+        เรียกก่อนเขียนข้อมูล แล้วส่งผลให้ record_write() หลังเขียน
+        """
+        return _parse_counts(registry.run('resource_footprint', use_cache=False, resource_id=resource_id))
+
+    def record_write(self, resource_id, before, version):
+        """ปรับตัวนับหลังเขียน resource_id สำเร็จ
+
+        before: footprint ก่อนเขียน, version: dataset version หลัง bump
+        ถ้าวัดไม่ได้หรือ version ไม่ต่อจากค่าที่ตัวนับรู้จัก (มีการเขียนอื่นแทรก) จะนับใหม่ทั้งชุดใน background
+        """
+        if self._counts is None:
+            return
+        after = self.footprint(resource_id) if before is not None else None
+        with self._lock:
+            consistent = (after is not None and version is not None and self.version is not None
+                          and version == self.version + 1)
+            if consistent:
+                self._counts = {field: self._counts[field] + after[field] - before[field]
+                                for field in FIELDS}
+                self.version = version
+                self.adjustments += 1
+        if not consistent:
+            self.reconcile_async()
+
+    def reconcile(self):
+        """นับใหม่ทั้งชุดจาก Fuseki แล้วแทนค่าเดิม คืน True ถ้าสำเร็จ"""
+        start = time.perf_counter()
+        # อ่าน version ก่อนนับ: ถ้ามีการเขียนระหว่างนับ version จะไม่ตรงและถูกนับใหม่อีกรอบ
+        version = dataset_version.refresh()
+        result = registry.run('count_dataset', use_cache=False)
+        counts = _parse_counts(result)
+        if version is None or counts is None:
+            self.last_error = f"นับ dataset ไม่สำเร็จ: {result.get('error') or 'dataset_version'}"
+            logger.warning("[COUNTERS] %s", self.last_error)
+            return False
+
+        with self._lock:
+            previous = self._counts
+            self._counts = counts
+            self.version = version
+        if previous is not None:
+            drift = {field: counts[field] - previous[field] for field in FIELDS
+                     if counts[field] != previous[field]}
+            if drift:
+                logger.info("[COUNTERS] ค่าที่ตรวจทานต่างจากตัวนับ: %s", drift)
+            self.last_drift = drift
+        self.last_error = None
+        self.reconciles += 1
+        self.last_reconciled_at = time.time()
+        self.last_reconcile_ms = round((time.perf_counter() - start) * 1000, 2)
+        return True
+
+    def reconcile_async(self):
+        """นับใหม่ใน thread แยก (ถ้ากำลังนับอยู่จะไม่สั่งซ้ำ)"""
+        with self._lock:
+            if self._reconciling:
+                return
+            self._reconciling = True
+
+        def run():
+            try:
+                self.reconcile()
+            finally:
+                self._reconciling = False
+
+        threading.Thread(target=run, name='dataset-counters', daemon=True).start()
+
+    def start(self):
+        """ตั้งต้นตัวนับใน background และตรวจทานทุก reconcile_seconds (0 = ไม่ตรวจทานเป็นระยะ)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        def loop():
+            with self._seed_lock:
+                if self._counts is None:
+                    self.reconcile()
+            while self.reconcile_seconds > 0:
+                time.sleep(self.reconcile_seconds)
+                self.reconcile()
+
+        threading.Thread(target=loop, name='dataset-counters-reconcile', daemon=True).start()
+
+    def stats(self):
+        return {
+            'counts': self._counts,
+            'version': self.version,
+            'reconcile_seconds': self.reconcile_seconds,
+            'reconciles': self.reconciles,
+            'adjustments': self.adjustments,
+            'last_reconcile_ms': self.last_reconcile_ms,
+            'last_reconciled_at': self.last_reconciled_at,
+            'last_drift': self.last_drift,
+            'last_error': self.last_error,
+        }
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+dataset_counters = DatasetCounters()
@@ -0,0 +1,166 @@
+# Inverted index วัตถุดิบ → ผลิตภัณฑ์ สำหรับหาคู่ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน
+#
+# SEMANTIC_SHARED_INGREDIENTS เป็น self-join ของผลิตภัณฑ์ทุกคู่ผ่าน hasIngredient (กำลังสองของจำนวนผลิตภัณฑ์)
+# ที่นี่มองข้อมูลเป็นเมทริกซ์อุบัติการณ์ A (ผลิตภัณฑ์ × วัตถุดิบ) แบบ sparse:
+#   ingredients[p] = แถวของ A, postings[i] = คอลัมน์ของ A (inverted index)
+#   overlap[(p, q)] = (A·Aᵀ)[p, q] = จำนวนวัตถุดิบที่ p และ q มีร่วมกัน เก็บเฉพาะสามเหลี่ยมบนที่ไม่เป็นศูนย์
+# A·Aᵀ คำนวณเป็นผลรวมของ outer product ของแต่ละคอลัมน์ จึงแตะเฉพาะคู่ที่มีวัตถุดิบร่วมกันจริง
+# เมื่อวัตถุดิบของผลิตภัณฑ์หนึ่งเปลี่ยน ปรับเฉพาะแถว/คอลัมน์ของผลิตภัณฑ์นั้นตาม posting ของวัตถุดิบที่เพิ่ม/ลด
+import heapq
+import time
+
+from config import INGREDIENT_INDEX_ENABLED
+from services.background_state import LoadError, run_queries
+from services.versioned_index import VersionedIndex
+from sparql.registry import registry
+from utils.helpers import build_uri
+from utils.tracing import tracer
+
+
+def _pair(a, b):
+    """key ของคู่ตามเงื่อนไข STR(?p1) < STR(?p2) ของ query เดิม"""
+    return (a, b) if a < b else (b, a)
+
+
+class IngredientIndex(VersionedIndex):
+    """A และ A·Aᵀ ของผลิตภัณฑ์ × วัตถุดิบ (services/versioned_index.py)
+
+    ปรับทีละผลิตภัณฑ์ภายใต้ lock ใช้เวลาสั้นมาก
+    """
+
+    log_tag = 'INGREDIENTS'
+    load_error = 'โหลด ingredient index ไม่สำเร็จ'
+
+    def __init__(self, enabled=INGREDIENT_INDEX_ENABLED):
+        super().__init__(enabled)
+        self.names = {}
+        self.ingredients = {}
+        self.postings = {}
+        self.overlap = {}
+
+    # === ปรับโครงสร้าง (เรียกภายใต้ self._lock) ===
+
+    def _add_overlap(self, a, b, delta):
+        key = _pair(a, b)
+        count = self.overlap.get(key, 0) + delta
+        if count:
+            self.overlap[key] = count
+        else:
+            del self.overlap[key]
+
+    def _set_product(self, uri, name, ingredients):
+        """แทนแถวของผลิตภัณฑ์ uri ใน A แล้วปรับ A·Aᵀ เฉพาะส่วนที่เปลี่ยน (name None = ลบผลิตภัณฑ์)"""
+        old = self.ingredients.get(uri, frozenset())
+        for ingredient in old - ingredients:
+            posting = self.postings[ingredient]
+            posting.discard(uri)
+            for other in posting:
+                self._add_overlap(uri, other, -1)
+            if not posting:
+                del self.postings[ingredient]
+        for ingredient in ingredients - old:
+            posting = self.postings.setdefault(ingredient, set())
+            for other in posting:
+                self._add_overlap(uri, other, 1)
+            posting.add(uri)
+        if name is None:
+            self.names.pop(uri, None)
+            self.ingredients.pop(uri, None)
+        else:
+            self.names[uri] = name
+            self.ingredients[uri] = ingredients
+
+    # === โหลด / ปรับตามการเขียน ===
+
+    def load(self):
+        """โหลดเมทริกซ์อุบัติการณ์ทั้งชุดจาก Fuseki แล้วคำนวณ A·Aᵀ (นอก lock)"""
+        result = run_queries('product_ingredient_incidence')['product_ingredient_incidence']
+        names, rows = {}, {}
+        for row in result['results']:
+            uri = row['product_uri']
+            # hasName หลายค่า → ใช้ค่าแรก
+            names.setdefault(uri, row['name'])
+            ingredients = rows.setdefault(uri, set())
+            if row.get('ingredient_uri') is not None:
+                ingredients.add(row['ingredient_uri'])
+
+        postings = {}
+        for uri, ingredients in rows.items():
+            for ingredient in ingredients:
+                postings.setdefault(ingredient, set()).add(uri)
+        overlap = {}
+        for posting in postings.values():
+            members = sorted(posting)
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    overlap[(a, b)] = overlap.get((a, b), 0) + 1
+        ingredients = {uri: frozenset(ingredients) for uri, ingredients in rows.items()}
+        return names, ingredients, postings, overlap
+
+    def install(self, data):
+        self.names, self.ingredients, self.postings, self.overlap = data
+
+    def load_change(self, resource_id):
+        """แถวใหม่ของ resource_id → (uri, ชื่อหรือ None ถ้าไม่ใช่ผลิตภัณฑ์แล้ว, วัตถุดิบ)"""
+        result = registry.run('product_ingredient_row', use_cache=False, product_id=resource_id)
+        if not result['success']:
+            raise LoadError('product_ingredient_row')
+        name = None
+        ingredients = set()
+        for row in result['results']:
+            if name is None:
+                name = row['name']
+            if row.get('ingredient_uri') is not None:
+                ingredients.add(row['ingredient_uri'])
+        return build_uri(resource_id), name, frozenset(ingredients)
+
+    def apply_change(self, change):
+        self._set_product(*change)
+
+    def sizes(self):
+        return {'products': len(self.names), 'ingredients': len(self.postings), 'pairs': len(self.overlap)}
+
+    # === อ่าน ===
+
+    def shared_pairs(self, min_shared=2, limit=20):
+        """คู่ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกันอย่างน้อย min_shared ชนิด เรียงจากมากไปน้อย มากสุด limit คู่ (0 = ทั้งหมด)
+
+        แถวรูปแบบเดียวกับ SEMANTIC_SHARED_INGREDIENTS (ค่าเท่ากันเรียงตามชื่อ)
+        """
+        with self._lock:
+            names = self.names
+            candidates = [(count, a, b) for (a, b), count in self.overlap.items() if count >= min_shared]
+
+            def order(item):
+                return -item[0], names[item[1]], names[item[2]]
+
+            if limit:
+                top = heapq.nsmallest(limit, candidates, key=order)
+            else:
+                top = sorted(candidates, key=order)
+            return [{'product1Name': names[a], 'product2Name': names[b], 'sharedCount': str(count)}
+                    for count, a, b in top]
+
+    def run(self, min_shared=2, limit=20):
+        """ผลลัพธ์รูปแบบเดียวกับ registry.run('shared_ingredients')
+
+        ถ้า index ใช้ไม่ได้จะ query Fuseki ด้วยเงื่อนไขเดียวกัน (limit = 0 ไม่ใส่ LIMIT)
+        """
+        if not self.ensure_current():
+            if limit:
+                return registry.run('shared_ingredients_top', min_shared=min_shared, limit=limit)
+            return registry.run('shared_ingredients', min_shared=min_shared)
+        start_time = time.time()
+        with tracer.span('ingredient_index', min_shared=min_shared, limit=limit):
+            rows = self.shared_pairs(min_shared, limit)
+        return {
+            'success': True,
+            'results': rows,
+            'count': len(rows),
+            'response_time_ms': round((time.time() - start_time) * 1000, 2),
+            'cached': True,
+        }
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+ingredient_index = IngredientIndex()
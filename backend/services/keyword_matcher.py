@@ -0,0 +1,117 @@
+# จับคู่คำหลักหลายคำพร้อมกันด้วย Aho-Corasick automaton (ใช้ใน SemanticSearch)
+#
+# รวมคำหลักทั้งหมด (คำของทุก intent และชื่ออำเภอ) เป็น trie เดียวพร้อม failure link ตอนสร้าง
+# แล้วอ่านคำค้นเพียงรอบเดียวก็ได้ทุกคำที่ปรากฏพร้อมตำแหน่ง — เวลา O(ความยาวคำค้น + จำนวนที่พบ)
+# ไม่ขึ้นกับจำนวนคำหลัก ต่างจากการวน `keyword in text` ทีละคำ (O(จำนวนคำ × ความยาวคำค้น))
+# คำที่ทับตำแหน่งกันเลือกคำที่ยาวกว่า เช่น "เมืองสกลนคร" ชนะ "เมือง" และ "น้ำพริก" ชนะ "น้ำ"
+from collections import deque
+
+
+class KeywordMatch:
+    """คำหลักหนึ่งคำที่พบในข้อความ: ตำแหน่ง [start, end) ของข้อความที่แปลงตัวพิมพ์เล็กแล้ว"""
+
+    __slots__ = ('start', 'end', 'keyword', 'kind', 'value', 'weight')
+
+    def __init__(self, start, end, keyword, kind, value, weight):
+        self.start = start
+        self.end = end
+        self.keyword = keyword
+        self.kind = kind
+        self.value = value
+        self.weight = weight
+
+    def to_dict(self):
+        return {'keyword': self.keyword, 'kind': self.kind, 'value': self.value,
+                'start': self.start, 'end': self.end}
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton ของคำหลัก: add() ทุกคำแล้ว build() ครั้งเดียว จากนั้น match() ได้ไม่จำกัด
+
+    คำหลักแต่ละคำมี kind (เช่น 'intent' / 'district') value (สิ่งที่คำนั้นชี้ถึง) และน้ำหนักของคะแนน
+    คำเดียวกันผูกกับหลาย value ได้ ไม่สนตัวพิมพ์เล็ก/ใหญ่
+    """
+
+    def __init__(self):
+        self._entries = []        # (keyword, kind, value, weight)
+        self._goto = [{}]         # state → {อักขระ: state ถัดไป}
+        self._fail = [0]
+        self._output = [()]       # state → index ของ entry ที่จบที่ state นี้ (รวมตาม failure link)
+        self._built = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, keyword, kind, value, weight=1.0):
+        keyword = keyword.lower()
+        if not keyword:
+            raise ValueError('คำหลักต้องไม่ว่าง')
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] += (len(self._entries),)
+        self._entries.append((keyword, kind, value, weight))
+        self._built = False
+
+    def build(self):
+        """คำนวณ failure link แบบ BFS ตามความลึก แล้วรวม output ของ state ที่ link ไปถึง"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+                queue.append(child)
+        self._built = True
+        return self
+
+    def find_all(self, text):
+        """ทุกคำหลักที่ปรากฏ (รวมคำที่ทับกัน) เป็น list ของ KeywordMatch เรียงตามตำแหน่งที่จบ"""
+        if not self._built:
+            self.build()
+        goto, fail, output, entries = self._goto, self._fail, self._output, self._entries
+        found = []
+        state = 0
+        for position, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                keyword, kind, value, weight = entries[index]
+                found.append(KeywordMatch(position + 1 - len(keyword), position + 1,
+                                          keyword, kind, value, weight))
+        return found
+
+    def match(self, text):
+        """คำหลักที่พบหลังตัดคำที่ทับกันออก (คำที่ยาวกว่าชนะ ยาวเท่ากันคำที่อยู่ซ้ายชนะ) เรียงตามตำแหน่ง
+
+        คำที่อยู่ช่วงเดียวกันพอดี (คำเดียวกันที่ผูกกับหลาย value) เก็บไว้ทั้งหมด
+        """
+        found = self.find_all(text)
+        if len(found) < 2:
+            return found
+        taken = set()
+        spans = set()
+        chosen = []
+        for item in sorted(found, key=lambda m: (m.start - m.end, m.start)):
+            span = (item.start, item.end)
+            if span not in spans:
+                if any(position in taken for position in range(item.start, item.end)):
+                    continue
+                spans.add(span)
+                taken.update(range(item.start, item.end))
+            chosen.append(item)
+        chosen.sort(key=lambda m: m.start)
+        return chosen
@@ -0,0 +1,173 @@
+# ผลิตภัณฑ์คล้ายกันจากคุณลักษณะหลายด้าน (แทนการคืนทุกผลิตภัณฑ์ในหมวดเดียวกันเรียงตามชื่อ)
+#
+# เมทริกซ์คุณลักษณะ X (ผลิตภัณฑ์ × ค่าคุณลักษณะ) แบ่งคอลัมน์เป็นกลุ่ม: หมวดหมู่ วัตถุดิบ การรับรอง ช่องทางจำหน่าย
+# กลุ่มลูกค้า ช่วงราคา และอำเภอของผู้ผลิต — แต่ละกลุ่มของแต่ละแถวปรับให้ยาวหนึ่งหน่วยแล้วคูณ √น้ำหนัก
+# (กลุ่มที่มีหลายค่า เช่นวัตถุดิบ จึงไม่กลบกลุ่มอื่น) จากนั้น cosine ของแถวคือ weighted cosine
+#   sim(a, b) = Σ_g w_g·cos_g(a, b) / √(Σ_g w_g[a มี g]) √(Σ_g w_g[b มี g])
+# คำนวณทุกคู่ด้วย X·Xᵀ ทีละช่วงแถว แล้วเก็บ top-k ของทุกผลิตภัณฑ์ไว้ — endpoint จึงแค่อ่าน dict
+# สร้างใหม่ทั้งชุดใน thread แยกหลัง admin เขียนข้อมูล ระหว่างนั้นและเมื่อ dataset version ไม่ตรงจะ query Fuseki ตามเดิม
+import math
+import time
+
+import numpy as np
+
+from config import SIMILARITY_ENABLED, SIMILARITY_TOP_K, SIMILARITY_WEIGHTS, SIMILARITY_RETRY_SECONDS
+from services.background_state import BackgroundState, run_queries
+from utils.tracing import tracer
+
+FEATURE_GROUPS = ('category', 'ingredient', 'certification', 'channel', 'customer', 'price', 'district')
+
+# จำนวนแถวต่อการคูณเมทริกซ์หนึ่งครั้ง (จำกัดหน่วยความจำของ X·Xᵀ เป็น BLOCK_ROWS × จำนวนผลิตภัณฑ์)
+BLOCK_ROWS = 1024
+
+
+def price_band(price):
+    """ช่วงราคาแบบ log₂ (เช่น 64–127 บาท = ช่วงเดียวกัน)"""
+    return int(math.floor(math.log2(max(price, 1.0))))
+
+
+def _price_features(price):
+    """ช่วงราคาของตัวเอง = 1 ช่วงติดกัน = 0.5 (ราคาใกล้กันคล้ายกันบางส่วน)"""
+    band = price_band(price)
+    return {band: 1.0, band - 1: 0.5, band + 1: 0.5}
+
+
+def build_matrix(products, features, weights):
+    """X (float64, แถวตามลำดับ products) จาก features: {uri: {กลุ่ม: {ค่า: น้ำหนักของค่า}}}"""
+    columns = {}
+    for uri in products:
+        for group, values in features[uri].items():
+            if weights.get(group, 0) > 0:
+                for value in values:
+                    columns.setdefault((group, value), len(columns))
+    matrix = np.zeros((len(products), len(columns)))
+    for row, uri in enumerate(products):
+        for group, values in features[uri].items():
+            weight = weights.get(group, 0)
+            if weight <= 0 or not values:
+                continue
+            cols = [columns[(group, value)] for value in values]
+            block = np.array(list(values.values()))
+            matrix[row, cols] = block / np.linalg.norm(block) * math.sqrt(weight)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_neighbours(matrix, k, tie_rank):
+    """index และคะแนนของ k แถวที่ cosine สูงสุดของทุกแถว (ไม่รวมตัวเอง และคะแนน > 0)
+
+    tie_rank: ลำดับใช้ตัดสินคะแนนเท่ากัน (เช่นลำดับชื่อ) — คืน list ของ (indices, scores)
+    """
+    n = matrix.shape[0]
+    result = []
+    for start in range(0, n, BLOCK_ROWS):
+        scores = matrix[start:start + BLOCK_ROWS] @ matrix.T
+        # ปัดเศษก่อนเรียง: คะแนนที่เท่ากันจริงแต่ต่างกันที่หลักสุดท้ายของ float จะได้ตัดสินด้วย tie_rank
+        scores = np.round(scores, 9)
+        for offset, row in enumerate(scores):
+            row[start + offset] = 0.0
+            candidates = np.flatnonzero(row > 0)
+            if len(candidates) > k:
+                # ตัดเหลือเฉพาะที่คะแนนถึงอันดับ k ก่อนเรียงด้วย tie_rank (argpartition เป็น O(n))
+                threshold = row[candidates[np.argpartition(-row[candidates], k - 1)[k - 1]]]
+                candidates = candidates[row[candidates] >= threshold]
+            order = np.lexsort((tie_rank[candidates], -row[candidates]))[:k]
+            chosen = candidates[order]
+            result.append((chosen, row[chosen]))
+    return result
+
+
+class SimilarityState:
+    """top-k ของทุกผลิตภัณฑ์ของ dataset version หนึ่ง (ไม่ถูกแก้ไขหลังสร้าง)"""
+
+    def __init__(self, version, product_rows, feature_rows, weights, top_k):
+        self.version = version
+        self.built_at = time.time()
+
+        info = {}
+        for row in product_rows:
+            info.setdefault(row['product_uri'], row)
+        features = {uri: {group: {} for group in FEATURE_GROUPS} for uri in info}
+        for row in feature_rows:
+            groups = features.get(row['product_uri'])
+            if groups is not None:
+                groups[row['feature']][row['value_uri']] = 1.0
+        for uri, row in info.items():
+            features[uri]['price'] = _price_features(float(row['price']))
+
+        products = list(info)
+        matrix = build_matrix(products, features, weights)
+        names = [info[uri]['name'] for uri in products]
+        tie_rank = np.argsort(np.argsort(np.array(names, dtype=object), kind='stable'), kind='stable')
+        neighbours = top_k_neighbours(matrix, top_k, tie_rank) if products else []
+
+        self.dimensions = matrix.shape[1]
+        self.neighbours = {}
+        for uri, (indices, scores) in zip(products, neighbours):
+            self.neighbours[info[uri]['product']] = [
+                _neighbour_row(info[products[i]], score) for i, score in zip(indices, scores)
+            ]
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'built_at': self.built_at,
+            'products': len(self.neighbours),
+            'dimensions': self.dimensions,
+        }
+
+
+def _neighbour_row(row, score):
+    """แถวรูปแบบเดียวกับ SEMANTIC_SIMILAR_PRODUCTS + คะแนนความคล้าย"""
+    neighbour = {
+        'relatedProduct': row['product'],
+        'relatedProduct_uri': row['product_uri'],
+        'relatedName': row['name'],
+        'relatedPrice': row['price'],
+        'similarity': round(float(score), 4),
+    }
+    if row.get('categoryName') is not None:
+        neighbour['categoryName'] = row['categoryName']
+    if row.get('imageUrl') is not None:
+        neighbour['imageUrl'] = row['imageUrl']
+    return neighbour
+
+
+class ProductSimilarity(BackgroundState):
+    """ถือ SimilarityState ปัจจุบันและสร้างใหม่ใน background (services/background_state.py)"""
+
+    thread_name = 'product-similarity'
+    log_tag = 'SIMILARITY'
+    load_error = 'โหลดคุณลักษณะไม่สำเร็จ'
+    build_error = 'คำนวณความคล้ายไม่สำเร็จ'
+
+    def __init__(self, enabled=SIMILARITY_ENABLED, weights=SIMILARITY_WEIGHTS, top_k=SIMILARITY_TOP_K,
+                 retry_seconds=SIMILARITY_RETRY_SECONDS):
+        super().__init__(enabled, retry_seconds)
+        self.weights = dict(weights)
+        self.top_k = top_k
+
+    def build(self, version):
+        """โหลดคุณลักษณะจาก Fuseki แล้วคำนวณ top-k ของทุกผลิตภัณฑ์เป็น SimilarityState"""
+        results = run_queries('all_products', 'product_features')
+        return SimilarityState(version, results['all_products']['results'],
+                               results['product_features']['results'], self.weights, self.top_k)
+
+    def describe(self, state):
+        return f'{len(state.neighbours)} products × {state.dimensions} features'
+
+    def settings(self):
+        return {'top_k': self.top_k, 'weights': self.weights}
+
+    def similar(self, product_id):
+        """ผลิตภัณฑ์คล้ายกันที่เรียงตามคะแนนแล้ว หรือ None ถ้าต้องถาม Fuseki"""
+        state = self.current()
+        if state is None:
+            return None
+        with tracer.span('similarity', product=product_id):
+            return state.neighbours.get(product_id, [])
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+product_similarity = ProductSimilarity()
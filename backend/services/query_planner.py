@@ -0,0 +1,287 @@
+# วางแผน query เดียวจาก intent หลายข้อของ SemanticSearch (เช่น "ของฝาก ราคาถูก ในพังโคน")
+#
+# intent ที่ประกอบกันได้แปลงเป็น Constraint ตามชนิด: หมวดหมู่ กลุ่มลูกค้า การรับรอง ช่องทางจำหน่าย ราคา อำเภอ
+# Constraint ชนิดเดียวกันรวมแบบ "หรือ" (ขนม + เครื่องดื่ม = หมวดใดหมวดหนึ่ง) ต่างชนิดกันรวมแบบ "และ"
+# แต่ละชนิดเขียนเป็น graph pattern หนึ่งก้อน แล้วเรียงก้อนที่คาดว่าเหลือผลิตภัณฑ์น้อยที่สุดขึ้นก่อน
+# (ทั้ง Fuseki และ embedded engine ประเมิน element ของ group ตามลำดับ ส่งค่า ?product ที่ผูกแล้วไปยังก้อนถัดไป)
+# ผลลัพธ์เป็น SELECT เดียว — ส่งครั้งเดียวแทนหลาย query ที่ client ต้องนำมาหาส่วนร่วมเอง
+# ทุกแผนใช้ template semantic_plan (sparql/queries.py) ชื่อเดียว ต่างกันที่พารามิเตอร์ plan/order
+import threading
+from collections import OrderedDict
+
+from config import QUERY_PLAN_CACHE_SIZE
+from sparql import queries as q
+from sparql.registry import registry
+from sparql.terms import BindError, iri
+
+# ชื่อ template เดียวของทุกแผน (metrics/แคช/slow-query log) — signature ของแผนส่งเป็นพารามิเตอร์ plan
+PLAN_QUERY = 'semantic_plan'
+
+# สัดส่วนผลิตภัณฑ์โดยประมาณที่ค่าหนึ่งค่าของแต่ละชนิดคัดไว้ (ตามรูปร่างของ ontology: 12 อำเภอ ~10 หมวด
+# การรับรองแต่ละแบบได้กับผลิตภัณฑ์ส่วนน้อย ลูกค้า/ช่องทางหนึ่งผลิตภัณฑ์มีได้หลายค่า) — ใช้เรียงก้อน pattern เท่านั้น
+SELECTIVITY = {
+    'district': 0.08,
+    'category': 0.1,
+    'certification': 0.2,
+    'customer': 0.25,
+    'channel': 0.3,
+    'price': 0.5,
+}
+
+# ลำดับชนิดเมื่อค่าประมาณเท่ากัน และลำดับใน signature ของแผน
+KINDS = ('district', 'category', 'certification', 'customer', 'channel', 'price')
+
+_PREDICATES = {
+    'category': 'sce:belongsToCategory',
+    'customer': 'sce:targetsCustomer',
+    'channel': 'sce:soldVia',
+}
+
+
+class Constraint:
+    """เงื่อนไขหนึ่งข้อของแผน (สร้างด้วย values / district / price / pattern)
+
+    key: ชื่อที่ใช้ใน signature ของแผน (เช่นชื่อ intent) — แผนเดียวกันได้ชื่อ template เดียวกัน
+    values: local name ของ resource (category/customer/channel/district)
+    condition: นิพจน์ FILTER บน ?price, alternatives: graph pattern ที่เป็นทางเลือกของกันและกัน
+    """
+
+    __slots__ = ('key', 'kind', 'values', 'condition', 'alternatives', 'order')
+
+    def __init__(self, key, kind, values=(), condition=None, alternatives=(), order=None):
+        if kind not in SELECTIVITY:
+            raise ValueError(f'ไม่รู้จักชนิดของเงื่อนไข: {kind}')
+        self.key = key
+        self.kind = kind
+        self.values = tuple(values)
+        self.condition = condition
+        self.alternatives = tuple(alternatives)
+        self.order = order
+
+
+def values(key, kind, *resource_ids):
+    """ผลิตภัณฑ์ที่มีค่า kind (category/customer/channel) เป็น resource ใด resource หนึ่ง"""
+    if kind not in _PREDICATES:
+        raise ValueError(f'{kind} ไม่ใช่เงื่อนไขแบบค่า')
+    return Constraint(key, kind, values=resource_ids)
+
+
+def district(key, district_id):
+    """ผลิตภัณฑ์ที่ผู้ผลิตตั้งอยู่ในอำเภอ district_id (ผ่านตำบล)"""
+    return Constraint(key, 'district', values=(district_id,))
+
+
+def price(key, operator, bound):
+    """ราคาตามเงื่อนไข เช่น price('cheap', '<=', 50) — เรียงผลตามราคาในทิศที่เงื่อนไขบอก"""
+    if operator not in ('<=', '>='):
+        raise ValueError(f'ไม่รองรับตัวดำเนินการ {operator}')
+    return Constraint(key, 'price', condition=f'?price {operator} {float(bound):g}',
+                      order='?price' if operator == '<=' else 'DESC(?price)')
+
+
+def pattern(key, kind, text):
+    """graph pattern อิสระบน ?product (เช่นการรับรองหลายข้อ) — ตัวแปรอื่นใน text ต้องไม่ซ้ำกับของแผน"""
+    return Constraint(key, kind, alternatives=(text.strip(),))
+
+
+class Fragment:
+    """graph pattern ของ constraint ชนิดเดียวกันที่รวมกันแล้ว พร้อมค่าประมาณสัดส่วนที่เหลือ"""
+
+    __slots__ = ('kind', 'text', 'estimate')
+
+    def __init__(self, kind, text, estimate):
+        self.kind = kind
+        self.text = text
+        self.estimate = estimate
+
+
+def _indent(text, spaces=4):
+    return '\n'.join(' ' * spaces + line if line else line for line in text.splitlines())
+
+
+def _values_fragment(kind, resource_ids):
+    """ค่าเดียว → triple ที่ object คงที่, หลายค่า → VALUES ก่อน triple (ค่าถูกส่งเข้า triple ทีละค่า)"""
+    if kind == 'district':
+        if len(resource_ids) == 1:
+            lines = [f'?subDistrict sce:locatedIn {iri(resource_ids[0])} .']
+        else:
+            lines = [f'VALUES ?district {{ {" ".join(iri(v) for v in resource_ids)} }}',
+                     '?subDistrict sce:locatedIn ?district .']
+        # จากอำเภอ (ค่าคงที่) → ตำบล → วิสาหกิจ → ผลิตภัณฑ์ แต่ละขั้นมีตัวแปรที่ผูกแล้วหนึ่งฝั่งเสมอ
+        return '\n'.join(lines + ['?producer sce:locatedIn ?subDistrict .',
+                                  '?product sce:producedBy ?producer .'])
+    predicate = _PREDICATES[kind]
+    if len(resource_ids) == 1:
+        return f'?product {predicate} {iri(resource_ids[0])} .'
+    return (f'VALUES ?{kind}Value {{ {" ".join(iri(v) for v in resource_ids)} }}\n'
+            f'?product {predicate} ?{kind}Value .')
+
+
+def _union(alternatives):
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '\nUNION\n'.join('{\n' + _indent(text) + '\n}' for text in alternatives)
+
+
+class PlannedQuery:
+    """แผนที่วางแล้ว: signature + graph pattern ที่เรียงก้อนแล้ว + ตัวแปรที่เรียงผล + ก้อนตามลำดับ
+
+    ส่งผ่าน template เดียว semantic_plan ด้วย params() — str() ของแผนคือ signature (แสดงใน slow-query log)
+    """
+
+    __slots__ = ('signature', 'pattern', 'order', 'fragments')
+
+    def __init__(self, signature, pattern, order, fragments):
+        self.signature = signature
+        self.pattern = pattern
+        self.order = order
+        self.fragments = fragments
+
+    def __str__(self):
+        return self.signature
+
+    def params(self):
+        """พารามิเตอร์ของ template semantic_plan"""
+        return {'plan': self, 'order': self.order}
+
+    def explain(self):
+        return [{'kind': fragment.kind, 'estimate': round(fragment.estimate, 4)}
+                for fragment in self.fragments]
+
+
+class PlanPattern:
+    """graph pattern ของ PlannedQuery — รับเฉพาะแผนที่ QueryPlanner สร้าง (ข้อความจากคำขอผูกไม่ได้)"""
+
+    name = 'plan'
+
+    @staticmethod
+    def bind(value):
+        if not isinstance(value, PlannedQuery):
+            raise BindError(f'ต้องเป็นแผนจาก QueryPlanner: {value!r}')
+        return value.pattern
+
+
+class PlanOrder:
+    """ตัวแปรที่เรียงผลของแผน — เฉพาะค่าที่ planner ใช้ (?name หรือทิศของเงื่อนไขราคา)"""
+
+    name = 'plan_order'
+    allowed = ('?name', '?price', 'DESC(?price)')
+
+    @staticmethod
+    def bind(value):
+        if value not in PlanOrder.allowed:
+            raise BindError(f'ไม่รองรับการเรียงตาม {value!r}')
+        return value
+
+
+class QueryPlanner:
+    """แปลงชุด Constraint เป็นแผนของ template semantic_plan (ลงทะเบียนครั้งเดียว ชื่อคงที่)
+
+    metrics และ slow-query log จึงรวมทุกแผนไว้ใต้ชื่อเดียว ไม่ว่าคำค้นจะผสม intent/อำเภอกี่แบบ
+    แผนที่วางแล้วเก็บแบบ LRU ไม่เกิน max_plans รายการ (แผนที่ถูกไล่ออกวางใหม่ได้เสมอ)
+    """
+
+    def __init__(self, registry=registry, max_plans=QUERY_PLAN_CACHE_SIZE):
+        self.registry = registry
+        self.max_plans = max_plans
+        self._plans = OrderedDict()   # signature -> PlannedQuery
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        registry.register(PLAN_QUERY, q.SEMANTIC_PLAN, plan=PlanPattern, order=PlanOrder)
+
+    @staticmethod
+    def signature(constraints):
+        keys = sorted({(KINDS.index(c.kind), c.key) for c in constraints})
+        return '+'.join(key for _, key in keys)
+
+    def plan(self, constraints):
+        """PlannedQuery ของ constraints (ต้องมีอย่างน้อยหนึ่งข้อ) — แผนเดิมคืนจาก LRU"""
+        if not constraints:
+            raise ValueError('ต้องมีเงื่อนไขอย่างน้อยหนึ่งข้อ')
+        signature = self.signature(constraints)
+        with self._lock:
+            planned = self._plans.get(signature)
+            if planned is not None:
+                self._plans.move_to_end(signature)
+                self.hits += 1
+                return planned
+            self.misses += 1
+        fragments, filters, order = self._fragments(constraints)
+        planned = PlannedQuery(signature, self._render(fragments, filters), order, fragments)
+        if self.max_plans <= 0:
+            return planned
+        with self._lock:
+            self._plans[signature] = planned
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+        return planned
+
+    def run(self, planned, run_query=None):
+        """ส่งแผนผ่าน template semantic_plan (run_query เหมือนของ SemanticSearch.search ค่าเริ่มต้น registry.run)"""
+        run_query = run_query or self.registry.run
+        return run_query(PLAN_QUERY, **planned.params())
+
+    def render(self, planned):
+        """ข้อความ SPARQL ของแผน (สำหรับตรวจดู)"""
+        return self.registry.render(PLAN_QUERY, **planned.params())
+
+    def _fragments(self, constraints):
+        """รวม constraint ตามชนิด → (ก้อน pattern เรียงตามค่าประมาณ, นิพจน์ FILTER, ORDER BY)"""
+        by_kind = {}
+        for constraint in constraints:
+            by_kind.setdefault(constraint.kind, []).append(constraint)
+
+        fragments = []
+        filters = []
+        orders = set()
+        for kind in KINDS:
+            group = by_kind.get(kind)
+            if not group:
+                continue
+            if kind == 'price':
+                conditions = sorted({c.condition for c in group})
+                filters.append(conditions[0] if len(conditions) == 1
+                               else '(' + ' || '.join(conditions) + ')')
+                orders.update(c.order for c in group)
+                continue
+            resource_ids = list(dict.fromkeys(v for c in group for v in c.values))
+            alternatives = list(dict.fromkeys(a for c in group for a in c.alternatives))
+            parts = []
+            if resource_ids:
+                parts.append(_values_fragment(kind, resource_ids))
+            parts.extend(alternatives)
+            count = len(resource_ids) + len(alternatives)
+            fragments.append(Fragment(kind, _union(parts), min(1.0, SELECTIVITY[kind] * count)))
+
+        # ราคาเป็น FILTER บน ?price ซึ่งผูกใน pattern หลัก จึงไม่อยู่ในการเรียงก้อน (กรองทันทีหลัง pattern หลัก)
+        fragments.sort(key=lambda fragment: (fragment.estimate, KINDS.index(fragment.kind)))
+        order = orders.pop() if len(orders) == 1 else '?name'
+        return fragments, filters, order
+
+    @staticmethod
+    def _render(fragments, filters):
+        """{plan} ของ template: ก้อนเงื่อนไขตามลำดับ แล้ว pattern หลักของผลิตภัณฑ์และ FILTER ราคา"""
+        body = [fragment.text for fragment in fragments]
+        body.append('?product a sce:FoodProduct ;\n'
+                    '         sce:hasName ?name ;\n'
+                    '         sce:hasPrice ?price .')
+        if filters:
+            body.append(f"FILTER ({' && '.join(filters)})")
+        return '\n'.join(_indent(text) for text in body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._plans),
+                'max_entries': self.max_plans,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+query_planner = QueryPlanner()
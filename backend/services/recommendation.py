@@ -1,16 +1,34 @@
 # บริการแนะนำผลิตภัณฑ์ (Recommendation)
-from sparql.fuseki_client import fuseki_client
-from sparql.queries import SEMANTIC_SIMILAR_PRODUCTS, SEMANTIC_SHARED_INGREDIENTS
+import time
+from sparql.registry import registry
+from services.also_liked import also_liked_model
+from services.ingredient_index import ingredient_index
+from services.product_similarity import product_similarity
+from utils.tracing import tracer
 
 
 class RecommendationService:
     """คลาสสำหรับแนะนำผลิตภัณฑ์"""
 
+    @tracer.traced('recommendation')
     def get_similar_products(self, product_id):
-        """แนะนำผลิตภัณฑ์ที่อยู่ในหมวดหมู่เดียวกัน"""
-        result = fuseki_client.query(
-            SEMANTIC_SIMILAR_PRODUCTS.format(product_id=product_id)
-        )
+        """แนะนำผลิตภัณฑ์คล้ายกัน เรียงตามคะแนน weighted cosine ที่คำนวณไว้ล่วงหน้า (services/product_similarity.py)
+
+        ถ้ายังไม่พร้อม คืนผลิตภัณฑ์ในหมวดหมู่เดียวกันเรียงตามชื่อจาก SPARQL ตามเดิม
+        """
+        start_time = time.time()
+        recommendations = product_similarity.similar(product_id)
+        if recommendations is not None:
+            return {
+                'message': f"ผลิตภัณฑ์ที่คล้ายกับ {product_id}: {len(recommendations)} รายการ",
+                'product_id': product_id,
+                'recommendations': recommendations,
+                'count': len(recommendations),
+                'response_time_ms': round((time.time() - start_time) * 1000, 2),
+                'cached': True
+            }
+
+        result = registry.run('similar_products', product_id=product_id)
 
         if not result['success']:
             return {'error': result['error']}
@@ -20,12 +38,65 @@ class RecommendationService:
             'product_id': product_id,
             'recommendations': result['results'],
             'count': result['count'],
-            'response_time_ms': result['response_time_ms']
+            'response_time_ms': result['response_time_ms'],
+            'cached': result['cached']
+        }
+
+    @tracer.traced('recommendation')
+    def get_similar_products_batch(self, product_ids):
+        """get_similar_products ของหลายผลิตภัณฑ์ → {รหัส: รายการแนะนำ}
+
+        ถ้า product_similarity ยังไม่พร้อม ใช้ SPARQL query เดียว (VALUES ?product) แล้วแยกแถวตาม ?product
+        """
+        start_time = time.time()
+        batch = {product_id: product_similarity.similar(product_id) for product_id in product_ids}
+        if all(recommendations is not None for recommendations in batch.values()):
+            response_time, cached = round((time.time() - start_time) * 1000, 2), True
+        else:
+            result = registry.run('similar_products_batch', product_ids=product_ids)
+            if not result['success']:
+                return {'error': result['error']}
+            batch = {product_id: [] for product_id in product_ids}
+            for row in result['results']:
+                row = dict(row)
+                product_id = row.pop('product')
+                row.pop('product_uri', None)
+                if product_id in batch:
+                    batch[product_id].append(row)
+            response_time, cached = result['response_time_ms'], result['cached']
+
+        total = sum(len(recommendations) for recommendations in batch.values())
+        return {
+            'message': f"ผลิตภัณฑ์ที่คล้ายกับ {len(product_ids)} รหัส: {total} รายการ",
+            'recommendations': batch,
+            'count': total,
+            'response_time_ms': response_time,
+            'cached': cached
+        }
+
+    @tracer.traced('recommendation')
+    def get_also_liked_products(self, product_id):
+        """ผลิตภัณฑ์ที่ผู้รีวิวผลิตภัณฑ์นี้ชอบด้วย จากโมเดล matrix factorisation (services/also_liked.py)
+
+        คืน None ถ้ายังไม่ได้ฝึกโมเดล (train_also_liked.py)
+        """
+        start_time = time.time()
+        recommendations = also_liked_model.also_liked(product_id)
+        if recommendations is None:
+            return None
+        return {
+            'message': f"ผู้ที่ชอบ {product_id} ยังชอบ: {len(recommendations)} รายการ",
+            'product_id': product_id,
+            'recommendations': recommendations,
+            'count': len(recommendations),
+            'response_time_ms': round((time.time() - start_time) * 1000, 2),
+            'cached': True
         }
 
-    def get_shared_ingredient_products(self):
-        """ดึงผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน"""
-        result = fuseki_client.query(SEMANTIC_SHARED_INGREDIENTS)
+    @tracer.traced('recommendation')
+    def get_shared_ingredient_products(self, min_shared=2, limit=20):
+        """ดึงคู่ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกันอย่างน้อย min_shared ชนิด (มากสุด limit คู่, 0 = ทั้งหมด)"""
+        result = ingredient_index.run(min_shared=min_shared, limit=limit)
 
         if not result['success']:
             return {'error': result['error']}
@@ -34,7 +105,8 @@ class RecommendationService:
             'message': f"คู่ผลิตภัณฑ์ที่มีวัตถุดิบร่วมกัน: {result['count']} คู่",
             'pairs': result['results'],
             'count': result['count'],
-            'response_time_ms': result['response_time_ms']
+            'response_time_ms': result['response_time_ms'],
+            'cached': result['cached']
         }
 
 
@@ -0,0 +1,259 @@
+# Full-text search index ของผลิตภัณฑ์ (ชื่อ คำอธิบาย วัตถุดิบ ผู้ผลิต) สำหรับ /api/search และ fallback ของ semantic search
+#
+# SEARCH_PRODUCTS_BY_TEXT กรองด้วย CONTAINS(LCASE(...)) ทุกผลิตภัณฑ์ทุกคำขอ (สแกนทั้งหมดใน Fuseki)
+# ที่นี่ตัดข้อความเป็น character n-gram (ภาษาไทยไม่เว้นวรรคระหว่างคำ จึงตัดคำด้วยช่องว่างไม่ได้)
+# เก็บ postings: n-gram → {ผลิตภัณฑ์: tf ถ่วงน้ำหนักตาม field} แล้วจัดอันดับด้วย BM25
+# ผู้สมัครจาก intersection ของ postings ทุก n-gram ของคำค้น แล้วตรวจว่าทุกช่วงของคำค้นอยู่ในข้อความจริง
+# (แบบเดียวกับ CONTAINS เดิม แต่ครอบคลุมวัตถุดิบ/ผู้ผลิตด้วย) จากนั้น route ดึงแถวผลลัพธ์เฉพาะรหัสที่ตรง
+# admin เขียนข้อมูล: ทำ index ใหม่เฉพาะผลิตภัณฑ์ที่ข้อความขึ้นกับ resource ที่ถูกแก้ (ตัวเอง / ผู้ผลิต / วัตถุดิบ)
+import math
+import re
+import time
+import unicodedata
+
+from config import SEARCH_INDEX_ENABLED
+from services.background_state import LoadError, run_queries
+from services.catalog_snapshot import catalog_snapshot
+from services.versioned_index import VersionedIndex
+from sparql.registry import registry
+from sparql.terms import BindError
+from utils.helpers import build_uri
+from utils.tracing import tracer
+
+# น้ำหนักของแต่ละ field ต่อ tf และความยาวเอกสาร (BM25F แบบย่อ)
+FIELD_WEIGHTS = {'name': 3.0, 'ingredient': 1.5, 'enterprise': 1.0, 'description': 1.0}
+NGRAM = 2
+K1 = 1.2
+B = 0.75
+
+# ช่วงอักษรไทยทั้งบล็อก (รวมสระบน/ล่างและวรรณยุกต์ ซึ่ง \w ไม่นับเป็นตัวอักษร) หรือคำอักษร/ตัวเลขอื่น
+_RUNS = re.compile(r'[\u0e00-\u0e7f]+|[^\W_]+')
+_THAI_DIGITS = str.maketrans('๐๑๒๓๔๕๖๗๘๙', '0123456789')
+
+
+def _local_name(uri):
+    return uri.split('#')[-1] if '#' in uri else uri
+
+
+def normalize(text):
+    """รูปแบบมาตรฐานก่อนตัด n-gram: NFC, นิคหิต+สระอา → สระอำ, เลขไทย → อารบิก, ตัดอักขระความกว้างศูนย์, casefold"""
+    text = unicodedata.normalize('NFC', text).replace('\u0e4d\u0e32', '\u0e33')
+    text = text.replace('\u200b', '').replace('\u200c', '').replace('\u200d', '')
+    return text.translate(_THAI_DIGITS).casefold()
+
+
+def _ngrams(runs):
+    grams = []
+    for run in runs:
+        if len(run) < NGRAM:
+            grams.append(run)
+        else:
+            grams.extend(run[i:i + NGRAM] for i in range(len(run) - NGRAM + 1))
+    return grams
+
+
+def tokenize(text):
+    """n-gram ของทุกช่วงอักษร (ช่วงที่สั้นกว่า NGRAM ใช้ทั้งช่วง) — มีซ้ำได้ (นับเป็น tf)"""
+    return _ngrams(_RUNS.findall(normalize(text)))
+
+
+class _Document:
+    __slots__ = ('tf', 'length', 'sources', 'text')
+
+    def __init__(self, fields):
+        """fields: list ของ (field, source_uri, ข้อความ)"""
+        self.tf = {}
+        self.length = 0.0
+        self.sources = set()
+        runs = []
+        for field, source, text in fields:
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            field_runs = _RUNS.findall(normalize(text))
+            for gram in _ngrams(field_runs):
+                self.tf[gram] = self.tf.get(gram, 0.0) + weight
+                self.length += weight
+            runs.extend(field_runs)
+            self.sources.add(source)
+        # ช่วงอักษรทั้งหมดคั่นด้วย \n สำหรับตรวจว่าคำค้นอยู่ในข้อความจริง (n-gram ครบอาจมาจากคนละตำแหน่ง)
+        self.text = '\n'.join(runs)
+
+
+class SearchIndex(VersionedIndex):
+    """postings ของ n-gram → ผลิตภัณฑ์ (services/versioned_index.py)"""
+
+    log_tag = 'SEARCH'
+    load_error = 'โหลด search index ไม่สำเร็จ'
+
+    def __init__(self, enabled=SEARCH_INDEX_ENABLED):
+        super().__init__(enabled)
+        self.documents = {}
+        self.postings = {}
+        self.related = {}
+        self.total_length = 0.0
+        self.searches = 0
+
+    # === ปรับโครงสร้าง (เรียกภายใต้ self._lock) ===
+
+    def _set_document(self, uri, fields):
+        """แทนเอกสารของผลิตภัณฑ์ uri (fields None หรือว่าง = ลบออกจาก index)"""
+        old = self.documents.pop(uri, None)
+        if old is not None:
+            for gram in old.tf:
+                posting = self.postings[gram]
+                del posting[uri]
+                if not posting:
+                    del self.postings[gram]
+            for source in old.sources:
+                products = self.related.get(source)
+                if products is not None:
+                    products.discard(uri)
+                    if not products:
+                        del self.related[source]
+            self.total_length -= old.length
+        if not fields:
+            return
+        document = _Document(fields)
+        self.documents[uri] = document
+        for gram, tf in document.tf.items():
+            self.postings.setdefault(gram, {})[uri] = tf
+        for source in document.sources:
+            if source != uri:
+                self.related.setdefault(source, set()).add(uri)
+        self.total_length += document.length
+
+    # === โหลด / ปรับตามการเขียน ===
+
+    def load(self):
+        """ข้อความของทุกผลิตภัณฑ์จาก Fuseki → {product_uri: fields}"""
+        return _group_fields(run_queries('search_documents')['search_documents']['results'])
+
+    def install(self, data):
+        self.documents, self.postings, self.related, self.total_length = {}, {}, {}, 0.0
+        for uri, fields in data.items():
+            self._set_document(uri, fields)
+
+    def load_change(self, resource_id):
+        """ข้อความใหม่ของผลิตภัณฑ์ที่ข้อความขึ้นกับ resource_id → (ผลิตภัณฑ์ที่กระทบ, {product_uri: fields})
+
+        ผลิตภัณฑ์ที่กระทบ = resource_id เอง + ผลิตภัณฑ์ที่เคยอ้างถึงใน index + ผลิตภัณฑ์ที่อ้างถึงหลังเขียน
+        """
+        uri = build_uri(resource_id)
+        related = registry.run('search_related_products', use_cache=False, resource_id=resource_id)
+        if not related['success']:
+            raise LoadError('search_related_products')
+        with self._lock:
+            affected = {uri} | self.related.get(uri, set())
+        affected |= {row['product_uri'] for row in related['results']}
+        try:
+            result = registry.run('search_documents_batch', use_cache=False,
+                                  product_ids=sorted(_local_name(product) for product in affected))
+        except BindError:
+            # URI นอก namespace sce: — ให้โหลดใหม่ทั้งชุด
+            raise LoadError('search_documents_batch')
+        if not result['success']:
+            raise LoadError('search_documents_batch')
+        return affected, _group_fields(result['results'])
+
+    def apply_change(self, change):
+        affected, fields = change
+        for product in affected:
+            self._set_document(product, fields.get(product))
+
+    def sizes(self):
+        return {'products': len(self.documents), 'ngrams': len(self.postings)}
+
+    # === ค้นหา ===
+
+    def _term_postings(self, gram):
+        """postings ของ n-gram — คำค้นที่สั้นกว่า NGRAM (เช่นพิมพ์ตัวแรก) ใช้ทุก n-gram ที่มีคำนั้นอยู่
+        (ไม่ใช่แค่ขึ้นต้น: อักษรท้ายช่วง เช่น ง ใน ...เย็น มีเฉพาะใน n-gram ที่ลงท้ายด้วยอักษรนั้น)"""
+        if len(gram) >= NGRAM:
+            return [self.postings.get(gram, {})]
+        return [posting for key, posting in self.postings.items() if gram in key]
+
+    def search(self, text):
+        """[(คะแนน BM25, uri)] ของผลิตภัณฑ์ที่มีทุกช่วงอักษรของ text เรียงคะแนนมากไปน้อย (เท่ากันเรียงตาม uri)"""
+        runs = _RUNS.findall(normalize(text))
+        query = {}
+        for gram in _ngrams(runs):
+            query[gram] = query.get(gram, 0) + 1
+        if not query:
+            return []
+        with self._lock:
+            count = len(self.documents)
+            average = self.total_length / count if count else 0.0
+            terms = [(qtf, self._term_postings(gram)) for gram, qtf in query.items()]
+            candidates = None
+            for _, postings in sorted(terms, key=lambda term: sum(map(len, term[1]))):
+                matched = set().union(*postings)
+                candidates = matched if candidates is None else candidates & matched
+                if not candidates:
+                    return []
+            candidates = [uri for uri in candidates
+                          if all(run in self.documents[uri].text for run in runs)]
+            scores = dict.fromkeys(candidates, 0.0)
+            for qtf, postings in terms:
+                for posting in postings:
+                    idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for uri in candidates:
+                        tf = posting.get(uri)
+                        if tf:
+                            norm = K1 * (1 - B + B * self.documents[uri].length / average)
+                            scores[uri] += qtf * idf * tf * (K1 + 1) / (tf + norm)
+        ranked = [(round(score, 4), uri) for uri, score in scores.items()]
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+    def select(self, name, **params):
+        """แถว {product, product_uri, score} ที่เรียงตามคะแนนของ search_products_by_text
+
+        คืน None ถ้าไม่ใช่ query ที่ index ครอบคลุม หรือ index ใช้ไม่ได้ (ให้ query Fuseki ตามเดิม)
+        """
+        if name != 'search_products_by_text' or not self.ensure_current():
+            return None
+        with tracer.span('search_index', query=name):
+            ranked = self.search(str(params['search_term']))
+        self.searches += 1
+        return [{'product': _local_name(uri), 'product_uri': uri, 'score': score} for score, uri in ranked]
+
+    def hydrate(self, ranked_rows):
+        """แถวผลลัพธ์แบบ SEARCH_PRODUCTS_BY_TEXT (+ score) ของแถวจาก select() ตามลำดับเดิม
+
+        อ่านจาก catalog snapshot ถ้าพร้อม ไม่เช่นนั้น query Fuseki เฉพาะรหัสที่ตรง (VALUES ?product) ครั้งเดียว
+        คืนรูปแบบเดียวกับ registry.run()
+        """
+        start_time = time.time()
+        if not ranked_rows:
+            return {'success': True, 'results': [], 'count': 0, 'response_time_ms': 0.0, 'cached': True}
+        product_ids = [row['product'] for row in ranked_rows]
+        rows = catalog_snapshot.select('search_result_rows', product_ids=product_ids)
+        if rows is not None:
+            result = {'success': True, 'results': rows, 'cached': True,
+                      'response_time_ms': round((time.time() - start_time) * 1000, 2)}
+        else:
+            result = registry.run('search_result_rows', product_ids=product_ids)
+            if not result['success']:
+                return result
+        by_uri = {}
+        for row in result['results']:
+            # OPTIONAL หลายค่า (เช่นหลายหมวดหมู่) → ใช้แถวแรก
+            by_uri.setdefault(row['product_uri'], row)
+        results = [{**by_uri[row['product_uri']], 'score': row['score']}
+                   for row in ranked_rows if row['product_uri'] in by_uri]
+        return {**result, 'results': results, 'count': len(results)}
+
+    def stats(self):
+        return {**super().stats(), 'searches': self.searches}
+
+
+def _group_fields(rows):
+    """แถวของ SEARCH_DOCUMENTS → {product_uri: [(field, source_uri, ข้อความ)]}"""
+    fields = {}
+    for row in rows:
+        fields.setdefault(row['product_uri'], []).append(
+            (row['field'], row.get('source_uri', row['product_uri']), row['text']))
+    return fields
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+search_index = SearchIndex()
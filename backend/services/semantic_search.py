@@ -1,11 +1,13 @@
 # บริการค้นหาเชิงความหมาย (Semantic Search)
 # แปลง natural language ภาษาไทย → SPARQL query
-from sparql.fuseki_client import fuseki_client
+from sparql.registry import registry
+from services import query_planner as planner
+from services.keyword_matcher import KeywordMatcher
+from utils.tracing import tracer
 from sparql.queries import (
     SEMANTIC_HEALTH_PRODUCTS, SEMANTIC_GIFT_PRODUCTS,
     SEMANTIC_ORGANIC_PRODUCTS, SEMANTIC_PREMIUM_PRODUCTS,
-    SEMANTIC_ONLINE_PRODUCTS, SEMANTIC_SIMILAR_PRODUCTS,
-    SEMANTIC_PRODUCTS_BY_DISTRICT, SEARCH_PRODUCTS_BY_TEXT
+    SEMANTIC_ONLINE_PRODUCTS, SEMANTIC_ORGANIC_PATTERN, SEMANTIC_PREMIUM_PATTERN
 )
 
 
@@ -14,23 +16,29 @@ class SemanticSearch:
 
     def __init__(self):
         # กำหนดรูปแบบคำค้นที่รองรับ พร้อม SPARQL query
+        # keywords: คำ (น้ำหนัก 1) หรือ (คำ, น้ำหนัก) — คำกว้างๆ ที่ปรากฏในบริบทอื่นบ่อยให้น้ำหนักน้อยลง
+        # constraint: เงื่อนไขของ intent สำหรับ query planner เมื่อคำค้นมีหลาย intent (ดู services/query_planner.py)
         self.patterns = [
             {
                 'keywords': ['สุขภาพ', 'เพื่อสุขภาพ', 'ดีต่อสุขภาพ', 'healthy'],
                 'intent': 'health_products',
                 'description': 'ผลิตภัณฑ์สำหรับผู้รักสุขภาพ',
+                'constraint': planner.values('health_products', 'customer', 'HealthConscious'),
                 'query': SEMANTIC_HEALTH_PRODUCTS
             },
             {
                 'keywords': ['ของฝาก', 'ฝากคน', 'ซื้อฝาก', 'souvenir', 'gift'],
                 'intent': 'gift_products',
                 'description': 'ผลิตภัณฑ์เหมาะเป็นของฝาก',
+                'constraint': planner.values('gift_products', 'customer', 'GiftBuyer', 'Tourist'),
                 'query': SEMANTIC_GIFT_PRODUCTS
             },
             {
                 'keywords': ['อินทรีย์', 'ออร์แกนิก', 'organic', 'ปลอดสาร', 'ไม่ใช้สารเคมี'],
                 'intent': 'organic_products',
                 'description': 'ผลิตภัณฑ์อินทรีย์/ออร์แกนิก',
+                'constraint': planner.pattern('organic_products', 'certification',
+                                              SEMANTIC_ORGANIC_PATTERN),
                 'query': SEMANTIC_ORGANIC_PRODUCTS
             },
             {
@@ -38,19 +46,24 @@ class SemanticSearch:
                              'ดีที่สุด', 'ระดับสูง', 'อย.'],
                 'intent': 'premium_products',
                 'description': 'ผลิตภัณฑ์มาตรฐานสูง (อย. + OTOP 4-5 ดาว)',
+                'constraint': planner.pattern('premium_products', 'certification',
+                                              SEMANTIC_PREMIUM_PATTERN),
                 'query': SEMANTIC_PREMIUM_PRODUCTS
             },
             {
-                'keywords': ['ออนไลน์', 'สั่งออนไลน์', 'online', 'facebook', 'line',
-                             'shopee', 'ซื้อผ่านเน็ต', 'สั่งซื้อ'],
+                'keywords': ['ออนไลน์', 'สั่งออนไลน์', 'online', 'facebook', ('line', 0.5),
+                             'shopee', 'ซื้อผ่านเน็ต', ('สั่งซื้อ', 0.5)],
                 'intent': 'online_products',
                 'description': 'ผลิตภัณฑ์ที่ขายออนไลน์',
+                'constraint': planner.values('online_products', 'channel',
+                                             'OnlineFacebook', 'OnlineLINE', 'OnlineShopee'),
                 'query': SEMANTIC_ONLINE_PRODUCTS
             },
             {
-                'keywords': ['ราคาถูก', 'ถูก', 'ประหยัด', 'cheap', 'ราคาย่อมเยา'],
+                'keywords': ['ราคาถูก', ('ถูก', 0.5), 'ประหยัด', 'cheap', 'ราคาย่อมเยา'],
                 'intent': 'cheap_products',
                 'description': 'ผลิตภัณฑ์ราคาไม่เกิน 50 บาท',
+                'constraint': planner.price('cheap_products', '<=', 50),
                 'query': """
 SELECT ?product ?name ?price ?categoryName ?enterpriseName
 WHERE {
@@ -74,6 +87,7 @@ ORDER BY ?price
                 'keywords': ['แพง', 'ราคาสูง', 'พรีเมียม', 'หรูหรา'],
                 'intent': 'expensive_products',
                 'description': 'ผลิตภัณฑ์ราคา 100 บาทขึ้นไป',
+                'constraint': planner.price('expensive_products', '>=', 100),
                 'query': """
 SELECT ?product ?name ?price ?categoryName ?enterpriseName
 WHERE {
@@ -97,6 +111,7 @@ ORDER BY DESC(?price)
                 'keywords': ['ขนม', 'ของว่าง', 'snack', 'ของกินเล่น', 'กินเล่น'],
                 'intent': 'snack_products',
                 'description': 'ผลิตภัณฑ์ประเภทขนม/ของว่าง',
+                'constraint': planner.values('snack_products', 'category', 'Snack'),
                 'query': """
 SELECT ?product ?name ?price ?enterpriseName
 WHERE {
@@ -113,9 +128,11 @@ ORDER BY ?price
 """
             },
             {
-                'keywords': ['เครื่องดื่ม', 'น้ำ', 'ดื่ม', 'drink', 'beverage'],
+                'keywords': ['เครื่องดื่ม', ('น้ำ', 0.5), ('ดื่ม', 0.5), 'drink', 'beverage'],
                 'intent': 'beverage_products',
                 'description': 'ผลิตภัณฑ์ประเภทเครื่องดื่ม',
+                'constraint': planner.values('beverage_products', 'category',
+                                             'Beverage', 'AlcoholicBeverage'),
                 'query': """
 SELECT ?product ?name ?price ?enterpriseName ?description
 WHERE {
@@ -140,6 +157,7 @@ ORDER BY ?price
                 'keywords': ['ข้าว', 'rice', 'ข้าวกล้อง', 'ข้าวอินทรีย์'],
                 'intent': 'rice_products',
                 'description': 'ผลิตภัณฑ์จากข้าว',
+                'constraint': planner.values('rice_products', 'category', 'RiceProduct'),
                 'query': """
 SELECT ?product ?name ?price ?enterpriseName ?description
 WHERE {
@@ -160,6 +178,7 @@ ORDER BY ?price
                 'keywords': ['น้ำพริก', 'เครื่องปรุง', 'ปรุงรส', 'ปลาร้า', 'seasoning'],
                 'intent': 'seasoning_products',
                 'description': 'ผลิตภัณฑ์ประเภทเครื่องปรุงรส/น้ำพริก',
+                'constraint': planner.values('seasoning_products', 'category', 'Seasoning'),
                 'query': """
 SELECT ?product ?name ?price ?enterpriseName ?description
 WHERE {
@@ -180,6 +199,7 @@ ORDER BY ?price
                 'keywords': ['หมัก', 'ดอง', 'fermented', 'ปลาส้ม', 'ไข่เค็ม'],
                 'intent': 'fermented_products',
                 'description': 'ผลิตภัณฑ์อาหารหมักดอง',
+                'constraint': planner.values('fermented_products', 'category', 'FermentedFood'),
                 'query': """
 SELECT ?product ?name ?price ?enterpriseName ?description
 WHERE {
@@ -197,9 +217,10 @@ ORDER BY ?price
 """
             },
             {
-                'keywords': ['แมลง', 'จิ้งหรีด', 'insect', 'โปรตีน'],
+                'keywords': ['แมลง', 'จิ้งหรีด', 'insect', ('โปรตีน', 0.5)],
                 'intent': 'insect_products',
                 'description': 'ผลิตภัณฑ์อาหารจากแมลง',
+                'constraint': planner.values('insect_products', 'category', 'InsectFood'),
                 'query': """
 SELECT ?product ?name ?price ?enterpriseName ?description
 WHERE {
@@ -217,7 +238,7 @@ ORDER BY ?price
 """
             },
             {
-                'keywords': ['รีวิว', 'คะแนน', 'ยอดนิยม', 'แนะนำ', 'review', 'popular'],
+                'keywords': ['รีวิว', 'คะแนน', 'ยอดนิยม', ('แนะนำ', 0.5), 'review', 'popular'],
                 'intent': 'reviewed_products',
                 'description': 'ผลิตภัณฑ์ที่มีรีวิวและคะแนนสูง',
                 'query': """
@@ -236,6 +257,11 @@ ORDER BY DESC(?avgRating)
             },
         ]
 
+        # ลงทะเบียน query ของแต่ละ intent ในชื่อ semantic_<intent>
+        for pattern in self.patterns:
+            pattern['query_name'] = f"semantic_{pattern['intent']}"
+            registry.register(pattern['query_name'], pattern['query'])
+
         # mapping อำเภอ
         self.district_map = {
             'เมือง': 'MueangSakonNakhon',
@@ -253,40 +279,112 @@ ORDER BY DESC(?avgRating)
             'บ้านโป่ง': 'BanPong',
         }
 
-    def search(self, query_text):
-        """ค้นหาเชิงความหมาย"""
-        query_lower = query_text.lower().strip()
-
-        # ตรวจสอบว่ามีชื่ออำเภอในคำค้นหรือไม่
+        # automaton เดียวของคำหลักทุก intent (value = ชื่อ intent) และชื่ออำเภอ (value = รหัสอำเภอ)
+        self.matcher = KeywordMatcher()
+        self.intent_order = {pattern['intent']: index for index, pattern in enumerate(self.patterns)}
+        for pattern in self.patterns:
+            for keyword in pattern['keywords']:
+                keyword, weight = keyword if isinstance(keyword, tuple) else (keyword, 1.0)
+                self.matcher.add(keyword, 'intent', pattern['intent'], weight)
         for district_name, district_id in self.district_map.items():
-            if district_name in query_text:
-                result = fuseki_client.query(
-                    SEMANTIC_PRODUCTS_BY_DISTRICT.format(district_id=district_id)
-                )
-                if result['success']:
-                    return {
-                        'message': f"ผลิตภัณฑ์ในพื้นที่ {district_name}: {result['count']} รายการ",
-                        'query': query_text,
-                        'search_type': 'semantic',
-                        'intent': 'district_search',
-                        'intent_description': f'ค้นหาผลิตภัณฑ์ในอำเภอ{district_name}',
-                        'count': result['count'],
-                        'products': result['results'],
-                        'response_time_ms': result['response_time_ms']
-                    }
+            self.matcher.add(district_name, 'district', district_id)
+        self.matcher.build()
 
-        # ตรวจสอบ pattern ที่ตรงกับคำค้น
-        best_match = None
-        best_score = 0
+    def detect(self, query_text):
+        """คำหลักของ intent และชื่ออำเภอที่พบในคำค้น พร้อมตำแหน่ง (อ่านคำค้นรอบเดียว ดู services/keyword_matcher.py)"""
+        return self.matcher.match(query_text)
 
-        for pattern in self.patterns:
-            score = sum(1 for kw in pattern['keywords'] if kw in query_lower)
-            if score > best_score:
-                best_score = score
-                best_match = pattern
+    def rank_intents(self, matches):
+        """[(คะแนน, pattern)] เรียงจากคะแนนมากไปน้อย — คะแนน = ผลรวมน้ำหนักของคำที่พบ (เท่ากัน: ลำดับใน self.patterns)"""
+        scores = {}
+        for match in matches:
+            if match.kind == 'intent':
+                scores[match.value] = scores.get(match.value, 0) + match.weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.intent_order[item[0]]))
+        return [(score, self.patterns[self.intent_order[intent]]) for intent, score in ranked]
+
+    def constraints(self, matches):
+        """[(Constraint, คำอธิบาย)] ของ intent ที่ประกอบกันได้และอำเภอที่พบ (ตัดรายการซ้ำ ตามลำดับที่ปรากฏ)"""
+        found = {}
+        for match in matches:
+            if match.kind == 'district':
+                key = f'district={match.value}'
+                if key not in found:
+                    found[key] = (planner.district(key, match.value), f'ผลิตภัณฑ์ในอำเภอ{match.keyword}')
+                continue
+            pattern = self.patterns[self.intent_order[match.value]]
+            if 'constraint' in pattern and match.value not in found:
+                found[match.value] = (pattern['constraint'], pattern['description'])
+        return list(found.values())
+
+    @staticmethod
+    def describe_plan(constraints):
+        """คำอธิบายของแผน: ชนิดเดียวกัน "หรือ" ต่างชนิด "และ" (ตามการรวมของ query planner)"""
+        groups = {}
+        for constraint, description in constraints:
+            groups.setdefault(constraint.kind, []).append(description)
+        return ' และ '.join(' หรือ '.join(descriptions) for descriptions in groups.values())
+
+    @tracer.traced('semantic_search')
+    def search(self, query_text, run_query=None):
+        """ค้นหาเชิงความหมาย
+
+        run_query: ฟังก์ชัน (ชื่อ template, **พารามิเตอร์) ที่ใช้ส่ง query (ค่าเริ่มต้น registry.run)
+        route ส่ง routes.listing.query_list มาเพื่อให้รองรับ ?limit/?cursor/?format
+        """
+        run_query = run_query or registry.run
+        matches = self.detect(query_text.strip())
+        matched = [match.to_dict() for match in matches]
+
+        # หลาย intent/อำเภอ → รวมเป็น query เดียวด้วย query planner (ส่งครั้งเดียว ไม่ต้องหาส่วนร่วมเอง)
+        constraints = self.constraints(matches)
+        if len(constraints) >= 2:
+            planned = planner.query_planner.plan([constraint for constraint, _ in constraints])
+            result = planner.query_planner.run(planned, run_query)
+            if result['success']:
+                description = self.describe_plan(constraints)
+                return {
+                    'message': f"{description}: {result['count']} รายการ",
+                    'query': query_text,
+                    'search_type': 'semantic',
+                    'intent': 'multi_intent',
+                    'intent_description': description,
+                    'intents': [constraint.key for constraint, _ in constraints],
+                    'plan': planned.explain(),
+                    'matches': matched,
+                    'count': result['count'],
+                    'next_cursor': result.get('next_cursor'),
+                    'products': result['results'],
+                    'response_time_ms': result['response_time_ms'],
+                    'cached': result['cached']
+                }
+
+        # ตรวจสอบว่ามีชื่ออำเภอในคำค้นหรือไม่ (ตามลำดับที่ปรากฏ)
+        for match in matches:
+            if match.kind != 'district':
+                continue
+            district_name = match.keyword
+            result = run_query('products_by_district', district_id=match.value)
+            if result['success']:
+                return {
+                    'message': f"ผลิตภัณฑ์ในพื้นที่ {district_name}: {result['count']} รายการ",
+                    'query': query_text,
+                    'search_type': 'semantic',
+                    'intent': 'district_search',
+                    'intent_description': f'ค้นหาผลิตภัณฑ์ในอำเภอ{district_name}',
+                    'matches': matched,
+                    'count': result['count'],
+                    'next_cursor': result.get('next_cursor'),
+                    'products': result['results'],
+                    'response_time_ms': result['response_time_ms'],
+                    'cached': result['cached']
+                }
 
-        if best_match and best_score > 0:
-            result = fuseki_client.query(best_match['query'])
+        # pattern ที่คะแนนสูงสุด
+        ranked = self.rank_intents(matches)
+        if ranked:
+            best_match = ranked[0][1]
+            result = run_query(best_match['query_name'])
             if result['success']:
                 return {
                     'message': f"{best_match['description']}: {result['count']} รายการ",
@@ -294,15 +392,16 @@ ORDER BY DESC(?avgRating)
                     'search_type': 'semantic',
                     'intent': best_match['intent'],
                     'intent_description': best_match['description'],
+                    'matches': matched,
                     'count': result['count'],
+                    'next_cursor': result.get('next_cursor'),
                     'products': result['results'],
-                    'response_time_ms': result['response_time_ms']
+                    'response_time_ms': result['response_time_ms'],
+                    'cached': result['cached']
                 }
 
-        # ถ้าไม่ตรง pattern ใดๆ → ใช้ full-text search
-        result = fuseki_client.query(
-            SEARCH_PRODUCTS_BY_TEXT.format(search_term=query_text)
-        )
+        # ถ้าไม่ตรง pattern ใดๆ → ใช้ full-text search (query_list ค้นจาก search index ก่อน ดู services/search_index.py)
+        result = run_query('search_products_by_text', search_term=query_text)
 
         if result['success']:
             return {
@@ -312,8 +411,10 @@ ORDER BY DESC(?avgRating)
                 'intent': 'text_search',
                 'intent_description': f'ค้นหาข้อความ: {query_text}',
                 'count': result['count'],
+                'next_cursor': result.get('next_cursor'),
                 'products': result['results'],
-                'response_time_ms': result['response_time_ms']
+                'response_time_ms': result['response_time_ms'],
+                'cached': result['cached']
             }
 
         return {
@@ -321,6 +422,7 @@ ORDER BY DESC(?avgRating)
             'query': query_text,
             'search_type': 'semantic',
             'count': 0,
+            'next_cursor': None,
             'products': [],
             'response_time_ms': 0
         }
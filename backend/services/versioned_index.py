@@ -0,0 +1,119 @@
+# index ในหน่วยความจำที่ตรงกับ dataset version หนึ่ง และปรับทีละส่วนตามการเขียนของ admin
+#
+# ใช้ร่วมกันโดย IngredientIndex และ SearchIndex: subclass กำหนดแค่การโหลด/ติดตั้งข้อมูลทั้งชุด
+# และการโหลด/ปรับเฉพาะส่วนที่ resource หนึ่งกระทบ ส่วนการตรวจ version การโหลดใหม่เมื่อไม่ตรง
+# และการยอมรับการเขียนเฉพาะ version ที่ต่อกันพอดีอยู่ที่นี่
+# ต่างจาก services/background_state.py ตรงที่โหลดใหม่ในคำขอที่อ่าน (รอจนเสร็จ) ไม่ใช่ใน background
+import logging
+import threading
+import time
+
+from services.background_state import LoadError
+from sparql.dataset_version import dataset_version
+
+
+class VersionedIndex:
+    """โครงสร้างในหน่วยความจำพร้อม dataset version ที่ข้อมูลตรงกัน
+
+    ทุกการอ่าน/เขียนโครงสร้างทำภายใต้ self._lock — load()/load_change() ทำนอก lock
+    install()/apply_change() ถูกเรียกภายใต้ lock
+    """
+
+    log_tag = 'INDEX'
+    load_error = 'โหลด index ไม่สำเร็จ'
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.logger = logging.getLogger(type(self).__module__)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.version = None
+        self.builds = 0
+        self.updates = 0
+        self.last_build_ms = None
+        self.last_error = None
+
+    def load(self):
+        """โหลดข้อมูลทั้งชุดจาก Fuseki (subclass กำหนด) — โหลดไม่สำเร็จให้ raise LoadError"""
+        raise NotImplementedError
+
+    def install(self, data):
+        """แทนโครงสร้างทั้งหมดด้วยผลของ load()"""
+        raise NotImplementedError
+
+    def load_change(self, resource_id):
+        """โหลดข้อมูลส่วนที่ resource_id กระทบหลังเขียน — โหลดไม่สำเร็จให้ raise LoadError"""
+        raise NotImplementedError
+
+    def apply_change(self, change):
+        """ปรับโครงสร้างตามผลของ load_change()"""
+        raise NotImplementedError
+
+    def sizes(self):
+        """ขนาดของโครงสร้าง {ชื่อ: จำนวน} สำหรับ log และ stats()"""
+        return {}
+
+    def rebuild(self):
+        """โหลดข้อมูลทั้งชุดจาก Fuseki แล้วสร้าง index ใหม่ คืน True ถ้าสำเร็จ"""
+        start = time.perf_counter()
+        version = dataset_version.refresh()
+        try:
+            if version is None:
+                raise LoadError('dataset_version')
+            data = self.load()
+        except LoadError as e:
+            self.last_error = f'{self.load_error}: {e}'
+            self.logger.warning("[%s] %s", self.log_tag, self.last_error)
+            return False
+
+        with self._lock:
+            self.install(data)
+            self.version = version
+        self.last_error = None
+        self.builds += 1
+        self.last_build_ms = round((time.perf_counter() - start) * 1000, 2)
+        summary = ', '.join(f'{count} {name}' for name, count in self.sizes().items())
+        self.logger.info("[%s] version %s: %s (%.0f ms)", self.log_tag, version, summary,
+                         self.last_build_ms)
+        return True
+
+    def record_write(self, resource_id, version):
+        """ปรับ index ตาม resource_id หลัง admin เขียนข้อมูล (version: dataset version หลัง bump)
+
+        ถ้า version ไม่ต่อจากค่าที่ index รู้จัก หรือโหลดไม่สำเร็จ จะปล่อยให้ version ไม่ตรง
+        แล้วโหลดใหม่ทั้งชุดตอนอ่านครั้งถัดไป
+        """
+        if not self.enabled or self.version is None or version != self.version + 1:
+            return
+        try:
+            change = self.load_change(resource_id)
+        except LoadError:
+            return
+        with self._lock:
+            if version != self.version + 1:
+                return
+            self.apply_change(change)
+            self.version = version
+            self.updates += 1
+
+    def ensure_current(self):
+        """True ถ้า index ตรงกับ dataset version ล่าสุด (โหลดใหม่ทันทีถ้าไม่ตรง)"""
+        if not self.enabled:
+            return False
+        if self.version is not None and self.version == dataset_version.current():
+            return True
+        with self._build_lock:
+            if self.version is not None and self.version == dataset_version.current():
+                return True
+            return self.rebuild()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'version': self.version,
+            **self.sizes(),
+            'builds': self.builds,
+            'updates': self.updates,
+            'last_build_ms': self.last_build_ms,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,274 @@
+# backend ที่ FusekiClient ใช้ประมวลผล SPARQL — เลือกด้วย SPARQL_BACKEND
+#   'fuseki'   (ค่าเริ่มต้น) ส่ง query ไป Apache Jena Fuseki ผ่าน HTTP connection pool
+#   'embedded' ประมวลผลในโปรเซสเดียวกันบน triple store ในหน่วยความจำ (sparql/embedded/)
+#              โหลดจากไฟล์ใน EMBEDDED_DATA_FILES ตอนเริ่ม — ไม่ต้องมี JVM/Fuseki และไม่มี network hop
+#              ข้อมูลที่ admin เขียนอยู่ในหน่วยความจำเท่านั้น (หายเมื่อรีสตาร์ท)
+#
+# ทั้งสองแบบมี interface เดียวกัน: query / iter_bindings / update / explain / ping
+# FusekiClient จัดการแคช metrics slow-query log และ tracing เองโดยไม่ขึ้นกับ backend
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    SPARQL_BACKEND, EMBEDDED_DATA_FILES, EMBEDDED_STORE, EMBEDDED_INDEX_FILE,
+    FUSEKI_QUERY_ENDPOINT, FUSEKI_UPDATE_ENDPOINT, FUSEKI_VALIDATE_ENDPOINT, FUSEKI_PING_ENDPOINT,
+    FUSEKI_ADMIN_USER, FUSEKI_ADMIN_PASSWORD,
+    FUSEKI_POOL_SIZE, FUSEKI_CONNECT_TIMEOUT, FUSEKI_READ_TIMEOUT, FUSEKI_ACCEPT_GZIP,
+)
+from sparql.streaming import iter_bindings
+from utils.tracing import tracer, REQUEST_ID_HEADER
+
+logger = logging.getLogger(__name__)
+
+
+class QueryResponse:
+    """ผลลัพธ์ดิบของ query หนึ่งครั้ง: body (bytes จาก HTTP) หรือ data (dict ที่ประมวลผลแล้ว)"""
+
+    __slots__ = ('body', 'data')
+
+    def __init__(self, body=None, data=None):
+        self.body = body
+        self.data = data
+
+    @property
+    def nbytes(self):
+        return len(self.body) if self.body is not None else 0
+
+    def json(self):
+        if self.body is None:
+            return self.data
+        return json.loads(self.body)
+
+
+class HttpBackend:
+    """Apache Jena Fuseki ผ่าน requests.Session ตัวเดียวที่มี connection pool ร่วมกันทุก thread"""
+
+    name = 'fuseki'
+    # ชื่อ span ของช่วงที่รอผลลัพธ์ (รอ Fuseki จนได้ body ครบ)
+    span_name = 'network'
+    # อาจตั้ง text index ไว้ (ตรวจด้วย FusekiClient.text_index_available)
+    text_index = True
+
+    def __init__(self):
+        self.query_url = FUSEKI_QUERY_ENDPOINT
+        self.update_url = FUSEKI_UPDATE_ENDPOINT
+        self.validate_url = FUSEKI_VALIDATE_ENDPOINT
+        self.ping_url = FUSEKI_PING_ENDPOINT
+        self.auth = (FUSEKI_ADMIN_USER, FUSEKI_ADMIN_PASSWORD)
+        self.timeout = (FUSEKI_CONNECT_TIMEOUT, FUSEKI_READ_TIMEOUT)
+        self.session = self._create_session()
+
+    @property
+    def endpoint(self):
+        return self.query_url
+
+    def _create_session(self):
+        """สร้าง HTTP session พร้อม keep-alive connection pool"""
+        session = requests.Session()
+        # pool_block=True: ถ้า connection เต็ม ให้รอแทนการเปิด connection ใหม่ทิ้งขว้าง
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FUSEKI_POOL_SIZE,
+                              pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip' if FUSEKI_ACCEPT_GZIP else 'identity'
+        return session
+
+    def _headers(self, accept=None):
+        """header ของ request ไป Fuseki — ส่ง X-Request-ID ต่อไปด้วยถ้าอยู่ใน trace
+        (requests ตัด header ที่มีค่า None ออกเอง)
+        """
+        headers = {REQUEST_ID_HEADER: tracer.current_request_id()}
+        if accept:
+            headers['Accept'] = accept
+        return headers
+
+    def query(self, sparql_query, accept):
+        response = self.session.get(
+            self.query_url,
+            params={'query': sparql_query},
+            headers=self._headers(accept),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return QueryResponse(body=response.content)
+
+    def iter_bindings(self, sparql_query, accept, chunk_size, on_bytes):
+        """yield binding (dict ดิบของ SPARQL JSON) ทีละแถวระหว่างที่ Fuseki ส่งข้อมูลมา"""
+        # with: คืน connection เข้า pool แม้ผู้เรียกเลิกอ่านกลางทาง
+        with self.session.get(
+            self.query_url,
+            params={'query': sparql_query},
+            headers=self._headers(accept),
+            timeout=self.timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+
+            def chunks():
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    on_bytes(len(chunk))
+                    yield chunk
+
+            yield from iter_bindings(chunks())
+
+    def update(self, sparql_update):
+        """ส่ง update คืนขนาด response (bytes)"""
+        response = self.session.post(
+            self.update_url,
+            data={'update': sparql_update},
+            headers=self._headers(),
+            auth=self.auth,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return len(response.content)
+
+    def explain(self, sparql_query):
+        """ขอแผนการทำงานของ query จาก validator ของ Fuseki (/$/validate/query)
+
+        คืน algebra ของ ARQ ทั้งก่อนและหลัง optimize — ไม่ได้รัน query ซ้ำ
+        """
+        response = self.session.post(
+            self.validate_url,
+            data={'query': sparql_query, 'languageSyntax': 'SPARQL',
+                  'outputFormat': ['algebra', 'opt']},
+            headers={'Accept': 'application/json'},
+            auth=self.auth,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        plan = response.json()
+        plan.pop('input', None)
+        return plan
+
+    def ping(self):
+        """ตรวจว่า Fuseki ตอบสนอง (/$/ping ไม่แตะข้อมูล) — raise ถ้าเชื่อมต่อไม่ได้"""
+        response = self.session.get(self.ping_url, headers=self._headers(), timeout=self.timeout)
+        response.raise_for_status()
+
+
+class EmbeddedBackend:
+    """triple store ในโปรเซส (sparql/embedded/) — โหลดไฟล์ ontology ตอนสร้าง
+
+    ใช้ lock เดียวครอบทุกคำสั่ง: query ไม่เห็น update ที่ทำไปครึ่งทาง
+    (การประมวลผลเป็น Python ล้วนซึ่งติด GIL อยู่แล้ว การรันพร้อมกันจึงไม่ได้เร็วขึ้น)
+    """
+
+    name = 'embedded'
+    # ชื่อ span ของช่วงที่ประมวลผล query ในโปรเซส
+    span_name = 'evaluate'
+    # ไม่รองรับ text:query — ค้นหาข้อความด้วย FILTER CONTAINS เสมอ
+    text_index = False
+
+    def __init__(self, data_files=None, store_kind=None, index_file=None):
+        # import ที่นี่: โหมด fuseki ไม่ต้องโหลดโมดูลของ embedded store
+        from sparql.embedded.engine import SparqlEngine
+
+        self.data_files = list(data_files if data_files is not None else EMBEDDED_DATA_FILES)
+        self.store_kind = (store_kind or EMBEDDED_STORE).lower()
+        self.index_file = EMBEDDED_INDEX_FILE if index_file is None else index_file
+        self.lock = threading.Lock()
+        self.store = self._create_store()
+        self.engine = SparqlEngine(self.store)
+
+    def _create_store(self):
+        """สร้าง triple store ตาม EMBEDDED_STORE แล้วโหลดข้อมูล
+
+        'dict'    — dict ซ้อนกัน (store.Graph) ผลลัพธ์ที่ไม่มี ORDER BY ออกตามลำดับในไฟล์
+        'encoded' — id + array เรียงลำดับ (encoded.EncodedGraph) ใช้หน่วยความจำน้อยกว่ามาก
+                    ถ้ากำหนด EMBEDDED_INDEX_FILE จะเปิด index จากไฟล์ด้วย mmap (ใช้ร่วมกันทุก worker)
+                    และสร้างไฟล์ใหม่เมื่อไฟล์ข้อมูลต้นทางเปลี่ยน
+        """
+        from sparql.embedded.store import TripleStore
+        from sparql.embedded.encoded import EncodedGraph, TermDictionary, source_fingerprint
+
+        if self.store_kind == 'dict':
+            store = TripleStore()
+            self.load(store, self.data_files)
+            return store
+        if self.store_kind != 'encoded':
+            raise ValueError(f"EMBEDDED_STORE ไม่ถูกต้อง: {self.store_kind!r} (ใช้ 'dict' หรือ 'encoded')")
+
+        dictionary = TermDictionary()
+        store = TripleStore(lambda: EncodedGraph(dictionary))
+        if not self.index_file:
+            self.load(store, self.data_files)
+            return store
+        metadata = {'sources': source_fingerprint(self.data_files)}
+        start = time.perf_counter()
+        graph = EncodedGraph.open(self.index_file, dictionary, metadata)
+        if graph is not None:
+            store.default = graph
+            logger.info("[EMBEDDED] เปิด index %s: %d triples (%.0f ms)", self.index_file,
+                        graph.size, (time.perf_counter() - start) * 1000)
+            return store
+        self.load(store, self.data_files)
+        store.default.save(self.index_file, metadata)
+        logger.info("[EMBEDDED] บันทึก index %s", self.index_file)
+        return store
+
+    @property
+    def endpoint(self):
+        return 'embedded:' + ','.join(os.path.basename(path) for path in self.data_files)
+
+    def load(self, store, paths):
+        """เพิ่ม triple จากไฟล์ .ttl (Turtle) หรือ .owl/.rdf/.xml (RDF/XML) เข้า default graph"""
+        from sparql.embedded.turtle import TurtleParser
+        from sparql.embedded.rdfxml import RdfXmlParser
+
+        for path in paths:
+            start = time.perf_counter()
+            with self.lock:
+                before = len(store)
+                if path.endswith('.ttl'):
+                    with open(path, encoding='utf-8') as f:
+                        TurtleParser(f.read(), base=_file_base(path), emit=store.add).parse()
+                else:
+                    RdfXmlParser(store.add, base=_file_base(path)).parse(path)
+                added = len(store) - before
+            logger.info("[EMBEDDED] โหลด %s: %d triples (%.0f ms)", path, added,
+                        (time.perf_counter() - start) * 1000)
+
+    def query(self, sparql_query, accept):
+        with self.lock:
+            _, data = self.engine.query(sparql_query)
+        return QueryResponse(data=data)
+
+    def iter_bindings(self, sparql_query, accept, chunk_size, on_bytes):
+        """ผลลัพธ์คำนวณเสร็จทั้งชุดก่อน (ในหน่วยความจำอยู่แล้ว) แล้ว yield ทีละแถว"""
+        with self.lock:
+            _, data = self.engine.query(sparql_query)
+        yield from data['results']['bindings']
+
+    def update(self, sparql_update):
+        with self.lock:
+            self.engine.update(sparql_update)
+        return 0
+
+    def explain(self, sparql_query):
+        return self.engine.explain(sparql_query)
+
+    def ping(self):
+        """store อยู่ในโปรเซสเดียวกัน พร้อมเสมอเมื่อสร้างเสร็จ"""
+
+    def stats(self):
+        with self.lock:
+            return self.store.stats()
+
+
+def _file_base(path):
+    return 'file://' + os.path.abspath(path)
+
+
+def create_backend(name=None):
+    """สร้าง backend ตามชื่อ (ค่าเริ่มต้นจาก SPARQL_BACKEND)"""
+    name = (name or SPARQL_BACKEND).lower()
+    if name == 'embedded':
+        return EmbeddedBackend()
+    if name != 'fuseki':
+        raise ValueError(f"SPARQL_BACKEND ไม่ถูกต้อง: {name!r} (ใช้ 'fuseki' หรือ 'embedded')")
+    return HttpBackend()
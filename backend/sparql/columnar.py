@@ -0,0 +1,161 @@
+# ผลลัพธ์ SPARQL แบบคอลัมน์ (columnar) — ทางเลือกที่กระชับกว่า list ของ dict จาก _parse_results
+#
+# รูปแบบ JSON (?format=columns):
+#   {
+#     "format": "columns",
+#     "vars": ["product", "name", ...],
+#     "namespaces": ["http://sakon-ce.example.org/ontology#", ...],
+#     "columns": {"product": ["KhaoHang", ...], "name": ["ข้าวฮาง", ...]},
+#     "uri_namespaces": {"product": [0, ...]}
+#   }
+# ค่าในคอลัมน์เป็นชื่อย่อ (local name) ของ URI หรือค่า literal; null = ไม่ผูกค่า (OPTIONAL)
+# uri_namespaces มีเฉพาะตัวแปรที่เคยเป็น URI: index ใน namespaces หรือ null ถ้าแถวนั้นไม่ใช่ URI
+# URI เต็ม = namespaces[index] + ค่าในคอลัมน์
+
+
+class ColumnarResult:
+    """ผลลัพธ์ SELECT ที่เก็บเป็นคอลัมน์ พร้อมตาราง namespace ที่ intern ไว้
+
+    แยก local name ครั้งเดียวต่อ URI ที่ไม่ซ้ำกัน แทนที่จะ split('#') ทุกแถว
+    วนลูป (iter) ได้ dict ทีละแถวในรูปแบบเดียวกับ FusekiClient._parse_results
+    """
+
+    __slots__ = ('vars', 'namespaces', 'columns', 'uri_namespaces', 'length')
+
+    def __init__(self, variables, namespaces, columns, uri_namespaces, length):
+        self.vars = variables
+        self.namespaces = namespaces
+        self.columns = columns
+        self.uri_namespaces = uri_namespaces
+        self.length = length
+
+    @classmethod
+    def from_sparql_json(cls, raw_results):
+        """สร้างจาก SPARQL JSON results (application/sparql-results+json)"""
+        bindings = raw_results['results']['bindings']
+        variables = list(raw_results.get('head', {}).get('vars', []))
+        known = set(variables)
+        length = len(bindings)
+
+        namespaces = []
+        namespace_index = {}
+        terms = {}   # uri -> (namespace index, local name) คำนวณครั้งเดียวต่อ URI
+        columns = {var: [None] * length for var in variables}
+        uri_namespaces = {}
+
+        for i, binding in enumerate(bindings):
+            for var, value in binding.items():
+                if var not in known:
+                    # ตัวแปรที่ไม่ได้ประกาศใน head (ไม่ควรเกิด แต่กันไว้)
+                    known.add(var)
+                    variables.append(var)
+                    columns[var] = [None] * length
+                if value['type'] != 'uri':
+                    columns[var][i] = value['value']
+                    continue
+                uri = value['value']
+                term = terms.get(uri)
+                if term is None:
+                    local = uri.split('#')[-1] if '#' in uri else uri
+                    namespace = uri[:len(uri) - len(local)]
+                    ns = namespace_index.get(namespace)
+                    if ns is None:
+                        ns = namespace_index[namespace] = len(namespaces)
+                        namespaces.append(namespace)
+                    term = terms[uri] = (ns, local)
+                columns[var][i] = term[1]
+                ns_column = uri_namespaces.get(var)
+                if ns_column is None:
+                    ns_column = uri_namespaces[var] = [None] * length
+                ns_column[i] = term[0]
+
+        return cls(variables, namespaces, columns, uri_namespaces, length)
+
+    @classmethod
+    def from_rows(cls, variables, rows):
+        """สร้างจาก list ของ dict แบบ _parse_results (เช่นแถวจาก catalog snapshot)
+
+        variables: ลำดับตัวแปรของ SELECT — คีย์ var_uri ในแถวบอกว่าค่านั้นเป็น URI
+        """
+        length = len(rows)
+        namespaces = []
+        namespace_index = {}
+        columns = {var: [None] * length for var in variables}
+        uri_namespaces = {}
+
+        for i, row in enumerate(rows):
+            for var in variables:
+                value = row.get(var)
+                if value is None:
+                    continue
+                columns[var][i] = value
+                uri = row.get(f'{var}_uri')
+                if uri is None:
+                    continue
+                namespace = uri[:len(uri) - len(value)]
+                ns = namespace_index.get(namespace)
+                if ns is None:
+                    ns = namespace_index[namespace] = len(namespaces)
+                    namespaces.append(namespace)
+                ns_column = uri_namespaces.get(var)
+                if ns_column is None:
+                    ns_column = uri_namespaces[var] = [None] * length
+                ns_column[i] = ns
+
+        return cls(list(variables), namespaces, columns, uri_namespaces, length)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        """dict ทีละแถว (คีย์ var และ var_uri เหมือน _parse_results) สร้างใหม่ทุกครั้ง"""
+        columns = [(var, self.columns[var], self.uri_namespaces.get(var))
+                   for var in self.vars]
+        namespaces = self.namespaces
+        for i in range(self.length):
+            row = {}
+            for var, column, ns_column in columns:
+                value = column[i]
+                if value is None:
+                    continue
+                row[var] = value
+                if ns_column is not None and ns_column[i] is not None:
+                    row[f'{var}_uri'] = namespaces[ns_column[i]] + value
+            yield row
+
+    def row(self, index):
+        """dict ของแถวที่ index"""
+        row = {}
+        for var in self.vars:
+            value = self.columns[var][index]
+            if value is None:
+                continue
+            row[var] = value
+            ns_column = self.uri_namespaces.get(var)
+            if ns_column is not None and ns_column[index] is not None:
+                row[f'{var}_uri'] = self.namespaces[ns_column[index]] + value
+        return row
+
+    def head(self, count):
+        """ColumnarResult ใหม่ที่มีเฉพาะ count แถวแรก (ตาราง namespace ใช้ร่วมกัน)"""
+        count = min(count, self.length)
+        return ColumnarResult(
+            self.vars, self.namespaces,
+            {var: column[:count] for var, column in self.columns.items()},
+            {var: column[:count] for var, column in self.uri_namespaces.items()},
+            count,
+        )
+
+    def rows(self):
+        """list ของ dict ทุกแถว (สำหรับโค้ดเดิมที่ต้องการ list)"""
+        return list(self)
+
+    def to_dict(self):
+        """รูปแบบ JSON แบบคอลัมน์ (ดูคำอธิบายด้านบนของไฟล์)"""
+        return {
+            'format': 'columns',
+            'vars': self.vars,
+            'namespaces': self.namespaces,
+            'columns': self.columns,
+            'uri_namespaces': self.uri_namespaces,
+        }
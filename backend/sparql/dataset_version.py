@@ -0,0 +1,58 @@
+# Dataset version — ตัวนับที่เพิ่มขึ้นทุกครั้งที่ admin เขียนข้อมูล
+# เก็บไว้ใน Fuseki (named graph metadata) ทุก gunicorn worker และหลัง restart จึงเห็นค่าเดียวกัน
+import time
+import logging
+import threading
+from config import DATASET_VERSION_TTL_SECONDS
+from sparql.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetVersion:
+    """อ่าน/เพิ่ม dataset version โดยจำค่าไว้ใน worker ช่วงสั้นๆ
+
+    ระหว่าง TTL จะตอบจากหน่วยความจำโดยไม่ถาม Fuseki (ใช้ตอบ 304 ได้ทันที)
+    ถ้าอ่านแล้วพบว่า version เปลี่ยน (worker อื่นเขียนข้อมูล) จะล้างแคชผลลัพธ์ของ worker นี้ด้วย
+    """
+
+    def __init__(self, registry, ttl_seconds=DATASET_VERSION_TTL_SECONDS):
+        self.registry = registry
+        self.client = registry.client
+        self.ttl_seconds = ttl_seconds
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """คืนค่า version ปัจจุบัน (int) หรือ None ถ้าอ่านจาก Fuseki ไม่ได้"""
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.ttl_seconds:
+                return self._version
+        return self.refresh()
+
+    def refresh(self):
+        """อ่าน version จาก Fuseki ใหม่"""
+        result = self.registry.run('dataset_version', use_cache=False)
+        if not result['success']:
+            logger.warning("[VERSION] อ่าน dataset version ไม่ได้: %s", result.get('error'))
+            return None
+
+        version = int(float(result['results'][0]['version'])) if result['results'] else 0
+        with self._lock:
+            if self._version is not None and version != self._version:
+                # worker อื่นเขียนข้อมูล → ผลลัพธ์ที่แคชไว้ใน worker นี้เก่าแล้ว
+                self.client.cache.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+    def bump(self):
+        """เพิ่ม version หลังเขียนข้อมูลสำเร็จ แล้วคืนค่าใหม่"""
+        result = self.registry.run('bump_dataset_version')
+        if not result['success']:
+            logger.error("[VERSION] เพิ่ม dataset version ไม่สำเร็จ: %s", result.get('error'))
+        return self.refresh()
+
+
+dataset_version = DatasetVersion(registry)
@@ -0,0 +1,303 @@
+# triple store แบบเข้ารหัสพจนานุกรม (dictionary encoding) สำหรับข้อมูลขนาดใหญ่
+#
+# ทุก term (IRI/blank node/literal) ถูกแทนด้วยเลข id ใน TermDictionary
+# triple หนึ่งตัวอัดเป็นจำนวนเต็ม 64 บิตตัวเดียว (id ละ ID_BITS บิต) และเก็บ 3 ลำดับ (SPO, POS, OSP)
+# เป็น array('q') ที่เรียงแล้ว — pattern ที่ผูกค่าส่วนหน้าไว้คือช่วงต่อเนื่องหนึ่งช่วง หาได้ด้วย bisect
+# ใช้หน่วยความจำ 24 ไบต์ต่อ triple (ไม่รวมพจนานุกรม) แทน dict ซ้อนกันหลายร้อยไบต์ต่อ triple
+#
+# บันทึกลงไฟล์แล้วเปิดด้วย mmap ได้ (save/open) — หลาย worker อ่าน index ชุดเดียวกันผ่าน page cache
+# index ที่ map ไว้เป็นแบบอ่านอย่างเดียว การเขียนครั้งแรกจะคัดลอกเข้าหน่วยความจำของโปรเซสนั้นก่อน
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+# จำนวนบิตต่อ id — รองรับ term ต่างกันได้ 2,097,152 ตัว (3 × 21 = 63 บิต พอดี int64 แบบมีเครื่องหมาย)
+ID_BITS = 21
+MAX_TERMS = 1 << ID_BITS
+_MASK = MAX_TERMS - 1
+_SHIFT_1 = ID_BITS
+_SHIFT_2 = ID_BITS * 2
+
+# ถ้า triple ที่รอรวมเกินจำนวนนี้ จะเรียง index ใหม่ทั้งชุดแทนการแทรกทีละตัว (เช่นตอนโหลดไฟล์)
+REBUILD_THRESHOLD = 256
+
+FILE_MAGIC = b'SCEIDX01'
+_HEADER = struct.Struct('<8sQ')
+
+
+class TermDictionary:
+    """term ↔ id (id เรียงตามลำดับที่พบครั้งแรก)"""
+
+    __slots__ = ('terms', 'ids')
+
+    def __init__(self):
+        self.terms = []
+        self.ids = {}
+
+    def intern(self, term):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            if term_id >= MAX_TERMS:
+                raise OverflowError(f'term เกิน {MAX_TERMS} ตัว (ID_BITS={ID_BITS})')
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def extend(self, terms):
+        """เติม term ทีละชุด (ใช้ตอนเปิดไฟล์ index — ลำดับใน terms คือ id)"""
+        start = len(self.terms)
+        if start + len(terms) > MAX_TERMS:
+            raise OverflowError(f'term เกิน {MAX_TERMS} ตัว (ID_BITS={ID_BITS})')
+        self.terms.extend(terms)
+        self.ids.update(zip(terms, range(start, start + len(terms))))
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def _pack(a, b, c):
+    return (a << _SHIFT_2) | (b << _SHIFT_1) | c
+
+
+def _bounds(index, ids):
+    """ช่วง [lo, hi) ใน index ของ key ที่ขึ้นต้นด้วย ids (0–3 ตัว)"""
+    prefix = 0
+    for term_id in ids:
+        prefix = (prefix << ID_BITS) | term_id
+    shift = ID_BITS * (3 - len(ids))
+    return bisect_left(index, prefix << shift), bisect_left(index, (prefix + 1) << shift)
+
+
+def _to_pos(key):
+    return (((key >> _SHIFT_1) & _MASK) << _SHIFT_2) | ((key & _MASK) << _SHIFT_1) | (key >> _SHIFT_2)
+
+
+def _to_osp(key):
+    return ((key & _MASK) << _SHIFT_2) | ((key >> _SHIFT_2) << _SHIFT_1) | ((key >> _SHIFT_1) & _MASK)
+
+
+class EncodedGraph:
+    """graph เดียวที่เก็บเป็น id — interface เดียวกับ store.Graph (add/remove/triples/estimate/size)
+
+    triple ที่เพิ่มใหม่พักไว้ใน pending ก่อน แล้วรวมเข้า index เมื่อมีการอ่านครั้งถัดไป
+    (โหลดไฟล์ทีเดียวจึงเรียงครั้งเดียว ส่วนการเขียนทีละ triple ของ admin ใช้การแทรกตรงตำแหน่ง)
+    """
+
+    __slots__ = ('dictionary', 'spo', 'pos', 'osp', 'pending', 'mapping')
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.spo = array('q')
+        self.pos = array('q')
+        self.osp = array('q')
+        self.pending = set()
+        self.mapping = None     # mmap ของไฟล์ index (ถ้าเปิดจากไฟล์และยังไม่ได้เขียน)
+
+    @property
+    def size(self):
+        return len(self.spo) + len(self.pending)
+
+    def _contains(self, key):
+        index = self.spo
+        i = bisect_left(index, key)
+        return i < len(index) and index[i] == key
+
+    def add(self, s, p, o):
+        intern = self.dictionary.intern
+        key = _pack(intern(s), intern(p), intern(o))
+        if key in self.pending or self._contains(key):
+            return False
+        self.pending.add(key)
+        return True
+
+    def remove(self, s, p, o):
+        ids = self.dictionary.ids
+        s, p, o = ids.get(s), ids.get(p), ids.get(o)
+        if s is None or p is None or o is None:
+            return False
+        key = _pack(s, p, o)
+        if key in self.pending:
+            self.pending.discard(key)
+            return True
+        if not self._contains(key):
+            return False
+        self._own()
+        for index, value in ((self.spo, key), (self.pos, _to_pos(key)), (self.osp, _to_osp(key))):
+            del index[bisect_left(index, value)]
+        return True
+
+    def _own(self):
+        """index ที่ map จากไฟล์ → คัดลอกเป็น array ของโปรเซสนี้ก่อนแก้ไข"""
+        if self.mapping is None:
+            return
+        for name in ('spo', 'pos', 'osp'):
+            copy = array('q')
+            copy.frombytes(getattr(self, name).tobytes())
+            setattr(self, name, copy)
+        self.mapping = None
+
+    def _flush(self):
+        """รวม triple ใน pending เข้า index ทั้งสามชุด"""
+        if not self.pending:
+            return
+        self._own()
+        added = sorted(self.pending)
+        self.pending = set()
+        if len(added) > REBUILD_THRESHOLD:
+            keys = list(self.spo)
+            keys.extend(added)
+            keys.sort()
+            self.spo = array('q', keys)
+            self.pos = array('q', sorted(map(_to_pos, keys)))
+            self.osp = array('q', sorted(map(_to_osp, keys)))
+            return
+        for key in added:
+            for index, value in ((self.spo, key), (self.pos, _to_pos(key)),
+                                 (self.osp, _to_osp(key))):
+                index.insert(bisect_left(index, value), value)
+
+    def _plan(self, s, p, o):
+        """เลือก index และ prefix ของ id ตามตำแหน่งที่ผูกค่า (None ถ้ามี term ที่ไม่อยู่ใน graph)
+
+        คืน (index, prefix, shape) — shape เช่น 'sp?' บอกตำแหน่งที่ผูกค่า ใช้เลือกวิธีถอดรหัส
+        """
+        ids = self.dictionary.ids
+        si = pi = oi = None
+        if s is not None:
+            si = ids.get(s)
+            if si is None:
+                return None
+        if p is not None:
+            pi = ids.get(p)
+            if pi is None:
+                return None
+        if o is not None:
+            oi = ids.get(o)
+            if oi is None:
+                return None
+        if si is not None:
+            if pi is not None:
+                if oi is not None:
+                    return self.spo, (si, pi, oi), 'spo'
+                return self.spo, (si, pi), 'sp?'
+            if oi is not None:
+                return self.osp, (oi, si), 's?o'
+            return self.spo, (si,), 's??'
+        if pi is not None:
+            if oi is not None:
+                return self.pos, (pi, oi), '?po'
+            return self.pos, (pi,), '?p?'
+        if oi is not None:
+            return self.osp, (oi,), '??o'
+        return self.spo, (), '???'
+
+    def triples(self, s, p, o):
+        """triple ที่ตรงกับ pattern (None = ค่าใดก็ได้) เรียงตาม id ของ index ที่ใช้
+
+        ตำแหน่งที่ผูกค่ามาแล้วใช้ term เดิม ถอดรหัสเฉพาะตำแหน่งที่ว่าง
+        """
+        self._flush()
+        plan = self._plan(s, p, o)
+        if plan is None:
+            return
+        index, prefix, shape = plan
+        lo, hi = _bounds(index, prefix)
+        if lo == hi:
+            return
+        terms = self.dictionary.terms
+        # slice = สำเนาของช่วง: การเขียนระหว่างวนไม่กระทบ
+        keys = index[lo:hi]
+        if shape == 'spo':
+            yield s, p, o
+        elif shape == 'sp?':
+            for key in keys:
+                yield s, p, terms[key & _MASK]
+        elif shape == '?po':
+            for key in keys:
+                yield terms[key & _MASK], p, o
+        elif shape == 's?o':
+            for key in keys:
+                yield s, terms[key & _MASK], o
+        elif shape == 's??':
+            for key in keys:
+                yield s, terms[(key >> _SHIFT_1) & _MASK], terms[key & _MASK]
+        elif shape == '?p?':
+            for key in keys:
+                yield terms[key & _MASK], p, terms[(key >> _SHIFT_1) & _MASK]
+        elif shape == '??o':
+            for key in keys:
+                yield terms[(key >> _SHIFT_1) & _MASK], terms[key & _MASK], o
+        else:
+            for key in keys:
+                yield terms[key >> _SHIFT_2], terms[(key >> _SHIFT_1) & _MASK], terms[key & _MASK]
+
+    def estimate(self, s, p, o):
+        """จำนวน triple ที่ตรงกับ pattern (ค่าจริง จากความยาวของช่วงใน index)"""
+        self._flush()
+        plan = self._plan(s, p, o)
+        if plan is None:
+            return 0
+        lo, hi = _bounds(plan[0], plan[1])
+        return hi - lo
+
+    # === ไฟล์ index (mmap) ===
+
+    def save(self, path, metadata=None):
+        """เขียน index + พจนานุกรมลงไฟล์ (เขียนไฟล์ชั่วคราวแล้ว rename จึงไม่มีใครเห็นไฟล์ครึ่งๆ)"""
+        self._flush()
+        header = dict(metadata or {})
+        header.update(triples=len(self.spo),
+                      terms=[list(term) for term in self.dictionary.terms])
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        # จัดให้ array เริ่มที่ offset หาร 8 ลงตัว
+        header_bytes += b' ' * (-(len(header_bytes) + _HEADER.size) % 8)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(FILE_MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            for index in (self.spo, self.pos, self.osp):
+                f.write(index.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path, dictionary, metadata=None):
+        """เปิดไฟล์ index ด้วย mmap (คืน None ถ้าไม่มีไฟล์ รูปแบบไม่ถูก หรือ metadata ไม่ตรง)
+
+        dictionary ต้องว่าง — จะถูกเติม term จากไฟล์
+        """
+        try:
+            with open(path, 'rb') as f:
+                magic, header_size = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != FILE_MAGIC:
+                    return None
+                header = json.loads(f.read(header_size))
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            return None
+        if any(header.get(key) != value for key, value in (metadata or {}).items()):
+            mapping.close()
+            return None
+
+        dictionary.extend([tuple(term) for term in header['terms']])
+        graph = cls(dictionary)
+        count = header['triples']
+        view = memoryview(mapping)
+        offset = _HEADER.size + header_size
+        for name in ('spo', 'pos', 'osp'):
+            setattr(graph, name, view[offset:offset + count * 8].cast('q'))
+            offset += count * 8
+        graph.mapping = mapping
+        return graph
+
+
+def source_fingerprint(paths):
+    """ตัวระบุไฟล์ต้นทาง (path, ขนาด, เวลาแก้ไข) — ใช้ตรวจว่าไฟล์ index ยังตรงกับข้อมูล"""
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
@@ -0,0 +1,1052 @@
+# ตัวประมวลผล SPARQL ของ embedded backend — รับ query/update เป็นข้อความ คืนผลรูปแบบเดียวกับ Fuseki
+#
+# การประเมิน pattern ส่งค่าที่ผูกแล้วลงไปใน element ถัดไป (แทนค่าตัวแปรก่อนค้น index)
+# BGP เลือก triple pattern ที่คาดว่าได้แถวน้อยที่สุดก่อนทุกครั้ง (จาก estimate ของ store)
+# FILTER ที่ตัวแปรทุกตัวถูกผูกแน่นอนแล้วจะกรองทันทีหลัง BGP นั้น ไม่รอจนจบ group
+import math
+import re
+import urllib.parse
+from collections import OrderedDict
+from decimal import Decimal, ROUND_FLOOR, ROUND_CEILING, localcontext
+from functools import lru_cache
+
+from sparql.embedded.parser import VAR, parse_query, parse_update, format_query
+from sparql.embedded.rdf import (
+    URI, BNODE, LITERAL, XSD_STRING, XSD_BOOLEAN, XSD_INTEGER, XSD_DECIMAL, XSD_DOUBLE,
+    XSD_FLOAT, RDF_LANG_STRING, DECIMAL_DIVIDE_SCALE,
+    iri, literal, fresh_bnode, boolean, numeric, numeric_value, boolean_value,
+    is_numeric, to_sparql_json, to_rdf_json, subject_key,
+)
+
+# จำนวน query/update ที่แปลงแล้วเก็บไว้ (template เดิมไม่ต้อง parse ซ้ำ)
+PARSE_CACHE_SIZE = 256
+
+_TERM_KINDS = (URI, BNODE, LITERAL)
+
+
+class ExprError(Exception):
+    """ข้อผิดพลาดระหว่างคำนวณ expression (FILTER = false, BIND/SELECT = ไม่ผูกค่า)"""
+
+
+class QueryError(Exception):
+    """query ที่ประมวลผลไม่ได้"""
+
+
+parse_query_cached = lru_cache(maxsize=PARSE_CACHE_SIZE)(parse_query)
+parse_update_cached = lru_cache(maxsize=PARSE_CACHE_SIZE)(parse_update)
+
+
+# === ค่าและการเปรียบเทียบ ===
+
+def _number(term):
+    if term[0] != LITERAL or not is_numeric(term):
+        raise ExprError('ไม่ใช่ตัวเลข')
+    try:
+        return numeric_value(term)
+    except ValueError as e:
+        raise ExprError(str(e))
+
+
+def _string(term):
+    """ค่าข้อความของ literal แบบ string (plain / xsd:string / มีภาษา)"""
+    if term[0] != LITERAL or term[2] is not None:
+        raise ExprError('ไม่ใช่ข้อความ')
+    return term[1]
+
+
+def _promote(x, y):
+    """ทำให้ตัวเลขสองตัวเป็นชนิดเดียวกัน (integer → decimal → double)"""
+    if isinstance(x, float) or isinstance(y, float):
+        return float(x), float(y)
+    if isinstance(x, Decimal) or isinstance(y, Decimal):
+        return Decimal(x), Decimal(y)
+    return x, y
+
+
+def ebv(term):
+    """effective boolean value"""
+    if term[0] == LITERAL:
+        datatype = term[2]
+        if datatype == XSD_BOOLEAN:
+            try:
+                return boolean_value(term)
+            except ValueError:
+                return False
+        if datatype is None:
+            return bool(term[1])
+        if is_numeric(term):
+            try:
+                value = numeric_value(term)
+            except ValueError:
+                return False
+            return bool(value) and value == value
+    raise ExprError('หาค่า boolean ไม่ได้')
+
+
+def _equal(x, y):
+    if x == y:
+        return True
+    if x[0] != LITERAL or y[0] != LITERAL:
+        return False
+    if is_numeric(x) and is_numeric(y):
+        a, b = _promote(_number(x), _number(y))
+        return a == b
+    if x[2] is None and y[2] is None:
+        return x[1] == y[1] and x[3] == y[3]
+    if x[2] == XSD_BOOLEAN and y[2] == XSD_BOOLEAN:
+        try:
+            return boolean_value(x) == boolean_value(y)
+        except ValueError:
+            raise ExprError('boolean ไม่ถูกต้อง')
+    if x[2] == y[2] or (x[2] not in _KNOWN_TYPES and y[2] not in _KNOWN_TYPES):
+        # literal ชนิดที่ไม่รู้จัก ค่าต่างกัน → เทียบไม่ได้ (type error ตาม spec)
+        raise ExprError('เทียบ literal ชนิดนี้ไม่ได้')
+    return False
+
+
+_KNOWN_TYPES = {None, XSD_BOOLEAN, XSD_INTEGER, XSD_DECIMAL, XSD_DOUBLE, XSD_FLOAT}
+
+
+def _less(x, y):
+    """x < y สำหรับตัวเลข ข้อความ และ boolean (ชนิดอื่น = type error)"""
+    if is_numeric(x) and is_numeric(y):
+        a, b = _promote(_number(x), _number(y))
+        return a < b
+    if x[0] == LITERAL and y[0] == LITERAL:
+        if x[2] is None and y[2] is None and x[3] == y[3]:
+            return x[1] < y[1]
+        if x[2] == XSD_BOOLEAN and y[2] == XSD_BOOLEAN:
+            return boolean_value(x) < boolean_value(y)
+    raise ExprError('เปรียบเทียบลำดับไม่ได้')
+
+
+def sort_key(term):
+    """ลำดับของ ORDER BY: ไม่ผูกค่า < blank node < IRI < literal (ตัวเลขเทียบตามค่า)"""
+    if term is None:
+        return (0,)
+    kind = term[0]
+    if kind == BNODE:
+        return (1, term[1])
+    if kind == URI:
+        return (2, term[1])
+    if is_numeric(term):
+        try:
+            value = numeric_value(term)
+            if value == value:
+                return (3, 0, value)
+        except ValueError:
+            pass
+    if term[2] is None:
+        return (3, 1, term[1], term[3] or '')
+    return (3, 2, term[2], term[1])
+
+
+# === ฟังก์ชันในตัว ===
+
+def _string_result(value, like):
+    """ผลของฟังก์ชันข้อความ — คงภาษาของ argument แรกไว้"""
+    return literal(value, lang=like[3])
+
+
+def _fn_str(args):
+    term = args[0]
+    if term[0] == BNODE:
+        raise ExprError('STR ของ blank node')
+    return literal(term[1])
+
+
+def _fn_lang(args):
+    if args[0][0] != LITERAL:
+        raise ExprError('LANG ต้องใช้กับ literal')
+    return literal(args[0][3] or '')
+
+
+def _fn_langmatches(args):
+    tag, pattern = _string(args[0]).lower(), _string(args[1]).lower()
+    if pattern == '*':
+        return boolean(bool(tag))
+    return boolean(tag == pattern or tag.startswith(pattern + '-'))
+
+
+def _fn_datatype(args):
+    term = args[0]
+    if term[0] != LITERAL:
+        raise ExprError('DATATYPE ต้องใช้กับ literal')
+    if term[3]:
+        return iri(RDF_LANG_STRING)
+    return iri(term[2] or XSD_STRING)
+
+
+def _fn_iri(args):
+    term = args[0]
+    if term[0] == URI:
+        return term
+    return iri(_string(term))
+
+
+def _fn_abs(args):
+    return numeric(abs(_number(args[0])))
+
+
+def _fn_ceil(args):
+    value = _number(args[0])
+    if isinstance(value, Decimal):
+        return numeric(value.to_integral_value(ROUND_CEILING))
+    return numeric(math.ceil(value) if isinstance(value, int) else float(math.ceil(value)))
+
+
+def _fn_floor(args):
+    value = _number(args[0])
+    if isinstance(value, Decimal):
+        return numeric(value.to_integral_value(ROUND_FLOOR))
+    return numeric(math.floor(value) if isinstance(value, int) else float(math.floor(value)))
+
+
+def _fn_round(args):
+    """ปัดครึ่งขึ้นไปทาง +∞ ตาม fn:round"""
+    value = _number(args[0])
+    if isinstance(value, int):
+        return numeric(value)
+    if isinstance(value, Decimal):
+        return numeric((value + Decimal('0.5')).to_integral_value(ROUND_FLOOR))
+    return numeric(float(math.floor(value + 0.5)))
+
+
+def _fn_concat(args):
+    values = [_string(arg) for arg in args]
+    langs = {arg[3] for arg in args}
+    lang = langs.pop() if len(langs) == 1 else None
+    return literal(''.join(values), lang=lang)
+
+
+def _fn_strlen(args):
+    return numeric(len(_string(args[0])))
+
+
+def _fn_ucase(args):
+    return _string_result(_string(args[0]).upper(), args[0])
+
+
+def _fn_lcase(args):
+    return _string_result(_string(args[0]).lower(), args[0])
+
+
+def _fn_encode_for_uri(args):
+    return literal(urllib.parse.quote(_string(args[0]), safe='-_.~'))
+
+
+def _fn_contains(args):
+    return boolean(_string(args[1]) in _string(args[0]))
+
+
+def _fn_strstarts(args):
+    return boolean(_string(args[0]).startswith(_string(args[1])))
+
+
+def _fn_strends(args):
+    return boolean(_string(args[0]).endswith(_string(args[1])))
+
+
+def _fn_strbefore(args):
+    text, marker = _string(args[0]), _string(args[1])
+    index = text.find(marker)
+    return _string_result(text[:index], args[0]) if index >= 0 else literal('')
+
+
+def _fn_strafter(args):
+    text, marker = _string(args[0]), _string(args[1])
+    index = text.find(marker)
+    return _string_result(text[index + len(marker):], args[0]) if index >= 0 else literal('')
+
+
+def _fn_strlang(args):
+    return literal(_string(args[0]), lang=_string(args[1]))
+
+
+def _fn_strdt(args):
+    if args[1][0] != URI:
+        raise ExprError('STRDT ต้องการ datatype IRI')
+    return literal(_string(args[0]), args[1][1])
+
+
+def _fn_sameterm(args):
+    return boolean(args[0] == args[1])
+
+
+def _fn_isiri(args):
+    return boolean(args[0][0] == URI)
+
+
+def _fn_isblank(args):
+    return boolean(args[0][0] == BNODE)
+
+
+def _fn_isliteral(args):
+    return boolean(args[0][0] == LITERAL)
+
+
+def _fn_isnumeric(args):
+    if not is_numeric(args[0]):
+        return boolean(False)
+    try:
+        numeric_value(args[0])
+        return boolean(True)
+    except ValueError:
+        return boolean(False)
+
+
+@lru_cache(maxsize=128)
+def _regex(pattern, flags):
+    options = 0
+    for flag in flags:
+        options |= {'i': re.IGNORECASE, 's': re.DOTALL, 'm': re.MULTILINE,
+                    'x': re.VERBOSE}.get(flag, 0)
+    try:
+        return re.compile(pattern, options)
+    except re.error as e:
+        raise ExprError(f'regex ไม่ถูกต้อง: {e}')
+
+
+def _fn_regex(args):
+    flags = _string(args[2]) if len(args) > 2 else ''
+    return boolean(_regex(_string(args[1]), flags).search(_string(args[0])) is not None)
+
+
+def _fn_substr(args):
+    text = _string(args[0])
+    start = _number(args[1])
+    if len(args) > 2:
+        length = _number(args[2])
+        begin = float(start)
+        chars = [c for i, c in enumerate(text, 1)
+                 if round(begin) <= i < round(begin) + round(float(length))]
+        return _string_result(''.join(chars), args[0])
+    return _string_result(text[max(int(round(float(start))) - 1, 0):], args[0])
+
+
+def _fn_replace(args):
+    flags = _string(args[3]) if len(args) > 3 else ''
+    replacement = re.sub(r'\$(\d+)', r'\\g<\1>', _string(args[2]))
+    return _string_result(_regex(_string(args[1]), flags).sub(replacement, _string(args[0])),
+                          args[0])
+
+
+FUNCTIONS = {
+    'STR': _fn_str, 'LANG': _fn_lang, 'LANGMATCHES': _fn_langmatches, 'DATATYPE': _fn_datatype,
+    'IRI': _fn_iri, 'URI': _fn_iri, 'ABS': _fn_abs, 'CEIL': _fn_ceil, 'FLOOR': _fn_floor,
+    'ROUND': _fn_round, 'CONCAT': _fn_concat, 'STRLEN': _fn_strlen, 'UCASE': _fn_ucase,
+    'LCASE': _fn_lcase, 'ENCODE_FOR_URI': _fn_encode_for_uri, 'CONTAINS': _fn_contains,
+    'STRSTARTS': _fn_strstarts, 'STRENDS': _fn_strends, 'STRBEFORE': _fn_strbefore,
+    'STRAFTER': _fn_strafter, 'STRLANG': _fn_strlang, 'STRDT': _fn_strdt,
+    'SAMETERM': _fn_sameterm, 'ISIRI': _fn_isiri, 'ISURI': _fn_isiri, 'ISBLANK': _fn_isblank,
+    'ISLITERAL': _fn_isliteral, 'ISNUMERIC': _fn_isnumeric, 'REGEX': _fn_regex,
+    'SUBSTR': _fn_substr, 'REPLACE': _fn_replace,
+}
+
+
+def _cast(datatype, term):
+    if term[0] == BNODE:
+        raise ExprError('แปลงชนิด blank node ไม่ได้')
+    lexical = term[1]
+    try:
+        if datatype == XSD_STRING:
+            return literal(lexical)
+        if term[0] == URI:
+            raise ExprError('แปลง IRI เป็นตัวเลขไม่ได้')
+        if datatype == XSD_BOOLEAN:
+            if is_numeric(term):
+                return boolean(_number(term) != 0)
+            return boolean(boolean_value(term))
+        if term[2] == XSD_BOOLEAN:
+            value = 1 if boolean_value(term) else 0
+        elif is_numeric(term):
+            value = _number(term)
+        else:
+            value = Decimal(lexical.strip()) if datatype != XSD_INTEGER else int(lexical.strip())
+        if datatype == XSD_INTEGER:
+            return numeric(int(value))
+        if datatype == XSD_DECIMAL:
+            return numeric(Decimal(value) if not isinstance(value, float) else Decimal(repr(value)))
+        return literal(repr(float(value)), datatype if datatype == XSD_FLOAT else XSD_DOUBLE)
+    except (ValueError, ArithmeticError):
+        raise ExprError(f'แปลง {lexical!r} เป็น {datatype} ไม่ได้')
+
+
+def _arithmetic(op, x, y):
+    a, b = _promote(_number(x), _number(y))
+    if op == '+':
+        return numeric(a + b)
+    if op == '-':
+        return numeric(a - b)
+    if op == '*':
+        return numeric(a * b)
+    if b == 0 and not isinstance(b, float):
+        raise ExprError('หารด้วยศูนย์')
+    if isinstance(a, int):
+        a, b = Decimal(a), Decimal(b)
+    if isinstance(a, Decimal):
+        return numeric(_divide(a, b))
+    return numeric(a / b)
+
+
+def _divide(a, b):
+    with localcontext() as context:
+        context.prec = 60
+        return (a / b).quantize(DECIMAL_DIVIDE_SCALE)
+
+
+def has_aggregate(expr):
+    if expr is None or expr[0] in _TERM_KINDS or expr[0] == VAR:
+        return False
+    if expr[0] == 'agg':
+        return True
+    if expr[0] == 'call':
+        return any(has_aggregate(arg) for arg in expr[2])
+    if expr[0] == 'in':
+        return has_aggregate(expr[1]) or any(has_aggregate(item) for item in expr[2])
+    if expr[0] == 'exists':
+        return False
+    if expr[0] == 'cast':
+        return has_aggregate(expr[2])
+    return any(has_aggregate(part) for part in expr[1:] if isinstance(part, tuple))
+
+
+def expr_vars(expr, found=None):
+    """ชื่อตัวแปรทั้งหมดใน expression (None ถ้ามี EXISTS/BOUND/COALESCE ซึ่งเลื่อนไปกรองก่อนไม่ได้)"""
+    found = set() if found is None else found
+    kind = expr[0]
+    if kind == VAR:
+        found.add(expr[1])
+    elif kind in _TERM_KINDS:
+        pass
+    elif kind == 'exists' or kind == 'agg':
+        return None
+    elif kind == 'call':
+        if expr[1] in ('BOUND', 'COALESCE', 'IF', 'BNODE'):
+            return None
+        for arg in expr[2]:
+            if expr_vars(arg, found) is None:
+                return None
+    elif kind == 'in':
+        for part in [expr[1]] + list(expr[2]):
+            if expr_vars(part, found) is None:
+                return None
+    elif kind == 'cast':
+        if expr_vars(expr[2], found) is None:
+            return None
+    else:
+        for part in expr[1:]:
+            if isinstance(part, tuple) and expr_vars(part, found) is None:
+                return None
+    return found
+
+
+def _compatible(a, b):
+    for name, value in b.items():
+        other = a.get(name)
+        if other is not None and other != value:
+            return False
+    return True
+
+
+def _triple_vars(triple):
+    return [term[1] for term in triple if term[0] == VAR]
+
+
+def visible_vars(elements, found=None):
+    """ตัวแปรที่ SELECT * แสดง ตามลำดับที่ปรากฏใน pattern (ไม่รวม blank node ใน pattern)"""
+    found = [] if found is None else found
+
+    def add(name):
+        if not name.startswith('_:') and name not in found:
+            found.append(name)
+
+    for element in elements:
+        kind = element[0]
+        if kind == 'bgp':
+            for triple in element[1]:
+                for name in _triple_vars(triple):
+                    add(name)
+        elif kind in ('optional', 'group'):
+            visible_vars(element[1], found)
+        elif kind == 'union':
+            for group in element[1]:
+                visible_vars(group, found)
+        elif kind == 'graph':
+            if element[1][0] == VAR:
+                add(element[1][1])
+            visible_vars(element[2], found)
+        elif kind == 'bind':
+            add(element[2])
+        elif kind == 'values':
+            for name in element[1]:
+                add(name)
+        elif kind == 'subquery':
+            for name in projected_vars(element[1]):
+                add(name)
+    return found
+
+
+def projected_vars(query):
+    if query.projection is None:
+        names = visible_vars(query.where)
+        if query.values is not None:
+            names.extend(name for name in query.values[1] if name not in names)
+        return names
+    return [name for name, _ in query.projection]
+
+
+class Evaluation:
+    """การประมวลผล query/update หนึ่งครั้งบน TripleStore (ใช้ครั้งเดียวแล้วทิ้ง)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.graph = None       # None = default graph, นอกนั้นเป็น IRI term ของ named graph
+
+    # === Graph pattern ===
+
+    def group(self, elements, solutions):
+        """ประเมิน group โดยเริ่มจากชุดคำตอบ solutions (list ของ dict ชื่อตัวแปร → term)"""
+        filters = [element[1] for element in elements if element[0] == 'filter']
+        pending = []
+        for expr in filters:
+            pending.append((expr, expr_vars(expr)))
+        certain = set()
+
+        for element in elements:
+            if not solutions:
+                return solutions
+            kind = element[0]
+            if kind == 'filter':
+                continue
+            if kind == 'bgp':
+                solutions = self.bgp(element[1], solutions)
+                for triple in element[1]:
+                    certain.update(_triple_vars(triple))
+            elif kind == 'optional':
+                solutions = self.optional(element[1], solutions)
+            elif kind == 'union':
+                merged = []
+                for branch in element[1]:
+                    merged.extend(self.group(branch, solutions))
+                solutions = merged
+            elif kind == 'group':
+                solutions = self.group(element[1], solutions)
+            elif kind == 'bind':
+                solutions = self.bind(element[1], element[2], solutions)
+            elif kind == 'values':
+                solutions = self.join(solutions, self.values_rows(element))
+                certain.update(name for i, name in enumerate(element[1])
+                               if all(row[i] is not None for row in element[2]))
+            elif kind == 'graph':
+                solutions = self.graph_pattern(element[1], element[2], solutions)
+            elif kind == 'minus':
+                solutions = self.minus(element[1], solutions)
+            elif kind == 'subquery':
+                solutions = self.join(solutions, self.select_rows(element[1])[1])
+            # กรองทันทีถ้าตัวแปรของ FILTER ถูกผูกครบแล้ว (ค่าจะไม่เปลี่ยนใน element ถัดไป)
+            if pending:
+                ready = [item for item in pending if item[1] is not None and item[1] <= certain]
+                for item in ready:
+                    pending.remove(item)
+                    solutions = [mu for mu in solutions if self.test(item[0], mu)]
+
+        for expr, _ in pending:
+            solutions = [mu for mu in solutions if self.test(expr, mu)]
+        return solutions
+
+    def bgp(self, triples, solutions):
+        graph = self.store.graph(self.graph)
+        if graph is None:
+            return []
+        out = []
+        for mu in solutions:
+            self._match(graph, triples, mu, out)
+        return out
+
+    def _match(self, graph, patterns, mu, out):
+        if not patterns:
+            out.append(mu)
+            return
+        best = None
+        best_estimate = None
+        best_terms = None
+        for index, pattern in enumerate(patterns):
+            terms = [mu.get(term[1]) if term[0] == VAR else term for term in pattern]
+            estimate = graph.estimate(*terms)
+            if estimate == 0:
+                return
+            if best is None or estimate < best_estimate:
+                best, best_estimate, best_terms = index, estimate, terms
+        pattern = patterns[best]
+        rest = patterns[:best] + patterns[best + 1:]
+        free = [(position, term[1]) for position, term in enumerate(pattern)
+                if term[0] == VAR and best_terms[position] is None]
+        for triple in graph.triples(*best_terms):
+            extended = dict(mu)
+            for position, name in free:
+                value = triple[position]
+                bound = extended.get(name)
+                if bound is None:
+                    extended[name] = value
+                elif bound != value:
+                    # ตัวแปรเดียวกันสองตำแหน่งใน pattern เดียว เช่น ?x ?p ?x
+                    break
+            else:
+                self._match(graph, rest, extended, out)
+
+    def optional(self, elements, solutions):
+        out = []
+        for mu in solutions:
+            extended = self.group(elements, [mu])
+            if extended:
+                out.extend(extended)
+            else:
+                out.append(mu)
+        return out
+
+    def bind(self, expr, name, solutions):
+        out = []
+        for mu in solutions:
+            try:
+                value = self.expr(expr, mu)
+            except ExprError:
+                out.append(mu)
+                continue
+            extended = dict(mu)
+            extended[name] = value
+            out.append(extended)
+        return out
+
+    @staticmethod
+    def values_rows(element):
+        _, names, rows = element
+        return [{name: value for name, value in zip(names, row) if value is not None}
+                for row in rows]
+
+    def graph_pattern(self, name, elements, solutions):
+        previous = self.graph
+        out = []
+        try:
+            for mu in solutions:
+                if name[0] != VAR:
+                    self.graph = name
+                    out.extend(self.group(elements, [mu]))
+                    continue
+                bound = mu.get(name[1])
+                graphs = [bound] if bound is not None else self.store.graph_names()
+                for graph in graphs:
+                    self.graph = graph
+                    extended = dict(mu)
+                    extended[name[1]] = graph
+                    out.extend(self.group(elements, [extended]))
+        finally:
+            self.graph = previous
+        return out
+
+    def minus(self, elements, solutions):
+        removed = self.group(elements, [{}])
+        out = []
+        for mu in solutions:
+            for other in removed:
+                if set(mu) & set(other) and _compatible(mu, other):
+                    break
+            else:
+                out.append(mu)
+        return out
+
+    @staticmethod
+    def join(left, right):
+        """รวมคำตอบสองชุดที่ค่าไม่ขัดกัน (hash ด้วยตัวแปรที่ทุกแถวทางขวาผูกไว้)"""
+        if not right:
+            return []
+        keys = set(right[0])
+        for row in right[1:]:
+            keys &= set(row)
+        keys = sorted(keys)
+        index = {}
+        for row in right:
+            index.setdefault(tuple(row[name] for name in keys), []).append(row)
+        out = []
+        for mu in left:
+            if all(name in mu for name in keys):
+                candidates = index.get(tuple(mu[name] for name in keys), ())
+            else:
+                candidates = right
+            for row in candidates:
+                if _compatible(mu, row):
+                    merged = dict(mu)
+                    merged.update(row)
+                    out.append(merged)
+        return out
+
+    # === Expression ===
+
+    def test(self, expr, mu, group=None):
+        try:
+            return ebv(self.expr(expr, mu, group))
+        except ExprError:
+            return False
+
+    def expr(self, expr, mu, group=None):
+        kind = expr[0]
+        if kind == VAR:
+            value = mu.get(expr[1])
+            if value is None:
+                raise ExprError(f'?{expr[1]} ไม่ได้ผูกค่า')
+            return value
+        if kind in _TERM_KINDS:
+            return expr
+        if kind == '&&':
+            try:
+                left = ebv(self.expr(expr[1], mu, group))
+            except ExprError:
+                left = None
+            if left is False:
+                return boolean(False)
+            right = ebv(self.expr(expr[2], mu, group))
+            if not right:
+                return boolean(False)
+            if left is None:
+                raise ExprError('&& มีข้อผิดพลาด')
+            return boolean(True)
+        if kind == '||':
+            try:
+                left = ebv(self.expr(expr[1], mu, group))
+            except ExprError:
+                left = None
+            if left:
+                return boolean(True)
+            if ebv(self.expr(expr[2], mu, group)):
+                return boolean(True)
+            if left is None:
+                raise ExprError('|| มีข้อผิดพลาด')
+            return boolean(False)
+        if kind == '!':
+            return boolean(not ebv(self.expr(expr[1], mu, group)))
+        if kind in ('=', '!='):
+            equal = _equal(self.expr(expr[1], mu, group), self.expr(expr[2], mu, group))
+            return boolean(equal if kind == '=' else not equal)
+        if kind in ('<', '>', '<=', '>='):
+            x = self.expr(expr[1], mu, group)
+            y = self.expr(expr[2], mu, group)
+            if kind == '<':
+                return boolean(_less(x, y))
+            if kind == '>':
+                return boolean(_less(y, x))
+            if kind == '<=':
+                return boolean(not _less(y, x))
+            return boolean(not _less(x, y))
+        if kind in ('+', '-', '*', '/'):
+            return _arithmetic(kind, self.expr(expr[1], mu, group), self.expr(expr[2], mu, group))
+        if kind == 'neg':
+            return numeric(-_number(self.expr(expr[1], mu, group)))
+        if kind == 'pos':
+            return numeric(_number(self.expr(expr[1], mu, group)))
+        if kind == 'in':
+            value = self.expr(expr[1], mu, group)
+            error = False
+            for item in expr[2]:
+                try:
+                    if _equal(value, self.expr(item, mu, group)):
+                        return boolean(not expr[3])
+                except ExprError:
+                    error = True
+            if error:
+                raise ExprError('IN มีข้อผิดพลาด')
+            return boolean(expr[3])
+        if kind == 'call':
+            return self.call(expr[1], expr[2], mu, group)
+        if kind == 'cast':
+            return _cast(expr[1], self.expr(expr[2], mu, group))
+        if kind == 'agg':
+            if group is None:
+                raise ExprError('ใช้ aggregate นอก GROUP BY')
+            return self.aggregate(expr, group)
+        if kind == 'exists':
+            found = bool(self.group(expr[1], [mu]))
+            return boolean(found != expr[2])
+        raise QueryError(f'ไม่รองรับ expression {kind}')
+
+    def call(self, name, args, mu, group):
+        if name == 'BOUND':
+            return boolean(args[0][1] in mu)
+        if name == 'COALESCE':
+            for arg in args:
+                try:
+                    return self.expr(arg, mu, group)
+                except ExprError:
+                    continue
+            raise ExprError('COALESCE ไม่มีค่าที่ใช้ได้')
+        if name == 'IF':
+            condition = ebv(self.expr(args[0], mu, group))
+            return self.expr(args[1] if condition else args[2], mu, group)
+        if name == 'BNODE':
+            return fresh_bnode()
+        return FUNCTIONS[name]([self.expr(arg, mu, group) for arg in args])
+
+    def aggregate(self, expr, rows):
+        _, name, distinct, arg, separator = expr
+        if arg is None:
+            if distinct:
+                return numeric(len({tuple(sorted(row.items())) for row in rows}))
+            return numeric(len(rows))
+        values = []
+        for row in rows:
+            try:
+                values.append(self.expr(arg, row))
+            except ExprError:
+                continue
+        if distinct:
+            values = list(OrderedDict.fromkeys(values))
+        if name == 'COUNT':
+            return numeric(len(values))
+        if name == 'SAMPLE':
+            if not values:
+                raise ExprError('SAMPLE ของกลุ่มว่าง')
+            return values[0]
+        if name == 'GROUP_CONCAT':
+            sep = ' ' if separator is None else separator
+            return literal(sep.join(_string(value) for value in values))
+        if name in ('MIN', 'MAX'):
+            if not values:
+                raise ExprError(f'{name} ของกลุ่มว่าง')
+            pick = min if name == 'MIN' else max
+            return pick(values, key=sort_key)
+        total = 0
+        for value in values:
+            a, b = _promote(total, _number(value))
+            total = a + b
+        if name == 'SUM':
+            return numeric(total)
+        # AVG
+        if not values:
+            return numeric(0)
+        if isinstance(total, float):
+            return numeric(total / len(values))
+        return numeric(_divide(Decimal(total), Decimal(len(values))))
+
+    # === Query ===
+
+    def select_rows(self, query):
+        """ประเมิน SELECT → (ชื่อตัวแปร, list ของ dict) หลัง GROUP BY/ORDER BY/DISTINCT/LIMIT"""
+        solutions = self.group(query.where, [{}])
+        if query.values is not None:
+            solutions = self.join(solutions, self.values_rows(query.values))
+        projection = query.projection or []
+
+        aggregated = query.group_by is not None or any(
+            has_aggregate(expr) for _, expr in projection) or any(
+            has_aggregate(expr) for expr in query.having) or any(
+            has_aggregate(expr) for expr, _ in query.order_by)
+
+        if aggregated:
+            rows = []
+            for binding, members in self._groups(query, solutions):
+                if not all(self.test(expr, binding, members) for expr in query.having):
+                    continue
+                row = dict(binding)
+                for name, expr in projection:
+                    if expr is not None:
+                        try:
+                            row[name] = self.expr(expr, row, members)
+                        except ExprError:
+                            pass
+                rows.append((row, members))
+        else:
+            rows = []
+            for mu in solutions:
+                for name, expr in projection:
+                    if expr is not None:
+                        try:
+                            value = self.expr(expr, mu)
+                        except ExprError:
+                            continue
+                        mu = dict(mu)
+                        mu[name] = value
+                rows.append((mu, None))
+
+        for expr, descending in reversed(query.order_by):
+            rows.sort(key=lambda item: self._order_value(expr, item), reverse=descending)
+
+        names = projected_vars(query)
+        if query.projection is not None or aggregated:
+            results = [{name: row[name] for name in names if name in row} for row, _ in rows]
+        else:
+            results = [row for row, _ in rows]
+        if query.distinct or query.reduced:
+            unique = OrderedDict()
+            for row in results:
+                unique.setdefault(tuple(row.get(name) for name in names), row)
+            results = list(unique.values())
+        if query.offset:
+            results = results[query.offset:]
+        if query.limit is not None:
+            results = results[:query.limit]
+        return names, results
+
+    def _order_value(self, expr, item):
+        row, members = item
+        try:
+            return sort_key(self.expr(expr, row, members))
+        except ExprError:
+            return sort_key(None)
+
+    def _groups(self, query, solutions):
+        if not query.group_by:
+            # aggregate โดยไม่มี GROUP BY = กลุ่มเดียว (มีแถวเดียวแม้ไม่มีคำตอบ)
+            return [({}, solutions)]
+        groups = OrderedDict()
+        for mu in solutions:
+            key = []
+            for expr, _ in query.group_by:
+                try:
+                    key.append(self.expr(expr, mu))
+                except ExprError:
+                    key.append(None)
+            key = tuple(key)
+            entry = groups.get(key)
+            if entry is None:
+                binding = {}
+                for value, (expr, alias) in zip(key, query.group_by):
+                    name = alias or (expr[1] if expr[0] == VAR else None)
+                    if name is not None and value is not None:
+                        binding[name] = value
+                entry = groups[key] = (binding, [])
+            entry[1].append(mu)
+        return list(groups.values())
+
+    def construct(self, query):
+        """CONSTRUCT → graph RDF/JSON (triple ซ้ำรวมเป็นตัวเดียว)"""
+        _, solutions = self.select_rows(query)
+        graph = OrderedDict()
+        seen = set()
+        for mu in solutions:
+            bnodes = {}
+            for triple in query.template:
+                terms = self._instantiate(triple, mu, bnodes)
+                if terms is None or terms in seen:
+                    continue
+                seen.add(terms)
+                s, p, o = terms
+                graph.setdefault(subject_key(s), OrderedDict()).setdefault(p[1], []).append(
+                    to_rdf_json(o))
+        return graph
+
+    @staticmethod
+    def _instantiate(pattern, mu, bnodes):
+        """แทนค่าตัวแปรใน template (คืน None ถ้ามีตัวแปรไม่ผูกค่า หรือได้ triple ที่ไม่ถูกต้อง)"""
+        terms = []
+        for term in pattern:
+            if term[0] == VAR:
+                term = mu.get(term[1])
+                if term is None:
+                    return None
+            elif term[0] == BNODE:
+                term = bnodes.setdefault(term[1], fresh_bnode())
+            terms.append(term)
+        if terms[0][0] == LITERAL or terms[1][0] != URI:
+            return None
+        return tuple(terms)
+
+    def describe(self, query):
+        resources = []
+        names, rows = self.select_rows(query) if query.where else ([], [{}])
+        targets = query.describe if query.describe is not None else [(VAR, name) for name in names]
+        for row in rows:
+            for target in targets:
+                term = row.get(target[1]) if target[0] == VAR else target
+                if term is not None and term[0] != LITERAL and term not in resources:
+                    resources.append(term)
+        graph = OrderedDict()
+        for resource in resources:
+            for s, p, o in self.store.triples(resource, None, None):
+                graph.setdefault(subject_key(s), OrderedDict()).setdefault(p[1], []).append(
+                    to_rdf_json(o))
+        return graph
+
+
+class SparqlEngine:
+    """จุดเข้าใช้งาน: query()/update()/explain() บน TripleStore หนึ่งชุด
+
+    ไม่มี lock ในตัว — ผู้เรียกต้องไม่ให้ update ทำงานพร้อมกับ query อื่น
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def query(self, text):
+        """ประมวลผล query → (รูปแบบผลลัพธ์, ข้อมูล)
+
+        SELECT/ASK → ('results', SPARQL JSON results), CONSTRUCT/DESCRIBE → ('graph', RDF/JSON)
+        """
+        query = parse_query_cached(text)
+        evaluation = Evaluation(self.store)
+        if query.form == 'SELECT':
+            names, rows = evaluation.select_rows(query)
+            return 'results', {
+                'head': {'vars': names},
+                'results': {'bindings': [
+                    {name: to_sparql_json(value) for name, value in row.items()
+                     if not name.startswith('_:')}
+                    for row in rows]},
+            }
+        if query.form == 'ASK':
+            query.limit = 1 if query.limit is None else query.limit
+            return 'results', {'head': {}, 'boolean': bool(evaluation.select_rows(query)[1])}
+        if query.form == 'CONSTRUCT':
+            return 'graph', evaluation.construct(query)
+        return 'graph', evaluation.describe(query)
+
+    def update(self, text):
+        """ประมวลผล update ทุกคำสั่งตามลำดับ คืนจำนวน triple ที่เพิ่มและลบ"""
+        update = parse_update_cached(text)
+        store = self.store
+        inserted = deleted = 0
+        for operation in update.operations:
+            kind = operation[0]
+            if kind == 'insert_data':
+                bnodes = {}
+                for quad in operation[1]:
+                    s, p, o = self._ground(quad[:3], bnodes)
+                    inserted += store.add(s, p, o, quad[3])
+            elif kind == 'delete_data':
+                for s, p, o, graph in operation[1]:
+                    deleted += store.remove(s, p, o, graph)
+            elif kind == 'modify':
+                _, delete_quads, insert_quads, where = operation
+                evaluation = Evaluation(store)
+                solutions = evaluation.group(where, [{}])
+                removals, additions = [], []
+                for mu in solutions:
+                    removals.extend(self._quads(delete_quads, mu, {}))
+                    additions.extend(self._quads(insert_quads, mu, {}))
+                for s, p, o, graph in removals:
+                    deleted += store.remove(s, p, o, graph)
+                for s, p, o, graph in additions:
+                    inserted += store.add(s, p, o, graph)
+            elif kind == 'clear':
+                store.clear(operation[1])
+        return {'inserted': inserted, 'deleted': deleted}
+
+    @staticmethod
+    def _ground(triple, bnodes):
+        return tuple(bnodes.setdefault(term[1], fresh_bnode()) if term[0] == BNODE else term
+                     for term in triple)
+
+    @staticmethod
+    def _quads(quads, mu, bnodes):
+        for s, p, o, graph in quads:
+            terms = Evaluation._instantiate((s, p, o), mu, bnodes)
+            if terms is None:
+                continue
+            if graph is not None and graph[0] == VAR:
+                graph = mu.get(graph[1])
+                if graph is None:
+                    continue
+            yield terms + (graph,)
+
+    def explain(self, text):
+        """โครงสร้างของ query ที่แปลงแล้ว (แทน algebra ของ ARQ)"""
+        query = parse_query_cached(text)
+        return {'form': query.form, 'algebra': format_query(query)}
@@ -0,0 +1,165 @@
+# ตัวแยก token ที่ใช้ร่วมกันระหว่าง Turtle และ SPARQL (ทั้งสองภาษาใช้ IRI, prefixed name, literal ชุดเดียวกัน)
+import re
+
+
+class SyntaxErrorAt(ValueError):
+    """ข้อความผิดไวยากรณ์ พร้อมตำแหน่ง (บรรทัด) ที่พบ"""
+
+    def __init__(self, message, text=None, pos=None):
+        if text is not None and pos is not None:
+            line = text.count('\n', 0, pos) + 1
+            message = f'{message} (บรรทัด {line})'
+        super().__init__(message)
+
+
+# ชนิดของ token
+IRI = 'IRI'
+PNAME = 'PNAME'
+BNODE = 'BNODE'
+VAR = 'VAR'
+STRING = 'STRING'
+LANGTAG = 'LANGTAG'
+INTEGER = 'INTEGER'
+DECIMAL = 'DECIMAL'
+DOUBLE = 'DOUBLE'
+NAME = 'NAME'
+PUNCT = 'PUNCT'
+EOF = 'EOF'
+
+_LOCAL_CHAR = r"(?:[\w\-:%]|\\[_~.\-!$&'()*+,;=/?#@%])"
+
+_TOKEN = re.compile(r'''
+    (?P<ws>(?:\s+|\#[^\n]*)+)
+  | <(?P<iri>[^<>"{}|^`\\\x00-\x20]*)>
+  | (?P<long>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\')
+  | (?P<string>"(?:[^"\\\n\r]|\\.)*"|'(?:[^'\\\n\r]|\\.)*')
+  | @(?P<langtag>[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | [?$](?P<var>\w+)
+  | _:(?P<bnode>(?:[\w\-]|\.(?=[\w\-]))+)
+  | (?P<double>(?:\d+\.\d*|\.\d+|\d+)[eE][+-]?\d+)
+  | (?P<decimal>\d*\.\d+)
+  | (?P<integer>\d+)
+  | (?P<pname>(?:[A-Za-z](?:[\w\-.]*[\w\-])?)?:(?:''' + _LOCAL_CHAR + r'''|\.(?=''' + _LOCAL_CHAR + r'''))*)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<punct>\^\^|&&|\|\||!=|<=|>=|[{}()\[\];,.=<>!+\-*/|^])
+''', re.VERBOSE)
+
+_ESCAPES = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f',
+            '"': '"', "'": "'", '\\': '\\'}
+_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))', re.DOTALL)
+_LOCAL_ESCAPE = re.compile(r"\\([_~.\-!$&'()*+,;=/?#@%])")
+
+
+def _unescape(match):
+    code = match.group(1) or match.group(2)
+    if code:
+        return chr(int(code, 16))
+    char = match.group(3)
+    if char not in _ESCAPES:
+        raise ValueError(f'escape ไม่ถูกต้อง: \\{char}')
+    return _ESCAPES[char]
+
+
+def unescape_string(body):
+    return _ESCAPE.sub(_unescape, body) if '\\' in body else body
+
+
+class Token:
+    __slots__ = ('kind', 'value', 'pos')
+
+    def __init__(self, kind, value, pos):
+        self.kind = kind
+        self.value = value
+        self.pos = pos
+
+    def __repr__(self):
+        return f'{self.kind}({self.value!r})'
+
+
+def tokenize(text):
+    """แยก text เป็น list ของ Token (ปิดท้ายด้วย EOF)
+
+    ค่าของ token: STRING = ข้อความที่ถอด escape แล้ว, PNAME = (prefix, local), VAR = ชื่อไม่มี ?,
+    NAME = คำเปล่า (keyword, ชื่อฟังก์ชัน, a, true/false)
+    """
+    tokens = []
+    pos = 0
+    length = len(text)
+    match = _TOKEN.match
+    while pos < length:
+        m = match(text, pos)
+        if m is None:
+            raise SyntaxErrorAt(f'อักขระที่ไม่รู้จัก {text[pos]!r}', text, pos)
+        kind = m.lastgroup
+        if kind != 'ws':
+            value = m.group(kind)
+            try:
+                if kind == 'long':
+                    tokens.append(Token(STRING, unescape_string(value[3:-3]), pos))
+                elif kind == 'string':
+                    tokens.append(Token(STRING, unescape_string(value[1:-1]), pos))
+                elif kind == 'pname':
+                    prefix, _, local = value.partition(':')
+                    tokens.append(Token(PNAME, (prefix, _LOCAL_ESCAPE.sub(r'\1', local)), pos))
+                elif kind == 'iri':
+                    tokens.append(Token(IRI, unescape_string(value), pos))
+                else:
+                    tokens.append(Token(kind.upper(), value, pos))
+            except ValueError as e:
+                raise SyntaxErrorAt(str(e), text, pos)
+        pos = m.end()
+    tokens.append(Token(EOF, None, length))
+    return tokens
+
+
+class TokenStream:
+    """ตัวอ่าน token แบบมอง token ถัดไปได้ (ใช้ร่วมกันใน parser ของ Turtle และ SPARQL)"""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self, offset=0):
+        index = min(self.index + offset, len(self.tokens) - 1)
+        return self.tokens[index]
+
+    def next(self):
+        token = self.tokens[self.index]
+        if token.kind != EOF:
+            self.index += 1
+        return token
+
+    def error(self, message, token=None):
+        token = token or self.peek()
+        return SyntaxErrorAt(message, self.text, token.pos)
+
+    def at_punct(self, *values):
+        token = self.peek()
+        return token.kind == PUNCT and token.value in values
+
+    def at_keyword(self, *words):
+        token = self.peek()
+        return token.kind == NAME and token.value.upper() in words
+
+    def accept_punct(self, value):
+        if self.at_punct(value):
+            return self.next()
+        return None
+
+    def accept_keyword(self, word):
+        if self.at_keyword(word):
+            return self.next()
+        return None
+
+    def expect_punct(self, value):
+        token = self.next()
+        if token.kind != PUNCT or token.value != value:
+            raise self.error(f"ต้องการ '{value}' แต่พบ {token.value!r}", token)
+        return token
+
+    def expect_keyword(self, word):
+        token = self.next()
+        if token.kind != NAME or token.value.upper() != word:
+            raise self.error(f"ต้องการ {word} แต่พบ {token.value!r}", token)
+        return token
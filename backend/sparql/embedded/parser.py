@@ -0,0 +1,860 @@
+# ตัวแปลง SPARQL 1.1 (ส่วนที่ระบบนี้ใช้) เป็นโครงสร้าง tuple สำหรับ sparql/embedded/engine.py
+#
+# pattern ของ WHERE เป็น list ของ element:
+#   ('bgp', [(s, p, o), ...])        ('optional', group)        ('union', [group, ...])
+#   ('filter', expr)                 ('bind', expr, ชื่อตัวแปร)   ('values', [ชื่อ...], [[term|None, ...], ...])
+#   ('graph', term|var, group)       ('minus', group)           ('group', group)
+#   ('subquery', Query)
+# ตำแหน่งใน triple และ expression เป็น RDF term (ดู rdf.py) หรือ ('var', ชื่อ)
+# expression อื่นเป็น tuple ที่ขึ้นต้นด้วยชื่อ operator เช่น ('&&', a, b), ('call', 'LCASE', [args]),
+# ('agg', 'COUNT', distinct, arg หรือ None (= *), separator), ('exists', group, negated)
+#
+# ไม่รองรับ: property path, FROM/FROM NAMED, SERVICE, LOAD
+from sparql.embedded import lexer
+from sparql.embedded.lexer import TokenStream
+from sparql.embedded.rdf import RDF_TYPE, RDF_FIRST, RDF_REST, RDF_NIL, XSD, to_ntriples
+from sparql.embedded.turtle import TermReader
+
+VAR = 'var'
+
+AGGREGATES = {'COUNT', 'SUM', 'MIN', 'MAX', 'AVG', 'SAMPLE', 'GROUP_CONCAT'}
+
+# ฟังก์ชันในตัว → (จำนวน argument ต่ำสุด, สูงสุด) None = ไม่จำกัด
+BUILTINS = {
+    'STR': (1, 1), 'LANG': (1, 1), 'LANGMATCHES': (2, 2), 'DATATYPE': (1, 1), 'BOUND': (1, 1),
+    'IRI': (1, 1), 'URI': (1, 1), 'BNODE': (0, 1), 'ABS': (1, 1), 'CEIL': (1, 1),
+    'FLOOR': (1, 1), 'ROUND': (1, 1), 'CONCAT': (0, None), 'STRLEN': (1, 1), 'UCASE': (1, 1),
+    'LCASE': (1, 1), 'ENCODE_FOR_URI': (1, 1), 'CONTAINS': (2, 2), 'STRSTARTS': (2, 2),
+    'STRENDS': (2, 2), 'STRBEFORE': (2, 2), 'STRAFTER': (2, 2), 'COALESCE': (0, None),
+    'IF': (3, 3), 'STRLANG': (2, 2), 'STRDT': (2, 2), 'SAMETERM': (2, 2), 'ISIRI': (1, 1),
+    'ISURI': (1, 1), 'ISBLANK': (1, 1), 'ISLITERAL': (1, 1), 'ISNUMERIC': (1, 1),
+    'REGEX': (2, 3), 'SUBSTR': (2, 3), 'REPLACE': (3, 4),
+}
+
+# การแปลงชนิด เช่น xsd:decimal(?x)
+CASTS = {XSD + name for name in ('string', 'integer', 'decimal', 'double', 'float', 'boolean')}
+
+_RELATIONAL = ('=', '!=', '<', '>', '<=', '>=')
+
+
+class Query:
+    """SELECT / CONSTRUCT / ASK / DESCRIBE ที่แปลงแล้ว"""
+
+    __slots__ = ('form', 'projection', 'distinct', 'reduced', 'template', 'describe', 'where',
+                 'group_by', 'having', 'order_by', 'limit', 'offset', 'values')
+
+    def __init__(self, form):
+        self.form = form
+        self.projection = None      # [(ชื่อตัวแปร, expr หรือ None)] หรือ None = SELECT *
+        self.distinct = False
+        self.reduced = False
+        self.template = None        # CONSTRUCT: [(s, p, o)]
+        self.describe = None        # DESCRIBE: [term|var] หรือ None = *
+        self.where = []
+        self.group_by = None        # [(expr, ชื่อตัวแปร หรือ None)]
+        self.having = []
+        self.order_by = []          # [(expr, descending)]
+        self.limit = None
+        self.offset = 0
+        self.values = None          # ('values', vars, rows) ท้าย query
+
+
+class Update:
+    """ลำดับของคำสั่ง update (คั่นด้วย ;)
+
+    operation: ('insert_data', quads) / ('delete_data', quads) /
+               ('modify', delete_quads, insert_quads, where) / ('clear', target)
+    quad = (s, p, o, graph) — graph เป็น None (default graph), term หรือ var
+    """
+
+    __slots__ = ('operations',)
+
+    def __init__(self, operations):
+        self.operations = operations
+
+
+def is_var(node):
+    return node[0] == VAR
+
+
+class SparqlParser(TermReader):
+
+    def __init__(self, text):
+        super().__init__(TokenStream(text))
+        self._anon = 0
+        self._in_data = False
+
+    # === ส่วนร่วม ===
+
+    def _prologue(self):
+        stream = self.stream
+        while True:
+            if stream.accept_keyword('PREFIX'):
+                token = stream.next()
+                if token.kind != lexer.PNAME or token.value[1]:
+                    raise stream.error('ต้องการชื่อ prefix เช่น sce:', token)
+                target = stream.next()
+                if target.kind != lexer.IRI:
+                    raise stream.error('ต้องการ IRI ของ prefix', target)
+                self.prefixes[token.value[0]] = target.value
+            elif stream.accept_keyword('BASE'):
+                target = stream.next()
+                if target.kind != lexer.IRI:
+                    raise stream.error('ต้องการ IRI ของ base', target)
+                self.base = target.value
+            else:
+                return
+
+    def _anon_var(self):
+        """blank node ใน pattern ทำหน้าที่เหมือนตัวแปรที่ไม่แสดงผล"""
+        self._anon += 1
+        return (VAR, f'_:anon{self._anon}')
+
+    def _var(self):
+        token = self.stream.next()
+        if token.kind != lexer.VAR:
+            raise self.stream.error(f'ต้องการตัวแปร แต่พบ {token.value!r}', token)
+        return token.value
+
+    def _integer(self):
+        token = self.stream.next()
+        if token.kind != lexer.INTEGER:
+            raise self.stream.error(f'ต้องการจำนวนเต็ม แต่พบ {token.value!r}', token)
+        return int(token.value)
+
+    # === Query ===
+
+    def parse_query(self):
+        stream = self.stream
+        self._prologue()
+        token = stream.peek()
+        form = token.value.upper() if token.kind == lexer.NAME else None
+        if form == 'SELECT':
+            query = self._select()
+        elif form == 'CONSTRUCT':
+            query = self._construct()
+        elif form == 'ASK':
+            stream.next()
+            query = Query('ASK')
+            self._dataset_clause()
+            stream.accept_keyword('WHERE')
+            query.where = self._group()
+            self._modifiers(query)
+        elif form == 'DESCRIBE':
+            query = self._describe()
+        else:
+            raise stream.error(f'ต้องการ SELECT/CONSTRUCT/ASK/DESCRIBE แต่พบ {token.value!r}')
+        if stream.accept_keyword('VALUES'):
+            query.values = self._data_block()
+        if stream.peek().kind != lexer.EOF:
+            raise stream.error(f'ข้อความเกินหลังจบ query: {stream.peek().value!r}')
+        return query
+
+    def _dataset_clause(self):
+        if self.stream.at_keyword('FROM'):
+            raise self.stream.error('embedded backend ไม่รองรับ FROM / FROM NAMED')
+
+    def _select(self, subquery=False):
+        stream = self.stream
+        stream.expect_keyword('SELECT')
+        query = Query('SELECT')
+        if stream.accept_keyword('DISTINCT'):
+            query.distinct = True
+        elif stream.accept_keyword('REDUCED'):
+            query.reduced = True
+        if stream.accept_punct('*'):
+            query.projection = None
+        else:
+            query.projection = []
+            while True:
+                token = stream.peek()
+                if token.kind == lexer.VAR:
+                    query.projection.append((stream.next().value, None))
+                elif token.kind == lexer.PUNCT and token.value == '(':
+                    stream.next()
+                    expr = self._expression()
+                    stream.expect_keyword('AS')
+                    query.projection.append((self._var(), expr))
+                    stream.expect_punct(')')
+                else:
+                    break
+            if not query.projection:
+                raise stream.error('SELECT ต้องมีตัวแปรอย่างน้อยหนึ่งตัว')
+        if not subquery:
+            self._dataset_clause()
+        stream.accept_keyword('WHERE')
+        query.where = self._group()
+        self._modifiers(query)
+        if subquery and stream.accept_keyword('VALUES'):
+            query.values = self._data_block()
+        return query
+
+    def _construct(self):
+        stream = self.stream
+        stream.expect_keyword('CONSTRUCT')
+        query = Query('CONSTRUCT')
+        if stream.at_keyword('WHERE'):
+            # CONSTRUCT WHERE { triples } — template = pattern
+            stream.next()
+            stream.expect_punct('{')
+            triples = self._triples_block_until('}')
+            stream.expect_punct('}')
+            query.template = triples
+            query.where = [('bgp', triples)] if triples else []
+        else:
+            stream.expect_punct('{')
+            query.template = self._template_triples()
+            self._dataset_clause()
+            stream.accept_keyword('WHERE')
+            query.where = self._group()
+        self._modifiers(query)
+        return query
+
+    def _describe(self):
+        stream = self.stream
+        stream.expect_keyword('DESCRIBE')
+        query = Query('DESCRIBE')
+        if stream.accept_punct('*'):
+            query.describe = None
+        else:
+            query.describe = []
+            while stream.peek().kind in (lexer.VAR, lexer.IRI, lexer.PNAME):
+                token = stream.next()
+                query.describe.append((VAR, token.value) if token.kind == lexer.VAR
+                                      else self.iri_token(token))
+        self._dataset_clause()
+        if stream.accept_keyword('WHERE') or stream.at_punct('{'):
+            query.where = self._group()
+        self._modifiers(query)
+        return query
+
+    def _template_triples(self):
+        """triple ใน { } ของ CONSTRUCT (blank node คงเป็น blank node — สร้างใหม่ทุกแถวตอนใช้)"""
+        stream = self.stream
+        previous, self._in_data = self._in_data, True
+        try:
+            triples = self._triples_block_until('}')
+        finally:
+            self._in_data = previous
+        stream.expect_punct('}')
+        return triples
+
+    def _modifiers(self, query):
+        stream = self.stream
+        if stream.at_keyword('GROUP'):
+            stream.next()
+            stream.expect_keyword('BY')
+            query.group_by = []
+            while True:
+                token = stream.peek()
+                if token.kind == lexer.VAR:
+                    stream.next()
+                    query.group_by.append(((VAR, token.value), None))
+                elif token.kind == lexer.PUNCT and token.value == '(':
+                    stream.next()
+                    expr = self._expression()
+                    alias = self._var() if stream.accept_keyword('AS') else None
+                    stream.expect_punct(')')
+                    query.group_by.append((expr, alias))
+                elif token.kind == lexer.NAME and token.value.upper() in BUILTINS:
+                    query.group_by.append((self._primary(), None))
+                else:
+                    break
+            if not query.group_by:
+                raise stream.error('GROUP BY ต้องมีอย่างน้อยหนึ่งรายการ')
+        if stream.accept_keyword('HAVING'):
+            query.having.append(self._constraint())
+            while stream.at_punct('(') or self._at_builtin():
+                query.having.append(self._constraint())
+        if stream.at_keyword('ORDER'):
+            stream.next()
+            stream.expect_keyword('BY')
+            while True:
+                token = stream.peek()
+                if token.kind == lexer.NAME and token.value.upper() in ('ASC', 'DESC'):
+                    stream.next()
+                    descending = token.value.upper() == 'DESC'
+                    stream.expect_punct('(')
+                    expr = self._expression()
+                    stream.expect_punct(')')
+                    query.order_by.append((expr, descending))
+                elif token.kind == lexer.VAR:
+                    stream.next()
+                    query.order_by.append(((VAR, token.value), False))
+                elif token.kind == lexer.PUNCT and token.value == '(' or self._at_builtin():
+                    query.order_by.append((self._constraint(), False))
+                else:
+                    break
+            if not query.order_by:
+                raise stream.error('ORDER BY ต้องมีอย่างน้อยหนึ่งรายการ')
+        while stream.at_keyword('LIMIT', 'OFFSET'):
+            if stream.next().value.upper() == 'LIMIT':
+                query.limit = self._integer()
+            else:
+                query.offset = self._integer()
+
+    def _at_builtin(self):
+        token = self.stream.peek()
+        return token.kind == lexer.NAME and (
+            token.value.upper() in BUILTINS or token.value.upper() in AGGREGATES
+            or token.value.upper() in ('EXISTS', 'NOT'))
+
+    # === Graph pattern ===
+
+    def _group(self):
+        """{ ... } → list ของ element"""
+        stream = self.stream
+        stream.expect_punct('{')
+        if stream.at_keyword('SELECT'):
+            query = self._select(subquery=True)
+            stream.expect_punct('}')
+            return [('subquery', query)]
+
+        elements = []
+
+        def add_triples(triples):
+            if elements and elements[-1][0] == 'bgp':
+                elements[-1][1].extend(triples)
+            else:
+                elements.append(('bgp', triples))
+
+        while not stream.accept_punct('}'):
+            token = stream.peek()
+            keyword = token.value.upper() if token.kind == lexer.NAME else None
+            if keyword == 'OPTIONAL':
+                stream.next()
+                elements.append(('optional', self._group()))
+            elif keyword == 'MINUS':
+                stream.next()
+                elements.append(('minus', self._group()))
+            elif keyword == 'GRAPH':
+                stream.next()
+                name = self._var_or_iri()
+                elements.append(('graph', name, self._group()))
+            elif keyword == 'FILTER':
+                stream.next()
+                elements.append(('filter', self._constraint()))
+            elif keyword == 'BIND':
+                stream.next()
+                stream.expect_punct('(')
+                expr = self._expression()
+                stream.expect_keyword('AS')
+                name = self._var()
+                stream.expect_punct(')')
+                elements.append(('bind', expr, name))
+            elif keyword == 'VALUES':
+                stream.next()
+                elements.append(self._data_block())
+            elif keyword == 'SERVICE':
+                raise stream.error('embedded backend ไม่รองรับ SERVICE')
+            elif token.kind == lexer.PUNCT and token.value == '{':
+                groups = [self._group()]
+                while stream.accept_keyword('UNION'):
+                    groups.append(self._group())
+                elements.append(('union', groups) if len(groups) > 1 else ('group', groups[0]))
+            elif token.kind == lexer.EOF:
+                raise stream.error("ต้องการ '}' ก่อนจบ query")
+            else:
+                add_triples(self._triples_same_subject())
+                if not stream.accept_punct('.'):
+                    if not stream.at_punct('}') and not self._at_pattern_keyword():
+                        raise stream.error(f"ต้องการ '.' หรือ '}}' แต่พบ {stream.peek().value!r}")
+                continue
+            stream.accept_punct('.')
+        return elements
+
+    def _at_pattern_keyword(self):
+        return self.stream.at_keyword('OPTIONAL', 'MINUS', 'GRAPH', 'FILTER', 'BIND', 'VALUES',
+                                      'SERVICE') or self.stream.at_punct('{')
+
+    def _data_block(self):
+        """VALUES ?x { ... } หรือ VALUES (?x ?y) { (...) ... }"""
+        stream = self.stream
+        if stream.peek().kind == lexer.VAR:
+            names = [stream.next().value]
+            stream.expect_punct('{')
+            rows = []
+            while not stream.accept_punct('}'):
+                rows.append([self._data_value()])
+            return ('values', names, rows)
+        stream.expect_punct('(')
+        names = []
+        while not stream.accept_punct(')'):
+            names.append(self._var())
+        stream.expect_punct('{')
+        rows = []
+        while not stream.accept_punct('}'):
+            stream.expect_punct('(')
+            row = []
+            while not stream.accept_punct(')'):
+                row.append(self._data_value())
+            if len(row) != len(names):
+                raise stream.error('จำนวนค่าใน VALUES ไม่ตรงกับจำนวนตัวแปร')
+            rows.append(row)
+        return ('values', names, rows)
+
+    def _data_value(self):
+        stream = self.stream
+        token = stream.next()
+        if token.kind == lexer.NAME and token.value.upper() == 'UNDEF':
+            return None
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            return self.iri_token(token)
+        term = self.literal_token(token)
+        if term is None:
+            raise stream.error(f'ค่าใน VALUES ไม่ถูกต้อง: {token.value!r}', token)
+        return term
+
+    def _var_or_iri(self):
+        token = self.stream.next()
+        if token.kind == lexer.VAR:
+            return (VAR, token.value)
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            return self.iri_token(token)
+        raise self.stream.error(f'ต้องการตัวแปรหรือ IRI แต่พบ {token.value!r}', token)
+
+    # === Triples ===
+
+    def _triples_block_until(self, closing):
+        triples = []
+        stream = self.stream
+        while not stream.at_punct(closing):
+            triples.extend(self._triples_same_subject())
+            if not stream.accept_punct('.'):
+                break
+        return triples
+
+    def _triples_same_subject(self):
+        triples = []
+        stream = self.stream
+        if stream.at_punct('['):
+            subject = self._blank_node_property_list(triples)
+            if stream.at_punct('.', '}') or self._at_pattern_keyword():
+                return triples
+        else:
+            subject = self._graph_node(triples)
+        self._property_list(subject, triples)
+        return triples
+
+    def _property_list(self, subject, triples):
+        stream = self.stream
+        while True:
+            predicate = self._verb()
+            while True:
+                triples.append((subject, predicate, self._graph_node(triples)))
+                if not stream.accept_punct(','):
+                    break
+            if not stream.accept_punct(';'):
+                return
+            while stream.accept_punct(';'):
+                pass
+            if stream.at_punct('.', '}', ']') or self._at_pattern_keyword():
+                return
+
+    def _verb(self):
+        token = self.stream.next()
+        if token.kind == lexer.NAME and token.value == 'a':
+            return RDF_TYPE
+        if token.kind == lexer.VAR:
+            return (VAR, token.value)
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            predicate = self.iri_token(token)
+            if self.stream.at_punct('/', '|', '*', '+', '?', '^'):
+                raise self.stream.error('embedded backend ไม่รองรับ property path')
+            return predicate
+        if token.kind == lexer.PUNCT and token.value in ('^', '(', '!'):
+            raise self.stream.error('embedded backend ไม่รองรับ property path', token)
+        raise self.stream.error(f'predicate ไม่ถูกต้อง: {token.value!r}', token)
+
+    def _graph_node(self, triples):
+        stream = self.stream
+        if stream.at_punct('['):
+            return self._blank_node_property_list(triples)
+        token = stream.next()
+        if token.kind == lexer.VAR:
+            return (VAR, token.value)
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            return self.iri_token(token)
+        if token.kind == lexer.BNODE:
+            if self._in_data:
+                return self.labelled_bnode(token.value)
+            return (VAR, f'_:{token.value}')
+        if token.kind == lexer.PUNCT and token.value == '(':
+            items = []
+            while not stream.accept_punct(')'):
+                items.append(self._graph_node(triples))
+            head = RDF_NIL
+            for item in reversed(items):
+                node = self._new_node()
+                triples.append((node, RDF_FIRST, item))
+                triples.append((node, RDF_REST, head))
+                head = node
+            return head
+        term = self.literal_token(token)
+        if term is None:
+            raise stream.error(f'term ไม่ถูกต้อง: {token.value!r}', token)
+        return term
+
+    def _new_node(self):
+        return self.new_bnode() if self._in_data else self._anon_var()
+
+    def _blank_node_property_list(self, triples):
+        stream = self.stream
+        stream.expect_punct('[')
+        node = self._new_node()
+        if not stream.accept_punct(']'):
+            self._property_list(node, triples)
+            stream.expect_punct(']')
+        return node
+
+    # === Expression ===
+
+    def _constraint(self):
+        """FILTER / HAVING / ORDER BY: (expr) หรือการเรียกฟังก์ชัน"""
+        if self.stream.at_punct('('):
+            self.stream.next()
+            expr = self._expression()
+            self.stream.expect_punct(')')
+            return expr
+        return self._primary()
+
+    def _expression(self):
+        stream = self.stream
+        expr = self._and()
+        while stream.accept_punct('||'):
+            expr = ('||', expr, self._and())
+        return expr
+
+    def _and(self):
+        stream = self.stream
+        expr = self._relational()
+        while stream.accept_punct('&&'):
+            expr = ('&&', expr, self._relational())
+        return expr
+
+    def _relational(self):
+        stream = self.stream
+        expr = self._additive()
+        token = stream.peek()
+        if token.kind == lexer.PUNCT and token.value in _RELATIONAL:
+            stream.next()
+            return (token.value, expr, self._additive())
+        negated = False
+        if stream.at_keyword('NOT') and stream.peek(1).kind == lexer.NAME \
+                and stream.peek(1).value.upper() == 'IN':
+            stream.next()
+            negated = True
+        if stream.accept_keyword('IN'):
+            return ('in', expr, self._expression_list(), negated)
+        if negated:
+            raise stream.error('ต้องการ IN หลัง NOT')
+        return expr
+
+    def _expression_list(self):
+        stream = self.stream
+        stream.expect_punct('(')
+        items = []
+        if stream.accept_punct(')'):
+            return items
+        while True:
+            items.append(self._expression())
+            if stream.accept_punct(')'):
+                return items
+            stream.expect_punct(',')
+
+    def _additive(self):
+        stream = self.stream
+        expr = self._multiplicative()
+        while stream.at_punct('+', '-'):
+            op = stream.next().value
+            expr = (op, expr, self._multiplicative())
+        return expr
+
+    def _multiplicative(self):
+        stream = self.stream
+        expr = self._unary()
+        while stream.at_punct('*', '/'):
+            op = stream.next().value
+            expr = (op, expr, self._unary())
+        return expr
+
+    def _unary(self):
+        stream = self.stream
+        if stream.accept_punct('!'):
+            return ('!', self._primary())
+        if stream.accept_punct('-'):
+            return ('neg', self._primary())
+        if stream.accept_punct('+'):
+            return ('pos', self._primary())
+        return self._primary()
+
+    def _primary(self):
+        stream = self.stream
+        token = stream.peek()
+        if token.kind == lexer.PUNCT and token.value == '(':
+            stream.next()
+            expr = self._expression()
+            stream.expect_punct(')')
+            return expr
+        if token.kind == lexer.VAR:
+            stream.next()
+            return (VAR, token.value)
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            stream.next()
+            term = self.iri_token(token)
+            if stream.at_punct('('):
+                if term[1] not in CASTS:
+                    raise stream.error(f'ไม่รองรับฟังก์ชัน <{term[1]}>', token)
+                args = self._expression_list()
+                if len(args) != 1:
+                    raise stream.error('การแปลงชนิดรับ argument เดียว', token)
+                return ('cast', term[1], args[0])
+            return term
+        if token.kind == lexer.NAME:
+            name = token.value.upper()
+            if name in AGGREGATES:
+                return self._aggregate()
+            if name == 'EXISTS':
+                stream.next()
+                return ('exists', self._group(), False)
+            if name == 'NOT' and stream.peek(1).kind == lexer.NAME \
+                    and stream.peek(1).value.upper() == 'EXISTS':
+                stream.next()
+                stream.next()
+                return ('exists', self._group(), True)
+            if name in BUILTINS:
+                stream.next()
+                if name == 'BOUND':
+                    stream.expect_punct('(')
+                    var = self._var()
+                    stream.expect_punct(')')
+                    return ('call', 'BOUND', [(VAR, var)])
+                args = self._expression_list()
+                low, high = BUILTINS[name]
+                if len(args) < low or (high is not None and len(args) > high):
+                    raise stream.error(f'{name} รับ argument ไม่ถูกจำนวน', token)
+                return ('call', name, args)
+        stream.next()
+        term = self.literal_token(token)
+        if term is None:
+            raise stream.error(f'expression ไม่ถูกต้อง: {token.value!r}', token)
+        return term
+
+    def _aggregate(self):
+        stream = self.stream
+        name = stream.next().value.upper()
+        stream.expect_punct('(')
+        distinct = bool(stream.accept_keyword('DISTINCT'))
+        separator = None
+        if name == 'COUNT' and stream.accept_punct('*'):
+            arg = None
+        else:
+            arg = self._expression()
+        if name == 'GROUP_CONCAT' and stream.accept_punct(';'):
+            stream.expect_keyword('SEPARATOR')
+            stream.expect_punct('=')
+            token = stream.next()
+            if token.kind != lexer.STRING:
+                raise stream.error('ต้องการข้อความของ separator', token)
+            separator = token.value
+        stream.expect_punct(')')
+        return ('agg', name, distinct, arg, separator)
+
+    # === Update ===
+
+    def parse_update(self):
+        stream = self.stream
+        operations = []
+        while True:
+            self._prologue()
+            if stream.peek().kind == lexer.EOF:
+                break
+            operations.append(self._update_operation())
+            if not stream.accept_punct(';'):
+                break
+        if stream.peek().kind != lexer.EOF:
+            raise stream.error(f'ข้อความเกินหลังจบ update: {stream.peek().value!r}')
+        if not operations:
+            raise stream.error('ไม่มีคำสั่ง update')
+        return Update(operations)
+
+    def _update_operation(self):
+        stream = self.stream
+        token = stream.peek()
+        keyword = token.value.upper() if token.kind == lexer.NAME else None
+        if keyword == 'INSERT' and stream.peek(1).kind == lexer.NAME \
+                and stream.peek(1).value.upper() == 'DATA':
+            stream.next()
+            stream.next()
+            return ('insert_data', self._quads(data=True))
+        if keyword == 'DELETE' and stream.peek(1).kind == lexer.NAME:
+            following = stream.peek(1).value.upper()
+            if following == 'DATA':
+                stream.next()
+                stream.next()
+                return ('delete_data', self._quads(data=True))
+            if following == 'WHERE':
+                stream.next()
+                stream.next()
+                quads = self._quads(data=False)
+                return ('modify', quads, [], self._quads_as_pattern(quads))
+        if keyword in ('CLEAR', 'DROP'):
+            stream.next()
+            stream.accept_keyword('SILENT')
+            if stream.accept_keyword('GRAPH'):
+                return ('clear', self.iri_token(stream.next()))
+            target = stream.next()
+            if target.kind != lexer.NAME or target.value.upper() not in ('DEFAULT', 'NAMED', 'ALL'):
+                raise stream.error(f'{keyword} ต้องระบุ GRAPH, DEFAULT, NAMED หรือ ALL', target)
+            return ('clear', target.value.upper())
+        if keyword in ('WITH', 'DELETE', 'INSERT'):
+            if stream.accept_keyword('WITH'):
+                raise stream.error('embedded backend ไม่รองรับ WITH')
+            delete_quads, insert_quads = [], []
+            if stream.accept_keyword('DELETE'):
+                delete_quads = self._quads(data=False)
+            if stream.accept_keyword('INSERT'):
+                previous, self._in_data = self._in_data, True
+                try:
+                    insert_quads = self._quads(data=False)
+                finally:
+                    self._in_data = previous
+            if stream.at_keyword('USING'):
+                raise stream.error('embedded backend ไม่รองรับ USING')
+            stream.expect_keyword('WHERE')
+            return ('modify', delete_quads, insert_quads, self._group())
+        raise stream.error(f'ไม่รองรับคำสั่ง update: {token.value!r}')
+
+    def _quads(self, data):
+        """{ triples GRAPH <g> { triples } ... } → list ของ (s, p, o, graph)"""
+        stream = self.stream
+        previous = self._in_data
+        if data:
+            self._in_data = True
+        try:
+            stream.expect_punct('{')
+            quads = []
+            while not stream.accept_punct('}'):
+                if stream.accept_keyword('GRAPH'):
+                    name = self._var_or_iri()
+                    stream.expect_punct('{')
+                    triples = self._triples_block_until('}')
+                    stream.expect_punct('}')
+                    quads.extend((s, p, o, name) for s, p, o in triples)
+                    stream.accept_punct('.')
+                else:
+                    triples = self._triples_same_subject()
+                    quads.extend((s, p, o, None) for s, p, o in triples)
+                    if not stream.accept_punct('.') and not stream.at_punct('}') \
+                            and not stream.at_keyword('GRAPH'):
+                        raise stream.error(f"ต้องการ '.' หรือ '}}' แต่พบ {stream.peek().value!r}")
+        finally:
+            self._in_data = previous
+        return quads
+
+    @staticmethod
+    def _quads_as_pattern(quads):
+        """DELETE WHERE: ใช้ quad ชุดเดียวกันเป็นทั้ง pattern และสิ่งที่ลบ"""
+        elements = []
+        default = [(s, p, o) for s, p, o, graph in quads if graph is None]
+        if default:
+            elements.append(('bgp', default))
+        graphs = {}
+        for s, p, o, graph in quads:
+            if graph is not None:
+                graphs.setdefault(graph, []).append((s, p, o))
+        for graph, triples in graphs.items():
+            elements.append(('graph', graph, [('bgp', triples)]))
+        return elements
+
+
+def parse_query(text):
+    """SPARQL query → Query (SyntaxErrorAt ถ้าผิดไวยากรณ์หรือใช้ส่วนที่ไม่รองรับ)"""
+    return SparqlParser(text).parse_query()
+
+
+def parse_update(text):
+    """SPARQL update → Update"""
+    return SparqlParser(text).parse_update()
+
+
+# === แสดงโครงสร้าง (ใช้ใน explain) ===
+
+def format_node(node):
+    if node[0] == VAR:
+        return f'?{node[1]}'
+    if node[0] in ('uri', 'literal', 'bnode'):
+        return to_ntriples(node)
+    op = node[0]
+    if op == 'call':
+        return f"{node[1]}({', '.join(format_node(arg) for arg in node[2])})"
+    if op == 'cast':
+        return f'<{node[1]}>({format_node(node[2])})'
+    if op == 'agg':
+        arg = '*' if node[3] is None else format_node(node[3])
+        return f"{node[1]}({'DISTINCT ' if node[2] else ''}{arg})"
+    if op == 'in':
+        items = ', '.join(format_node(item) for item in node[2])
+        return f"({format_node(node[1])} {'NOT IN' if node[3] else 'IN'} ({items}))"
+    if op == 'exists':
+        return f"({'notexists' if node[2] else 'exists'} {format_group(node[1])})"
+    if op in ('!', 'neg', 'pos'):
+        return f'({op} {format_node(node[1])})'
+    return f'({format_node(node[1])} {op} {format_node(node[2])})'
+
+
+def format_group(elements, indent=0):
+    """pattern ในรูป algebra แบบย่อ (คล้าย SSE ของ ARQ)"""
+    pad = '  ' * indent
+    lines = []
+    for element in elements:
+        kind = element[0]
+        if kind == 'bgp':
+            triples = ' '.join(
+                f"({' '.join(format_node(term) for term in triple)})" for triple in element[1])
+            lines.append(f'{pad}(bgp {triples})')
+        elif kind == 'filter':
+            lines.append(f'{pad}(filter {format_node(element[1])})')
+        elif kind == 'bind':
+            lines.append(f'{pad}(extend ?{element[2]} {format_node(element[1])})')
+        elif kind == 'values':
+            lines.append(f"{pad}(table {' '.join('?' + name for name in element[1])} "
+                         f'rows={len(element[2])})')
+        elif kind == 'union':
+            lines.append(f'{pad}(union')
+            lines.extend(format_group(group, indent + 1) for group in element[1])
+            lines.append(f'{pad})')
+        elif kind == 'graph':
+            lines.append(f'{pad}(graph {format_node(element[1])}')
+            lines.append(format_group(element[2], indent + 1))
+            lines.append(f'{pad})')
+        elif kind == 'subquery':
+            lines.append(f'{pad}(subquery')
+            lines.append(format_query(element[1], indent + 1))
+            lines.append(f'{pad})')
+        else:
+            lines.append(f'{pad}({"leftjoin" if kind == "optional" else kind}')
+            lines.append(format_group(element[1], indent + 1))
+            lines.append(f'{pad})')
+    return '\n'.join(lines)
+
+
+def format_query(query, indent=0):
+    pad = '  ' * indent
+    lines = [format_group(query.where, indent + 1)]
+    if query.group_by is not None or any(expr is not None for _, expr in query.projection or ()):
+        lines.insert(0, f"{pad}(group ({' '.join(format_node(expr) for expr, _ in query.group_by or ())})")
+        lines.append(f'{pad})')
+    for expr in query.having:
+        lines.append(f'{pad}(having {format_node(expr)})')
+    if query.order_by:
+        keys = ' '.join(('DESC ' if desc else '') + format_node(expr) for expr, desc in query.order_by)
+        lines.append(f'{pad}(order {keys})')
+    if query.projection is not None:
+        lines.append(f"{pad}(project {' '.join('?' + name for name, _ in query.projection)})")
+    if query.distinct:
+        lines.append(f'{pad}(distinct)')
+    if query.limit is not None or query.offset:
+        lines.append(f'{pad}(slice {query.offset} {query.limit})')
+    return '\n'.join(lines)
+
@@ -0,0 +1,184 @@
+# RDF term ของ embedded store — เก็บเป็น tuple (hash ได้ ใช้เป็น key ของ index ได้ทันที)
+#
+#   ('uri', 'http://...')
+#   ('bnode', 'b0')
+#   ('literal', lexical, datatype หรือ None, lang หรือ None)
+#
+# literal ที่เป็น xsd:string เก็บ datatype เป็น None (เทียบเท่า plain literal ตาม RDF 1.1)
+import itertools
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+URI = 'uri'
+BNODE = 'bnode'
+LITERAL = 'literal'
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+
+RDF_TYPE = (URI, RDF + 'type')
+RDF_FIRST = (URI, RDF + 'first')
+RDF_REST = (URI, RDF + 'rest')
+RDF_NIL = (URI, RDF + 'nil')
+RDF_LANG_STRING = RDF + 'langString'
+
+XSD_STRING = XSD + 'string'
+XSD_BOOLEAN = XSD + 'boolean'
+XSD_INTEGER = XSD + 'integer'
+XSD_DECIMAL = XSD + 'decimal'
+XSD_DOUBLE = XSD + 'double'
+XSD_FLOAT = XSD + 'float'
+
+INTEGER_TYPES = frozenset(XSD + name for name in (
+    'integer', 'int', 'long', 'short', 'byte', 'nonNegativeInteger', 'positiveInteger',
+    'nonPositiveInteger', 'negativeInteger', 'unsignedLong', 'unsignedInt', 'unsignedShort',
+    'unsignedByte'))
+NUMERIC_TYPES = INTEGER_TYPES | {XSD_DECIMAL, XSD_DOUBLE, XSD_FLOAT}
+
+# ความละเอียดของการหาร decimal (ใกล้เคียงกับ ARQ)
+DECIMAL_DIVIDE_SCALE = Decimal(1).scaleb(-24)
+
+
+def iri(value):
+    return (URI, value)
+
+
+def bnode(label):
+    return (BNODE, label)
+
+
+_bnode_ids = itertools.count(1)
+
+
+def fresh_bnode():
+    """blank node ใหม่ที่ไม่ซ้ำกับตัวอื่นใน process (ใช้ข้ามไฟล์และข้าม update ได้)"""
+    return (BNODE, f'b{next(_bnode_ids)}')
+
+
+def literal(lexical, datatype=None, lang=None):
+    if datatype == XSD_STRING:
+        datatype = None
+    return (LITERAL, lexical, datatype, lang.lower() if lang else None)
+
+
+TRUE = literal('true', XSD_BOOLEAN)
+FALSE = literal('false', XSD_BOOLEAN)
+
+
+def boolean(value):
+    return TRUE if value else FALSE
+
+
+def is_literal(term):
+    return term[0] == LITERAL
+
+
+def is_string(term):
+    """plain literal / xsd:string / literal ที่มีภาษา"""
+    return term[0] == LITERAL and term[2] is None
+
+
+def is_numeric(term):
+    return term[0] == LITERAL and term[2] in NUMERIC_TYPES
+
+
+def numeric_value(term):
+    """ค่าตัวเลขของ literal (int / Decimal / float) — ValueError ถ้าไม่ใช่ตัวเลขที่ถูกต้อง"""
+    datatype = term[2]
+    lexical = term[1].strip()
+    try:
+        if datatype in INTEGER_TYPES:
+            return int(lexical)
+        if datatype == XSD_DECIMAL:
+            return Decimal(lexical)
+        if datatype in (XSD_DOUBLE, XSD_FLOAT):
+            return float(lexical)
+    except (ValueError, InvalidOperation):
+        pass
+    raise ValueError(f'ไม่ใช่ตัวเลข: {lexical!r}')
+
+
+def numeric(value):
+    """literal จากค่าตัวเลขของ Python (bool ไม่นับเป็นตัวเลข)"""
+    if isinstance(value, int):
+        return literal(str(value), XSD_INTEGER)
+    if isinstance(value, Decimal):
+        return literal(format_decimal(value), XSD_DECIMAL)
+    return literal(format_double(value), XSD_DOUBLE)
+
+
+def format_decimal(value):
+    """รูปแบบ canonical ของ xsd:decimal (มีจุดทศนิยมเสมอ ไม่มีเลขศูนย์ท้าย)"""
+    if value == value.to_integral_value():
+        return f'{value.quantize(Decimal(1), rounding=ROUND_HALF_UP):f}.0'
+    return f'{value.normalize():f}'
+
+
+def format_double(value):
+    """รูปแบบ canonical ของ xsd:double (เช่น 1.5E0)"""
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'INF' if value > 0 else '-INF'
+    mantissa, exponent = f'{value:.15E}'.split('E')
+    mantissa = mantissa.rstrip('0')
+    if mantissa.endswith('.'):
+        mantissa += '0'
+    return f'{mantissa}E{int(exponent)}'
+
+
+def boolean_value(term):
+    lexical = term[1].strip()
+    if lexical in ('true', '1'):
+        return True
+    if lexical in ('false', '0'):
+        return False
+    raise ValueError(f'ไม่ใช่ boolean: {lexical!r}')
+
+
+def to_sparql_json(term):
+    """term → ค่าใน SPARQL JSON results (application/sparql-results+json)"""
+    kind = term[0]
+    if kind == LITERAL:
+        value = {'type': LITERAL, 'value': term[1]}
+        if term[3]:
+            value['xml:lang'] = term[3]
+        elif term[2]:
+            value['datatype'] = term[2]
+        return value
+    return {'type': kind, 'value': term[1]}
+
+
+def to_rdf_json(term):
+    """term → ค่า object ใน RDF/JSON (application/rdf+json) รูปแบบที่ Fuseki คืนจาก CONSTRUCT"""
+    kind = term[0]
+    if kind == LITERAL:
+        value = {'type': LITERAL, 'value': term[1]}
+        if term[3]:
+            value['lang'] = term[3]
+        elif term[2]:
+            value['datatype'] = term[2]
+        return value
+    if kind == BNODE:
+        return {'type': BNODE, 'value': f'_:{term[1]}'}
+    return {'type': URI, 'value': term[1]}
+
+
+def subject_key(term):
+    """key ของ subject ใน RDF/JSON"""
+    return f'_:{term[1]}' if term[0] == BNODE else term[1]
+
+
+def to_ntriples(term):
+    """term ในรูปแบบ N-Triples (ใช้แสดงผลและใน explain)"""
+    kind = term[0]
+    if kind == URI:
+        return f'<{term[1]}>'
+    if kind == BNODE:
+        return f'_:{term[1]}'
+    lexical = (term[1].replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n').replace('\r', '\\r'))
+    if term[3]:
+        return f'"{lexical}"@{term[3]}'
+    if term[2]:
+        return f'"{lexical}"^^<{term[2]}>'
+    return f'"{lexical}"'
@@ -0,0 +1,156 @@
+# ตัวอ่าน RDF/XML (.owl / .rdf) สำหรับ embedded store — ใช้ xml.etree ของ standard library
+# รองรับ rdf:about/rdf:ID/rdf:nodeID, typed node, property attribute, rdf:resource, rdf:datatype,
+# xml:lang (สืบทอดลงไป), node ซ้อนใน property และ rdf:parseType="Resource"/"Collection"/"Literal"
+import xml.etree.ElementTree as ElementTree
+
+from sparql.embedded.rdf import (
+    RDF, iri, fresh_bnode, literal, RDF_TYPE, RDF_FIRST, RDF_REST, RDF_NIL,
+)
+from sparql.embedded.turtle import resolve_iri
+
+XML_NS = '{http://www.w3.org/XML/1998/namespace}'
+XML_LANG = XML_NS + 'lang'
+XML_BASE = XML_NS + 'base'
+XML_LITERAL = RDF + 'XMLLiteral'
+
+
+def _rdf(name):
+    return '{' + RDF + '}' + name
+
+
+RDF_RDF = _rdf('RDF')
+RDF_DESCRIPTION = _rdf('Description')
+RDF_ABOUT = _rdf('about')
+RDF_ID = _rdf('ID')
+RDF_NODE_ID = _rdf('nodeID')
+RDF_RESOURCE = _rdf('resource')
+RDF_DATATYPE = _rdf('datatype')
+RDF_PARSE_TYPE = _rdf('parseType')
+RDF_TYPE_ATTR = _rdf('type')
+
+# attribute ที่ไม่ใช่ property
+_SYNTAX_ATTRS = {RDF_ABOUT, RDF_ID, RDF_NODE_ID, RDF_RESOURCE, RDF_DATATYPE, RDF_PARSE_TYPE,
+                 XML_LANG, XML_BASE}
+
+
+def _tag_iri(tag):
+    """{namespace}local → IRI เต็ม"""
+    if tag.startswith('{'):
+        namespace, _, local = tag[1:].partition('}')
+        return namespace + local
+    return tag
+
+
+class RdfXmlParser:
+    """แปลงเอกสาร RDF/XML เป็น triple — เรียก emit ทีละ triple"""
+
+    def __init__(self, emit, base=None):
+        self.emit = emit
+        self.base = base
+        self._node_ids = {}
+
+    def parse(self, source):
+        root = ElementTree.parse(source).getroot()
+        base = root.get(XML_BASE, self.base)
+        lang = root.get(XML_LANG)
+        if root.tag == RDF_RDF:
+            for element in root:
+                self._node(element, base, lang)
+        else:
+            self._node(root, base, lang)
+
+    def _node_id(self, label):
+        node = self._node_ids.get(label)
+        if node is None:
+            node = self._node_ids[label] = fresh_bnode()
+        return node
+
+    def _subject(self, element, base):
+        if RDF_ABOUT in element.attrib:
+            return iri(resolve_iri(element.attrib[RDF_ABOUT], base))
+        if RDF_ID in element.attrib:
+            return iri(resolve_iri('#' + element.attrib[RDF_ID], base))
+        if RDF_NODE_ID in element.attrib:
+            return self._node_id(element.attrib[RDF_NODE_ID])
+        return fresh_bnode()
+
+    def _node(self, element, base, lang):
+        """node element → subject (พร้อม emit triple ของ property ทั้งหมด)"""
+        base = element.get(XML_BASE, base)
+        lang = element.get(XML_LANG, lang)
+        subject = self._subject(element, base)
+        if element.tag != RDF_DESCRIPTION:
+            self.emit(subject, RDF_TYPE, iri(_tag_iri(element.tag)))
+        for name, value in element.attrib.items():
+            if name in _SYNTAX_ATTRS:
+                continue
+            if name == RDF_TYPE_ATTR:
+                self.emit(subject, RDF_TYPE, iri(resolve_iri(value, base)))
+            else:
+                self.emit(subject, iri(_tag_iri(name)), literal(value, lang=lang))
+        for child in element:
+            self._property(subject, child, base, lang)
+        return subject
+
+    def _property(self, subject, element, base, lang):
+        base = element.get(XML_BASE, base)
+        lang = element.get(XML_LANG, lang)
+        predicate = iri(_tag_iri(element.tag))
+        attrs = element.attrib
+        parse_type = attrs.get(RDF_PARSE_TYPE)
+
+        if parse_type == 'Resource':
+            node = fresh_bnode()
+            self.emit(subject, predicate, node)
+            for child in element:
+                self._property(node, child, base, lang)
+        elif parse_type == 'Collection':
+            items = [self._node(child, base, lang) for child in element]
+            head = RDF_NIL
+            for item in reversed(items):
+                node = fresh_bnode()
+                self.emit(node, RDF_FIRST, item)
+                self.emit(node, RDF_REST, head)
+                head = node
+            self.emit(subject, predicate, head)
+        elif parse_type == 'Literal':
+            content = (element.text or '') + ''.join(
+                ElementTree.tostring(child, encoding='unicode') for child in element)
+            self.emit(subject, predicate, literal(content, XML_LITERAL))
+        elif RDF_RESOURCE in attrs or RDF_NODE_ID in attrs:
+            if RDF_RESOURCE in attrs:
+                obj = iri(resolve_iri(attrs[RDF_RESOURCE], base))
+            else:
+                obj = self._node_id(attrs[RDF_NODE_ID])
+            self.emit(subject, predicate, obj)
+            self._property_attributes(obj, attrs, base, lang)
+        elif len(element):
+            self.emit(subject, predicate, self._node(element[0], base, lang))
+        elif any(name not in _SYNTAX_ATTRS for name in attrs):
+            # property element ว่างที่มี property attribute → blank node
+            node = fresh_bnode()
+            self.emit(subject, predicate, node)
+            self._property_attributes(node, attrs, base, lang)
+        else:
+            text = element.text or ''
+            datatype = attrs.get(RDF_DATATYPE)
+            if datatype:
+                self.emit(subject, predicate, literal(text, resolve_iri(datatype, base)))
+            else:
+                self.emit(subject, predicate, literal(text, lang=lang))
+
+    def _property_attributes(self, node, attrs, base, lang):
+        for name, value in attrs.items():
+            if name in _SYNTAX_ATTRS:
+                continue
+            if name == RDF_TYPE_ATTR:
+                self.emit(node, RDF_TYPE, iri(resolve_iri(value, base)))
+            else:
+                self.emit(node, iri(_tag_iri(name)), literal(value, lang=lang))
+
+
+def parse_rdfxml(source, base=None):
+    """list ของ triple จากไฟล์หรือ file object ของ RDF/XML"""
+    triples = []
+    RdfXmlParser(lambda s, p, o: triples.append((s, p, o)), base=base).parse(source)
+    return triples
@@ -0,0 +1,183 @@
+# ที่เก็บ triple ในหน่วยความจำของ embedded backend
+#
+# แต่ละ graph มี index 3 ชุด (SPO, POS, OSP) เป็น dict ซ้อนกัน ชั้นในสุดเป็น dict ที่ใช้แทน set
+# (dict รักษาลำดับการเพิ่ม ผลลัพธ์ที่ไม่มี ORDER BY จึงออกตามลำดับในไฟล์ข้อมูลทุกครั้ง ไม่ขึ้นกับ hash seed)
+# ทุก pattern (s, p, o) ที่มีค่าว่างเป็น None จะอ่านจาก index ที่ตรงกับตำแหน่งที่ผูกค่าแล้ว
+
+
+class Graph:
+    """triple ของ graph เดียว"""
+
+    __slots__ = ('spo', 'pos', 'osp', 'predicate_counts', 'size')
+
+    def __init__(self):
+        self.spo = {}
+        self.pos = {}
+        self.osp = {}
+        self.predicate_counts = {}
+        self.size = 0
+
+    def add(self, s, p, o):
+        objects = self.spo.setdefault(s, {}).setdefault(p, {})
+        if o in objects:
+            return False
+        objects[o] = None
+        self.pos.setdefault(p, {}).setdefault(o, {})[s] = None
+        self.osp.setdefault(o, {}).setdefault(s, {})[p] = None
+        self.predicate_counts[p] = self.predicate_counts.get(p, 0) + 1
+        self.size += 1
+        return True
+
+    def remove(self, s, p, o):
+        objects = self.spo.get(s, {}).get(p)
+        if objects is None or o not in objects:
+            return False
+        _discard(self.spo, s, p, o)
+        _discard(self.pos, p, o, s)
+        _discard(self.osp, o, s, p)
+        count = self.predicate_counts[p] - 1
+        if count:
+            self.predicate_counts[p] = count
+        else:
+            del self.predicate_counts[p]
+        self.size -= 1
+        return True
+
+    def triples(self, s, p, o):
+        """triple ที่ตรงกับ pattern (None = ค่าใดก็ได้)"""
+        if s is not None:
+            by_predicate = self.spo.get(s)
+            if by_predicate is None:
+                return
+            if p is not None:
+                objects = by_predicate.get(p)
+                if objects is None:
+                    return
+                if o is not None:
+                    if o in objects:
+                        yield s, p, o
+                    return
+                for obj in objects:
+                    yield s, p, obj
+                return
+            if o is not None:
+                for pred in self.osp.get(o, {}).get(s, ()):
+                    yield s, pred, o
+                return
+            for pred, objects in by_predicate.items():
+                for obj in objects:
+                    yield s, pred, obj
+            return
+        if p is not None:
+            by_object = self.pos.get(p)
+            if by_object is None:
+                return
+            if o is not None:
+                for subj in by_object.get(o, ()):
+                    yield subj, p, o
+                return
+            for obj, subjects in by_object.items():
+                for subj in subjects:
+                    yield subj, p, obj
+            return
+        if o is not None:
+            for subj, predicates in self.osp.get(o, {}).items():
+                for pred in predicates:
+                    yield subj, pred, o
+            return
+        for subj, by_predicate in self.spo.items():
+            for pred, objects in by_predicate.items():
+                for obj in objects:
+                    yield subj, pred, obj
+
+    def estimate(self, s, p, o):
+        """จำนวน triple โดยประมาณที่ตรงกับ pattern (ใช้เลือกลำดับการ join)"""
+        if s is not None:
+            by_predicate = self.spo.get(s)
+            if by_predicate is None:
+                return 0
+            if p is not None:
+                objects = by_predicate.get(p)
+                if objects is None:
+                    return 0
+                return (1 if o in objects else 0) if o is not None else len(objects)
+            if o is not None:
+                return len(self.osp.get(o, {}).get(s, ()))
+            return sum(len(objects) for objects in by_predicate.values())
+        if p is not None:
+            if o is not None:
+                return len(self.pos.get(p, {}).get(o, ()))
+            return self.predicate_counts.get(p, 0)
+        if o is not None:
+            return sum(len(predicates) for predicates in self.osp.get(o, {}).values())
+        return self.size
+
+
+def _discard(index, a, b, c):
+    """ลบ c ออกจาก index[a][b] แล้วเก็บกวาด dict ที่ว่าง"""
+    inner = index[a][b]
+    del inner[c]
+    if not inner:
+        del index[a][b]
+        if not index[a]:
+            del index[a]
+
+
+class TripleStore:
+    """default graph + named graph (เช่น graph metadata ของ dataset version)
+
+    graph=None หมายถึง default graph ส่วน named graph ระบุด้วย IRI term
+    ไม่มี lock ในตัว — ผู้เรียก (EmbeddedBackend) ป้องกันการเขียนพร้อมกับการอ่านเอง
+    graph_factory: สร้าง graph เปล่า (Graph หรือ EncodedGraph ที่ใช้พจนานุกรมร่วมกัน ดู encoded.py)
+    """
+
+    def __init__(self, graph_factory=Graph):
+        self.graph_factory = graph_factory
+        self.default = graph_factory()
+        self.named = {}
+
+    def graph(self, name=None, create=False):
+        if name is None:
+            return self.default
+        graph = self.named.get(name)
+        if graph is None and create:
+            graph = self.named[name] = self.graph_factory()
+        return graph
+
+    def graph_names(self):
+        return [name for name, graph in self.named.items() if graph.size]
+
+    def add(self, s, p, o, graph=None):
+        return self.graph(graph, create=True).add(s, p, o)
+
+    def remove(self, s, p, o, graph=None):
+        target = self.graph(graph)
+        return target is not None and target.remove(s, p, o)
+
+    def triples(self, s=None, p=None, o=None, graph=None):
+        target = self.graph(graph)
+        if target is None:
+            return iter(())
+        return target.triples(s, p, o)
+
+    def estimate(self, s=None, p=None, o=None, graph=None):
+        target = self.graph(graph)
+        return target.estimate(s, p, o) if target is not None else 0
+
+    def clear(self, target):
+        """CLEAR: IRI term ของ graph หรือ 'DEFAULT' / 'NAMED' / 'ALL'"""
+        if target in ('DEFAULT', 'ALL'):
+            self.default = self.graph_factory()
+        if target in ('NAMED', 'ALL'):
+            self.named = {}
+        elif target != 'DEFAULT':
+            self.named.pop(target, None)
+
+    def __len__(self):
+        return self.default.size
+
+    def stats(self):
+        return {
+            'triples': self.default.size,
+            'named_graphs': {name[1]: graph.size for name, graph in self.named.items()},
+        }
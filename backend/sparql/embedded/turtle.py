@@ -0,0 +1,204 @@
+# ตัวอ่าน Turtle (.ttl) สำหรับ embedded store
+# รองรับ @prefix/@base/PREFIX/BASE, a, ; , , [ ... ], ( ... ), literal ทุกรูปแบบ (ภาษา, ^^datatype, ตัวเลข, boolean)
+from sparql.embedded import lexer
+from sparql.embedded.lexer import TokenStream
+from sparql.embedded.rdf import (
+    iri, fresh_bnode, literal, RDF_TYPE, RDF_FIRST, RDF_REST, RDF_NIL,
+    XSD_INTEGER, XSD_DECIMAL, XSD_DOUBLE, XSD_BOOLEAN,
+)
+
+NUMBER_TYPES = {lexer.INTEGER: XSD_INTEGER, lexer.DECIMAL: XSD_DECIMAL, lexer.DOUBLE: XSD_DOUBLE}
+
+
+def resolve_iri(value, base):
+    """ต่อ IRI สัมพัทธ์เข้ากับ base (กรณีที่ใช้จริงในไฟล์ข้อมูล: #frag, ชื่อไฟล์, path)"""
+    if not base or ':' in value.split('/', 1)[0]:
+        return value
+    if value.startswith('#'):
+        return base.split('#', 1)[0] + value
+    if value == '':
+        return base.split('#', 1)[0]
+    if value.startswith('/'):
+        scheme, sep, rest = base.partition('://')
+        return f'{scheme}{sep}{rest.split("/", 1)[0]}{value}'
+    return base.split('#', 1)[0].rsplit('/', 1)[0] + '/' + value
+
+
+class TermReader:
+    """อ่าน term แบบ Turtle จาก TokenStream — ใช้ร่วมกับ parser ของ SPARQL"""
+
+    def __init__(self, stream, prefixes=None, base=None):
+        self.stream = stream
+        self.prefixes = dict(prefixes or {})
+        self.base = base
+        self._labels = {}
+
+    def new_bnode(self):
+        return fresh_bnode()
+
+    def labelled_bnode(self, label):
+        """_:label ตัวเดียวกันในเอกสารเดียวกัน → blank node เดียวกัน"""
+        node = self._labels.get(label)
+        if node is None:
+            node = self._labels[label] = fresh_bnode()
+        return node
+
+    def iri_token(self, token):
+        if token.kind == lexer.IRI:
+            return iri(resolve_iri(token.value, self.base))
+        prefix, local = token.value
+        namespace = self.prefixes.get(prefix)
+        if namespace is None:
+            raise self.stream.error(f'ไม่รู้จัก prefix {prefix}:', token)
+        return iri(namespace + local)
+
+    def literal_token(self, token):
+        """STRING / ตัวเลข / true-false → literal (คืน None ถ้าไม่ใช่ literal)"""
+        stream = self.stream
+        if token.kind == lexer.STRING:
+            if stream.peek().kind == lexer.LANGTAG:
+                return literal(token.value, lang=stream.next().value)
+            if stream.accept_punct('^^'):
+                datatype = stream.next()
+                if datatype.kind not in (lexer.IRI, lexer.PNAME):
+                    raise stream.error('ต้องการ datatype IRI หลัง ^^', datatype)
+                return literal(token.value, self.iri_token(datatype)[1])
+            return literal(token.value)
+        if token.kind in NUMBER_TYPES:
+            return literal(token.value, NUMBER_TYPES[token.kind])
+        if token.kind == lexer.PUNCT and token.value in ('+', '-') \
+                and stream.peek().kind in NUMBER_TYPES:
+            number = stream.next()
+            return literal(token.value + number.value, NUMBER_TYPES[number.kind])
+        if token.kind == lexer.NAME and token.value in ('true', 'false'):
+            return literal(token.value, XSD_BOOLEAN)
+        return None
+
+
+class TurtleParser(TermReader):
+    """แปลงเอกสาร Turtle เป็น triple (term, term, term) — เรียก emit ทีละ triple"""
+
+    def __init__(self, text, base=None, emit=None):
+        super().__init__(TokenStream(text), base=base)
+        self.emit = emit
+
+    def parse(self):
+        stream = self.stream
+        while stream.peek().kind != lexer.EOF:
+            token = stream.peek()
+            if token.kind == lexer.LANGTAG and token.value in ('prefix', 'base'):
+                stream.next()
+                self._directive(token.value, terminated=True)
+            elif token.kind == lexer.NAME and token.value.upper() in ('PREFIX', 'BASE'):
+                stream.next()
+                self._directive(token.value.lower(), terminated=False)
+            else:
+                self._triples()
+                stream.expect_punct('.')
+
+    def _directive(self, name, terminated):
+        stream = self.stream
+        if name == 'prefix':
+            token = stream.next()
+            if token.kind != lexer.PNAME or token.value[1]:
+                raise stream.error('ต้องการชื่อ prefix เช่น sce:', token)
+            target = stream.next()
+            if target.kind != lexer.IRI:
+                raise stream.error('ต้องการ IRI ของ prefix', target)
+            self.prefixes[token.value[0]] = resolve_iri(target.value, self.base)
+        else:
+            target = stream.next()
+            if target.kind != lexer.IRI:
+                raise stream.error('ต้องการ IRI ของ base', target)
+            self.base = resolve_iri(target.value, self.base)
+        if terminated:
+            stream.expect_punct('.')
+
+    def _triples(self):
+        stream = self.stream
+        if stream.at_punct('['):
+            subject = self._blank_node_property_list()
+            if stream.at_punct('.'):
+                return
+        else:
+            subject = self._subject()
+        self._predicate_object_list(subject)
+
+    def _subject(self):
+        token = self.stream.next()
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            return self.iri_token(token)
+        if token.kind == lexer.BNODE:
+            return self.labelled_bnode(token.value)
+        if token.kind == lexer.PUNCT and token.value == '(':
+            return self._collection()
+        raise self.stream.error(f'subject ไม่ถูกต้อง: {token.value!r}', token)
+
+    def _predicate_object_list(self, subject):
+        stream = self.stream
+        while True:
+            predicate = self._verb()
+            while True:
+                self.emit(subject, predicate, self._object())
+                if not stream.accept_punct(','):
+                    break
+            if not stream.accept_punct(';'):
+                return
+            # อนุญาต ; ซ้ำ หรือ ; ก่อนปิดประโยค
+            while stream.accept_punct(';'):
+                pass
+            if stream.at_punct('.', ']'):
+                return
+
+    def _verb(self):
+        token = self.stream.next()
+        if token.kind == lexer.NAME and token.value == 'a':
+            return RDF_TYPE
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            return self.iri_token(token)
+        raise self.stream.error(f'predicate ไม่ถูกต้อง: {token.value!r}', token)
+
+    def _object(self):
+        stream = self.stream
+        if stream.at_punct('['):
+            return self._blank_node_property_list()
+        token = stream.next()
+        if token.kind in (lexer.IRI, lexer.PNAME):
+            return self.iri_token(token)
+        if token.kind == lexer.BNODE:
+            return self.labelled_bnode(token.value)
+        if token.kind == lexer.PUNCT and token.value == '(':
+            return self._collection()
+        term = self.literal_token(token)
+        if term is None:
+            raise stream.error(f'object ไม่ถูกต้อง: {token.value!r}', token)
+        return term
+
+    def _blank_node_property_list(self):
+        stream = self.stream
+        stream.expect_punct('[')
+        node = self.new_bnode()
+        if not stream.accept_punct(']'):
+            self._predicate_object_list(node)
+            stream.expect_punct(']')
+        return node
+
+    def _collection(self):
+        """( a b c ) → rdf:first/rdf:rest (คืน rdf:nil ถ้าว่าง)"""
+        items = []
+        while not self.stream.accept_punct(')'):
+            items.append(self._object())
+        head = RDF_NIL
+        for item in reversed(items):
+            node = self.new_bnode()
+            self.emit(node, RDF_FIRST, item)
+            self.emit(node, RDF_REST, head)
+            head = node
+        return head
+
+
+def parse_turtle(text, base=None):
+    """list ของ triple จากข้อความ Turtle"""
+    triples = []
+    TurtleParser(text, base=base, emit=lambda s, p, o: triples.append((s, p, o))).parse()
+    return triples
@@ -0,0 +1,178 @@
+# แปลง graph จาก CONSTRUCT (RDF/JSON) เป็น dict ซ้อนกันแบบเดียวกับที่ API คืนค่า
+# ใช้คู่กับ CONSTRUCT_PRODUCT_DOCUMENT / CONSTRUCT_ENTERPRISE_DOCUMENT ใน queries.py
+from utils.helpers import build_uri
+
+RDF_TYPE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+
+
+def _local_name(uri):
+    """ตัด namespace ออกเหลือแค่ชื่อ (เหมือน FusekiClient._parse_results)"""
+    return uri.split('#')[-1] if '#' in uri else uri
+
+
+def _set_if(target, key, value):
+    """ใส่ key เฉพาะเมื่อมีค่า (เลียนแบบ OPTIONAL ที่ไม่ผูกค่า)"""
+    if value is not None:
+        target[key] = value
+
+
+class GraphFramer:
+    """ห่อ graph RDF/JSON ไว้อ่านค่าตาม subject/predicate ได้สะดวก"""
+
+    def __init__(self, graph):
+        self.graph = graph or {}
+
+    def objects(self, subject, predicate):
+        """คืนค่า object ทั้งหมดของ (subject, predicate)"""
+        return self.graph.get(subject, {}).get(build_uri(predicate), [])
+
+    def resources(self, subject, predicate):
+        """คืนค่า URI ของ object ที่เป็น resource"""
+        return [o['value'] for o in self.objects(subject, predicate) if o['type'] == 'uri']
+
+    def value(self, subject, predicate):
+        """คืนค่า literal ตัวแรก (หรือ None ถ้าไม่มี)"""
+        for o in self.objects(subject, predicate):
+            if o['type'] == 'literal':
+                return o['value']
+        return None
+
+    def is_a(self, subject, class_name):
+        types = self.graph.get(subject, {}).get(RDF_TYPE, [])
+        return any(o['value'] == build_uri(class_name) for o in types)
+
+    def named_resources(self, subject, predicate, name_key, desc_key=None):
+        """รายการ resource ที่มีชื่อ เช่น วัตถุดิบ/มาตรฐาน → [{name_key, desc_key}]"""
+        items = []
+        for uri in self.resources(subject, predicate):
+            name = self.value(uri, 'hasName')
+            if name is None:
+                continue
+            item = {name_key: name}
+            desc = self.value(uri, 'hasDescription') if desc_key else None
+            if desc is not None:
+                item[desc_key] = desc
+            items.append(item)
+        return items
+
+
+def frame_product(graph, product_id):
+    """สร้าง dict ผลิตภัณฑ์ (รูปแบบเดียวกับ GET /api/products/<id>) จาก graph
+
+    คืนค่า None ถ้าไม่พบผลิตภัณฑ์ หรือไม่มีชื่อ/ราคา
+    """
+    g = GraphFramer(graph)
+    subject = build_uri(product_id)
+    if not g.is_a(subject, 'FoodProduct'):
+        return None
+
+    name = g.value(subject, 'hasName')
+    price = g.value(subject, 'hasPrice')
+    if name is None or price is None:
+        return None
+
+    product = {'name': name, 'price': price}
+    _set_if(product, 'description', g.value(subject, 'hasDescription'))
+    _set_if(product, 'weight', g.value(subject, 'hasWeight'))
+    _set_if(product, 'shelfLife', g.value(subject, 'hasShelfLifeDays'))
+    _set_if(product, 'imageUrl', g.value(subject, 'hasImageUrl'))
+
+    for category in g.resources(subject, 'belongsToCategory'):
+        category_name = g.value(category, 'hasName')
+        if category_name is not None:
+            product['categoryName'] = category_name
+            break
+
+    for enterprise in g.resources(subject, 'producedBy'):
+        enterprise_name = g.value(enterprise, 'hasName')
+        if enterprise_name is not None:
+            product['enterpriseName'] = enterprise_name
+            _set_if(product, 'enterpriseDesc', g.value(enterprise, 'hasDescription'))
+            break
+
+    product['ingredients'] = sorted(
+        g.named_resources(subject, 'hasIngredient', 'ingredientName', 'ingredientDesc'),
+        key=lambda i: i['ingredientName']
+    )
+    product['certifications'] = g.named_resources(
+        subject, 'hasCertification', 'certName', 'certDesc')
+    product['channels'] = g.named_resources(
+        subject, 'soldVia', 'channelName', 'channelDesc')
+    product['target_customers'] = g.named_resources(
+        subject, 'targetsCustomer', 'customerName', 'customerDesc')
+
+    # รีวิวต้องมีทั้งชื่อผู้รีวิวและคะแนน เรียงคะแนนจากมากไปน้อย
+    reviews = []
+    for review in g.resources(subject, 'hasReview'):
+        reviewer = g.value(review, 'hasName')
+        rating = g.value(review, 'hasRating')
+        if reviewer is None or rating is None:
+            continue
+        item = {'reviewerName': reviewer, 'rating': rating}
+        _set_if(item, 'reviewDesc', g.value(review, 'hasDescription'))
+        reviews.append(item)
+    product['reviews'] = sorted(reviews, key=lambda r: float(r['rating']), reverse=True)
+
+    product['production_process'] = g.named_resources(
+        subject, 'hasProductionProcess', 'processName', 'processDesc')
+
+    return product
+
+
+def frame_enterprise(graph, enterprise_id):
+    """สร้าง dict วิสาหกิจ (รูปแบบเดียวกับ GET /api/enterprises/<id>) จาก graph
+
+    คืนค่า None ถ้าไม่พบวิสาหกิจ หรือไม่มีชื่อ
+    """
+    g = GraphFramer(graph)
+    subject = build_uri(enterprise_id)
+    if not g.is_a(subject, 'CommunityEnterprise'):
+        return None
+
+    name = g.value(subject, 'hasName')
+    if name is None:
+        return None
+
+    enterprise = {'name': name}
+    _set_if(enterprise, 'description', g.value(subject, 'hasDescription'))
+
+    for location in g.resources(subject, 'locatedIn'):
+        location_name = g.value(location, 'hasName')
+        if location_name is None:
+            continue
+        enterprise['locationName'] = location_name
+        for district in g.resources(location, 'locatedIn'):
+            district_name = g.value(district, 'hasName')
+            if district_name is not None:
+                enterprise['districtName'] = district_name
+                break
+        break
+
+    for contact in g.resources(subject, 'hasContactInfo'):
+        phone = g.value(contact, 'hasPhoneNumber')
+        if phone is not None:
+            enterprise['phone'] = phone
+            break
+
+    products = []
+    for product_uri in g.resources(subject, 'hasProduct'):
+        product_name = g.value(product_uri, 'hasName')
+        price = g.value(product_uri, 'hasPrice')
+        if product_name is None or price is None:
+            continue
+        item = {
+            'product': _local_name(product_uri),
+            'product_uri': product_uri,
+            'productName': product_name,
+            'price': price,
+        }
+        _set_if(item, 'imageUrl', g.value(product_uri, 'hasImageUrl'))
+        for category in g.resources(product_uri, 'belongsToCategory'):
+            category_name = g.value(category, 'hasName')
+            if category_name is not None:
+                item['categoryName'] = category_name
+                break
+        products.append(item)
+    enterprise['products'] = sorted(products, key=lambda p: p['productName'])
+
+    return enterprise
@@ -1,41 +1,189 @@
-# ตัวเชื่อมต่อ Apache Jena Fuseki ผ่าน SPARQLWrapper
+# ตัวเชื่อมต่อ SPARQL ของแอป — Apache Jena Fuseki ผ่าน HTTP connection pool (keep-alive)
+# หรือ embedded store ในโปรเซส ตาม SPARQL_BACKEND (ดู sparql/backends.py)
 import time
-import json
 import logging
-from SPARQLWrapper import SPARQLWrapper, JSON, POST, GET
-from config import FUSEKI_QUERY_ENDPOINT, FUSEKI_UPDATE_ENDPOINT, SPARQL_PREFIXES, FUSEKI_ADMIN_USER, FUSEKI_ADMIN_PASSWORD
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    SPARQL_PREFIXES,
+    FUSEKI_FANOUT_WORKERS,
+    QUERY_CACHE_ENABLED, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS,
+    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_SIZE, SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS,
+    FUSEKI_TEXT_INDEX, FUSEKI_TEXT_INDEX_PROBE_SECONDS,
+)
+from sparql import queries as q
+from sparql.backends import create_backend
+from sparql.query_cache import QueryCache, normalize_query
+from sparql.columnar import ColumnarResult
+from sparql.slow_query_log import SlowQueryLog
+from sparql.terms import LuceneText
+from utils.metrics import metrics, ADHOC_QUERY
+from utils.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+SPARQL_RESULTS_JSON = 'application/sparql-results+json'
+RDF_JSON = 'application/rdf+json'
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class FusekiClient:
-    """คลาสสำหรับเชื่อมต่อและ query ข้อมูลจาก Fuseki"""
+    """คลาสสำหรับเชื่อมต่อและ query ข้อมูลจาก Fuseki (หรือ embedded store)
+
+    การส่ง query จริงทำผ่าน self.backend (HttpBackend / EmbeddedBackend)
+    ส่วนแคช metrics slow-query log และ tracing อยู่ที่คลาสนี้ ใช้เหมือนกันทุก backend
+    query/headers ของแต่ละ request เป็น local ของการเรียกนั้นๆ
+    จึงไม่มี state ที่ thread อื่นเขียนทับได้ (ต่างจาก SPARQLWrapper.setQuery)
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend()
+        self.executor = ThreadPoolExecutor(max_workers=FUSEKI_FANOUT_WORKERS,
+                                           thread_name_prefix='fuseki-fanout')
+        self.cache = QueryCache(max_entries=QUERY_CACHE_MAX_ENTRIES,
+                                ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+                                enabled=QUERY_CACHE_ENABLED)
+        self.slow_queries = SlowQueryLog(SLOW_QUERY_THRESHOLD_MS, capacity=SLOW_QUERY_LOG_SIZE,
+                                         path=SLOW_QUERY_LOG_FILE or None,
+                                         max_bytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                         backup_count=SLOW_QUERY_LOG_BACKUPS,
+                                         explain=self.explain, submit=self.executor.submit)
+        self.text_index_mode = FUSEKI_TEXT_INDEX
+        self._text_index = False
+        self._text_index_checked_at = None
 
-    def __init__(self):
-        self.query_endpoint = SPARQLWrapper(FUSEKI_QUERY_ENDPOINT)
-        self.query_endpoint.setReturnFormat(JSON)
-        self.update_endpoint = SPARQLWrapper(FUSEKI_UPDATE_ENDPOINT)
-        self.update_endpoint.setCredentials(FUSEKI_ADMIN_USER, FUSEKI_ADMIN_PASSWORD)
+    def _observe(self, query_name, kind, sparql_query, seconds, nbytes=0, error=None, params=None):
+        """บันทึกการเรียก Fuseki หนึ่งครั้งลง metrics และ slow-query log"""
+        metrics.observe_query(query_name, kind, seconds, nbytes, error is not None)
+        self.slow_queries.observe(query_name, kind, sparql_query, seconds * 1000, params, error)
 
-    def query(self, sparql_query, include_prefixes=True):
-        """ส่ง SPARQL SELECT query และวัดเวลาตอบกลับ"""
+    def _send_query(self, sparql_query, accept, query_name=None, kind='select', params=None,
+                    parse=None):
+        """ส่ง query ไปยัง backend แล้วคืนค่า JSON ที่ได้ (ผ่าน parse ถ้ามี)
+
+        บันทึกเวลา ขนาด response และข้อผิดพลาดลง metrics (label = ชื่อ template)
+        และ span 'sparql' แยกเวลา network (รอ Fuseki จนได้ body ครบ) หรือ evaluate (embedded) กับ parse
+        """
+        start = time.perf_counter()
+        nbytes = 0
+        error = 'ยกเลิกกลางคัน'
+        try:
+            with tracer.span('sparql', query=query_name or ADHOC_QUERY, kind=kind) as span:
+                with tracer.span(self.backend.span_name):
+                    response = self.backend.query(sparql_query, accept)
+                    nbytes = response.nbytes
+                with tracer.span('parse'):
+                    data = response.json()
+                    if parse is not None:
+                        data = parse(data)
+                if span is not None:
+                    span.attributes['bytes'] = nbytes
+            error = None
+            return data
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self._observe(query_name, kind, sparql_query, time.perf_counter() - start,
+                          nbytes, error, params)
+
+    def query(self, sparql_query, include_prefixes=True, use_cache=True, query_name=None,
+              params=None):
+        """ส่ง SPARQL SELECT query และวัดเวลาตอบกลับ
+
+        ผลลัพธ์ที่สำเร็จจะถูกแคชไว้ (key = query text ที่ normalize แล้ว)
+        ค่า 'cached' ในผลลัพธ์บอกว่ามาจากแคชหรือไม่
+        query_name: ชื่อ template จาก sparql/registry.py (ถ้ามี) — query text ของ template คงรูปอยู่แล้ว
+        จึงใช้เป็น key ได้ทันทีโดยไม่ต้อง normalize
+        params: ค่าพารามิเตอร์ที่ผูกกับ template (ใช้ใน slow-query log เท่านั้น)
+        """
         start_time = time.time()
 
         if include_prefixes and not sparql_query.strip().upper().startswith('PREFIX'):
             sparql_query = SPARQL_PREFIXES + sparql_query
 
+        cache_key = self._cache_key('select', sparql_query, query_name)
+        cached = self.cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            metrics.observe_cache_hit(query_name, 'select')
+            # คืนสำเนาแถว เพราะ route บางตัวแก้ไข dict ที่ได้รับ
+            return {
+                'success': True,
+                'results': [dict(row) for row in cached['results']],
+                'count': cached['count'],
+                'response_time_ms': round((time.time() - start_time) * 1000, 2),
+                'cached': True
+            }
+
+        generation = self.cache.generation
         try:
-            self.query_endpoint.setQuery(sparql_query)
-            self.query_endpoint.setMethod(GET)
-            results = self.query_endpoint.query().convert()
+            parsed = self._send_query(sparql_query, SPARQL_RESULTS_JSON, query_name, params=params,
+                                      parse=self._parse_results)
+            count = len(parsed)
+            metrics.observe_rows(query_name, 'select', count)
+            if use_cache:
+                self.cache.set(cache_key, {
+                    'results': [dict(row) for row in parsed],
+                    'count': count,
+                }, generation)
             response_time = round((time.time() - start_time) * 1000, 2)
 
             return {
                 'success': True,
-                'results': self._parse_results(results),
-                'count': len(results['results']['bindings']),
+                'results': parsed,
+                'count': count,
+                'response_time_ms': response_time,
+                'cached': False
+            }
+        except Exception as e:
+            response_time = round((time.time() - start_time) * 1000, 2)
+            return {
+                'success': False,
+                'error': f'เกิดข้อผิดพลาดในการ query: {str(e)}',
                 'response_time_ms': response_time
             }
+
+    def query_columns(self, sparql_query, include_prefixes=True, use_cache=True, query_name=None,
+                      params=None):
+        """ส่ง SPARQL SELECT query คืนผลลัพธ์เป็น ColumnarResult (ดู sparql/columnar.py)
+
+        รูปแบบผลลัพธ์เหมือน query() แต่ 'results' เป็น ColumnarResult แทน list ของ dict
+        ColumnarResult ที่คืนจากแคชใช้ร่วมกัน ผู้เรียกต้องอ่านอย่างเดียว
+        """
+        start_time = time.time()
+
+        if include_prefixes and not sparql_query.strip().upper().startswith('PREFIX'):
+            sparql_query = SPARQL_PREFIXES + sparql_query
+
+        cache_key = self._cache_key('columns', sparql_query, query_name)
+        cached = self.cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            metrics.observe_cache_hit(query_name, 'columns')
+            return {
+                'success': True,
+                'results': cached,
+                'count': len(cached),
+                'response_time_ms': round((time.time() - start_time) * 1000, 2),
+                'cached': True
+            }
+
+        generation = self.cache.generation
+        try:
+            columns = self._send_query(sparql_query, SPARQL_RESULTS_JSON, query_name, 'columns',
+                                       params, parse=ColumnarResult.from_sparql_json)
+            metrics.observe_rows(query_name, 'columns', len(columns))
+            if use_cache:
+                self.cache.set(cache_key, columns, generation)
+            response_time = round((time.time() - start_time) * 1000, 2)
+
+            return {
+                'success': True,
+                'results': columns,
+                'count': len(columns),
+                'response_time_ms': response_time,
+                'cached': False
+            }
         except Exception as e:
             response_time = round((time.time() - start_time) * 1000, 2)
             return {
@@ -44,39 +192,187 @@ class FusekiClient:
                 'response_time_ms': response_time
             }
 
+    def iter_query(self, sparql_query, include_prefixes=True, use_cache=True,
+                   chunk_size=STREAM_CHUNK_SIZE, query_name=None, params=None):
+        """ส่ง SPARQL SELECT query แล้ว yield แถวทีละแถวระหว่างที่ Fuseki ส่งข้อมูลมา
+
+        ใช้กับผลลัพธ์ขนาดใหญ่: ไม่สร้าง list ทั้งชุด และไม่เก็บผลลัพธ์ลงแคช
+        (ถ้ามีผลลัพธ์ในแคชอยู่แล้วจะ yield จากแคชแทน)
+        ข้อผิดพลาดจะถูก raise ออกไปจาก generator ไม่ได้คืนเป็น dict แบบ query()
+        """
+        if include_prefixes and not sparql_query.strip().upper().startswith('PREFIX'):
+            sparql_query = SPARQL_PREFIXES + sparql_query
+
+        cached = self.cache.get(self._cache_key('select', sparql_query, query_name)) if use_cache else None
+        if cached is not None:
+            metrics.observe_cache_hit(query_name, 'stream')
+            for row in cached['results']:
+                yield dict(row)
+            return
+
+        # เวลาใน metrics นับจนอ่านครบ (หรือผู้เรียกเลิกอ่าน) ไม่ใช่แค่ถึง byte แรก
+        # network กับ parse สลับกันทีละ chunk จึงมี span เดียว
+        start = time.perf_counter()
+        span = tracer.start_span('sparql', query=query_name or ADHOC_QUERY, kind='stream')
+        nbytes = 0
+        rows = 0
+        error = 'ยกเลิกกลางคัน'
+
+        def count_bytes(n):
+            nonlocal nbytes
+            nbytes += n
+
+        bindings = self.backend.iter_bindings(sparql_query, SPARQL_RESULTS_JSON, chunk_size,
+                                              count_bytes)
+        try:
+            for binding in bindings:
+                rows += 1
+                yield self._parse_binding(binding)
+            error = None
+        except GeneratorExit:
+            # ผู้เรียกเลิกอ่านเอง (เช่น client ปิดการเชื่อมต่อ) ไม่นับเป็นข้อผิดพลาด
+            error = None
+            raise
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            # ปิด generator ของ backend ทันที (คืน connection เข้า pool แม้ผู้เรียกเลิกอ่านกลางทาง)
+            bindings.close()
+            self._observe(query_name, 'stream', sparql_query, time.perf_counter() - start,
+                          nbytes, error, params)
+            metrics.observe_rows(query_name, 'stream', rows)
+            if span is not None:
+                span.attributes.update(rows=rows, bytes=nbytes)
+                if error:
+                    span.attributes['error'] = error
+                span.finish()
+
+    def construct(self, sparql_query, include_prefixes=True, use_cache=True, query_name=None,
+                  params=None):
+        """ส่ง SPARQL CONSTRUCT query คืนค่า graph ในรูป RDF/JSON
+
+        graph มีรูปแบบ {subject_uri: {predicate_uri: [{'type': ..., 'value': ...}]}}
+        graph ที่คืนจากแคชใช้ร่วมกัน ผู้เรียกต้องอ่านอย่างเดียว
+        """
+        start_time = time.time()
+
+        if include_prefixes and not sparql_query.strip().upper().startswith('PREFIX'):
+            sparql_query = SPARQL_PREFIXES + sparql_query
+
+        cache_key = self._cache_key('construct', sparql_query, query_name)
+        cached = self.cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            metrics.observe_cache_hit(query_name, 'construct')
+            return {
+                'success': True,
+                'graph': cached['graph'],
+                'count': cached['count'],
+                'response_time_ms': round((time.time() - start_time) * 1000, 2),
+                'cached': True
+            }
+
+        generation = self.cache.generation
+        try:
+            graph = self._send_query(sparql_query, RDF_JSON, query_name, 'construct', params)
+            count = sum(len(objects) for predicates in graph.values()
+                        for objects in predicates.values())
+            metrics.observe_rows(query_name, 'construct', count)
+            if use_cache:
+                self.cache.set(cache_key, {'graph': graph, 'count': count}, generation)
+            response_time = round((time.time() - start_time) * 1000, 2)
+
+            return {
+                'success': True,
+                'graph': graph,
+                'count': count,
+                'response_time_ms': response_time,
+                'cached': False
+            }
+        except Exception as e:
+            response_time = round((time.time() - start_time) * 1000, 2)
+            return {
+                'success': False,
+                'error': f'เกิดข้อผิดพลาดในการ query: {str(e)}',
+                'response_time_ms': response_time
+            }
+
+    def query_many(self, queries, include_prefixes=True, query_names=None, query_params=None):
+        """ส่งหลาย SELECT query ที่ไม่ขึ้นต่อกันพร้อมกัน
+
+        queries: dict ของ {ชื่อ: sparql_query}
+        query_names: dict ของ {ชื่อ: ชื่อ template} (ถ้ามี)
+        query_params: dict ของ {ชื่อ: พารามิเตอร์ของ template} (ถ้ามี)
+        คืนค่าผลลัพธ์แยกตามชื่อ (รูปแบบเดียวกับ query()) พร้อมเวลาของแต่ละ query
+        และ response_time_ms เป็นเวลารวมจริง (wall time) ของทั้งชุด
+        """
+        start_time = time.time()
+
+        query_names = query_names or {}
+        query_params = query_params or {}
+        # copy_context: ให้ thread ใน pool เห็น context ของ request เดิม (เช่น route ใน slow-query log)
+        futures = {
+            name: self.executor.submit(contextvars.copy_context().run, self.query, sparql_query,
+                                       include_prefixes, query_name=query_names.get(name),
+                                       params=query_params.get(name))
+            for name, sparql_query in queries.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+        response_time = round((time.time() - start_time) * 1000, 2)
+
+        return {
+            'success': all(r['success'] for r in results.values()),
+            'results': results,
+            'timings_ms': {name: r['response_time_ms'] for name, r in results.items()},
+            'response_time_ms': response_time,
+            'cached': all(r.get('cached', False) for r in results.values())
+        }
+
+    def _cache_key(self, kind, sparql_query, query_name):
+        """key ของแคช: query จาก registry ใช้ (ชื่อ template, text) ตรงๆ ส่วน query อื่น normalize ก่อน"""
+        if query_name:
+            return (kind, query_name, sparql_query)
+        return (kind, normalize_query(sparql_query))
+
     def _parse_results(self, raw_results):
         """แปลงผลลัพธ์ SPARQL เป็น list ของ dict"""
-        parsed = []
-        for binding in raw_results['results']['bindings']:
-            row = {}
-            for var, value in binding.items():
-                if value['type'] == 'uri':
-                    # ตัด namespace ออกเหลือแค่ชื่อ
-                    uri = value['value']
-                    if '#' in uri:
-                        row[var] = uri.split('#')[-1]
-                    else:
-                        row[var] = uri
-                    row[f'{var}_uri'] = uri
+        return [self._parse_binding(binding) for binding in raw_results['results']['bindings']]
+
+    def _parse_binding(self, binding):
+        """แปลง binding หนึ่งแถวเป็น dict"""
+        row = {}
+        for var, value in binding.items():
+            if value['type'] == 'uri':
+                # ตัด namespace ออกเหลือแค่ชื่อ
+                uri = value['value']
+                if '#' in uri:
+                    row[var] = uri.split('#')[-1]
                 else:
-                    row[var] = value['value']
-            parsed.append(row)
-        return parsed
+                    row[var] = uri
+                row[f'{var}_uri'] = uri
+            else:
+                row[var] = value['value']
+        return row
 
-    def update(self, sparql_update, include_prefixes=True):
+    def update(self, sparql_update, include_prefixes=True, query_name=None, params=None):
         """ส่ง SPARQL INSERT/DELETE update"""
         start_time = time.time()
 
         if include_prefixes and not sparql_update.strip().upper().startswith('PREFIX'):
             sparql_update = SPARQL_PREFIXES + sparql_update
 
-        logger.info("[SPARQL UPDATE] Query:\n%s", sparql_update)
+        logger.info("[SPARQL UPDATE] %s Query:\n%s", query_name or '(ad-hoc)', sparql_update)
 
         try:
-            self.update_endpoint.setQuery(sparql_update)
-            self.update_endpoint.setMethod(POST)
-            self.update_endpoint.query()
+            with tracer.span('sparql', query=query_name or ADHOC_QUERY, kind='update'), \
+                    tracer.span(self.backend.span_name):
+                nbytes = self.backend.update(sparql_update)
             response_time = round((time.time() - start_time) * 1000, 2)
+            self._observe(query_name, 'update', sparql_update, response_time / 1000,
+                          nbytes, params=params)
+
+            # ข้อมูลเปลี่ยนแล้ว ผลลัพธ์ที่แคชไว้ทั้งหมดใช้ไม่ได้อีก
+            self.cache.clear()
 
             return {
                 'success': True,
@@ -84,6 +380,8 @@ class FusekiClient:
             }
         except Exception as e:
             response_time = round((time.time() - start_time) * 1000, 2)
+            self._observe(query_name, 'update', sparql_update, response_time / 1000,
+                          error=str(e), params=params)
             logger.error("[SPARQL UPDATE] FAILED: %s\nQuery was:\n%s", str(e), sparql_update)
             return {
                 'success': False,
@@ -91,26 +389,78 @@ class FusekiClient:
                 'response_time_ms': response_time
             }
 
-    def count_triples(self):
+    def explain(self, sparql_query):
+        """แผนการทำงานของ query จาก backend — ไม่ได้รัน query ซ้ำ
+
+        Fuseki: algebra ของ ARQ ทั้งก่อนและหลัง optimize (/$/validate/query)
+        embedded: โครงสร้างของ query ที่แปลงแล้ว
+        """
+        return self.backend.explain(sparql_query)
+
+    def text_index_available(self):
+        """Fuseki มี text index (jena-text / Lucene) ที่ใช้ text:query ค้นหาข้อความได้หรือไม่
+
+        FUSEKI_TEXT_INDEX='auto': ตรวจด้วย TEXT_INDEX_PROBE แล้วจำผลไว้ FUSEKI_TEXT_INDEX_PROBE_SECONDS
+        (ระหว่างตรวจใหม่ thread อื่นใช้ผลเดิมไปก่อน) embedded backend ไม่มี text index
+        """
+        if self.text_index_mode == 'false' or not self.backend.text_index:
+            return False
+        if self.text_index_mode == 'true':
+            return True
+        now = time.monotonic()
+        checked_at = self._text_index_checked_at
+        if checked_at is not None and now - checked_at < FUSEKI_TEXT_INDEX_PROBE_SECONDS:
+            return self._text_index
+        self._text_index_checked_at = now
+        available = self._probe_text_index()
+        if available != self._text_index:
+            logger.info("[TEXT INDEX] %s", 'ใช้ text:query' if available else 'ใช้ FILTER CONTAINS')
+        self._text_index = available
+        return available
+
+    def _probe_text_index(self):
+        """ค้นชื่อของผลิตภัณฑ์หนึ่งด้วย text:query แล้วดูว่าเจอผลิตภัณฑ์นั้นหรือไม่ (ข้อผิดพลาด = ไม่มี index)"""
+        sample = self.query(q.TEXT_INDEX_PROBE_SAMPLE, use_cache=False, query_name='text_index_probe')
+        if not sample['success'] or not sample['results']:
+            return False
+        row = sample['results'][0]
+        probe = SPARQL_PREFIXES + q.TEXT_INDEX_PROBE.format(
+            product_uri=row['product_uri'], search_term=LuceneText.bind(row['name']))
+        try:
+            data = self._send_query(probe, SPARQL_RESULTS_JSON, 'text_index_probe', kind='ask')
+        except Exception as e:
+            logger.warning("[TEXT INDEX] ตรวจ text index ไม่สำเร็จ: %s", e)
+            return False
+        return bool(data.get('boolean'))
+
+    def text_index_stats(self):
+        return {
+            'mode': self.text_index_mode,
+            'available': self.text_index_available(),
+        }
+
+    def count_triples(self, use_cache=True):
         """นับจำนวน triples ทั้งหมดใน dataset"""
-        result = self.query("SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }")
+        result = self.query("SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }", use_cache=use_cache,
+                            query_name='count_triples')
         if result['success'] and result['results']:
             return int(result['results'][0]['count'])
         return 0
 
     def check_connection(self):
-        """ตรวจสอบการเชื่อมต่อกับ Fuseki"""
+        """ตรวจสอบการเชื่อมต่อกับ Fuseki (หรือความพร้อมของ embedded store) ด้วย ping ที่ไม่ต้อง query ข้อมูล"""
         try:
-            count = self.count_triples()
+            self.backend.ping()
             return {
                 'connected': True,
-                'endpoint': FUSEKI_QUERY_ENDPOINT,
-                'triple_count': count
+                'backend': self.backend.name,
+                'endpoint': self.backend.endpoint,
             }
         except Exception as e:
             return {
                 'connected': False,
-                'endpoint': FUSEKI_QUERY_ENDPOINT,
+                'backend': self.backend.name,
+                'endpoint': self.backend.endpoint,
                 'error': str(e)
             }
 
@@ -1,5 +1,7 @@
 # SPARQL Queries สำหรับ Backend API
 # รวม query templates ที่ใช้บ่อยทั้งหมด
+import re
+from sparql.terms import iri, escape_literal, Number
 
 # === ผลิตภัณฑ์ (Products) ===
 
@@ -29,19 +31,19 @@ GET_PRODUCT_BY_ID = """
 SELECT ?name ?price ?description ?weight ?categoryName ?enterpriseName
        ?enterpriseDesc ?shelfLife ?imageUrl
 WHERE {{
-    sce:{product_id} a sce:FoodProduct ;
+    {product_id} a sce:FoodProduct ;
                      sce:hasName ?name ;
                      sce:hasPrice ?price .
-    OPTIONAL {{ sce:{product_id} sce:hasDescription ?description }}
-    OPTIONAL {{ sce:{product_id} sce:hasWeight ?weight }}
-    OPTIONAL {{ sce:{product_id} sce:hasShelfLifeDays ?shelfLife }}
-    OPTIONAL {{ sce:{product_id} sce:hasImageUrl ?imageUrl }}
+    OPTIONAL {{ {product_id} sce:hasDescription ?description }}
+    OPTIONAL {{ {product_id} sce:hasWeight ?weight }}
+    OPTIONAL {{ {product_id} sce:hasShelfLifeDays ?shelfLife }}
+    OPTIONAL {{ {product_id} sce:hasImageUrl ?imageUrl }}
     OPTIONAL {{
-        sce:{product_id} sce:belongsToCategory ?category .
+        {product_id} sce:belongsToCategory ?category .
         ?category sce:hasName ?categoryName .
     }}
     OPTIONAL {{
-        sce:{product_id} sce:producedBy ?enterprise .
+        {product_id} sce:producedBy ?enterprise .
         ?enterprise sce:hasName ?enterpriseName .
         OPTIONAL {{ ?enterprise sce:hasDescription ?enterpriseDesc }}
     }}
@@ -51,7 +53,7 @@ WHERE {{
 GET_PRODUCT_INGREDIENTS = """
 SELECT ?ingredientName ?ingredientDesc
 WHERE {{
-    sce:{product_id} sce:hasIngredient ?ingredient .
+    {product_id} sce:hasIngredient ?ingredient .
     ?ingredient sce:hasName ?ingredientName .
     OPTIONAL {{ ?ingredient sce:hasDescription ?ingredientDesc }}
 }}
@@ -61,7 +63,7 @@ ORDER BY ?ingredientName
 GET_PRODUCT_CERTIFICATIONS = """
 SELECT ?certName ?certDesc
 WHERE {{
-    sce:{product_id} sce:hasCertification ?cert .
+    {product_id} sce:hasCertification ?cert .
     ?cert sce:hasName ?certName .
     OPTIONAL {{ ?cert sce:hasDescription ?certDesc }}
 }}
@@ -70,7 +72,7 @@ WHERE {{
 GET_PRODUCT_CHANNELS = """
 SELECT ?channelName ?channelDesc
 WHERE {{
-    sce:{product_id} sce:soldVia ?channel .
+    {product_id} sce:soldVia ?channel .
     ?channel sce:hasName ?channelName .
     OPTIONAL {{ ?channel sce:hasDescription ?channelDesc }}
 }}
@@ -79,7 +81,7 @@ WHERE {{
 GET_PRODUCT_CUSTOMERS = """
 SELECT ?customerName ?customerDesc
 WHERE {{
-    sce:{product_id} sce:targetsCustomer ?customer .
+    {product_id} sce:targetsCustomer ?customer .
     ?customer sce:hasName ?customerName .
     OPTIONAL {{ ?customer sce:hasDescription ?customerDesc }}
 }}
@@ -88,7 +90,7 @@ WHERE {{
 GET_PRODUCT_REVIEWS = """
 SELECT ?reviewerName ?rating ?reviewDesc
 WHERE {{
-    sce:{product_id} sce:hasReview ?review .
+    {product_id} sce:hasReview ?review .
     ?review sce:hasName ?reviewerName ;
             sce:hasRating ?rating .
     OPTIONAL {{ ?review sce:hasDescription ?reviewDesc }}
@@ -99,7 +101,7 @@ ORDER BY DESC(?rating)
 GET_PRODUCT_PROCESS = """
 SELECT ?processName ?processDesc
 WHERE {{
-    sce:{product_id} sce:hasProductionProcess ?process .
+    {product_id} sce:hasProductionProcess ?process .
     ?process sce:hasName ?processName .
     OPTIONAL {{ ?process sce:hasDescription ?processDesc }}
 }}
@@ -111,7 +113,7 @@ WHERE {{
     ?product a sce:FoodProduct ;
              sce:hasName ?name ;
              sce:hasPrice ?price ;
-             sce:belongsToCategory sce:{category_id} .
+             sce:belongsToCategory {category_id} .
     OPTIONAL {{ ?product sce:hasDescription ?description }}
     OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
     OPTIONAL {{
@@ -142,6 +144,41 @@ WHERE {{
 ORDER BY ?price
 """
 
+# ดึงผลิตภัณฑ์พร้อมข้อมูลรอบข้างทั้งหมดในรอบเดียว (ใช้คู่กับ sparql/framing.py)
+# ครอบคลุม: หมวดหมู่, วิสาหกิจ, วัตถุดิบ, มาตรฐาน, ช่องทาง, ลูกค้า, รีวิว, กระบวนการผลิต
+CONSTRUCT_PRODUCT_DOCUMENT = """
+CONSTRUCT {{
+    {product_id} ?p ?o .
+    ?o ?op ?ov .
+}}
+WHERE {{
+    {product_id} a sce:FoodProduct ;
+                     ?p ?o .
+    OPTIONAL {{
+        ?o ?op ?ov .
+        FILTER (?op IN (sce:hasName, sce:hasDescription, sce:hasRating))
+    }}
+}}
+"""
+
+# หลายผลิตภัณฑ์ใน query เดียว (POST /api/products/batch) — graph เดียวกับ CONSTRUCT_PRODUCT_DOCUMENT
+# ของทุกรหัสใน {product_ids} แล้วแยกเป็นรายผลิตภัณฑ์ด้วย frame_product ฝั่ง Python
+CONSTRUCT_PRODUCTS_BATCH = """
+CONSTRUCT {{
+    ?product ?p ?o .
+    ?o ?op ?ov .
+}}
+WHERE {{
+    VALUES ?product {{ {product_ids} }}
+    ?product a sce:FoodProduct ;
+             ?p ?o .
+    OPTIONAL {{
+        ?o ?op ?ov .
+        FILTER (?op IN (sce:hasName, sce:hasDescription, sce:hasRating))
+    }}
+}}
+"""
+
 # === วิสาหกิจชุมชน (Enterprises) ===
 
 GET_ALL_ENTERPRISES = """
@@ -161,11 +198,11 @@ ORDER BY ?name
 GET_ENTERPRISE_BY_ID = """
 SELECT ?name ?description ?locationName ?districtName ?phone
 WHERE {{
-    sce:{enterprise_id} a sce:CommunityEnterprise ;
+    {enterprise_id} a sce:CommunityEnterprise ;
                         sce:hasName ?name .
-    OPTIONAL {{ sce:{enterprise_id} sce:hasDescription ?description }}
+    OPTIONAL {{ {enterprise_id} sce:hasDescription ?description }}
     OPTIONAL {{
-        sce:{enterprise_id} sce:locatedIn ?location .
+        {enterprise_id} sce:locatedIn ?location .
         ?location sce:hasName ?locationName .
         OPTIONAL {{
             ?location sce:locatedIn ?district .
@@ -173,7 +210,7 @@ WHERE {{
         }}
     }}
     OPTIONAL {{
-        sce:{enterprise_id} sce:hasContactInfo ?contact .
+        {enterprise_id} sce:hasContactInfo ?contact .
         ?contact sce:hasPhoneNumber ?phone .
     }}
 }}
@@ -182,7 +219,7 @@ WHERE {{
 GET_ENTERPRISE_PRODUCTS = """
 SELECT ?product ?productName ?price ?categoryName ?imageUrl
 WHERE {{
-    sce:{enterprise_id} sce:hasProduct ?product .
+    {enterprise_id} sce:hasProduct ?product .
     ?product sce:hasName ?productName ;
              sce:hasPrice ?price .
     OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
@@ -194,6 +231,33 @@ WHERE {{
 ORDER BY ?productName
 """
 
+# ดึงวิสาหกิจพร้อมที่ตั้ง, เบอร์ติดต่อ และรายการผลิตภัณฑ์ในรอบเดียว
+CONSTRUCT_ENTERPRISE_DOCUMENT = """
+CONSTRUCT {{
+    {enterprise_id} ?p ?o .
+    ?o ?op ?ov .
+    ?district sce:hasName ?districtName .
+    ?category sce:hasName ?categoryName .
+}}
+WHERE {{
+    {enterprise_id} a sce:CommunityEnterprise ;
+                        ?p ?o .
+    OPTIONAL {{
+        ?o ?op ?ov .
+        FILTER (?op IN (sce:hasName, sce:hasPrice, sce:hasImageUrl,
+                        sce:belongsToCategory, sce:locatedIn, sce:hasPhoneNumber))
+    }}
+    OPTIONAL {{
+        ?o sce:locatedIn ?district .
+        ?district sce:hasName ?districtName .
+    }}
+    OPTIONAL {{
+        ?o sce:belongsToCategory ?category .
+        ?category sce:hasName ?categoryName .
+    }}
+}}
+"""
+
 # === หมวดหมู่ (Categories) ===
 
 GET_ALL_CATEGORIES = """
@@ -211,8 +275,81 @@ GROUP BY ?category ?name ?description
 ORDER BY ?name
 """
 
+# === Catalog snapshot (services/catalog_snapshot.py) ===
+# ดึงเอกสารของผลิตภัณฑ์/วิสาหกิจทุกตัวในรอบเดียว รูปเดียวกับ CONSTRUCT_*_DOCUMENT แต่ไม่ผูก ID
+
+CONSTRUCT_CATALOG_PRODUCTS = """
+CONSTRUCT {
+    ?product ?p ?o .
+    ?o ?op ?ov .
+}
+WHERE {
+    ?product a sce:FoodProduct ;
+             ?p ?o .
+    OPTIONAL {
+        ?o ?op ?ov .
+        FILTER (?op IN (sce:hasName, sce:hasDescription, sce:hasRating))
+    }
+}
+"""
+
+CONSTRUCT_CATALOG_ENTERPRISES = """
+CONSTRUCT {
+    ?enterprise ?p ?o .
+    ?o ?op ?ov .
+    ?district sce:hasName ?districtName .
+    ?category sce:hasName ?categoryName .
+}
+WHERE {
+    ?enterprise a sce:CommunityEnterprise ;
+                ?p ?o .
+    OPTIONAL {
+        ?o ?op ?ov .
+        FILTER (?op IN (sce:hasName, sce:hasPrice, sce:hasImageUrl,
+                        sce:belongsToCategory, sce:locatedIn, sce:hasPhoneNumber))
+    }
+    OPTIONAL {
+        ?o sce:locatedIn ?district .
+        ?district sce:hasName ?districtName .
+    }
+    OPTIONAL {
+        ?o sce:belongsToCategory ?category .
+        ?category sce:hasName ?categoryName .
+    }
+}
+"""
+
 # === วิเคราะห์ข้อมูล (Analytics) ===
 
+COUNT_PRODUCTS = "SELECT (COUNT(?p) AS ?count) WHERE { ?p a sce:FoodProduct }"
+COUNT_ENTERPRISES = "SELECT (COUNT(?e) AS ?count) WHERE { ?e a sce:CommunityEnterprise }"
+COUNT_CATEGORIES = "SELECT (COUNT(?c) AS ?count) WHERE { ?c a sce:ProductCategory }"
+
+# ตัวนับทั้งชุดใน query เดียว — ใช้ตั้งต้นและตรวจทานตัวนับของ services/dataset_counters.py
+COUNT_DATASET = """
+SELECT ?triples ?products ?enterprises ?categories
+WHERE {
+    { SELECT (COUNT(*) AS ?triples) WHERE { ?s ?p ?o } }
+    { SELECT (COUNT(?p) AS ?products) WHERE { ?p a sce:FoodProduct } }
+    { SELECT (COUNT(?e) AS ?enterprises) WHERE { ?e a sce:CommunityEnterprise } }
+    { SELECT (COUNT(?c) AS ?categories) WHERE { ?c a sce:ProductCategory } }
+}
+"""
+
+# triple ที่ resource หนึ่งเป็น subject หรือ object และชนิดของ resource นั้น
+# วัดก่อนและหลัง admin เขียนข้อมูล ผลต่างคือค่าที่ต้องปรับตัวนับ (อ่านจาก index ของ resource เดียว ไม่สแกนทั้ง store)
+RESOURCE_FOOTPRINT = """
+SELECT (COUNT(?p) AS ?triples)
+       (SUM(IF(?p = rdf:type && ?o = sce:FoodProduct, 1, 0)) AS ?products)
+       (SUM(IF(?p = rdf:type && ?o = sce:CommunityEnterprise, 1, 0)) AS ?enterprises)
+       (SUM(IF(?p = rdf:type && ?o = sce:ProductCategory, 1, 0)) AS ?categories)
+WHERE {{
+    {{ {resource_id} ?p ?o }}
+    UNION
+    {{ ?s ?p {resource_id} FILTER (?s != {resource_id}) BIND ({resource_id} AS ?o) }}
+}}
+"""
+
 ANALYTICS_PRICE_BY_CATEGORY = """
 SELECT ?categoryName
        (COUNT(?product) AS ?count)
@@ -286,6 +423,17 @@ GROUP BY ?productName ?price
 ORDER BY DESC(?avgRating)
 """
 
+# view ของหน้า analytics ที่คำนวณล่วงหน้าได้ (services/analytics_views.py) ชื่อ template → query
+# รวมเป็น query เดียวด้วย union_views()
+ANALYTICS_VIEWS = {
+    'analytics_price_by_category': ANALYTICS_PRICE_BY_CATEGORY,
+    'analytics_channels': ANALYTICS_CHANNELS,
+    'analytics_certifications': ANALYTICS_CERTIFICATIONS,
+    'analytics_enterprise_products': ANALYTICS_ENTERPRISE_PRODUCTS,
+    'analytics_customer_segments': ANALYTICS_CUSTOMER_SEGMENTS,
+    'analytics_top_rated': ANALYTICS_TOP_RATED,
+}
+
 # === ค้นหา (Search) ===
 
 SEARCH_PRODUCTS_BY_TEXT = """
@@ -305,13 +453,125 @@ WHERE {{
         ?enterprise sce:hasName ?enterpriseName .
     }}
     FILTER (
-        CONTAINS(LCASE(?name), LCASE("{search_term}"))
-        || CONTAINS(LCASE(COALESCE(?description, "")), LCASE("{search_term}"))
+        CONTAINS(LCASE(?name), LCASE({search_term}))
+        || CONTAINS(LCASE(COALESCE(?description, "")), LCASE({search_term}))
     )
 }}
 ORDER BY ?name
 """
 
+# SEARCH_PRODUCTS_BY_TEXT ผ่าน text index ของ Fuseki (jena-text / Lucene ดู docker/fuseki/sakon_ce_text.ttl)
+# ใช้แทนอัตโนมัติเมื่อ text index พร้อมใช้ (FusekiClient.text_index_available) — คอลัมน์และการเรียงเหมือนเดิม
+# Lucene จับคู่ตามคำที่ analyzer ตัดไว้ (ไม่ใช่ substring) {search_term} จึงเป็นวลี (LuceneText)
+SEARCH_PRODUCTS_BY_TEXT_INDEXED = """
+SELECT ?product ?name ?price ?categoryName ?enterpriseName ?description ?imageUrl
+WHERE {{
+    {{
+        SELECT DISTINCT ?product WHERE {{
+            {{ ?product text:query (sce:hasName {search_term}) }}
+            UNION
+            {{ ?product text:query (sce:hasDescription {search_term}) }}
+        }}
+    }}
+    ?product a sce:FoodProduct ;
+             sce:hasName ?name ;
+             sce:hasPrice ?price .
+    OPTIONAL {{ ?product sce:hasDescription ?description }}
+    OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
+    OPTIONAL {{
+        ?product sce:belongsToCategory ?category .
+        ?category sce:hasName ?categoryName .
+    }}
+    OPTIONAL {{
+        ?product sce:producedBy ?enterprise .
+        ?enterprise sce:hasName ?enterpriseName .
+    }}
+}}
+ORDER BY ?name
+"""
+
+# แถวผลลัพธ์ของ SEARCH_PRODUCTS_BY_TEXT สำหรับผลิตภัณฑ์ที่ search index จับคู่ได้ (ไม่ต้องสแกนทุกผลิตภัณฑ์ใน Fuseki)
+SEARCH_RESULT_ROWS = """
+SELECT ?product ?name ?price ?categoryName ?enterpriseName ?description ?imageUrl
+WHERE {{
+    VALUES ?product {{ {product_ids} }}
+    ?product a sce:FoodProduct ;
+             sce:hasName ?name ;
+             sce:hasPrice ?price .
+    OPTIONAL {{ ?product sce:hasDescription ?description }}
+    OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
+    OPTIONAL {{
+        ?product sce:belongsToCategory ?category .
+        ?category sce:hasName ?categoryName .
+    }}
+    OPTIONAL {{
+        ?product sce:producedBy ?enterprise .
+        ?enterprise sce:hasName ?enterpriseName .
+    }}
+}}
+"""
+
+# ข้อความที่ทำ index ของผลิตภัณฑ์ (แถวละค่า) สำหรับ services/search_index.py
+# ?field: name / description / ingredient / enterprise, ?source: resource ที่เป็นเจ้าของข้อความ
+SEARCH_DOCUMENTS = """
+SELECT ?product ?field ?source ?text
+WHERE {
+    ?product a sce:FoodProduct .
+    {
+        ?product sce:hasName ?text .
+        BIND ("name" AS ?field)
+        BIND (?product AS ?source)
+    } UNION {
+        ?product sce:hasDescription ?text .
+        BIND ("description" AS ?field)
+        BIND (?product AS ?source)
+    } UNION {
+        ?product sce:hasIngredient ?source .
+        ?source sce:hasName ?text .
+        BIND ("ingredient" AS ?field)
+    } UNION {
+        ?product sce:producedBy ?source .
+        ?source sce:hasName ?text .
+        BIND ("enterprise" AS ?field)
+    }
+}
+"""
+
+# SEARCH_DOCUMENTS เฉพาะผลิตภัณฑ์ใน {product_ids} (ปรับ index ทีละส่วนหลัง admin เขียนข้อมูล)
+SEARCH_DOCUMENTS_BATCH = """
+SELECT ?product ?field ?source ?text
+WHERE {{
+    VALUES ?product {{ {product_ids} }}
+    ?product a sce:FoodProduct .
+    {{
+        ?product sce:hasName ?text .
+        BIND ("name" AS ?field)
+        BIND (?product AS ?source)
+    }} UNION {{
+        ?product sce:hasDescription ?text .
+        BIND ("description" AS ?field)
+        BIND (?product AS ?source)
+    }} UNION {{
+        ?product sce:hasIngredient ?source .
+        ?source sce:hasName ?text .
+        BIND ("ingredient" AS ?field)
+    }} UNION {{
+        ?product sce:producedBy ?source .
+        ?source sce:hasName ?text .
+        BIND ("enterprise" AS ?field)
+    }}
+}}
+"""
+
+# ผลิตภัณฑ์ที่ข้อความใน index ขึ้นกับ resource (ผู้ผลิต/วัตถุดิบ) — ใช้ปรับ index หลัง admin เขียน resource นั้น
+SEARCH_RELATED_PRODUCTS = """
+SELECT ?product
+WHERE {{
+    ?product a sce:FoodProduct .
+    {{ ?product sce:producedBy {resource_id} }} UNION {{ ?product sce:hasIngredient {resource_id} }}
+}}
+"""
+
 SEARCH_BY_CERTIFICATION = """
 SELECT ?product ?name ?price ?certName ?enterpriseName ?imageUrl
 WHERE {{
@@ -320,7 +580,7 @@ WHERE {{
              sce:hasPrice ?price ;
              sce:hasCertification ?cert .
     ?cert sce:hasName ?certName .
-    FILTER (CONTAINS(LCASE(?certName), LCASE("{search_term}")))
+    FILTER (CONTAINS(LCASE(?certName), LCASE({search_term})))
     OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
     OPTIONAL {{
         ?product sce:producedBy ?enterprise .
@@ -330,6 +590,42 @@ WHERE {{
 ORDER BY ?name
 """
 
+# SEARCH_BY_CERTIFICATION ผ่าน text index — หาการรับรองจากชื่อก่อน แล้วจึงหาผลิตภัณฑ์ที่ได้รับ
+SEARCH_BY_CERTIFICATION_INDEXED = """
+SELECT ?product ?name ?price ?certName ?enterpriseName ?imageUrl
+WHERE {{
+    ?cert text:query (sce:hasName {search_term}) ;
+          sce:hasName ?certName .
+    ?product a sce:FoodProduct ;
+             sce:hasName ?name ;
+             sce:hasPrice ?price ;
+             sce:hasCertification ?cert .
+    OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
+    OPTIONAL {{
+        ?product sce:producedBy ?enterprise .
+        ?enterprise sce:hasName ?enterpriseName .
+    }}
+}}
+ORDER BY ?name
+"""
+
+# ตรวจว่า Fuseki มี text index ที่ใช้ได้ (FusekiClient.text_index_available):
+# ชื่อของผลิตภัณฑ์หนึ่งต้องค้นเจอผลิตภัณฑ์นั้นด้วย text:query — ถ้าไม่มี jena-text, dataset ไม่ได้ตั้ง index
+# หรือ index ยังว่าง (โหลดข้อมูลแล้วยังไม่ได้สร้าง index) ผลจะเป็น false
+TEXT_INDEX_PROBE_SAMPLE = """
+SELECT ?product ?name
+WHERE {
+    ?product a sce:FoodProduct ;
+             sce:hasName ?name .
+}
+ORDER BY ?product
+LIMIT 1
+"""
+
+TEXT_INDEX_PROBE = """
+ASK {{ <{product_uri}> text:query (sce:hasName {search_term}) }}
+"""
+
 # === Semantic Queries ===
 
 SEMANTIC_HEALTH_PRODUCTS = """
@@ -431,24 +727,123 @@ GROUP BY ?product ?name ?price ?enterpriseName ?imageUrl
 ORDER BY ?name
 """
 
+# เงื่อนไขการรับรองของ SEMANTIC_ORGANIC_PRODUCTS / SEMANTIC_PREMIUM_PRODUCTS เป็น graph pattern บน ?product
+# สำหรับ query planner (services/query_planner.py) ที่รวมหลาย intent เป็น query เดียว
+SEMANTIC_ORGANIC_PATTERN = """
+{ ?product sce:hasCertification sce:OrganicThailand }
+UNION
+{
+    ?product sce:hasDescription ?organicDescription .
+    FILTER (CONTAINS(?organicDescription, "อินทรีย์"))
+}
+"""
+
+SEMANTIC_PREMIUM_PATTERN = """
+?product sce:hasCertification sce:FDA_Certificate .
+{ ?product sce:hasCertification sce:OTOP_4Star }
+UNION
+{ ?product sce:hasCertification sce:OTOP_5Star }
+"""
+
+# query เดียวของ semantic search ที่มีหลาย intent: {plan} คือ graph pattern ที่ query planner เรียงแล้ว
+# (ก้อนเงื่อนไข + pattern หลักของผลิตภัณฑ์ + FILTER ราคา) และ {order} คือตัวแปรที่เรียงผล
+SEMANTIC_PLAN = """
+SELECT DISTINCT ?product ?name ?price ?categoryName ?enterpriseName ?imageUrl
+WHERE {{
+{plan}
+    OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
+    OPTIONAL {{
+        ?product sce:belongsToCategory ?category .
+        ?category sce:hasName ?categoryName .
+    }}
+    OPTIONAL {{
+        ?product sce:producedBy ?enterprise .
+        ?enterprise sce:hasName ?enterpriseName .
+    }}
+}}
+ORDER BY {order}
+"""
+
 SEMANTIC_SIMILAR_PRODUCTS = """
 SELECT ?relatedProduct ?relatedName ?relatedPrice ?categoryName ?imageUrl
 WHERE {{
-    sce:{product_id} sce:belongsToCategory ?category .
+    {product_id} sce:belongsToCategory ?category .
     ?relatedProduct a sce:FoodProduct ;
                     sce:belongsToCategory ?category ;
                     sce:hasName ?relatedName ;
                     sce:hasPrice ?relatedPrice .
     ?category sce:hasName ?categoryName .
     OPTIONAL {{ ?relatedProduct sce:hasImageUrl ?imageUrl }}
-    FILTER (?relatedProduct != sce:{product_id})
+    FILTER (?relatedProduct != {product_id})
 }}
 ORDER BY ?relatedName
 """
 
+# SEMANTIC_SIMILAR_PRODUCTS ของหลายผลิตภัณฑ์ใน query เดียว (POST /api/recommendations/similar/batch)
+# ?product บอกว่าแถวเป็นของรหัสใด — แยกกลุ่มฝั่ง Python โดยคงลำดับ ?relatedName ภายในกลุ่ม
+SEMANTIC_SIMILAR_PRODUCTS_BATCH = """
+SELECT ?product ?relatedProduct ?relatedName ?relatedPrice ?categoryName ?imageUrl
+WHERE {{
+    VALUES ?product {{ {product_ids} }}
+    ?product sce:belongsToCategory ?category .
+    ?relatedProduct a sce:FoodProduct ;
+                    sce:belongsToCategory ?category ;
+                    sce:hasName ?relatedName ;
+                    sce:hasPrice ?relatedPrice .
+    ?category sce:hasName ?categoryName .
+    OPTIONAL {{ ?relatedProduct sce:hasImageUrl ?imageUrl }}
+    FILTER (?relatedProduct != ?product)
+}}
+ORDER BY ?product ?relatedName
+"""
+
+# คะแนนรีวิวทุกรายการ (ผู้รีวิว × ผลิตภัณฑ์) สำหรับฝึก matrix factorisation ของ train_also_liked.py
+# ผู้รีวิวระบุด้วย hasName ของรีวิว (รีวิวที่ไม่มีชื่อนับเป็นผู้รีวิวแยกกัน)
+REVIEW_RATINGS = """
+SELECT ?product ?review ?reviewerName ?rating
+WHERE {
+    ?product a sce:FoodProduct ;
+             sce:hasReview ?review .
+    ?review sce:hasRating ?rating .
+    OPTIONAL { ?review sce:hasName ?reviewerName }
+}
+"""
+
+# คุณลักษณะของผลิตภัณฑ์ทุกตัว (แถวละค่า) สำหรับเมทริกซ์คุณลักษณะของ services/product_similarity.py
+# ?feature: category / ingredient / certification / channel / customer / district (อำเภอของวิสาหกิจผู้ผลิต)
+PRODUCT_FEATURES = """
+SELECT ?product ?feature ?value
+WHERE {
+    ?product a sce:FoodProduct .
+    {
+        ?product sce:belongsToCategory ?value .
+        BIND ("category" AS ?feature)
+    } UNION {
+        ?product sce:hasIngredient ?value .
+        BIND ("ingredient" AS ?feature)
+    } UNION {
+        ?product sce:hasCertification ?value .
+        BIND ("certification" AS ?feature)
+    } UNION {
+        ?product sce:soldVia ?value .
+        BIND ("channel" AS ?feature)
+    } UNION {
+        ?product sce:targetsCustomer ?value .
+        BIND ("customer" AS ?feature)
+    } UNION {
+        ?product sce:producedBy ?enterprise .
+        ?enterprise sce:locatedIn ?subDistrict .
+        ?subDistrict sce:locatedIn ?value .
+        ?value a sce:District .
+        BIND ("district" AS ?feature)
+    }
+}
+"""
+
+# คู่ที่มีวัตถุดิบร่วมกันอย่างน้อย {min_shared} ชนิด ทุกคู่ (ค่าเท่ากันเรียงตามชื่อ เหมือน services/ingredient_index.py)
 SEMANTIC_SHARED_INGREDIENTS = """
 SELECT ?product1Name ?product2Name (COUNT(?ingredient) AS ?sharedCount)
-WHERE {
+WHERE {{
     ?p1 a sce:FoodProduct ;
         sce:hasName ?product1Name ;
         sce:hasIngredient ?ingredient .
@@ -456,11 +851,34 @@ WHERE {
         sce:hasName ?product2Name ;
         sce:hasIngredient ?ingredient .
     FILTER (STR(?p1) < STR(?p2))
-}
+}}
 GROUP BY ?product1Name ?product2Name
-HAVING (COUNT(?ingredient) >= 2)
-ORDER BY DESC(?sharedCount)
-LIMIT 20
+HAVING (COUNT(?ingredient) >= {min_shared})
+ORDER BY DESC(?sharedCount) ?product1Name ?product2Name
+"""
+
+# เฉพาะ {limit} คู่แรก
+SEMANTIC_SHARED_INGREDIENTS_TOP = SEMANTIC_SHARED_INGREDIENTS + "LIMIT {limit}\n"
+
+# ผลิตภัณฑ์ × วัตถุดิบ (แถวละคู่ ผลิตภัณฑ์ที่ไม่มีวัตถุดิบได้แถวเดียวที่ ?ingredient ว่าง)
+# สำหรับสร้าง inverted index ของ services/ingredient_index.py แทน self-join ของ SEMANTIC_SHARED_INGREDIENTS
+PRODUCT_INGREDIENT_INCIDENCE = """
+SELECT ?product ?name ?ingredient
+WHERE {
+    ?product a sce:FoodProduct ;
+             sce:hasName ?name .
+    OPTIONAL { ?product sce:hasIngredient ?ingredient }
+}
+"""
+
+# แถวของผลิตภัณฑ์เดียว — ใช้ปรับ index หลัง admin เขียนข้อมูล (ไม่มีแถว = ไม่ใช่ผลิตภัณฑ์แล้ว)
+PRODUCT_INGREDIENT_ROW = """
+SELECT ?name ?ingredient
+WHERE {{
+    {product_id} a sce:FoodProduct ;
+                 sce:hasName ?name .
+    OPTIONAL {{ {product_id} sce:hasIngredient ?ingredient }}
+}}
 """
 
 SEMANTIC_PRODUCTS_BY_DISTRICT = """
@@ -472,109 +890,200 @@ WHERE {{
              sce:producedBy ?enterprise .
     ?enterprise sce:hasName ?enterpriseName ;
                 sce:locatedIn ?subDistrict .
-    ?subDistrict sce:locatedIn sce:{district_id} .
-    sce:{district_id} sce:hasName ?districtName .
+    ?subDistrict sce:locatedIn {district_id} .
+    {district_id} sce:hasName ?districtName .
     OPTIONAL {{ ?product sce:hasImageUrl ?imageUrl }}
 }}
 ORDER BY ?productName
 """
 
+# === Keyset Pagination ===
+# แบ่งหน้าด้วยค่าของคอลัมน์ที่ใช้เรียง (ORDER BY เดิมของ template) + ตัวแปรแรกของ SELECT เป็นตัวตัดสินเสมอ
+# หน้าถัดไปใช้ FILTER "มากกว่าแถวสุดท้าย" แทน OFFSET จึงไม่ต้องข้ามแถวที่อ่านไปแล้วซ้ำ
+
+# ตัวแปรที่เรียงเป็นตัวเลข (นอกนั้นเทียบเป็นข้อความ)
+NUMERIC_ORDER_VARS = {'price', 'relatedPrice', 'avgRating', 'score'}
+
+_ORDER_BY = re.compile(r'\bORDER BY\s+(?:(DESC|ASC)\(\s*\?(\w+)\s*\)|\?(\w+))\s*$', re.IGNORECASE)
+_PROLOGUE = re.compile(r'(?:\s*PREFIX[^\n]*\n)*', re.IGNORECASE)
+_FIRST_SELECT_VAR = re.compile(r'\bSELECT\s+(?:DISTINCT\s+)?\?(\w+)', re.IGNORECASE)
+
+
+def page_key(sparql_query):
+    """คืน (ตัวแปรที่เรียง, เรียงจากมากไปน้อยหรือไม่, ตัวแปรตัดสินเสมอ) ของ query
+
+    รองรับ template ที่จบด้วย ORDER BY ?var หรือ ORDER BY DESC(?var)/ASC(?var) ตัวเดียว
+    """
+    order = _ORDER_BY.search(sparql_query.strip())
+    first = _FIRST_SELECT_VAR.search(sparql_query)
+    if not order or not first:
+        raise ValueError('query นี้ไม่รองรับการแบ่งหน้า (ต้องมี ORDER BY ตัวแปรเดียวท้าย query)')
+    descending = (order.group(1) or '').upper() == 'DESC'
+    return order.group(2) or order.group(3), descending, first.group(1)
+
+
+def union_views(views):
+    """รวม SELECT แบบ aggregate หลายชุดเป็น query เดียว (UNION ของ subquery)
+
+    views: ชื่อ → query ทุกแถวของผลลัพธ์มีตัวแปร ?view บอกชื่อ view ที่มาของแถว
+    ORDER BY ท้ายแต่ละ query ถูกตัดออก (ลำดับใน subquery ไม่คงอยู่หลัง UNION) ผู้เรียกต้องเรียงเองตาม page_key()
+    """
+    parts = []
+    for name, query in views.items():
+        query = _ORDER_BY.sub('', query.strip()).strip()
+        query = re.sub(r'^SELECT\s+', f'SELECT ("{name}" AS ?view) ', query, count=1, flags=re.IGNORECASE)
+        parts.append('    {\n' + query + '\n    }')
+    return 'SELECT * WHERE {\n' + '\n    UNION\n'.join(parts) + '\n}\n'
+
+
+_PROJECTION = re.compile(r'\bSELECT\s+(?:DISTINCT\s+)?(.*?)\bWHERE\b', re.IGNORECASE | re.DOTALL)
+_AGGREGATE_ALIAS = re.compile(r'\(.*?\bAS\s+(\?\w+)\s*\)', re.IGNORECASE | re.DOTALL)
+
+
+def select_vars(sparql_query):
+    """ชื่อตัวแปรของ SELECT ตามลำดับ (ตัวแปรจาก (... AS ?x) ใช้ชื่อ x)"""
+    projection = _PROJECTION.search(sparql_query)
+    if not projection:
+        return []
+    return re.findall(r'\?(\w+)', _AGGREGATE_ALIAS.sub(r'\1', projection.group(1)))
+
+
+def _order_literal(order_var, value):
+    if order_var in NUMERIC_ORDER_VARS:
+        return Number.bind(value)
+    return f'"{sparql_escape_string(value)}"'
+
+
+def paginate_query(sparql_query, after=None, limit=None):
+    """ใส่ keyset pagination ลงใน query ที่ format แล้ว
+
+    after: (ค่าคอลัมน์ที่เรียง, ค่าตัวแปรตัดสินเสมอ) ของแถวสุดท้ายในหน้าก่อน
+    limit: จำนวนแถวสูงสุด (None = ไม่จำกัด)
+    ถ้าคอลัมน์ที่เรียงเป็นผลของ aggregate (เช่น AVG ... AS ?avgRating) จะห่อ query เดิมเป็น subquery
+    เพราะ FILTER ใน WHERE มองไม่เห็นค่าที่คำนวณหลัง GROUP BY
+    """
+    sparql_query = sparql_query.strip()
+    order_var, descending, key_var = page_key(sparql_query)
+    # แยก PREFIX ไว้ด้านบน (subquery ต้องไม่มี PREFIX ข้างใน)
+    prologue = _PROLOGUE.match(sparql_query).group(0)
+    body = sparql_query[len(prologue):_ORDER_BY.search(sparql_query).start()].strip()
+
+    if after is not None:
+        value, key = after
+        literal = _order_literal(order_var, value)
+        sort_term = f'?{order_var}' if order_var in NUMERIC_ORDER_VARS else f'STR(?{order_var})'
+        op = '<' if descending else '>'
+        condition = (
+            f'FILTER ({sort_term} {op} {literal} || '
+            f'({sort_term} = {literal} && STR(?{key_var}) > "{sparql_escape_string(key)}"))'
+        )
+        if re.search(rf'\bAS\s+\?{order_var}\s*\)', body, re.IGNORECASE):
+            body = f'SELECT * WHERE {{\n{{\n{body}\n}}\n    {condition}\n}}'
+        else:
+            close = body.rfind('}')
+            body = f'{body[:close]}    {condition}\n{body[close:]}'
+
+    direction = f'DESC(?{order_var})' if descending else f'?{order_var}'
+    query = f'{prologue}{body}\nORDER BY {direction} STR(?{key_var})\n'
+    if limit is not None:
+        query += f'LIMIT {int(limit)}\n'
+    return query
+
+
+# === Dataset Version (metadata) ===
+# เก็บใน named graph แยก เพื่อไม่ให้ปนกับข้อมูลใน default graph (COUNT(*) ไม่เปลี่ยน)
+
+METADATA_GRAPH = "urn:sakon-ce:metadata"
+DATASET_RESOURCE = "urn:sakon-ce:dataset"
+
+GET_DATASET_VERSION = f"""
+SELECT ?version
+WHERE {{
+    GRAPH <{METADATA_GRAPH}> {{ <{DATASET_RESOURCE}> sce:datasetVersion ?version }}
+}}
+"""
+
+# เพิ่ม version ทีละ 1 ภายใน update เดียว (atomic ใน Fuseki)
+BUMP_DATASET_VERSION = f"""
+DELETE {{ GRAPH <{METADATA_GRAPH}> {{ <{DATASET_RESOURCE}> sce:datasetVersion ?old }} }}
+INSERT {{ GRAPH <{METADATA_GRAPH}> {{ <{DATASET_RESOURCE}> sce:datasetVersion ?new }} }}
+WHERE {{
+    OPTIONAL {{ GRAPH <{METADATA_GRAPH}> {{ <{DATASET_RESOURCE}> sce:datasetVersion ?old }} }}
+    BIND (COALESCE(?old, 0) + 1 AS ?new)
+}}
+"""
+
 def sparql_escape_string(value):
     """Escape special characters for SPARQL string literals."""
     if not value:
         return value
-    value = str(value)
-    value = value.replace('\\', '\\\\')
-    value = value.replace('"', '\\"')
-    value = value.replace("'", "\\'")
-    value = value.replace('\n', '\\n')
-    value = value.replace('\r', '\\r')
-    value = value.replace('\t', '\\t')
-    return value
+    return escape_literal(value)
 
 
 # === Admin CRUD Templates ===
 
-INSERT_PRODUCT = """
-INSERT DATA {{
-    sce:{product_id} a sce:FoodProduct ;
-        sce:hasName "{name}" ;
-        sce:hasPrice {price} .
-    {description_triple}
-    {weight_triple}
-    {shelf_life_triple}
-    {category_triple}
-    {enterprise_triple}
-    {image_url_triple}
-}}
-"""
-
 # ใช้ Python format ไม่ได้กับ optional triples ตรงๆ → สร้าง helper
 def build_insert_product(product_id, name, price, description='', weight='',
                          shelf_life='', category_id='', enterprise_id='', image_url=''):
-    """สร้าง SPARQL INSERT สำหรับผลิตภัณฑ์"""
+    """สร้าง SPARQL INSERT สำหรับผลิตภัณฑ์ (ตรวจรหัสและตัวเลขก่อน → BindError ถ้าไม่ถูกต้อง)"""
+    product = iri(product_id)
+    price = Number.bind(price)
     name = sparql_escape_string(name)
     triples = [
-        f'sce:{product_id} a sce:FoodProduct .',
-        f'sce:{product_id} sce:hasName "{name}" .',
-        f'sce:{product_id} sce:hasPrice {price} .',
+        f'{product} a sce:FoodProduct .',
+        f'{product} sce:hasName "{name}" .',
+        f'{product} sce:hasPrice {price} .',
     ]
     if description:
         description = sparql_escape_string(description)
-        triples.append(f'sce:{product_id} sce:hasDescription "{description}" .')
+        triples.append(f'{product} sce:hasDescription "{description}" .')
     if weight:
         weight = sparql_escape_string(weight)
-        triples.append(f'sce:{product_id} sce:hasWeight "{weight}" .')
+        triples.append(f'{product} sce:hasWeight "{weight}" .')
     if shelf_life:
-        triples.append(f'sce:{product_id} sce:hasShelfLifeDays {shelf_life} .')
+        triples.append(f'{product} sce:hasShelfLifeDays {Number.bind(shelf_life)} .')
     if category_id:
-        triples.append(f'sce:{product_id} sce:belongsToCategory sce:{category_id} .')
+        triples.append(f'{product} sce:belongsToCategory {iri(category_id)} .')
     if enterprise_id:
-        triples.append(f'sce:{product_id} sce:producedBy sce:{enterprise_id} .')
-        triples.append(f'sce:{enterprise_id} sce:hasProduct sce:{product_id} .')
+        enterprise = iri(enterprise_id)
+        triples.append(f'{product} sce:producedBy {enterprise} .')
+        triples.append(f'{enterprise} sce:hasProduct {product} .')
     if image_url:
         image_url = sparql_escape_string(image_url)
-        triples.append(f'sce:{product_id} sce:hasImageUrl "{image_url}" .')
+        triples.append(f'{product} sce:hasImageUrl "{image_url}" .')
     body = "\n    ".join(triples)
     return f"INSERT DATA {{\n    {body}\n}}"
 
 
 DELETE_PRODUCT = """
 DELETE WHERE {{
-    sce:{product_id} ?p ?o .
+    {product_id} ?p ?o .
 }}
 """
 
 DELETE_PRODUCT_REVERSE = """
 DELETE WHERE {{
-    ?s ?p sce:{product_id} .
-}}
-"""
-
-INSERT_ENTERPRISE = """
-INSERT DATA {{
-    sce:{enterprise_id} a sce:CommunityEnterprise ;
-        sce:hasName "{name}" .
-    {description_triple}
+    ?s ?p {product_id} .
 }}
 """
 
 def build_insert_enterprise(enterprise_id, name, description=''):
-    """สร้าง SPARQL INSERT สำหรับวิสาหกิจ"""
+    """สร้าง SPARQL INSERT สำหรับวิสาหกิจ (ตรวจรหัสก่อน → BindError ถ้าไม่ถูกต้อง)"""
+    enterprise = iri(enterprise_id)
     name = sparql_escape_string(name)
     triples = [
-        f'sce:{enterprise_id} a sce:CommunityEnterprise .',
-        f'sce:{enterprise_id} sce:hasName "{name}" .',
+        f'{enterprise} a sce:CommunityEnterprise .',
+        f'{enterprise} sce:hasName "{name}" .',
     ]
     if description:
         description = sparql_escape_string(description)
-        triples.append(f'sce:{enterprise_id} sce:hasDescription "{description}" .')
+        triples.append(f'{enterprise} sce:hasDescription "{description}" .')
     body = "\n    ".join(triples)
     return f"INSERT DATA {{\n    {body}\n}}"
 
 
 DELETE_ENTERPRISE = """
 DELETE WHERE {{
-    sce:{enterprise_id} ?p ?o .
+    {enterprise_id} ?p ?o .
 }}
 """
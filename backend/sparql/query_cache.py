@@ -0,0 +1,112 @@
+# แคชผลลัพธ์ SPARQL (LRU + TTL) ล้างทิ้งทั้งหมดเมื่อมีการเขียนข้อมูล
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def normalize_query(sparql_query):
+    """ทำให้ query text เป็นรูปแบบเดียวกันก่อนใช้เป็น key
+
+    ตัดช่องว่างหน้า/ท้ายบรรทัดและบรรทัดว่างออก แต่ไม่แตะช่องว่างภายในบรรทัด
+    (กันไม่ให้ literal อย่าง "ข้าว  หอม" กับ "ข้าว หอม" ชนกัน)
+    """
+    return '\n'.join(line.strip() for line in sparql_query.splitlines() if line.strip())
+
+
+def estimate_size(value):
+    """ประมาณขนาดหน่วยความจำ (bytes) ของผลลัพธ์ที่เก็บในแคช"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(v) for v in value)
+    elif hasattr(value, '__slots__'):
+        size += sum(estimate_size(getattr(value, name)) for name in value.__slots__)
+    return size
+
+
+class QueryCache:
+    """แคชแบบ LRU จำกัดจำนวนรายการ พร้อมอายุ (TTL) ต่อรายการ ใช้ร่วมกันได้หลาย thread"""
+
+    def __init__(self, max_entries=256, ttl_seconds=300, enabled=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()   # key -> (expires_at, size_bytes, value)
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+        # เพิ่มทุกครั้งที่ clear — กันผลลัพธ์ของ query ที่เริ่มก่อน update ถูกเขียนกลับเข้าแคช
+        self.generation = 0
+
+    def get(self, key):
+        """คืนค่าในแคช หรือ None ถ้าไม่มี/หมดอายุ"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._memory_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """เก็บค่าลงแคช ถ้าเกินจำนวนสูงสุดจะไล่รายการที่ใช้นานที่สุดออก
+
+        generation: ค่า self.generation ตอนเริ่ม query ถ้ามีการ clear ระหว่างนั้นจะไม่เก็บ
+        """
+        if not self.enabled or self.max_entries <= 0:
+            return
+        size = estimate_size(value)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._memory_bytes += size
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """ล้างแคชทั้งหมด (เรียกหลัง update สำเร็จ)"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+            self.flushes += 1
+            self.generation += 1
+
+    def stats(self):
+        """สถิติการใช้งานแคช"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'flushes': self.flushes,
+                'memory_bytes': self._memory_bytes,
+            }
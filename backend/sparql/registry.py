@@ -0,0 +1,194 @@
+# Registry ของ query template ที่ตั้งชื่อไว้
+# แต่ละ template แนบ PREFIX และแยกส่วนพารามิเตอร์ไว้ครั้งเดียวตอน import
+# ตอนเรียกใช้แค่ตรวจชนิดพารามิเตอร์ (sparql/terms.py) แล้วต่อ string — ไม่ต้อง format/ต่อ PREFIX ใหม่ทุกคำขอ
+# ชื่อ template ใช้เป็น key ของแคชและสถิติได้ (คงที่ ไม่ขึ้นกับค่าพารามิเตอร์)
+import string
+from config import SPARQL_PREFIXES
+from sparql.fuseki_client import fuseki_client
+from sparql import queries as q
+from sparql.terms import Iri, IriList, Text, LuceneText, Number, BindError
+
+_QUERY_FORMS = ('SELECT', 'ASK', 'DESCRIBE')
+
+
+class QueryTemplate:
+    """template ที่ compile แล้ว: ส่วนข้อความคงที่สลับกับช่องพารามิเตอร์
+
+    template ที่มีพารามิเตอร์เขียนแบบ str.format (ปีกกาคู่ {{ }} แทนปีกกาจริง)
+    แต่ละช่องแทนด้วย term ทั้งตัว เช่น {product_id} → sce:KhaoHang, {search_term} → "ข้าว"
+    template ที่ไม่มีพารามิเตอร์ใช้ข้อความตามตัว
+    """
+
+    __slots__ = ('name', 'kind', 'params', '_segments')
+
+    def __init__(self, name, template, params):
+        self.name = name
+        self.params = params
+        keyword = template.split(None, 1)[0].upper()
+        if keyword == 'CONSTRUCT':
+            self.kind = 'construct'
+        elif keyword in _QUERY_FORMS:
+            self.kind = 'select'
+        else:
+            self.kind = 'update'
+
+        if not params:
+            self._segments = (SPARQL_PREFIXES + template,)
+            return
+        segments = []
+        for literal, field, _, _ in string.Formatter().parse(SPARQL_PREFIXES + template):
+            if literal:
+                segments.append(literal)
+            if field is not None:
+                if field not in params:
+                    raise KeyError(f'template {name}: ไม่ได้กำหนดชนิดของพารามิเตอร์ {field}')
+                segments.append((field,))
+        self._segments = tuple(segments)
+
+    def render(self, **values):
+        """bind ค่าพารามิเตอร์ → query ที่พร้อมส่ง (มี PREFIX แล้ว)"""
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise BindError(f'{self.name}: ไม่รู้จักพารามิเตอร์ {", ".join(sorted(unknown))}')
+        bound = {}
+        for param, kind in self.params.items():
+            value = values.get(param)
+            if value is None or value == '':
+                raise BindError(f'{self.name}: ต้องระบุ {param}')
+            bound[param] = kind.bind(value)
+        return ''.join(
+            segment if isinstance(segment, str) else bound[segment[0]]
+            for segment in self._segments
+        )
+
+
+class QueryRegistry:
+    """เก็บ template ตามชื่อ และส่ง query ผ่าน FusekiClient พร้อมชื่อ template"""
+
+    def __init__(self, client):
+        self.client = client
+        self._templates = {}
+        self._rewrites = {}
+
+    def register(self, name, template, **params):
+        """ลงทะเบียน template (ชื่อเดิมจะถูกแทนที่) params: ชื่อพารามิเตอร์ → Iri/Text/Number"""
+        self._templates[name] = QueryTemplate(name, template, params)
+
+    def register_rewrite(self, name, target, when):
+        """ใช้ template target แทน name เมื่อ when() เป็นจริง (พารามิเตอร์ชื่อเดียวกัน ผลลัพธ์รูปแบบเดียวกัน)"""
+        self._rewrites[name] = (target, when)
+
+    def resolve(self, name):
+        """ชื่อ template ที่จะส่งจริงแทน name (ตาม register_rewrite) — ใช้เป็น query_name ของ metrics/แคชด้วย"""
+        rewrite = self._rewrites.get(name)
+        if rewrite is not None and rewrite[1]():
+            return rewrite[0]
+        return name
+
+    def get(self, name):
+        return self._templates[name]
+
+    def names(self):
+        return sorted(self._templates)
+
+    def render(self, name, **values):
+        return self._templates[self.resolve(name)].render(**values)
+
+    def run(self, name, use_cache=True, **values):
+        """ส่ง query ตามชื่อ — SELECT → query(), CONSTRUCT → construct(), อื่นๆ → update()"""
+        name = self.resolve(name)
+        template = self._templates[name]
+        sparql = template.render(**values)
+        if template.kind == 'select':
+            return self.client.query(sparql, include_prefixes=False,
+                                     use_cache=use_cache, query_name=name, params=values)
+        if template.kind == 'construct':
+            return self.client.construct(sparql, include_prefixes=False,
+                                         use_cache=use_cache, query_name=name, params=values)
+        return self.client.update(sparql, include_prefixes=False, query_name=name, params=values)
+
+    def run_many(self, calls):
+        """ส่งหลาย SELECT พร้อมกัน calls: {key: (ชื่อ template, {พารามิเตอร์})}"""
+        calls = {key: (self.resolve(name), values) for key, (name, values) in calls.items()}
+        queries = {key: self.render(name, **values) for key, (name, values) in calls.items()}
+        return self.client.query_many(queries, include_prefixes=False,
+                                      query_names={key: name for key, (name, _) in calls.items()},
+                                      query_params={key: values for key, (_, values) in calls.items()})
+
+
+registry = QueryRegistry(fuseki_client)
+
+# === ผลิตภัณฑ์ ===
+registry.register('all_products', q.GET_ALL_PRODUCTS)
+registry.register('product_by_id', q.GET_PRODUCT_BY_ID, product_id=Iri)
+registry.register('product_ingredients', q.GET_PRODUCT_INGREDIENTS, product_id=Iri)
+registry.register('product_certifications', q.GET_PRODUCT_CERTIFICATIONS, product_id=Iri)
+registry.register('product_channels', q.GET_PRODUCT_CHANNELS, product_id=Iri)
+registry.register('product_customers', q.GET_PRODUCT_CUSTOMERS, product_id=Iri)
+registry.register('product_reviews', q.GET_PRODUCT_REVIEWS, product_id=Iri)
+registry.register('product_process', q.GET_PRODUCT_PROCESS, product_id=Iri)
+registry.register('products_by_category', q.GET_PRODUCTS_BY_CATEGORY, category_id=Iri)
+registry.register('products_by_price_range', q.GET_PRODUCTS_BY_PRICE_RANGE,
+                  min_price=Number, max_price=Number)
+registry.register('product_document', q.CONSTRUCT_PRODUCT_DOCUMENT, product_id=Iri)
+registry.register('products_batch', q.CONSTRUCT_PRODUCTS_BATCH, product_ids=IriList)
+
+# === วิสาหกิจชุมชน / หมวดหมู่ ===
+registry.register('all_enterprises', q.GET_ALL_ENTERPRISES)
+registry.register('enterprise_by_id', q.GET_ENTERPRISE_BY_ID, enterprise_id=Iri)
+registry.register('enterprise_products', q.GET_ENTERPRISE_PRODUCTS, enterprise_id=Iri)
+registry.register('enterprise_document', q.CONSTRUCT_ENTERPRISE_DOCUMENT, enterprise_id=Iri)
+registry.register('all_categories', q.GET_ALL_CATEGORIES)
+registry.register('catalog_products', q.CONSTRUCT_CATALOG_PRODUCTS)
+registry.register('catalog_enterprises', q.CONSTRUCT_CATALOG_ENTERPRISES)
+
+# === วิเคราะห์ข้อมูล ===
+registry.register('count_products', q.COUNT_PRODUCTS)
+registry.register('count_enterprises', q.COUNT_ENTERPRISES)
+registry.register('count_categories', q.COUNT_CATEGORIES)
+registry.register('count_dataset', q.COUNT_DATASET)
+registry.register('resource_footprint', q.RESOURCE_FOOTPRINT, resource_id=Iri)
+registry.register('analytics_price_by_category', q.ANALYTICS_PRICE_BY_CATEGORY)
+registry.register('analytics_channels', q.ANALYTICS_CHANNELS)
+registry.register('analytics_certifications', q.ANALYTICS_CERTIFICATIONS)
+registry.register('analytics_enterprise_products', q.ANALYTICS_ENTERPRISE_PRODUCTS)
+registry.register('analytics_customer_segments', q.ANALYTICS_CUSTOMER_SEGMENTS)
+registry.register('analytics_top_rated', q.ANALYTICS_TOP_RATED)
+registry.register('analytics_views', q.union_views(q.ANALYTICS_VIEWS))
+
+# === ค้นหา / Semantic ===
+# intent ของ SemanticSearch ใช้ชื่อ semantic_<intent> (pattern ที่เขียนไว้ใน service ลงทะเบียนเองตอนสร้าง)
+registry.register('search_products_by_text', q.SEARCH_PRODUCTS_BY_TEXT, search_term=Text)
+registry.register('search_result_rows', q.SEARCH_RESULT_ROWS, product_ids=IriList)
+registry.register('search_documents', q.SEARCH_DOCUMENTS)
+registry.register('search_documents_batch', q.SEARCH_DOCUMENTS_BATCH, product_ids=IriList)
+registry.register('search_related_products', q.SEARCH_RELATED_PRODUCTS, resource_id=Iri)
+registry.register('search_by_certification', q.SEARCH_BY_CERTIFICATION, search_term=Text)
+# Fuseki ที่มี text index (docker/fuseki/sakon_ce_text.ttl) ค้นด้วย text:query แทน FILTER CONTAINS
+registry.register('search_products_by_text_indexed', q.SEARCH_PRODUCTS_BY_TEXT_INDEXED, search_term=LuceneText)
+registry.register('search_by_certification_indexed', q.SEARCH_BY_CERTIFICATION_INDEXED, search_term=LuceneText)
+registry.register_rewrite('search_products_by_text', 'search_products_by_text_indexed',
+                          when=fuseki_client.text_index_available)
+registry.register_rewrite('search_by_certification', 'search_by_certification_indexed',
+                          when=fuseki_client.text_index_available)
+registry.register('semantic_health_products', q.SEMANTIC_HEALTH_PRODUCTS)
+registry.register('semantic_gift_products', q.SEMANTIC_GIFT_PRODUCTS)
+registry.register('semantic_organic_products', q.SEMANTIC_ORGANIC_PRODUCTS)
+registry.register('semantic_premium_products', q.SEMANTIC_PREMIUM_PRODUCTS)
+registry.register('semantic_online_products', q.SEMANTIC_ONLINE_PRODUCTS)
+registry.register('similar_products', q.SEMANTIC_SIMILAR_PRODUCTS, product_id=Iri)
+registry.register('similar_products_batch', q.SEMANTIC_SIMILAR_PRODUCTS_BATCH, product_ids=IriList)
+registry.register('product_features', q.PRODUCT_FEATURES)
+registry.register('review_ratings', q.REVIEW_RATINGS)
+registry.register('shared_ingredients', q.SEMANTIC_SHARED_INGREDIENTS, min_shared=Number)
+registry.register('shared_ingredients_top', q.SEMANTIC_SHARED_INGREDIENTS_TOP, min_shared=Number, limit=Number)
+registry.register('product_ingredient_incidence', q.PRODUCT_INGREDIENT_INCIDENCE)
+registry.register('product_ingredient_row', q.PRODUCT_INGREDIENT_ROW, product_id=Iri)
+registry.register('products_by_district', q.SEMANTIC_PRODUCTS_BY_DISTRICT, district_id=Iri)
+
+# === Dataset version / Admin ===
+registry.register('dataset_version', q.GET_DATASET_VERSION)
+registry.register('bump_dataset_version', q.BUMP_DATASET_VERSION)
+registry.register('delete_product', q.DELETE_PRODUCT, product_id=Iri)
+registry.register('delete_product_reverse', q.DELETE_PRODUCT_REVERSE, product_id=Iri)
+registry.register('delete_enterprise', q.DELETE_ENTERPRISE, enterprise_id=Iri)
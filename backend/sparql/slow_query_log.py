@@ -0,0 +1,131 @@
+# บันทึก query ที่ช้ากว่าเกณฑ์ (slow-query log) พร้อมแผนการทำงานจาก Fuseki
+#
+# เก็บในหน่วยความจำแบบ ring buffer (ดูผ่าน GET /api/admin/slow-queries)
+# และเขียนต่อท้ายไฟล์ JSONL ที่หมุนไฟล์ตามขนาด (RotatingFileHandler)
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# จำนวนแผนที่จำไว้ต่อ query text (query เดิมช้าซ้ำไม่ต้องขอแผนใหม่ทุกครั้ง)
+PLAN_CACHE_SIZE = 128
+
+
+class SlowQueryLog:
+    """ตัวบันทึก query ที่ใช้เวลาเกิน threshold_ms (ค่าติดลบ = ปิด)
+
+    explain: callable(sparql_query) -> dict ของแผนการทำงาน (FusekiClient.explain)
+    submit: callable สำหรับขอแผนแบบไม่บล็อก request (เช่น executor.submit) — None = ทำทันที
+    """
+
+    def __init__(self, threshold_ms, capacity=200, path=None, max_bytes=5 * 1024 * 1024,
+                 backup_count=3, explain=None, submit=None):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.submit = submit
+        self._records = deque(maxlen=capacity)
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_logger = self._create_file_logger(path, max_bytes, backup_count) if path else None
+        self.path = path
+
+    def _create_file_logger(self, path, max_bytes, backup_count):
+        """logger แยกที่เขียนเฉพาะบรรทัด JSON ลงไฟล์ ไม่ส่งต่อไปยัง root logger"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding='utf-8', delay=True)
+        except OSError as e:
+            logger.warning("[SLOW QUERY] เปิดไฟล์ %s ไม่ได้: %s (เก็บเฉพาะในหน่วยความจำ)", path, e)
+            return None
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        file_logger = logging.getLogger(f'{__name__}.file')
+        file_logger.handlers = [handler]
+        file_logger.setLevel(logging.INFO)
+        file_logger.propagate = False
+        return file_logger
+
+    @property
+    def enabled(self):
+        return self.threshold_ms is not None and self.threshold_ms >= 0
+
+    def observe(self, query_name, kind, sparql_query, elapsed_ms, params=None, error=None):
+        """เรียกหลัง query ทุกครั้ง บันทึกเฉพาะที่ช้ากว่าเกณฑ์"""
+        if not self.enabled or elapsed_ms < self.threshold_ms:
+            return
+        record = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'query_name': query_name,
+            'kind': kind,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'threshold_ms': self.threshold_ms,
+            'params': {name: str(value) for name, value in (params or {}).items()},
+            'route': None,
+            'path': None,
+            'error': error,
+            'sparql': sparql_query,
+            'plan': None,
+        }
+        if has_request_context():
+            record['route'] = request.url_rule.rule if request.url_rule else None
+            record['path'] = request.full_path.rstrip('?')
+        logger.warning("[SLOW QUERY] %s (%s) %.0f ms route=%s",
+                       query_name or '(ad-hoc)', kind, elapsed_ms, record['route'])
+
+        if self.explain is None or kind == 'update':
+            self._store(record)
+        elif self.submit is not None:
+            self.submit(self._explain_and_store, record)
+        else:
+            self._explain_and_store(record)
+
+    def _explain_and_store(self, record):
+        record['plan'] = self._plan(record['sparql'])
+        self._store(record)
+
+    def _plan(self, sparql_query):
+        """แผนการทำงานของ query (จำไว้ตาม query text)"""
+        with self._lock:
+            plan = self._plans.get(sparql_query)
+            if plan is not None:
+                self._plans.move_to_end(sparql_query)
+                return plan
+        start = time.perf_counter()
+        try:
+            plan = self.explain(sparql_query)
+        except Exception as e:
+            plan = {'error': f'ขอแผนการทำงานไม่สำเร็จ: {e}'}
+        plan['explain_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            self._plans[sparql_query] = plan
+            while len(self._plans) > PLAN_CACHE_SIZE:
+                self._plans.popitem(last=False)
+        return plan
+
+    def _store(self, record):
+        with self._lock:
+            self._records.append(record)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(record, ensure_ascii=False))
+
+    def recent(self, limit=None, query_name=None):
+        """รายการล่าสุดก่อน กรองตามชื่อ template ได้"""
+        with self._lock:
+            records = list(self._records)
+        records.reverse()
+        if query_name:
+            records = [r for r in records if r['query_name'] == query_name]
+        return records[:limit] if limit else records
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._plans.clear()
@@ -0,0 +1,71 @@
+# อ่านผลลัพธ์ SPARQL JSON แบบทีละแถว (incremental) โดยไม่ต้องโหลดทั้ง response เข้าหน่วยความจำ
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_BINDINGS_START = re.compile(r'"bindings"\s*:\s*\[')
+
+
+class StreamingParseError(ValueError):
+    """response จาก Fuseki ไม่ใช่ SPARQL JSON ที่ถูกต้อง หรือจบก่อนครบ"""
+
+
+def _skip_whitespace(buffer, pos):
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def iter_bindings(chunks):
+    """รับ chunk ของ bytes (เช่น response.iter_content) แล้ว yield binding ทีละตัว
+
+    หา array "results" → "bindings" ก่อน จากนั้นถอดรหัส object ทีละตัวด้วย raw_decode
+    เก็บใน buffer เฉพาะส่วนที่ยังไม่ได้ถอดรหัส หน่วยความจำจึงเท่ากับ chunk + binding หนึ่งตัว
+    """
+    decode = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    in_bindings = False
+    exhausted = False
+    chunks = iter(chunks)
+
+    while True:
+        if not in_bindings:
+            match = _BINDINGS_START.search(buffer)
+            if match:
+                in_bindings = True
+                pos = match.end()
+                continue
+        else:
+            pos = _skip_whitespace(buffer, pos)
+            if pos < len(buffer):
+                char = buffer[pos]
+                if char == ']':
+                    return
+                if char == ',':
+                    pos += 1
+                    continue
+                try:
+                    binding, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # object ยังมาไม่ครบ — อ่าน chunk ถัดไปแล้วลองใหม่
+                    if exhausted:
+                        raise StreamingParseError('binding ไม่สมบูรณ์ที่ท้าย response')
+                else:
+                    yield binding
+                    pos = end
+                    continue
+            # ทิ้งส่วนที่ถอดรหัสแล้ว ไม่ให้ buffer โตตามขนาด response
+            buffer = buffer[pos:]
+            pos = 0
+
+        if exhausted:
+            raise StreamingParseError('ไม่พบ results.bindings ใน response')
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += decode.decode(b'', final=True)
+        else:
+            buffer += decode.decode(chunk)
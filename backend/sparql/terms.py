@@ -0,0 +1,88 @@
+# ชนิดพารามิเตอร์ของ query template — ตรวจสอบค่าแล้วแปลงเป็น term ของ SPARQL ที่ปลอดภัย
+# ใช้แทนการแทรกข้อความดิบจากผู้ใช้ลงใน query (ดู sparql/registry.py)
+import re
+
+_LOCAL_NAME = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_\-]*$')
+_NUMBER = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+
+
+class BindError(ValueError):
+    """ค่าพารามิเตอร์ไม่ถูกต้องตามชนิดที่ template กำหนด (ตอบ 400)"""
+
+
+def escape_literal(value):
+    """Escape special characters for SPARQL string literals."""
+    value = str(value)
+    value = value.replace('\\', '\\\\')
+    value = value.replace('"', '\\"')
+    value = value.replace("'", "\\'")
+    value = value.replace('\n', '\\n')
+    value = value.replace('\r', '\\r')
+    value = value.replace('\t', '\\t')
+    return value
+
+
+class Iri:
+    """resource ใน namespace sce: — รับเฉพาะ local name (เช่น KhaoHang, CE_01) → sce:KhaoHang"""
+
+    name = 'iri'
+
+    @staticmethod
+    def bind(value):
+        value = str(value)
+        if not _LOCAL_NAME.match(value):
+            raise BindError(f'รหัสไม่ถูกต้อง: {value!r}')
+        return f'sce:{value}'
+
+
+class Text:
+    """string literal → "..." (escape แล้ว)"""
+
+    name = 'text'
+
+    @staticmethod
+    def bind(value):
+        return f'"{escape_literal(value)}"'
+
+
+class LuceneText:
+    """คำค้นของ text:query (Lucene) → ครอบเป็นวลีเดียว (อักขระพิเศษของ Lucene จึงไม่มีผล) แล้ว escape แบบ Text"""
+
+    name = 'lucene_text'
+
+    @staticmethod
+    def bind(value):
+        phrase = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        return Text.bind(f'"{phrase}"')
+
+
+class Number:
+    """ตัวเลข (integer/decimal/double) → เขียนลง query ตามรูปเดิมหลังตรวจรูปแบบ"""
+
+    name = 'number'
+
+    @staticmethod
+    def bind(value):
+        value = str(value).strip()
+        if not _NUMBER.match(value):
+            raise BindError(f'ต้องเป็นตัวเลข: {value!r}')
+        return value
+
+
+class IriList:
+    """รายการ local name (list/tuple) → sce:A sce:B ... สำหรับใส่ใน VALUES ?product { ... }"""
+
+    name = 'iri_list'
+
+    @staticmethod
+    def bind(values):
+        if isinstance(values, str) or not isinstance(values, (list, tuple)):
+            raise BindError(f'ต้องเป็นรายการรหัส: {values!r}')
+        if not values:
+            raise BindError('ต้องระบุรหัสอย่างน้อยหนึ่งรายการ')
+        return ' '.join(Iri.bind(value) for value in values)
+
+
+def iri(value):
+    """ตรวจและแปลง local name เป็น sce:<name> (ใช้กับ query ที่สร้างแบบ dynamic)"""
+    return Iri.bind(value)
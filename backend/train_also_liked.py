@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+ฝึกโมเดล "ลูกค้าที่ชอบสินค้านี้ก็ชอบ" (matrix factorisation ของคะแนนรีวิว) จากข้อมูลใน Fuseki
+แล้วบันทึก factor ของผลิตภัณฑ์เป็น .npy (+ .json) ที่ /api/recommendations/<id>/also-liked เปิดด้วย mmap
+API ที่รันอยู่จะเปิดไฟล์ใหม่เองในคำขอถัดไป
+
+    python train_also_liked.py [--mode explicit|implicit] [--factors 16] [--output models/also_liked.npy]
+"""
+
+import argparse
+import sys
+import time
+
+from config import ALSO_LIKED_MODEL_FILE
+from services.also_liked import MODES, metadata_path, save, train
+from sparql.registry import registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ฝึกโมเดล also-liked จากคะแนนรีวิวใน Fuseki')
+    parser.add_argument('--mode', choices=MODES, default='explicit',
+                        help='explicit = ประมาณคะแนน, implicit = ประมาณการมีรีวิวถ่วงด้วยคะแนน')
+    parser.add_argument('--factors', type=int, default=16, help='จำนวน latent factor')
+    parser.add_argument('--reg', type=float, default=0.1, help='ค่า regularisation (L2)')
+    parser.add_argument('--iterations', type=int, default=15, help='จำนวนรอบของ ALS')
+    parser.add_argument('--alpha', type=float, default=1.0, help='น้ำหนัก confidence ของโหมด implicit')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=ALSO_LIKED_MODEL_FILE, help='ไฟล์ .npy ปลายทาง')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = {name: registry.run(name, use_cache=False) for name in ('review_ratings', 'all_products')}
+    failed = {name: result['error'] for name, result in results.items() if not result['success']}
+    if failed:
+        print(f'โหลดข้อมูลจาก Fuseki ไม่สำเร็จ: {failed}', file=sys.stderr)
+        return 1
+
+    try:
+        item_factors, metadata = train(results['review_ratings']['results'], results['all_products']['results'],
+                                       factors=args.factors, reg=args.reg, iterations=args.iterations,
+                                       mode=args.mode, alpha=args.alpha, seed=args.seed)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    save(args.output, item_factors, metadata)
+
+    components = len(set(metadata['component']))
+    print(f"{metadata['ratings']} ratings, {metadata['reviewers']} reviewers, "
+          f"{item_factors.shape[0]} products × {item_factors.shape[1]} factors, "
+          f"{components} components, rmse {metadata['rmse']}")
+    print(f'บันทึก {args.output} และ {metadata_path(args.output)} '
+          f'({(time.perf_counter() - start) * 1000:.0f} ms)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# ตัวชี้วัดการทำงาน (metrics) ของ API และ SPARQL query — ส่งออกในรูปแบบ Prometheus text
+#
+# label ของ query คือชื่อ template จาก sparql/registry.py (query ที่ไม่มีชื่อรวมเป็น 'adhoc')
+# label ของ endpoint คือ URL rule ของ Flask (เช่น /api/products/<product_id>) ไม่ใช่ path จริง
+# จำนวน series จึงจำกัดตามจำนวน template/route ไม่โตตามค่าพารามิเตอร์ที่ผู้ใช้ส่งมา
+import math
+import threading
+from collections import deque
+
+from config import METRICS_QUANTILE_WINDOW
+
+# ขอบบนของ bucket (วินาที)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+ADHOC_QUERY = 'adhoc'
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """histogram สะสมแบบ Prometheus พร้อมหน้าต่างค่าล่าสุดสำหรับคำนวณ p50/p95/p99"""
+
+    __slots__ = ('bucket_counts', 'count', 'sum', 'recent')
+
+    def __init__(self, window):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def cumulative(self):
+        """จำนวนสะสมต่อ bucket (le) ตามรูปแบบ Prometheus"""
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """ค่า quantile จากค่าล่าสุด METRICS_QUANTILE_WINDOW ค่า (nearest-rank)"""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def _le(bound):
+    return f'le="{bound}"'
+
+
+def _quantile(q):
+    return f'quantile="{q}"'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class Metrics:
+    """ที่เก็บ metrics ทั้งแอป ใช้ร่วมกันได้หลาย thread"""
+
+    QUERY_LABELS = ('query', 'kind')
+    ENDPOINT_LABELS = ('endpoint', 'method')
+
+    def __init__(self, window=METRICS_QUANTILE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._query_latency = {}     # (query, kind) -> Histogram
+        self._query_rows = {}
+        self._query_errors = {}
+        self._query_bytes = {}
+        self._cache_hits = {}
+        self._request_latency = {}   # (endpoint, method) -> Histogram
+        self._request_bytes = {}
+        self._requests = {}          # (endpoint, method, status) -> count
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram(self.window)
+        return histogram
+
+    # === SPARQL query ===
+
+    def observe_query(self, query_name, kind, seconds, nbytes=0, error=False):
+        """บันทึกการเรียก Fuseki หนึ่งครั้ง (เวลา, ขนาด response, ผิดพลาดหรือไม่)"""
+        key = (query_name or ADHOC_QUERY, kind)
+        with self._lock:
+            self._histogram(self._query_latency, key).observe(seconds)
+            self._query_bytes[key] = self._query_bytes.get(key, 0) + nbytes
+            if error:
+                self._query_errors[key] = self._query_errors.get(key, 0) + 1
+
+    def observe_rows(self, query_name, kind, rows):
+        """บันทึกจำนวนแถว (หรือ triple สำหรับ CONSTRUCT) ที่ query คืนมา"""
+        key = (query_name or ADHOC_QUERY, kind)
+        with self._lock:
+            self._query_rows[key] = self._query_rows.get(key, 0) + rows
+
+    def observe_cache_hit(self, query_name, kind):
+        key = (query_name or ADHOC_QUERY, kind)
+        with self._lock:
+            self._cache_hits[key] = self._cache_hits.get(key, 0) + 1
+
+    # === HTTP request ===
+
+    def observe_request(self, endpoint, method, status, seconds, nbytes=0):
+        """บันทึก request หนึ่งครั้งของ API (endpoint = URL rule)"""
+        key = (endpoint, method)
+        with self._lock:
+            self._histogram(self._request_latency, key).observe(seconds)
+            self._request_bytes[key] = self._request_bytes.get(key, 0) + nbytes
+            status_key = (endpoint, method, str(status))
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+
+    # === ส่งออก ===
+
+    def render(self):
+        """ข้อความรูปแบบ Prometheus exposition (text/plain; version=0.0.4)"""
+        lines = []
+        with self._lock:
+            self._render_histogram(
+                lines, 'sce_sparql_query_duration_seconds',
+                'เวลาตอบกลับของ Fuseki ต่อ query template', self.QUERY_LABELS,
+                self._query_latency)
+            self._render_counter(
+                lines, 'sce_sparql_query_rows_total',
+                'จำนวนแถว (หรือ triple) ที่ query คืนมา', self.QUERY_LABELS, self._query_rows)
+            self._render_counter(
+                lines, 'sce_sparql_query_errors_total',
+                'จำนวน query ที่ผิดพลาด', self.QUERY_LABELS, self._query_errors)
+            self._render_counter(
+                lines, 'sce_sparql_response_bytes_total',
+                'ขนาด response body จาก Fuseki (bytes หลังคลาย gzip)', self.QUERY_LABELS,
+                self._query_bytes)
+            self._render_counter(
+                lines, 'sce_sparql_cache_hits_total',
+                'จำนวนครั้งที่ได้ผลลัพธ์จากแคชโดยไม่ต้องถาม Fuseki', self.QUERY_LABELS,
+                self._cache_hits)
+            self._render_histogram(
+                lines, 'sce_http_request_duration_seconds',
+                'เวลาตอบกลับของ API ต่อ endpoint', self.ENDPOINT_LABELS,
+                self._request_latency)
+            self._render_counter(
+                lines, 'sce_http_requests_total',
+                'จำนวน request ต่อ endpoint และ status', self.ENDPOINT_LABELS + ('status',),
+                self._requests)
+            self._render_counter(
+                lines, 'sce_http_response_bytes_total',
+                'ขนาด response body ของ API (ไม่รวม response แบบ streaming)',
+                self.ENDPOINT_LABELS, self._request_bytes)
+        return '\n'.join(lines) + '\n'
+
+    def _render_counter(self, lines, name, help_text, label_names, table):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key in sorted(table):
+            lines.append(f'{name}{_labels(label_names, key)} {_number(table[key])}')
+
+    def _render_histogram(self, lines, name, help_text, label_names, table):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key in sorted(table):
+            histogram = table[key]
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{_labels(label_names, key, _le(bound))} {count}')
+            lines.append(f'{name}_bucket{_labels(label_names, key, _le("+Inf"))} {histogram.count}')
+            lines.append(f'{name}_sum{_labels(label_names, key)} {_number(histogram.sum)}')
+            lines.append(f'{name}_count{_labels(label_names, key)} {histogram.count}')
+
+        # p50/p95/p99 ของค่าล่าสุด คำนวณในแอป ใช้ดูได้ทันทีโดยไม่ต้องใช้ histogram_quantile()
+        summary = name.replace('_duration_seconds', '_latency_seconds')
+        lines.append(f'# HELP {summary} quantile ของเวลาตอบกลับจาก {self.window} ค่าล่าสุด')
+        lines.append(f'# TYPE {summary} summary')
+        for key in sorted(table):
+            histogram = table[key]
+            for q in QUANTILES:
+                lines.append(f'{summary}{_labels(label_names, key, _quantile(q))} '
+                             f'{_number(histogram.quantile(q))}')
+            lines.append(f'{summary}_sum{_labels(label_names, key)} {_number(histogram.sum)}')
+            lines.append(f'{summary}_count{_labels(label_names, key)} {histogram.count}')
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+metrics = Metrics()
@@ -0,0 +1,213 @@
+# Tracing แบบเบาภายใน process — ผูก span ของ route, service และการเรียก Fuseki ไว้ใต้ request เดียว
+#
+# span ปัจจุบันเก็บใน ContextVar จึงตามไปถึง thread ของ query_many (copy_context)
+# นอก request (ไม่มี trace) tracer.span() ไม่ทำอะไรและแทบไม่มีต้นทุน
+# trace ที่จบแล้วเขียนเป็น JSON บรรทัดละ trace (TRACE_EXPORT_FILE) และสรุปใน header Server-Timing
+import functools
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from flask.json.provider import DefaultJSONProvider
+
+from config import TRACING_ENABLED, TRACE_EXPORT_FILE, TRACE_EXPORT_MAX_BYTES, TRACE_EXPORT_BACKUPS
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._\-]{1,64}$')
+
+_current_span = ContextVar('current_span', default=None)
+
+
+class Span:
+    """ช่วงเวลาหนึ่งของงาน ลูกเก็บใน children (append จากหลาย thread ได้)"""
+
+    __slots__ = ('name', 'span_id', 'trace', 'start', 'end', 'attributes', 'children')
+
+    def __init__(self, name, trace, attributes=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes or {}
+        self.children = []
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin):
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'children': [child.to_dict(origin) for child in self.children],
+        }
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class Trace:
+    """trace ของ request หนึ่ง (root span = ทั้ง request)"""
+
+    __slots__ = ('request_id', 'root', 'started_at')
+
+    def __init__(self, request_id, name, attributes=None):
+        self.request_id = request_id
+        self.started_at = time.time()
+        self.root = Span(name, self, attributes)
+
+    def server_timing(self):
+        """ค่า header Server-Timing: เวลารวมต่อชื่อ span (span ที่ขนานกันนับรวมกัน) และ total"""
+        totals = {}
+        for span in self.root.walk():
+            if span is self.root:
+                continue
+            total, count = totals.get(span.name, (0.0, 0))
+            totals[span.name] = (total + span.duration_ms, count + 1)
+        entries = []
+        for name, (total, count) in totals.items():
+            entry = f'{name};dur={total:.1f}'
+            if count > 1:
+                entry += f';desc="{count}x"'
+            entries.append(entry)
+        entries.append(f'total;dur={self.root.duration_ms:.1f}')
+        return ', '.join(entries)
+
+    def to_dict(self):
+        return {
+            'request_id': self.request_id,
+            'timestamp': self.started_at,
+            'duration_ms': round(self.root.duration_ms, 3),
+            'root': self.root.to_dict(self.root.start),
+        }
+
+
+class Tracer:
+    """สร้าง trace ต่อ request และ span ซ้อนกันภายใน"""
+
+    def __init__(self, enabled=True, export_path=None, max_bytes=10 * 1024 * 1024, backup_count=3):
+        self.enabled = enabled
+        self.export_path = export_path
+        self._export_logger = self._create_export_logger(export_path, max_bytes, backup_count) \
+            if enabled and export_path else None
+
+    def _create_export_logger(self, path, max_bytes, backup_count):
+        """logger แยกที่เขียนเฉพาะ JSON ของ trace ลงไฟล์ (หมุนไฟล์ตามขนาด)"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding='utf-8', delay=True)
+        except OSError as e:
+            logger.warning("[TRACE] เปิดไฟล์ %s ไม่ได้: %s (ไม่ export trace)", path, e)
+            return None
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        export_logger = logging.getLogger(f'{__name__}.export')
+        export_logger.handlers = [handler]
+        export_logger.setLevel(logging.INFO)
+        export_logger.propagate = False
+        return export_logger
+
+    @staticmethod
+    def request_id(incoming=None):
+        """ใช้ X-Request-ID ที่ส่งมาถ้ารูปแบบปลอดภัย ไม่เช่นนั้นสร้างใหม่"""
+        if incoming and _REQUEST_ID.match(incoming):
+            return incoming
+        return uuid.uuid4().hex
+
+    def start_trace(self, request_id, name, **attributes):
+        """เริ่ม trace ของ request และตั้ง root span เป็น span ปัจจุบัน"""
+        if not self.enabled:
+            return None
+        trace = Trace(request_id, name, attributes)
+        _current_span.set(trace.root)
+        return trace
+
+    def finish_trace(self, trace, **attributes):
+        """ปิด root span, export แล้วล้าง span ปัจจุบันของ context นี้"""
+        _current_span.set(None)
+        if trace is None:
+            return
+        if trace.root.end is None:
+            trace.root.end = time.perf_counter()
+        trace.root.attributes.update(attributes)
+        if self._export_logger is not None:
+            try:
+                self._export_logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
+            except Exception as e:
+                logger.warning("[TRACE] export ไม่สำเร็จ: %s", e)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """span ลูกของ span ปัจจุบัน ถ้าไม่มี trace อยู่จะ yield None"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(name, parent.trace, attributes)
+        parent.children.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.attributes['error'] = str(e)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+
+    def start_span(self, name, **attributes):
+        """span ลูกที่ไม่ตั้งเป็น span ปัจจุบัน — ใช้ใน generator ซึ่ง yield ออกไประหว่างทาง
+        (ContextVar.set ค้างไว้ข้าม yield จะทำให้ span ของผู้เรียกผิดพ่อ) ต้องเรียก finish() เอง
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        span = Span(name, parent.trace, attributes)
+        parent.children.append(span)
+        return span
+
+    def traced(self, name):
+        """decorator: ห่อทั้งฟังก์ชันด้วย span ชื่อ name"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current_request_id(self):
+        span = _current_span.get()
+        return span.trace.request_id if span is not None else None
+
+
+class TracingJSONProvider(DefaultJSONProvider):
+    """JSON provider ของ Flask ที่จับเวลาแปลง response เป็น JSON (span 'serialize')"""
+
+    def dumps(self, obj, **kwargs):
+        with tracer.span('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+# สร้าง instance เดียวใช้ทั้งแอป
+tracer = Tracer(enabled=TRACING_ENABLED, export_path=TRACE_EXPORT_FILE or None,
+                max_bytes=TRACE_EXPORT_MAX_BYTES, backup_count=TRACE_EXPORT_BACKUPS)
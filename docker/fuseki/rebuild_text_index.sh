@@ -0,0 +1,30 @@
+#!/bin/sh
+# สร้าง Lucene text index ของ sakon_ce ใหม่ทั้งหมดจากข้อมูลใน TDB2 (jena.textindexer)
+# รันหลังโหลดข้อมูลจำนวนมากโดยไม่ผ่าน Fuseki (tdb2.tdbloader) หรือหลังเปิดใช้ sakon_ce_text.ttl
+# กับ dataset ที่มีข้อมูลอยู่แล้ว — การเขียนผ่าน /data หรือ /update ของ Fuseki index ให้เองอยู่แล้ว
+# TDB2 เปิดได้ทีละโปรเซส จึงต้องหยุด Fuseki ระหว่างสร้าง index
+#
+#   docker/fuseki/rebuild_text_index.sh
+#       docker compose: หยุด fuseki → สร้าง index → เริ่ม fuseki ใหม่
+#   FUSEKI_HOME=/opt/fuseki docker/fuseki/rebuild_text_index.sh --local <assembler.ttl>
+#       ติดตั้ง Fuseki เอง: หยุด Fuseki ก่อน และใช้ assembler ที่ชี้ไปยัง location ของเครื่องนั้น
+set -e
+
+if [ "$1" = "--local" ]; then
+    FUSEKI_HOME="${FUSEKI_HOME:-/opt/fuseki}"
+    DESC="${2:-$(dirname "$0")/sakon_ce_text.ttl}"
+    echo "สร้าง text index ใหม่จาก $DESC..."
+    exec java ${JVM_ARGS} -cp "$FUSEKI_HOME/fuseki-server.jar" jena.textindexer --desc="$DESC"
+fi
+
+cd "$(dirname "$0")/../.."
+echo "หยุด Fuseki..."
+docker compose stop fuseki
+# เริ่ม Fuseki กลับมาเสมอ แม้สร้าง index ไม่สำเร็จ
+trap 'echo "เริ่ม Fuseki..."; docker compose start fuseki' EXIT
+
+echo "สร้าง text index ใหม่..."
+docker compose run --rm --no-deps --entrypoint java fuseki \
+    -cp /jena-fuseki/fuseki-server.jar jena.textindexer \
+    --desc=/fuseki/configuration/sakon_ce.ttl
+echo "สร้าง text index สำเร็จ!"
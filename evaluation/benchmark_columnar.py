@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+เปรียบเทียบการแปลงผลลัพธ์ SPARQL แบบแถว (_parse_results) กับแบบคอลัมน์ (ColumnarResult)
+วัดเวลาแปลงและขนาด payload JSON บนผลลัพธ์สังเคราะห์ (ค่าเริ่มต้น 50,000 แถว)
+ไม่ต้องเชื่อมต่อ Fuseki
+"""
+
+import json
+import gzip
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from config import SCE_NAMESPACE  # noqa: E402
+from sparql.fuseki_client import fuseki_client  # noqa: E402
+from sparql.columnar import ColumnarResult  # noqa: E402
+
+CATEGORIES = ['ProcessedRice', 'Snack', 'Beverage', 'Seasoning', 'Textile',
+              'HerbalProduct', 'DriedFood', 'Confectionery']
+
+
+def uri(value):
+    return {'type': 'uri', 'value': value}
+
+
+def literal(value, datatype=None):
+    term = {'type': 'literal', 'value': value}
+    if datatype:
+        term['datatype'] = datatype
+    return term
+
+
+def build_synthetic_result(num_rows, num_enterprises=200):
+    """สร้าง SPARQL JSON รูปแบบเดียวกับ GET_ALL_PRODUCTS (มีคอลัมน์ OPTIONAL ว่างบางแถว)"""
+    bindings = []
+    for i in range(num_rows):
+        binding = {
+            'product': uri(f'{SCE_NAMESPACE}Product_{i:06d}'),
+            'name': literal(f'ผลิตภัณฑ์ทดสอบ {i}'),
+            'price': literal(str(20 + i % 480), 'http://www.w3.org/2001/XMLSchema#decimal'),
+            'category': uri(SCE_NAMESPACE + CATEGORIES[i % len(CATEGORIES)]),
+            'categoryName': literal(CATEGORIES[i % len(CATEGORIES)]),
+            'enterprise': uri(f'{SCE_NAMESPACE}CE_{i % num_enterprises:03d}'),
+        }
+        if i % 2 == 0:
+            binding['imageUrl'] = literal(f'/images/products/{i:06d}.jpg')
+        bindings.append(binding)
+    return {
+        'head': {'vars': ['product', 'name', 'price', 'category', 'categoryName',
+                          'enterprise', 'imageUrl']},
+        'results': {'bindings': bindings},
+    }
+
+
+def time_it(func, rounds):
+    """เวลา (ms) ของแต่ละรอบ"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def payload_sizes(obj):
+    body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+    return len(body), len(gzip.compress(body))
+
+
+def run_benchmark(num_rows, rounds):
+    raw = build_synthetic_result(num_rows)
+
+    rows_timings = time_it(lambda: fuseki_client._parse_results(raw), rounds)
+    columns_timings = time_it(lambda: ColumnarResult.from_sparql_json(raw), rounds)
+
+    rows = fuseki_client._parse_results(raw)
+    columns = ColumnarResult.from_sparql_json(raw)
+    assert columns.rows() == rows, 'ColumnarResult ต้องให้แถวเหมือน _parse_results'
+
+    # เวลาแปลงเป็น JSON (ส่วนที่ jsonify ทำใน route)
+    rows_serialize = time_it(lambda: json.dumps(rows, ensure_ascii=False), rounds)
+    columns_serialize = time_it(lambda: json.dumps(columns.to_dict(), ensure_ascii=False), rounds)
+
+    rows_bytes, rows_gzip = payload_sizes(rows)
+    columns_bytes, columns_gzip = payload_sizes(columns.to_dict())
+
+    return {
+        'num_rows': num_rows,
+        'rounds': rounds,
+        'rows': {
+            'parse_ms_median': round(statistics.median(rows_timings), 2),
+            'serialize_ms_median': round(statistics.median(rows_serialize), 2),
+            'payload_bytes': rows_bytes,
+            'payload_gzip_bytes': rows_gzip,
+        },
+        'columns': {
+            'parse_ms_median': round(statistics.median(columns_timings), 2),
+            'serialize_ms_median': round(statistics.median(columns_serialize), 2),
+            'payload_bytes': columns_bytes,
+            'payload_gzip_bytes': columns_gzip,
+            'namespaces': len(columns.namespaces),
+        },
+        'parse_speedup': round(statistics.median(rows_timings) / statistics.median(columns_timings), 2),
+        'serialize_speedup': round(statistics.median(rows_serialize) / statistics.median(columns_serialize), 2),
+        'payload_ratio': round(columns_bytes / rows_bytes, 3),
+        'payload_gzip_ratio': round(columns_gzip / rows_gzip, 3),
+    }
+
+
+def print_report(report):
+    print("=" * 50)
+    print(f"  ผลลัพธ์สังเคราะห์ {report['num_rows']:,} แถว ({report['rounds']} รอบ)")
+    print("=" * 50)
+    for label in ('rows', 'columns'):
+        item = report[label]
+        print(f"  {label:8s} parse {item['parse_ms_median']:>9.2f} ms  "
+              f"serialize {item['serialize_ms_median']:>9.2f} ms  "
+              f"payload {item['payload_bytes']:>11,} B  gzip {item['payload_gzip_bytes']:>9,} B")
+    print(f"  parse เร็วขึ้น {report['parse_speedup']}x, serialize เร็วขึ้น "
+          f"{report['serialize_speedup']}x, payload เหลือ "
+          f"{report['payload_ratio'] * 100:.1f}% (gzip {report['payload_gzip_ratio'] * 100:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='เปรียบเทียบผลลัพธ์แบบแถวกับแบบคอลัมน์')
+    parser.add_argument('--rows', type=int, default=50000,
+                        help='จำนวนแถวสังเคราะห์ (default: 50000)')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='จำนวนรอบวัดเวลา (default: 5)')
+    parser.add_argument('--output', default='results/',
+                        help='โฟลเดอร์เก็บผลลัพธ์ (default: results/)')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.rows, args.rounds)
+    print_report(report)
+
+    output_dir = os.path.join(os.path.dirname(__file__), args.output)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, 'columnar_benchmark.json')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"JSON exported: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+เปรียบเทียบการหา intent/อำเภอในคำค้นของ SemanticSearch แบบเดิม (วน `keyword in text` ทุกคำ)
+กับ Aho-Corasick automaton (services/keyword_matcher.py) เมื่อจำนวน intent เพิ่มเป็นหลักร้อย
+คำหลักสังเคราะห์สร้างจากพยางค์ภาษาไทยผสมกับคำหลักจริงของ SemanticSearch ไม่ต้องเชื่อมต่อ Fuseki
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.keyword_matcher import KeywordMatcher  # noqa: E402
+
+SYLLABLES = ['ข้าว', 'หอม', 'มะลิ', 'น้ำ', 'พริก', 'ปลา', 'ร้า', 'กล้วย', 'ทอด', 'กรอบ', 'สมุน', 'ไพร',
+             'หมาก', 'เม่า', 'ไข่', 'เค็ม', 'แหนม', 'ไส้', 'กรอก', 'ผ้า', 'คราม', 'ผึ้ง', 'เห็ด', 'ชา',
+             'กาแฟ', 'มัน', 'เทศ', 'ถั่ว', 'งา', 'ขิง', 'ข่า', 'ตะไคร้', 'ส้ม', 'มะม่วง', 'แดด', 'เดียว']
+FILLER = ['อยากได้', 'หา', 'ขอ', 'ผลิตภัณฑ์', 'แบบ', 'ที่', 'มี', 'ไหม', 'ครับ', 'ค่ะ', ' ', ' ']
+
+REAL_KEYWORDS = ['สุขภาพ', 'เพื่อสุขภาพ', 'ของฝาก', 'อินทรีย์', 'ออร์แกนิก', 'ออนไลน์', 'ราคาถูก', 'ถูก',
+                 'แพง', 'ขนม', 'เครื่องดื่ม', 'น้ำ', 'น้ำพริก', 'หมัก', 'แมลง', 'รีวิว']
+DISTRICTS = ['เมือง', 'เมืองสกลนคร', 'กุสุมาลย์', 'พังโคน', 'ภูพาน', 'สว่างแดนดิน', 'วานรนิวาส',
+             'โพนนาแก้ว', 'คำตากล้า', 'บ้านม่วง', 'กุดบาก', 'อากาศอำนวย']
+
+
+def build_vocabulary(num_intents, keywords_per_intent, rng):
+    """[(intent, [คำหลัก])] — intent แรกๆ ใช้คำจริง ที่เหลือเป็นคำประสม 2–3 พยางค์ไม่ซ้ำกัน"""
+    seen = set()
+    intents = []
+    real = iter(REAL_KEYWORDS)
+    for i in range(num_intents):
+        keywords = []
+        while len(keywords) < keywords_per_intent:
+            word = next(real, None) or ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+            if word not in seen:
+                seen.add(word)
+                keywords.append(word)
+        intents.append((f'intent_{i:04d}', keywords))
+    return intents
+
+
+def build_queries(intents, num_queries, rng):
+    """คำค้นที่มีคำหลัก 0–3 คำและชื่ออำเภอบ้าง คั่นด้วยคำทั่วไป"""
+    queries = []
+    for _ in range(num_queries):
+        parts = [rng.choice(FILLER) for _ in range(rng.randint(1, 4))]
+        for _ in range(rng.randint(0, 3)):
+            parts.append(rng.choice(rng.choice(intents)[1]))
+            parts.append(rng.choice(FILLER))
+        if rng.random() < 0.3:
+            parts.append(rng.choice(DISTRICTS))
+        rng.shuffle(parts)
+        queries.append(''.join(parts))
+    return queries
+
+
+def loop_match(intents, query):
+    """แบบเดิมของ SemanticSearch.search: อำเภอแรกที่พบ ไม่เช่นนั้น intent ที่มีคำตรงมากที่สุด"""
+    for district in DISTRICTS:
+        if district in query:
+            return ('district', district)
+    query_lower = query.lower()
+    best, best_score = None, 0
+    for intent, keywords in intents:
+        score = sum(1 for keyword in keywords if keyword in query_lower)
+        if score > best_score:
+            best, best_score = intent, score
+    return ('intent', best) if best else None
+
+
+def build_matcher(intents):
+    matcher = KeywordMatcher()
+    for intent, keywords in intents:
+        for keyword in keywords:
+            matcher.add(keyword, 'intent', intent)
+    for district in DISTRICTS:
+        matcher.add(district, 'district', district)
+    return matcher.build()
+
+
+def automaton_match(matcher, query):
+    """แบบใหม่: อ่านคำค้นรอบเดียว ตัดคำที่ทับกัน (คำยาวกว่าชนะ) แล้วรวมคะแนนตาม intent"""
+    scores = {}
+    for match in matcher.match(query):
+        if match.kind == 'district':
+            return ('district', match.keyword)
+        scores[match.value] = scores.get(match.value, 0) + match.weight
+    if not scores:
+        return None
+    return ('intent', min(scores, key=lambda intent: (-scores[intent], intent)))
+
+
+def time_per_query(func, queries, rounds):
+    """เวลาเฉลี่ยต่อคำค้น (µs) ของแต่ละรอบ"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for query in queries:
+            func(query)
+        timings.append((time.perf_counter() - start) * 1e6 / len(queries))
+    return timings
+
+
+def run_benchmark(num_intents, keywords_per_intent, num_queries, rounds, seed):
+    rng = random.Random(seed)
+    intents = build_vocabulary(num_intents, keywords_per_intent, rng)
+    queries = build_queries(intents, num_queries, rng)
+
+    start = time.perf_counter()
+    matcher = build_matcher(intents)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # automaton ต้องพบคำหลักชุดเดียวกับการวน `in` ทุกคำ (ก่อนตัดคำที่ทับกัน)
+    vocabulary = [keyword for _, keywords in intents for keyword in keywords] + DISTRICTS
+    for query in queries[:200]:
+        expected = {keyword for keyword in vocabulary if keyword in query.lower()}
+        found = {match.keyword for match in matcher.find_all(query)}
+        assert found == expected, f'ผลไม่ตรงกันสำหรับ {query!r}'
+
+    loop_timings = time_per_query(lambda query: loop_match(intents, query), queries, rounds)
+    automaton_timings = time_per_query(lambda query: automaton_match(matcher, query), queries, rounds)
+    agree = sum(loop_match(intents, query) == automaton_match(matcher, query) for query in queries)
+
+    return {
+        'intents': num_intents,
+        'keywords': len(vocabulary),
+        'queries': num_queries,
+        'avg_query_chars': round(statistics.mean(len(query) for query in queries), 1),
+        'rounds': rounds,
+        'build_ms': round(build_ms, 2),
+        'loop_us_median': round(statistics.median(loop_timings), 2),
+        'automaton_us_median': round(statistics.median(automaton_timings), 2),
+        'speedup': round(statistics.median(loop_timings) / statistics.median(automaton_timings), 2),
+        # ต่างกันได้เมื่อคำหนึ่งซ้อนอยู่ในอีกคำ (แบบเดิมนับทั้งสองคำ แบบใหม่นับเฉพาะคำที่ยาวกว่า)
+        'same_result_ratio': round(agree / num_queries, 3),
+    }
+
+
+def print_report(reports):
+    print("=" * 72)
+    print("  intent  keywords   build ms   loop µs/q   automaton µs/q   speedup   same")
+    print("=" * 72)
+    for report in reports:
+        print(f"  {report['intents']:>6,}  {report['keywords']:>8,}  {report['build_ms']:>9.2f}  "
+              f"{report['loop_us_median']:>10.2f}  {report['automaton_us_median']:>15.2f}  "
+              f"{report['speedup']:>7}x  {report['same_result_ratio'] * 100:>5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='เปรียบเทียบการหา intent แบบวนคำหลักกับ Aho-Corasick')
+    parser.add_argument('--intents', default='14,100,500,1000',
+                        help='จำนวน intent ที่ทดสอบ คั่นด้วยจุลภาค (default: 14,100,500,1000)')
+    parser.add_argument('--keywords', type=int, default=6,
+                        help='จำนวนคำหลักต่อ intent (default: 6)')
+    parser.add_argument('--queries', type=int, default=2000,
+                        help='จำนวนคำค้นสังเคราะห์ (default: 2000)')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='จำนวนรอบวัดเวลา (default: 5)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='results/',
+                        help='โฟลเดอร์เก็บผลลัพธ์ (default: results/)')
+    args = parser.parse_args()
+
+    reports = [run_benchmark(int(n), args.keywords, args.queries, args.rounds, args.seed)
+               for n in args.intents.split(',')]
+    print_report(reports)
+
+    output_dir = os.path.join(os.path.dirname(__file__), args.output)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, 'intent_matcher_benchmark.json')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(reports, f, ensure_ascii=False, indent=2)
+    print(f"JSON exported: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
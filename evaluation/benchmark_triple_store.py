@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+เปรียบเทียบ triple store ของ embedded backend: dict ซ้อนกัน (store.Graph) กับแบบเข้ารหัส id
++ array เรียงลำดับ (encoded.EncodedGraph) บน sample_data.ttl ที่ขยายขนาด (ค่าเริ่มต้น ×200 ≈ 360,000 triples)
+วัดเวลาโหลด หน่วยความจำของโครงสร้าง (tracemalloc — ไม่รวมตัว term ที่สร้างไว้ก่อนวัด)
+เวลาค้นตาม pattern เวลา SPARQL query และเวลาเปิดไฟล์ index ด้วย mmap
+ไม่ต้องเชื่อมต่อ Fuseki
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sparql.embedded.turtle import parse_turtle  # noqa: E402
+from sparql.embedded.store import TripleStore  # noqa: E402
+from sparql.embedded.encoded import EncodedGraph, TermDictionary  # noqa: E402
+from sparql.embedded.engine import SparqlEngine  # noqa: E402
+from sparql.embedded.rdf import URI, BNODE, literal  # noqa: E402
+from config import SPARQL_PREFIXES  # noqa: E402
+
+SAMPLE_DATA = os.path.join(os.path.dirname(__file__), '..', 'ontology', 'sample_data.ttl')
+
+# pattern ที่วัด: ตำแหน่งที่ผูกค่า (s, p, o)
+PATTERNS = {
+    'S??': (True, False, False),
+    'SP?': (True, True, False),
+    '?PO': (False, True, True),
+    '??O': (False, False, True),
+    'SPO': (True, True, True),
+}
+
+QUERIES = {
+    'product_detail': """
+SELECT ?name ?price ?categoryName WHERE {
+    sce:KhaoHang_1 sce:hasName ?name ; sce:hasPrice ?price ; sce:belongsToCategory ?c .
+    OPTIONAL { ?c sce:hasName ?categoryName }
+}""",
+    'products_by_category': """
+SELECT ?product ?name ?price WHERE {
+    ?product a sce:FoodProduct ; sce:hasName ?name ; sce:hasPrice ?price ;
+             sce:belongsToCategory sce:Snack_0 .
+} ORDER BY ?price LIMIT 20""",
+    'price_by_category': """
+SELECT ?category (COUNT(?product) AS ?count) (AVG(?price) AS ?avgPrice) WHERE {
+    ?product a sce:FoodProduct ; sce:hasPrice ?price ; sce:belongsToCategory ?category .
+} GROUP BY ?category""",
+}
+
+
+def scale_triples(base, copies):
+    """สำเนา copies ชุด: IRI ของ instance และ literal ข้อความได้ต่อท้าย _<i> (term ใหม่จริง)
+    ส่วน class/property ของ ontology และตัวเลขใช้ร่วมกันทุกชุด
+    """
+    instances = {s for s, _, _ in base if s[0] == URI}
+    triples = []
+    for i in range(copies):
+        suffix = f'_{i}'
+
+        def rename(term):
+            if term[0] == URI:
+                return (URI, term[1] + suffix) if term in instances else term
+            if term[0] == BNODE:
+                return (BNODE, term[1] + suffix)
+            if term[2] is None:
+                return literal(term[1] + suffix, lang=term[3])
+            return term
+
+        triples.extend((rename(s), p, rename(o)) for s, p, o in base)
+    return triples
+
+
+def build_dict(triples):
+    store = TripleStore()
+    for s, p, o in triples:
+        store.add(s, p, o)
+    store.estimate()
+    return store
+
+
+def build_encoded(triples):
+    dictionary = TermDictionary()
+    store = TripleStore(lambda: EncodedGraph(dictionary))
+    for s, p, o in triples:
+        store.add(s, p, o)
+    store.estimate()    # รวม triple ที่รอไว้เข้า index (เรียงครั้งเดียว)
+    return store
+
+
+def measure_build(build, triples):
+    """(store, เวลาโหลด ms, หน่วยความจำที่ใช้อยู่ MB, หน่วยความจำสูงสุดระหว่างโหลด MB)"""
+    start = time.perf_counter()
+    build(triples)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    tracemalloc.start()
+    store = build(triples)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, elapsed, current / 1024 / 1024, peak / 1024 / 1024
+
+
+def time_lookups(store, probes):
+    """เวลารวม (ms) ของการค้นและอ่านผลลัพธ์ครบทุก probe + จำนวนแถวทั้งหมด"""
+    start = time.perf_counter()
+    rows = 0
+    for s, p, o in probes:
+        for _ in store.triples(s, p, o):
+            rows += 1
+    return (time.perf_counter() - start) * 1000, rows
+
+
+def time_query(engine, query, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        engine.query(SPARQL_PREFIXES + query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(copies, probes_per_pattern, rounds, seed):
+    with open(SAMPLE_DATA, encoding='utf-8') as f:
+        base = parse_turtle(f.read())
+    triples = scale_triples(base, copies)
+
+    dict_store, dict_load, dict_mem, dict_peak = measure_build(build_dict, triples)
+    encoded_store, encoded_load, encoded_mem, encoded_peak = measure_build(build_encoded, triples)
+    assert len(dict_store) == len(encoded_store), 'จำนวน triple ต้องเท่ากัน'
+
+    rng = random.Random(seed)
+    lookups = {}
+    for name, bound in PATTERNS.items():
+        sample = rng.sample(triples, probes_per_pattern)
+        probes = [tuple(term if use else None for term, use in zip(triple, bound))
+                  for triple in sample]
+        dict_ms, dict_rows = time_lookups(dict_store, probes)
+        encoded_ms, encoded_rows = time_lookups(encoded_store, probes)
+        assert dict_rows == encoded_rows, f'{name}: จำนวนแถวต้องเท่ากัน'
+        lookups[name] = {
+            'probes': probes_per_pattern,
+            'rows': dict_rows,
+            'dict_us_per_lookup': round(dict_ms * 1000 / probes_per_pattern, 2),
+            'encoded_us_per_lookup': round(encoded_ms * 1000 / probes_per_pattern, 2),
+        }
+
+    queries = {}
+    dict_engine, encoded_engine = SparqlEngine(dict_store), SparqlEngine(encoded_store)
+    for name, query in QUERIES.items():
+        queries[name] = {
+            'dict_ms_median': round(time_query(dict_engine, query, rounds), 2),
+            'encoded_ms_median': round(time_query(encoded_engine, query, rounds), 2),
+        }
+
+    # ไฟล์ index: เวลาเปิดด้วย mmap (ส่วนใหญ่คือสร้างพจนานุกรม term จาก header)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.bin')
+        encoded_store.default.save(path)
+        start = time.perf_counter()
+        mapped = EncodedGraph.open(path, TermDictionary())
+        open_ms = (time.perf_counter() - start) * 1000
+        assert mapped.size == len(encoded_store)
+        mapped_ms, _ = time_lookups(mapped, [(s, p, None) for s, p, _ in
+                                             rng.sample(triples, probes_per_pattern)])
+        mmap_report = {
+            'file_bytes': os.path.getsize(path),
+            'open_ms': round(open_ms, 2),
+            'SP?_us_per_lookup': round(mapped_ms * 1000 / probes_per_pattern, 2),
+        }
+        del mapped
+
+    return {
+        'copies': copies,
+        'triples': len(dict_store),
+        'terms': len(encoded_store.default.dictionary),
+        'dict': {
+            'load_ms': round(dict_load, 1),
+            'memory_mb': round(dict_mem, 1),
+            'peak_mb': round(dict_peak, 1),
+        },
+        'encoded': {
+            'load_ms': round(encoded_load, 1),
+            'memory_mb': round(encoded_mem, 1),
+            'peak_mb': round(encoded_peak, 1),
+            'index_mb': round(len(encoded_store) * 24 / 1024 / 1024, 1),
+        },
+        'memory_ratio': round(encoded_mem / dict_mem, 3),
+        'lookups': lookups,
+        'queries': queries,
+        'mmap': mmap_report,
+    }
+
+
+def print_report(report):
+    print("=" * 66)
+    print(f"  sample_data.ttl ×{report['copies']} = {report['triples']:,} triples, "
+          f"{report['terms']:,} terms")
+    print("=" * 66)
+    for label in ('dict', 'encoded'):
+        item = report[label]
+        print(f"  {label:8s} load {item['load_ms']:>9.1f} ms  memory {item['memory_mb']:>7.1f} MB  "
+              f"(peak {item['peak_mb']:.1f} MB)")
+    print(f"  encoded ใช้หน่วยความจำ {report['memory_ratio'] * 100:.1f}% ของ dict "
+          f"(index {report['encoded']['index_mb']} MB ที่เหลือคือพจนานุกรม term)")
+    print("-" * 66)
+    print("  pattern   rows/probe    dict µs   encoded µs")
+    for name, item in report['lookups'].items():
+        print(f"  {name:8s} {item['rows'] / item['probes']:>10.1f} {item['dict_us_per_lookup']:>10.2f} "
+              f"{item['encoded_us_per_lookup']:>12.2f}")
+    print("-" * 66)
+    for name, item in report['queries'].items():
+        print(f"  {name:22s} dict {item['dict_ms_median']:>8.2f} ms  "
+              f"encoded {item['encoded_ms_median']:>8.2f} ms")
+    mapped = report['mmap']
+    print(f"  mmap: ไฟล์ {mapped['file_bytes'] / 1024 / 1024:.1f} MB เปิดใน {mapped['open_ms']:.1f} ms, "
+          f"SP? {mapped['SP?_us_per_lookup']:.2f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='เปรียบเทียบ triple store แบบ dict กับแบบเข้ารหัส id')
+    parser.add_argument('--copies', type=int, default=200,
+                        help='จำนวนสำเนาของ sample_data.ttl (default: 200)')
+    parser.add_argument('--probes', type=int, default=5000,
+                        help='จำนวนการค้นต่อ pattern (default: 5000)')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='จำนวนรอบวัดเวลา query (default: 5)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='seed ของการสุ่ม pattern (default: 42)')
+    parser.add_argument('--output', default='results/',
+                        help='โฟลเดอร์เก็บผลลัพธ์ (default: results/)')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.copies, args.probes, args.rounds, args.seed)
+    print_report(report)
+
+    output_dir = os.path.join(os.path.dirname(__file__), args.output)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, 'triple_store_benchmark.json')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"JSON exported: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -157,6 +157,57 @@ def run_evaluation(api_url, queries, num_rounds=5):
     return results
 
 
+# === Detail Mode Benchmark ===
+
+def canonical_document(doc):
+    """แปลงเอกสารเป็น string ที่ไม่ขึ้นกับลำดับรายการ (SPARQL ไม่รับประกันลำดับถ้าไม่มี ORDER BY)"""
+    if not isinstance(doc, dict):
+        return json.dumps(doc, sort_keys=True, ensure_ascii=False)
+    normalized = {
+        k: sorted(json.dumps(i, sort_keys=True, ensure_ascii=False) for i in v) if isinstance(v, list) else v
+        for k, v in doc.items()
+    }
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+def run_detail_benchmark(api_url, queries, modes, num_rounds=5):
+    """เปรียบเทียบเวลาดึงรายละเอียดผลิตภัณฑ์ระหว่างโหมด (multi / construct)
+
+    ใช้ product IDs ทั้งหมดที่ปรากฏใน expected_product_ids ของชุดคำถาม
+    และตรวจว่าเอกสารที่ได้จากทุกโหมดตรงกัน
+    """
+    product_ids = sorted({pid for q in queries for pid in q['expected_product_ids']})
+    print(f"\n[Detail Benchmark] {len(product_ids)} products, modes: {', '.join(modes)}")
+
+    timings = {mode: [] for mode in modes}
+    mismatches = []
+    for pid in product_ids:
+        documents = {}
+        for mode in modes:
+            for round_num in range(num_rounds):
+                data, elapsed = call_api(api_url, f"/products/{pid}?mode={mode}")
+                timings[mode].append(elapsed)
+                if round_num == 0 and data:
+                    documents[mode] = data.get('product')
+        if len({canonical_document(d) for d in documents.values()}) > 1:
+            mismatches.append(pid)
+
+    summary = {
+        mode: {
+            'avg_ms': round(statistics.mean(rts), 2),
+            'median_ms': round(statistics.median(rts), 2),
+            'max_ms': round(max(rts), 2),
+        }
+        for mode, rts in timings.items() if rts
+    }
+    for mode, s in summary.items():
+        print(f"  {mode:>10}: avg={s['avg_ms']:.1f}ms, median={s['median_ms']:.1f}ms, max={s['max_ms']:.1f}ms")
+    if mismatches:
+        print(f"  [WARNING] เอกสารไม่ตรงกันระหว่างโหมด: {', '.join(mismatches)}")
+
+    return {'products': len(product_ids), 'summary': summary, 'mismatches': mismatches}
+
+
 # === Report Generation ===
 
 def generate_summary(results):
@@ -401,6 +452,8 @@ def main():
                        help='โฟลเดอร์เก็บผลลัพธ์ (default: results/)')
     parser.add_argument('--rounds', type=int, default=5,
                        help='จำนวนรอบทดสอบต่อ query (default: 5)')
+    parser.add_argument('--detail-modes', default='',
+                       help='เปรียบเทียบโหมดดึงรายละเอียดผลิตภัณฑ์ เช่น multi,construct')
     args = parser.parse_args()
 
     # โหลดชุดคำถาม
@@ -443,6 +496,15 @@ def main():
     export_csv(results, summary, output_dir)
     export_json(results, summary, output_dir)
 
+    # เปรียบเทียบโหมดดึงรายละเอียดผลิตภัณฑ์
+    if args.detail_modes:
+        modes = [m.strip() for m in args.detail_modes.split(',') if m.strip()]
+        benchmark = run_detail_benchmark(args.api_url, queries, modes, args.rounds)
+        benchmark_path = os.path.join(output_dir, 'detail_mode_benchmark.json')
+        with open(benchmark_path, 'w', encoding='utf-8') as f:
+            json.dump(benchmark, f, ensure_ascii=False, indent=2)
+        print(f"JSON exported: {benchmark_path}")
+
     # สร้างกราฟ
     try:
         generate_charts(results, summary, output_dir)
@@ -12,6 +12,7 @@ const api = axios.create({
 // Products
 export const getProducts = (params) => api.get('/products', { params });
 export const getProductById = (id) => api.get(`/products/${id}`);
+export const getProductsBatch = (ids) => api.post('/products/batch', { ids });
 
 // Enterprises
 export const getEnterprises = () => api.get('/enterprises');
@@ -38,6 +39,7 @@ export const getSharedIngredients = () => api.get('/analytics/shared-ingredients
 
 // Recommendations
 export const getSimilarProducts = (id) => api.get(`/recommendations/${id}/similar`);
+export const getSimilarProductsBatch = (ids) => api.post('/recommendations/similar/batch', { ids });
 
 // Health
 export const getHealth = () => api.get('/health');